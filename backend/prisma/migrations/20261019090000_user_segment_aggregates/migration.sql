@@ -0,0 +1,12 @@
+-- AlterTable
+ALTER TABLE "user_segments" ADD COLUMN     "firstOrderAt" TIMESTAMP(3),
+ADD COLUMN     "lastOrderAt" TIMESTAMP(3);
+
+-- CreateIndex
+CREATE INDEX "orders_userId_status_idx" ON "orders"("userId", "status");
+
+-- CreateIndex
+CREATE INDEX "user_segments_lastCalculated_idx" ON "user_segments"("lastCalculated");
+
+-- CreateIndex
+CREATE INDEX "user_segments_lastOrderAt_idx" ON "user_segments"("lastOrderAt");
@@ -0,0 +1,6 @@
+-- AlterTable
+ALTER TABLE "loyalty_points" ADD COLUMN     "completedReferrals" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN     "countersSyncedAt" TIMESTAMP(3),
+ADD COLUMN     "totalPurchases" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN     "totalReviews" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN     "totalSpent" DOUBLE PRECISION NOT NULL DEFAULT 0.0;
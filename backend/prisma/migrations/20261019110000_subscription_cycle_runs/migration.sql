@@ -0,0 +1,33 @@
+-- CreateTable
+CREATE TABLE "subscription_cycle_runs" (
+    "id" TEXT NOT NULL,
+    "dueBefore" TIMESTAMP(3) NOT NULL,
+    "pageSize" INTEGER NOT NULL DEFAULT 500,
+    "concurrency" INTEGER NOT NULL DEFAULT 4,
+    "status" TEXT NOT NULL DEFAULT 'RUNNING',
+    "cursor" TEXT,
+    "pages" INTEGER NOT NULL DEFAULT 0,
+    "resumedCount" INTEGER NOT NULL DEFAULT 0,
+    "processed" INTEGER NOT NULL DEFAULT 0,
+    "ordersCreated" INTEGER NOT NULL DEFAULT 0,
+    "failed" INTEGER NOT NULL DEFAULT 0,
+    "durationMs" INTEGER NOT NULL DEFAULT 0,
+    "lastError" TEXT,
+    "startedAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "finishedAt" TIMESTAMP(3),
+    "updatedAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "subscription_cycle_runs_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE INDEX "subscription_cycle_runs_status_idx" ON "subscription_cycle_runs"("status");
+
+-- CreateIndex
+CREATE INDEX "subscription_cycle_runs_startedAt_idx" ON "subscription_cycle_runs"("startedAt");
+
+-- CreateIndex
+CREATE INDEX "subscriptions_status_id_idx" ON "subscriptions"("status", "id");
+
+-- CreateIndex
+CREATE INDEX "subscription_deliveries_subscriptionId_status_idx" ON "subscription_deliveries"("subscriptionId", "status");
@@ -0,0 +1,14 @@
+-- CreateIndex
+CREATE INDEX "products_isActive_createdAt_id_idx" ON "products"("isActive", "createdAt", "id");
+
+-- CreateIndex
+CREATE INDEX "orders_createdAt_id_idx" ON "orders"("createdAt", "id");
+
+-- CreateIndex
+CREATE INDEX "users_createdAt_id_idx" ON "users"("createdAt", "id");
+
+-- CreateIndex
+CREATE INDEX "inventory_movements_createdAt_id_idx" ON "inventory_movements"("createdAt", "id");
+
+-- CreateIndex
+CREATE INDEX "loyalty_transactions_userId_createdAt_id_idx" ON "loyalty_transactions"("userId", "createdAt", "id");
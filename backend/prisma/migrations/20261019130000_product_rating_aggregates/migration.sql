@@ -0,0 +1,41 @@
+-- AlterTable
+ALTER TABLE "products" ADD COLUMN     "ratingSum" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN     "rating1Count" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN     "rating2Count" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN     "rating3Count" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN     "rating4Count" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN     "rating5Count" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN     "verifiedReviews" INTEGER NOT NULL DEFAULT 0;
+
+-- CreateIndex
+CREATE INDEX "products_isActive_averageRating_id_idx" ON "products"("isActive", "averageRating", "id");
+
+-- CreateIndex
+CREATE INDEX "reviews_productId_status_idx" ON "reviews"("productId", "status");
+
+-- Backfill desde las reseñas aprobadas existentes
+UPDATE "products" AS p SET
+  "totalReviews" = r.total,
+  "ratingSum" = r.sum,
+  "rating1Count" = r.c1,
+  "rating2Count" = r.c2,
+  "rating3Count" = r.c3,
+  "rating4Count" = r.c4,
+  "rating5Count" = r.c5,
+  "verifiedReviews" = r.verified,
+  "averageRating" = r.sum::double precision / r.total
+FROM (
+  SELECT "productId",
+    COUNT(*)::int AS total,
+    SUM("rating")::int AS sum,
+    COUNT(*) FILTER (WHERE "rating" = 1)::int AS c1,
+    COUNT(*) FILTER (WHERE "rating" = 2)::int AS c2,
+    COUNT(*) FILTER (WHERE "rating" = 3)::int AS c3,
+    COUNT(*) FILTER (WHERE "rating" = 4)::int AS c4,
+    COUNT(*) FILTER (WHERE "rating" = 5)::int AS c5,
+    COUNT(*) FILTER (WHERE "isVerifiedPurchase")::int AS verified
+  FROM "reviews"
+  WHERE "status" = 'APPROVED'
+  GROUP BY "productId"
+) AS r
+WHERE p."id" = r."productId";
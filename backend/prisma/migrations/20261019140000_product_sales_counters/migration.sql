@@ -0,0 +1,50 @@
+-- AlterTable
+ALTER TABLE "orders" ADD COLUMN     "salesCountedAt" TIMESTAMP(3);
+
+-- CreateTable
+CREATE TABLE "product_daily_sales" (
+    "id" TEXT NOT NULL,
+    "productId" TEXT NOT NULL,
+    "day" TIMESTAMP(3) NOT NULL,
+    "units" INTEGER NOT NULL DEFAULT 0,
+    "revenue" DOUBLE PRECISION NOT NULL DEFAULT 0.0,
+    "updatedAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "product_daily_sales_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE INDEX "product_daily_sales_day_idx" ON "product_daily_sales"("day");
+
+-- CreateIndex
+CREATE UNIQUE INDEX "product_daily_sales_productId_day_key" ON "product_daily_sales"("productId", "day");
+
+-- CreateIndex
+CREATE INDEX "products_isActive_totalSales_id_idx" ON "products"("isActive", "totalSales", "id");
+
+-- AddForeignKey
+ALTER TABLE "product_daily_sales" ADD CONSTRAINT "product_daily_sales_productId_fkey" FOREIGN KEY ("productId") REFERENCES "products"("id") ON DELETE CASCADE ON UPDATE CASCADE;
+
+-- Backfill desde los pedidos pagados existentes
+UPDATE "orders" SET "salesCountedAt" = CURRENT_TIMESTAMP
+WHERE "paymentStatus" IN ('CAPTURED', 'PAID', 'COD_COLLECTED');
+
+INSERT INTO "product_daily_sales" ("id", "productId", "day", "units", "revenue", "updatedAt")
+SELECT md5(oi."productId" || date_trunc('day', o."createdAt")::text),
+       oi."productId",
+       date_trunc('day', o."createdAt"),
+       SUM(oi."quantity")::int,
+       SUM(oi."total"),
+       CURRENT_TIMESTAMP
+FROM "order_items" oi
+JOIN "orders" o ON o."id" = oi."orderId"
+WHERE o."salesCountedAt" IS NOT NULL
+GROUP BY oi."productId", date_trunc('day', o."createdAt");
+
+UPDATE "products" AS p SET "totalSales" = s.units
+FROM (
+  SELECT "productId", SUM("units")::int AS units
+  FROM "product_daily_sales"
+  GROUP BY "productId"
+) AS s
+WHERE p."id" = s."productId";
@@ -0,0 +1,24 @@
+-- CreateTable
+CREATE TABLE "media_assets" (
+    "id" TEXT NOT NULL,
+    "hash" TEXT NOT NULL,
+    "extension" TEXT NOT NULL,
+    "kind" TEXT NOT NULL,
+    "mimeType" TEXT NOT NULL,
+    "bytes" INTEGER NOT NULL,
+    "width" INTEGER,
+    "height" INTEGER,
+    "status" TEXT NOT NULL DEFAULT 'PENDING',
+    "renditions" TEXT,
+    "error" TEXT,
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updatedAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "media_assets_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE UNIQUE INDEX "media_assets_hash_key" ON "media_assets"("hash");
+
+-- CreateIndex
+CREATE INDEX "media_assets_status_idx" ON "media_assets"("status");
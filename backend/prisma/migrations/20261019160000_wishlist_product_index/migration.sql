@@ -0,0 +1,2 @@
+-- CreateIndex
+CREATE INDEX "wishlist_items_productId_notifyPriceChange_idx" ON "wishlist_items"("productId", "notifyPriceChange");
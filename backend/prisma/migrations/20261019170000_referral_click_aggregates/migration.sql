@@ -0,0 +1,39 @@
+-- AlterTable
+ALTER TABLE "loyalty_points" ADD COLUMN     "referralPoints" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN     "referralClicks" INTEGER NOT NULL DEFAULT 0;
+
+-- CreateTable
+CREATE TABLE "referral_click_minutes" (
+    "referralCode" TEXT NOT NULL,
+    "minute" TIMESTAMP(3) NOT NULL,
+    "clicks" INTEGER NOT NULL DEFAULT 0,
+
+    CONSTRAINT "referral_click_minutes_pkey" PRIMARY KEY ("referralCode","minute")
+);
+
+-- DropIndex (referralCode ya tiene índice único)
+DROP INDEX IF EXISTS "referrals_referralCode_idx";
+
+-- DropIndex
+DROP INDEX IF EXISTS "referrals_referredUserId_idx";
+
+-- CreateIndex
+CREATE INDEX "referrals_referredUserId_status_idx" ON "referrals"("referredUserId", "status");
+
+-- CreateIndex
+CREATE INDEX "loyalty_points_totalReferrals_referralPoints_idx" ON "loyalty_points"("totalReferrals", "referralPoints");
+
+-- Backfill desde los referidos existentes
+UPDATE "loyalty_points" AS l SET
+  "totalReferrals" = r.registered,
+  "referralPoints" = r.points,
+  "referralClicks" = r.clicks
+FROM (
+  SELECT "referrerLoyaltyId",
+    COUNT(*) FILTER (WHERE "status" <> 'PENDING')::int AS registered,
+    SUM("referrerPoints")::int AS points,
+    SUM("clickCount")::int AS clicks
+  FROM "referrals"
+  GROUP BY "referrerLoyaltyId"
+) AS r
+WHERE l."id" = r."referrerLoyaltyId";
@@ -0,0 +1,16 @@
+-- AlterTable
+ALTER TABLE "subscription_cycle_runs" ADD COLUMN     "leaseOwner" TEXT,
+ADD COLUMN     "leaseExpiresAt" TIMESTAMP(3);
+
+-- Las corridas RUNNING anteriores no tienen concesión: se consideran vencidas
+-- y se pueden retomar. Una corrida RUNNING más antigua que otra queda abandonada
+-- para poder crear el índice único.
+UPDATE "subscription_cycle_runs" r SET "status" = 'ABANDONED', "finishedAt" = CURRENT_TIMESTAMP
+WHERE r."status" = 'RUNNING'
+  AND EXISTS (
+    SELECT 1 FROM "subscription_cycle_runs" o
+    WHERE o."status" = 'RUNNING' AND o."startedAt" > r."startedAt"
+  );
+
+-- CreateIndex (a lo sumo una corrida RUNNING entre todos los procesos)
+CREATE UNIQUE INDEX "subscription_cycle_runs_single_running_key" ON "subscription_cycle_runs"("status") WHERE "status" = 'RUNNING';
@@ -0,0 +1,74 @@
+/**
+ * Bases de datos aisladas para el harness de pruebas (harness.py)
+ * Cada instancia del harness corre contra su propia copia de una base
+ * plantilla ya migrada y sembrada. En PostgreSQL la copia es un
+ * CREATE DATABASE ... TEMPLATE (copia de archivos, sin re-sembrar).
+ *
+ * Se conecta a la base de mantenimiento `postgres` del mismo servidor que
+ * DATABASE_URL.
+ *
+ * Uso:
+ *   node scripts/harness-db.js exists carnes_harness_template
+ *   node scripts/harness-db.js create carnes_harness_template
+ *   node scripts/harness-db.js clone carnes_harness_template carnes_harness_1234_0
+ *   node scripts/harness-db.js drop carnes_harness_1234_0
+ */
+
+require('dotenv').config();
+const { PrismaClient } = require('@prisma/client');
+
+const NAME_PATTERN = /^[a-z][a-z0-9_]{0,62}$/;
+
+function databaseName(name) {
+  if (!NAME_PATTERN.test(name || '')) {
+    throw new Error(`Nombre de base inválido: ${name}`);
+  }
+  return `"${name}"`;
+}
+
+function maintenanceUrl() {
+  const url = new URL(process.env.DATABASE_URL);
+  url.pathname = '/postgres';
+  url.searchParams.delete('schema');
+  return url.toString();
+}
+
+async function exists(prisma, name) {
+  databaseName(name);
+  const rows = await prisma.$queryRaw`SELECT 1 FROM pg_database WHERE datname = ${name}`;
+  return rows.length > 0;
+}
+
+async function main() {
+  const [command, ...names] = process.argv.slice(2);
+  const prisma = new PrismaClient({ datasources: { db: { url: maintenanceUrl() } } });
+
+  try {
+    switch (command) {
+      case 'exists':
+        process.exitCode = await exists(prisma, names[0]) ? 0 : 1;
+        break;
+      case 'create':
+        await prisma.$executeRawUnsafe(`CREATE DATABASE ${databaseName(names[0])}`);
+        break;
+      case 'clone':
+        // La plantilla no puede tener conexiones abiertas durante la copia
+        await prisma.$executeRawUnsafe(
+          `CREATE DATABASE ${databaseName(names[1])} TEMPLATE ${databaseName(names[0])}`
+        );
+        break;
+      case 'drop':
+        await prisma.$executeRawUnsafe(`DROP DATABASE IF EXISTS ${databaseName(names[0])} WITH (FORCE)`);
+        break;
+      default:
+        throw new Error(`Comando desconocido: ${command} (exists, create, clone, drop)`);
+    }
+  } finally {
+    await prisma.$disconnect();
+  }
+}
+
+main().catch(error => {
+  console.error(`❌ ${error.message}`);
+  process.exit(2);
+});
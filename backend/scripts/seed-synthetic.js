@@ -0,0 +1,399 @@
+/**
+ * Generador de datos sintéticos para benchmarks
+ * Crea usuarios, pedidos, catálogo, reseñas, wishlists y suscripciones en volumen con
+ * createMany por bloques.
+ *
+ * Uso:
+ *   node scripts/seed-synthetic.js --users 200000 --orders-per-user 5
+ *   node scripts/seed-synthetic.js --users 50000 --products 20 --subscriptions 50000
+ *   node scripts/seed-synthetic.js --products 25000 --movements 100000
+ *   node scripts/seed-synthetic.js --users 5000 --products 500 --reviews 200000
+ *   node scripts/seed-synthetic.js --users 100000 --orders-per-user 4 --products 2000 --items-per-order 2.5
+ *   node scripts/seed-synthetic.js --users 50 --products 10000 --wishlist 500000
+ *   node scripts/seed-synthetic.js --reset
+ *
+ * Todas las filas generadas usan el prefijo de id "syn_" y el dominio
+ * @synthetic.local para poder borrarlas con --reset.
+ */
+
+require('dotenv').config();
+const { PrismaClient } = require('@prisma/client');
+const bcrypt = require('bcryptjs');
+
+const prisma = new PrismaClient();
+
+const ID_PREFIX = 'syn_';
+const EMAIL_DOMAIN = 'synthetic.local';
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+function parseArgs(argv) {
+  const args = {
+    users: 0,
+    ordersPerUser: 0,
+    days: 365,
+    products: 0,
+    subscriptions: 0,
+    movements: 0,
+    reviews: 0,
+    itemsPerOrder: 0,
+    wishlist: 0,
+    chunkSize: 5000,
+    seed: 42,
+    reset: false
+  };
+
+  for (let i = 2; i < argv.length; i++) {
+    const arg = argv[i];
+    const value = argv[i + 1];
+    switch (arg) {
+      case '--users': args.users = parseInt(value); i++; break;
+      case '--orders-per-user': args.ordersPerUser = parseFloat(value); i++; break;
+      case '--days': args.days = parseInt(value); i++; break;
+      case '--products': args.products = parseInt(value); i++; break;
+      case '--subscriptions': args.subscriptions = parseInt(value); i++; break;
+      case '--movements': args.movements = parseInt(value); i++; break;
+      case '--reviews': args.reviews = parseInt(value); i++; break;
+      case '--items-per-order': args.itemsPerOrder = parseFloat(value); i++; break;
+      case '--wishlist': args.wishlist = parseInt(value); i++; break;
+      case '--chunk-size': args.chunkSize = parseInt(value); i++; break;
+      case '--seed': args.seed = parseInt(value); i++; break;
+      case '--reset': args.reset = true; break;
+      default:
+        console.warn(`Argumento desconocido: ${arg}`);
+    }
+  }
+
+  return args;
+}
+
+/**
+ * PRNG determinista (mulberry32) para que dos corridas generen lo mismo
+ */
+function createRandom(seed) {
+  let state = seed >>> 0;
+  return () => {
+    state = (state + 0x6D2B79F5) >>> 0;
+    let t = state;
+    t = Math.imul(t ^ (t >>> 15), t | 1);
+    t ^= t + Math.imul(t ^ (t >>> 7), t | 61);
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+  };
+}
+
+function syntheticId(kind, index) {
+  return `${ID_PREFIX}${kind}_${String(index).padStart(8, '0')}`;
+}
+
+async function insertInChunks(label, total, chunkSize, buildRow, insert) {
+  const startedAt = Date.now();
+  for (let offset = 0; offset < total; offset += chunkSize) {
+    const rows = [];
+    const end = Math.min(offset + chunkSize, total);
+    for (let i = offset; i < end; i++) {
+      rows.push(buildRow(i));
+    }
+    await insert(rows);
+    process.stdout.write(`\r   ${label}: ${end}/${total}`);
+  }
+  const seconds = ((Date.now() - startedAt) / 1000).toFixed(1);
+  process.stdout.write(`\r   ${label}: ${total} en ${seconds}s\n`);
+}
+
+async function seedUsers(args, random) {
+  const passwordHash = await bcrypt.hash('synthetic123', 10);
+  const now = Date.now();
+
+  await insertInChunks('Usuarios', args.users, args.chunkSize, (i) => ({
+    id: syntheticId('u', i),
+    email: `user${i}@${EMAIL_DOMAIN}`,
+    password: passwordHash,
+    name: `Synthetic User ${i}`,
+    role: 'CUSTOMER',
+    createdAt: new Date(now - Math.floor(random() * args.days) * DAY_MS)
+  }), (rows) => prisma.user.createMany({ data: rows, skipDuplicates: true }));
+}
+
+async function seedOrders(args, random) {
+  const totalOrders = Math.round(args.users * args.ordersPerUser);
+  const now = Date.now();
+  const address = JSON.stringify({ street: 'Calle Sintética 1', city: 'CDMX' });
+  const statuses = ['DELIVERED', 'DELIVERED', 'DELIVERED', 'DELIVERED', 'CANCELLED', 'PENDING'];
+
+  await insertInChunks('Pedidos', totalOrders, args.chunkSize, (i) => {
+    const subtotal = Math.round((20 + random() * 380) * 100) / 100;
+    return {
+      id: syntheticId('o', i),
+      orderNumber: `SYN-${String(i).padStart(9, '0')}`,
+      userId: syntheticId('u', Math.floor(random() * args.users)),
+      status: statuses[Math.floor(random() * statuses.length)],
+      paymentStatus: 'CAPTURED',
+      subtotal,
+      total: subtotal,
+      billingAddress: address,
+      shippingAddress: address,
+      createdAt: new Date(now - Math.floor(random() * args.days * DAY_MS))
+    };
+  }, (rows) => prisma.order.createMany({ data: rows, skipDuplicates: true }));
+}
+
+async function seedCatalog(args) {
+  const categoryId = `${ID_PREFIX}category`;
+  await prisma.category.upsert({
+    where: { id: categoryId },
+    update: {},
+    create: { id: categoryId, name: 'Synthetic', slug: 'synthetic' }
+  });
+
+  await insertInChunks('Productos', args.products, args.chunkSize, (i) => ({
+    id: syntheticId('p', i),
+    name: `Synthetic Cut ${i}`,
+    slug: `synthetic-cut-${i}`,
+    sku: `SYN-P-${i}`,
+    categoryId
+  }), (rows) => prisma.product.createMany({ data: rows, skipDuplicates: true }));
+
+  await insertInChunks('Variantes', args.products, args.chunkSize, (i) => ({
+    id: syntheticId('v', i),
+    productId: syntheticId('p', i),
+    name: '1 kg',
+    sku: `SYN-V-${i}`,
+    price: 100 + (i % 10) * 25,
+    cost: 60 + (i % 10) * 15,
+    stock: 1000000,
+    isDefault: true
+  }), (rows) => prisma.productVariant.createMany({ data: rows, skipDuplicates: true }));
+}
+
+async function seedSubscriptions(args, random) {
+  const boxProducts = Math.min(3, args.products);
+  const includedProducts = Array.from({ length: boxProducts }, (_, i) => ({
+    productId: syntheticId('p', i),
+    variantId: syntheticId('v', i),
+    quantity: 1 + (i % 2)
+  }));
+  const planId = `${ID_PREFIX}plan_weekly`;
+
+  await prisma.subscriptionPlan.upsert({
+    where: { id: planId },
+    update: {},
+    create: {
+      id: planId,
+      name: 'Synthetic Weekly Box',
+      slug: 'synthetic-weekly-box',
+      boxType: 'STANDARD',
+      estimatedValue: 450,
+      price: 399,
+      includedProducts: JSON.stringify(includedProducts),
+      productCount: includedProducts.length,
+      deliveryFrequency: 'WEEKLY'
+    }
+  });
+
+  // Todas vencen en la última hora: simula la corrida semanal
+  const now = Date.now();
+  const dueDates = [];
+  const address = JSON.stringify({ street: 'Calle Sintética 1', city: 'CDMX' });
+
+  await insertInChunks('Suscripciones', args.subscriptions, args.chunkSize, (i) => {
+    dueDates[i] = new Date(now - Math.floor(random() * 60 * 60 * 1000));
+    return {
+      id: syntheticId('s', i),
+      userId: syntheticId('u', i % args.users),
+      planId,
+      status: 'ACTIVE',
+      frequency: 'WEEKLY',
+      nextDeliveryDate: dueDates[i],
+      shippingAddress: address,
+      totalDeliveries: 1
+    };
+  }, (rows) => prisma.subscription.createMany({ data: rows, skipDuplicates: true }));
+
+  await insertInChunks('Entregas programadas', args.subscriptions, args.chunkSize, (i) => ({
+    id: syntheticId('d', i),
+    subscriptionId: syntheticId('s', i),
+    scheduledDate: dueDates[i],
+    status: 'SCHEDULED',
+    products: JSON.stringify(includedProducts),
+    totalValue: 450
+  }), (rows) => prisma.subscriptionDelivery.createMany({ data: rows, skipDuplicates: true }));
+}
+
+async function seedMovements(args, random) {
+  const now = Date.now();
+  const types = ['IN', 'OUT', 'OUT', 'OUT', 'ADJUSTMENT', 'RETURN'];
+
+  await insertInChunks('Movimientos', args.movements, args.chunkSize, (i) => {
+    const index = Math.floor(random() * args.products);
+    const type = types[Math.floor(random() * types.length)];
+    const quantity = (type === 'OUT' ? -1 : 1) * (1 + Math.floor(random() * 20));
+    const previousStock = 500 + Math.floor(random() * 500);
+    return {
+      id: syntheticId('m', i),
+      productId: syntheticId('p', index),
+      variantId: syntheticId('v', index),
+      type,
+      quantity,
+      previousStock,
+      newStock: previousStock + quantity,
+      referenceType: 'ADJUSTMENT',
+      reason: 'Movimiento sintético',
+      createdAt: new Date(now - Math.floor(random() * args.days * DAY_MS))
+    };
+  }, (rows) => prisma.inventoryMovement.createMany({ data: rows, skipDuplicates: true }));
+}
+
+/**
+ * Items de pedidos repartidos al azar entre pedidos y productos.
+ * Se insertan sin pasar por la API: los contadores de ventas se
+ * reconstruyen después con POST /api/admin/sales-counters/rebuild.
+ */
+async function seedOrderItems(args, random) {
+  const totalOrders = Math.round(args.users * args.ordersPerUser);
+  const totalItems = Math.round(totalOrders * args.itemsPerOrder);
+
+  await insertInChunks('Items de pedidos', totalItems, args.chunkSize, (i) => {
+    const index = Math.floor(random() * args.products);
+    const quantity = 1 + Math.floor(random() * 5);
+    const price = 100 + (index % 10) * 25;
+    return {
+      id: syntheticId('oi', i),
+      orderId: syntheticId('o', Math.floor(random() * totalOrders)),
+      productId: syntheticId('p', index),
+      variantId: syntheticId('v', index),
+      quantity,
+      price,
+      total: price * quantity
+    };
+  }, (rows) => prisma.orderItem.createMany({ data: rows, skipDuplicates: true }));
+}
+
+/**
+ * Reseñas: la reseña i es del producto i % products y del usuario
+ * i / products, así se respeta el único (userId, productId).
+ * Se insertan sin pasar por la API: los agregados del producto se
+ * reconstruyen después con POST /api/review/admin/ratings/rebuild.
+ */
+async function seedReviews(args, random) {
+  const now = Date.now();
+  const statuses = ['APPROVED', 'APPROVED', 'APPROVED', 'APPROVED', 'PENDING', 'REJECTED'];
+  // Sesgo hacia calificaciones altas, como en reseñas reales
+  const ratings = [1, 2, 3, 4, 4, 5, 5, 5];
+
+  await insertInChunks('Reseñas', args.reviews, args.chunkSize, (i) => ({
+    id: syntheticId('r', i),
+    userId: syntheticId('u', Math.floor(i / args.products)),
+    productId: syntheticId('p', i % args.products),
+    rating: ratings[Math.floor(random() * ratings.length)],
+    title: 'Reseña sintética',
+    isVerifiedPurchase: random() < 0.4,
+    status: statuses[Math.floor(random() * statuses.length)],
+    createdAt: new Date(now - Math.floor(random() * args.days * DAY_MS))
+  }), (rows) => prisma.review.createMany({ data: rows, skipDuplicates: true }));
+}
+
+/**
+ * Items de wishlist con alerta de precio: el item i es del producto
+ * i % products y del usuario i / products (único userId, productId).
+ * El precio guardado es el de la variante sembrada, así una actualización
+ * de precios genera alertas para todos los seguidores del producto.
+ */
+async function seedWishlist(args, random) {
+  const now = Date.now();
+
+  await insertInChunks('Wishlist', args.wishlist, args.chunkSize, (i) => {
+    const index = i % args.products;
+    const price = 100 + (index % 10) * 25;
+    return {
+      id: syntheticId('w', i),
+      userId: syntheticId('u', Math.floor(i / args.products)),
+      productId: syntheticId('p', index),
+      priceWhenAdded: price,
+      notifyPriceChange: random() < 0.8,
+      targetPrice: random() < 0.2 ? Math.round(price * 0.9) : null,
+      createdAt: new Date(now - Math.floor(random() * args.days * DAY_MS))
+    };
+  }, (rows) => prisma.wishlistItem.createMany({ data: rows, skipDuplicates: true }));
+}
+
+async function reset() {
+  console.log('🧹 Eliminando datos sintéticos...');
+  const synthetic = { startsWith: ID_PREFIX };
+  await prisma.userSegment.deleteMany({ where: { userId: synthetic } });
+  await prisma.subscription.deleteMany({ where: { id: synthetic } });
+  await prisma.subscriptionPlan.deleteMany({ where: { id: synthetic } });
+  await prisma.order.deleteMany({ where: { userId: synthetic } });
+  await prisma.review.deleteMany({ where: { userId: synthetic } });
+  await prisma.wishlistPriceAlert.deleteMany({ where: { userId: synthetic } });
+  await prisma.inventoryMovement.deleteMany({ where: { productId: synthetic } });
+  await prisma.productVariant.deleteMany({ where: { id: synthetic } });
+  await prisma.product.deleteMany({ where: { id: synthetic } });
+  await prisma.category.deleteMany({ where: { id: synthetic } });
+  await prisma.user.deleteMany({ where: { id: synthetic } });
+}
+
+async function main() {
+  const args = parseArgs(process.argv);
+  const random = createRandom(args.seed);
+
+  if (args.reset) {
+    await reset();
+  }
+
+  if (args.users > 0) {
+    console.log(`🌱 Generando dataset sintético (${args.users} usuarios)...`);
+    await seedUsers(args, random);
+    if (args.ordersPerUser > 0) {
+      await seedOrders(args, random);
+    }
+  }
+
+  if (args.products > 0) {
+    await seedCatalog(args);
+  }
+
+  if (args.movements > 0) {
+    if (args.products === 0) {
+      throw new Error('--movements requiere --products');
+    }
+    await seedMovements(args, random);
+  }
+
+  if (args.itemsPerOrder > 0) {
+    if (args.users === 0 || args.ordersPerUser === 0 || args.products === 0) {
+      throw new Error('--items-per-order requiere --users, --orders-per-user y --products');
+    }
+    await seedOrderItems(args, random);
+  }
+
+  if (args.reviews > 0) {
+    if (args.products === 0 || args.users * args.products < args.reviews) {
+      throw new Error('--reviews requiere --users y --products (máximo users x products)');
+    }
+    await seedReviews(args, random);
+  }
+
+  if (args.wishlist > 0) {
+    if (args.products === 0 || args.users * args.products < args.wishlist) {
+      throw new Error('--wishlist requiere --users y --products (máximo users x products)');
+    }
+    await seedWishlist(args, random);
+  }
+
+  if (args.subscriptions > 0) {
+    if (args.users === 0 || args.products === 0) {
+      throw new Error('--subscriptions requiere --users y --products');
+    }
+    await seedSubscriptions(args, random);
+  }
+
+  console.log('✅ Dataset sintético listo');
+}
+
+main()
+  .catch((error) => {
+    console.error('❌ Error generando datos sintéticos:', error);
+    process.exit(1);
+  })
+  .finally(async () => {
+    await prisma.$disconnect();
+  });
@@ -0,0 +1,140 @@
+require('dotenv').config();
+const cluster = require('cluster');
+const os = require('os');
+const path = require('path');
+const { handleWorkerMessage, releaseWorker } = require('./utils/sharedState');
+const { relayToWorkers } = require('./utils/socketRelayAdapter');
+const { relayProfilingMessage } = require('./utils/profilingRelay');
+
+/**
+ * Runtime en cluster: un worker de server.js por núcleo
+ * - WEB_CONCURRENCY workers (por defecto, los núcleos disponibles)
+ * - Reinicio automático de workers caídos
+ * - Reinicio escalonado con SIGHUP: se levanta el reemplazo, se espera a que
+ *   escuche y recién entonces se drena el worker viejo
+ * - Sin Redis, el primario guarda el estado compartido (rate limiting,
+ *   presencia) y reenvía los broadcasts de Socket.IO entre workers
+ * - Los comandos de profiling se ejecutan siempre en el worker
+ *   PROFILING_WORKER (utils/profilingRelay)
+ *
+ * Uso:
+ *   WEB_CONCURRENCY=4 node src/cluster.js
+ *   kill -HUP <pid del primario>   # reinicio escalonado
+ */
+
+const WORKERS = parseInt(process.env.WEB_CONCURRENCY || String(os.availableParallelism()));
+const SHUTDOWN_TIMEOUT_MS = parseInt(process.env.SHUTDOWN_TIMEOUT_MS || '30000');
+const STARTUP_TIMEOUT_MS = parseInt(process.env.WORKER_STARTUP_TIMEOUT_MS || '60000');
+const RESPAWN_DELAY_MS = 1000;
+
+let shuttingDown = false;
+let restarting = false;
+
+cluster.setupPrimary({
+  exec: path.join(__dirname, 'server.js'),
+  // Permite Buffers en los paquetes de Socket.IO reenviados por IPC
+  serialization: 'advanced'
+});
+
+/**
+ * Lanza un worker; el índice se mantiene entre reinicios para que las
+ * tareas programadas corran solo en el worker 0
+ */
+function fork(index) {
+  const worker = cluster.fork({ WORKER_INDEX: String(index) });
+  worker.index = index;
+  worker.on('message', (message) => {
+    handleWorkerMessage(worker, message)
+      || relayProfilingMessage(worker, message)
+      || relayToWorkers(worker, message);
+  });
+  return worker;
+}
+
+function waitForListening(worker) {
+  return new Promise((resolve, reject) => {
+    const timer = setTimeout(() => reject(new Error(`worker ${worker.process.pid} no empezó a escuchar`)),
+      STARTUP_TIMEOUT_MS);
+    worker.once('listening', () => {
+      clearTimeout(timer);
+      resolve();
+    });
+    worker.once('exit', () => {
+      clearTimeout(timer);
+      reject(new Error(`worker ${worker.process.pid} terminó durante el arranque`));
+    });
+  });
+}
+
+/**
+ * Pide al worker que drene (deja de aceptar conexiones, termina las
+ * requests en curso) y lo mata si no sale a tiempo
+ */
+function stopWorker(worker) {
+  return new Promise((resolve) => {
+    worker.stopping = true;
+    const timer = setTimeout(() => worker.process.kill('SIGKILL'), SHUTDOWN_TIMEOUT_MS);
+    worker.once('exit', () => {
+      clearTimeout(timer);
+      resolve();
+    });
+    if (worker.isConnected()) worker.send({ type: 'shutdown' });
+    else worker.process.kill('SIGTERM');
+  });
+}
+
+async function rollingRestart() {
+  if (restarting || shuttingDown) return;
+  restarting = true;
+  console.log('🔄 Reinicio escalonado de workers...');
+
+  try {
+    for (const worker of Object.values(cluster.workers)) {
+      if (!worker || worker.stopping) continue;
+      const replacement = fork(worker.index);
+      // Si el reemplazo cae al arrancar no se relanza: se aborta el reinicio
+      replacement.probation = true;
+      try {
+        await waitForListening(replacement);
+        replacement.probation = false;
+      } catch (error) {
+        // El código nuevo no arranca: se mantiene el worker viejo
+        console.error('❌ Reinicio abortado:', error.message);
+        if (!replacement.isDead()) await stopWorker(replacement);
+        return;
+      }
+      await stopWorker(worker);
+      console.log(`   worker ${worker.index}: ${worker.process.pid} → ${replacement.process.pid}`);
+    }
+    console.log('✅ Reinicio escalonado completado');
+  } finally {
+    restarting = false;
+  }
+}
+
+async function shutdown(signal) {
+  if (shuttingDown) return;
+  shuttingDown = true;
+  console.log(`${signal} recibido, deteniendo workers...`);
+  await Promise.all(Object.values(cluster.workers).map(stopWorker));
+  process.exit(0);
+}
+
+cluster.on('exit', (worker, code, signal) => {
+  releaseWorker(worker);
+  if (shuttingDown || worker.stopping || worker.probation) return;
+
+  console.error(`⚠️ Worker ${worker.process.pid} terminó (${signal || code}), reiniciando...`);
+  setTimeout(() => {
+    if (!shuttingDown) fork(worker.index);
+  }, RESPAWN_DELAY_MS);
+});
+
+process.on('SIGHUP', rollingRestart);
+process.on('SIGTERM', () => shutdown('SIGTERM'));
+process.on('SIGINT', () => shutdown('SIGINT'));
+
+console.log(`🧵 Primario ${process.pid}: iniciando ${WORKERS} workers`);
+for (let index = 0; index < WORKERS; index++) {
+  fork(index);
+}
@@ -1,4 +1,6 @@
 const { PrismaClient } = require('@prisma/client');
+const { prismaQueryMiddleware } = require('../utils/queryMetrics');
+const { responseCache } = require('../utils/responseCache');
 
 let prisma;
 
@@ -17,18 +19,12 @@ function getPrismaClient() {
       }
     });
 
-    // Middleware para logging personalizado
-    prisma.$use(async (params, next) => {
-      const before = Date.now();
-      const result = await next(params);
-      const after = Date.now();
-      
-      if (process.env.NODE_ENV === 'development') {
-        console.log(`Query ${params.model}.${params.action} tomó ${after - before}ms`);
-      }
-      
-      return result;
-    });
+    // Instrumentación: histogramas, atribución por ruta y queries lentas
+    prisma.$use(prismaQueryMiddleware);
+    // Las escrituras del catálogo invalidan las respuestas cacheadas
+    // (las de una transacción, después del commit)
+    prisma.$use(responseCache.prismaMiddleware);
+    responseCache.deferTransactionInvalidations(prisma);
   }
   
   return prisma;
@@ -45,10 +41,6 @@ async function initializeDatabase() {
     await prismaClient.$connect();
     console.log('Conexión a PostgreSQL establecida');
     
-    // Verificar que las tablas existen
-    const userCount = await prismaClient.user.count();
-    console.log(`Base de datos inicializada (${userCount} usuarios)`);
-    
     return prismaClient;
   } catch (error) {
     console.error('Error conectando a la base de datos:', error);
@@ -56,6 +48,15 @@ async function initializeDatabase() {
   }
 }
 
+/**
+ * Verifica que las tablas existen. No bloquea el arranque: el servidor
+ * la corre después de empezar a escuchar.
+ * @returns {number} Cantidad de usuarios
+ */
+async function verifyDatabase() {
+  return getPrismaClient().user.count();
+}
+
 /**
  * Cierra la conexión a la base de datos
  */
@@ -103,6 +104,7 @@ async function geoQuery(latitude, longitude, radiusKm = 10) {
 module.exports = {
   getPrismaClient,
   initializeDatabase,
+  verifyDatabase,
   disconnectDatabase,
   transaction,
   rawQuery,
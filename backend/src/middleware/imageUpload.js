@@ -0,0 +1,49 @@
+/**
+ * Subida de imágenes (multipart/form-data)
+ * Los archivos quedan en memoria (req.file / req.files) para que
+ * mediaService calcule el hash y los guarde; el tipo real se valida por
+ * contenido en mediaService.
+ */
+const multer = require('multer');
+
+const MAX_IMAGE_BYTES = parseInt(process.env.MAX_IMAGE_BYTES || String(10 * 1024 * 1024));
+
+const upload = multer({
+  storage: multer.memoryStorage(),
+  limits: { fileSize: MAX_IMAGE_BYTES },
+  fileFilter: (req, file, cb) => {
+    if (!file.mimetype.startsWith('image/')) {
+      const error = new Error('Tipo de archivo no permitido');
+      error.code = 'LIMIT_FILE_TYPE';
+      return cb(error);
+    }
+    cb(null, true);
+  }
+});
+
+/**
+ * Una imagen en el campo `field`
+ * @param {string} field - Nombre del campo del formulario
+ * @returns {Function} Middleware function
+ */
+const singleImage = (field) => upload.single(field);
+
+/**
+ * Hasta `maxCount` imágenes en `field`, solo si el request es multipart:
+ * los clientes que envían JSON siguen funcionando igual
+ * @param {string} field - Nombre del campo del formulario
+ * @param {number} maxCount - Máximo de archivos
+ * @returns {Function} Middleware function
+ */
+const optionalImages = (field, maxCount) => {
+  const handler = upload.array(field, maxCount);
+  return (req, res, next) => {
+    if (!req.is('multipart/form-data')) return next();
+    handler(req, res, next);
+  };
+};
+
+module.exports = {
+  singleImage,
+  optionalImages
+};
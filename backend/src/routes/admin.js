@@ -1,12 +1,26 @@
 const express = require('express');
-const { PrismaClient } = require('@prisma/client');
-const bcrypt = require('bcryptjs');
+const { getPrismaClient } = require('../database/connection');
 const { requireAdmin } = require('../middleware/auth');
-const { asyncHandler } = require('../middleware/errorHandler');
+const { asyncHandler, CommonErrors } = require('../middleware/errorHandler');
+const { parseCursorQuery, parseSortQuery, decodeCursor, keysetArgs, buildPage } = require('../utils/pagination');
+const segmentationService = require('../services/segmentationService');
+const salesCounterService = require('../services/salesCounterService');
+const { queryMetrics } = require('../utils/queryMetrics');
+const { cpuPool } = require('../utils/workerPool');
+const { hashPassword } = require('../utils/password');
+const profilingService = require('../services/profilingService');
+const { runProfiling } = require('../utils/profilingRelay');
+const mediaService = require('../services/mediaService');
+const wishlistAlertService = require('../services/wishlistAlertService');
+const orderTrackingService = require('../services/orderTrackingService');
+const { responseCache } = require('../utils/responseCache');
+const adminDashboardService = require('../services/adminDashboardService');
+const referralClickService = require('../services/referralClickService');
+const { singleImage } = require('../middleware/imageUpload');
 const Joi = require('joi');
 
 const router = express.Router();
-const prisma = new PrismaClient();
+const prisma = getPrismaClient();
 
 // Todas las rutas requieren rol de administrador
 router.use(requireAdmin);
@@ -16,236 +30,52 @@ router.use(requireAdmin);
 /**
  * GET /api/admin/dashboard
  * Obtener métricas del dashboard administrativo
+ * Los paneles salen del cache de adminDashboardService; `panels` indica
+ * la antigüedad de cada uno
  */
 router.get('/dashboard', asyncHandler(async (req, res) => {
-  const [
-    totalOrders,
-    totalUsers,
-    totalProducts,
-    activeProducts,
-    ordersToday,
-    ordersThisMonth,
-    ordersThisYear,
-    revenueData,
-    recentOrders,
-    lowStockProducts,
-    topProducts
-  ] = await Promise.all([
-    // Total de órdenes
-    prisma.order.count(),
-    
-    // Total de usuarios
-    prisma.user.count({ where: { role: 'CUSTOMER' } }),
-    
-    // Total de productos
-    prisma.product.count(),
-    
-    // Productos activos
-    prisma.product.count({ where: { isActive: true } }),
-    
-    // Órdenes de hoy
-    prisma.order.count({
-      where: {
-        createdAt: {
-          gte: new Date(new Date().setHours(0, 0, 0, 0))
-        }
-      }
-    }),
-    
-    // Órdenes este mes
-    prisma.order.count({
-      where: {
-        createdAt: {
-          gte: new Date(new Date().getFullYear(), new Date().getMonth(), 1)
-        }
-      }
-    }),
-    
-    // Órdenes este año
-    prisma.order.count({
-      where: {
-        createdAt: {
-          gte: new Date(new Date().getFullYear(), 0, 1)
-        }
-      }
-    }),
-    
-    // Revenue total y por período
-    prisma.order.aggregate({
-      where: { paymentStatus: 'PAID' },
-      _sum: { total: true }
-    }),
-    
-    // Últimas 5 órdenes
-    prisma.order.findMany({
-      take: 5,
-      orderBy: { createdAt: 'desc' },
-      include: {
-        user: {
-          select: { id: true, name: true, email: true }
-        },
-        items: {
-          include: {
-            product: {
-              select: { id: true, name: true, imageUrl: true }
-            }
-          }
-        }
-      }
-    }),
-    
-    // Productos con bajo stock
-    prisma.productVariant.findMany({
-      where: {
-        stock: {
-          lte: prisma.productVariant.fields.reorderPoint
-        }
-      },
-      take: 10,
-      include: {
-        product: {
-          select: { id: true, name: true, imageUrl: true }
-        }
-      },
-      orderBy: { stock: 'asc' }
-    }),
-    
-    // Productos más vendidos
-    prisma.product.findMany({
-      take: 10,
-      orderBy: { totalSales: 'desc' },
-      select: {
-        id: true,
-        name: true,
-        imageUrl: true,
-        totalSales: true,
-        averageRating: true
-      }
-    })
-  ]);
-  
-  const totalRevenue = revenueData._sum.total || 0;
-  
-  // Calcular revenue de hoy
-  const todayRevenue = await prisma.order.aggregate({
-    where: {
-      paymentStatus: 'PAID',
-      createdAt: {
-        gte: new Date(new Date().setHours(0, 0, 0, 0))
-      }
-    },
-    _sum: { total: true }
-  });
-  
-  // Calcular revenue del mes
-  const monthRevenue = await prisma.order.aggregate({
-    where: {
-      paymentStatus: 'PAID',
-      createdAt: {
-        gte: new Date(new Date().getFullYear(), new Date().getMonth(), 1)
-      }
-    },
-    _sum: { total: true }
-  });
-  
   res.json({
     success: true,
-    data: {
-      overview: {
-        totalOrders,
-        totalUsers,
-        totalProducts,
-        activeProducts,
-        totalRevenue,
-        ordersToday,
-        ordersThisMonth,
-        ordersThisYear,
-        revenueToday: todayRevenue._sum.total || 0,
-        revenueThisMonth: monthRevenue._sum.total || 0
-      },
-      recentOrders,
-      lowStockProducts,
-      topProducts
-    }
+    data: await adminDashboardService.getDashboard()
+  });
+}));
+
+/**
+ * GET /api/admin/dashboard/stream
+ * Server-Sent Events: un evento `panel` por cada panel recalculado
+ * (el primero, `dashboard`, trae el dashboard completo)
+ */
+router.get('/dashboard/stream', asyncHandler(async (req, res) => {
+  const dashboard = await adminDashboardService.getDashboard();
+
+  res.writeHead(200, {
+    'Content-Type': 'text/event-stream',
+    // no-transform: compression() no debe bufferear el stream
+    'Cache-Control': 'no-cache, no-transform',
+    'Connection': 'keep-alive',
+    'X-Accel-Buffering': 'no'
+  });
+  const send = (event, data) => res.write(`event: ${event}\ndata: ${JSON.stringify(data)}\n\n`);
+  send('dashboard', dashboard);
+
+  const unsubscribe = adminDashboardService.subscribe(update => send('panel', update));
+  const keepAlive = setInterval(() => res.write(': keep-alive\n\n'), 25 * 1000);
+  req.on('close', () => {
+    clearInterval(keepAlive);
+    unsubscribe();
   });
 }));
 
 /**
  * GET /api/admin/analytics
- * Obtener datos analíticos para gráficas
+ * Obtener datos analíticos para gráficas (period: week, month, year)
  */
 router.get('/analytics', asyncHandler(async (req, res) => {
   const { period = 'month' } = req.query;
-  
-  let startDate;
-  const now = new Date();
-  
-  switch (period) {
-    case 'week':
-      startDate = new Date(now.getTime() - 7 * 24 * 60 * 60 * 1000);
-      break;
-    case 'month':
-      startDate = new Date(now.getFullYear(), now.getMonth(), 1);
-      break;
-    case 'year':
-      startDate = new Date(now.getFullYear(), 0, 1);
-      break;
-    default:
-      startDate = new Date(now.getFullYear(), now.getMonth(), 1);
-  }
-  
-  // Obtener órdenes del período
-  const orders = await prisma.order.findMany({
-    where: {
-      createdAt: { gte: startDate }
-    },
-    select: {
-      createdAt: true,
-      total: true,
-      status: true,
-      paymentStatus: true
-    }
-  });
-  
-  // Agrupar por día
-  const dailyStats = {};
-  orders.forEach(order => {
-    const date = order.createdAt.toISOString().split('T')[0];
-    if (!dailyStats[date]) {
-      dailyStats[date] = {
-        date,
-        orders: 0,
-        revenue: 0,
-        paid: 0,
-        pending: 0
-      };
-    }
-    dailyStats[date].orders++;
-    dailyStats[date].revenue += order.total;
-    if (order.paymentStatus === 'PAID') {
-      dailyStats[date].paid++;
-    } else {
-      dailyStats[date].pending++;
-    }
-  });
-  
-  const chartData = Object.values(dailyStats).sort((a, b) => 
-    new Date(a.date) - new Date(b.date)
-  );
-  
+
   res.json({
     success: true,
-    data: {
-      period,
-      chartData,
-      summary: {
-        totalOrders: orders.length,
-        totalRevenue: orders.reduce((sum, o) => sum + o.total, 0),
-        averageOrderValue: orders.length > 0 
-          ? orders.reduce((sum, o) => sum + o.total, 0) / orders.length 
-          : 0
-      }
-    }
+    data: await adminDashboardService.getAnalytics(period)
   });
 }));
 
@@ -390,8 +220,8 @@ router.post('/products', asyncHandler(async (req, res) => {
     shortDesc: Joi.string().allow('', null),
     sku: Joi.string().required(),
     categoryId: Joi.string().required(),
-    imageUrl: Joi.string().uri().allow('', null),
-    gallery: Joi.array().items(Joi.string().uri()).allow(null),
+    imageUrl: Joi.string().uri({ allowRelative: true }).allow('', null),
+    gallery: Joi.array().items(Joi.string().uri({ allowRelative: true })).allow(null),
     isActive: Joi.boolean().default(true),
     isFeatured: Joi.boolean().default(false),
     weight: Joi.number().positive().allow(null),
@@ -414,7 +244,7 @@ router.post('/products', asyncHandler(async (req, res) => {
       compareAtPrice: Joi.number().positive().allow(null),
       stock: Joi.number().integer().default(0),
       weight: Joi.number().positive().allow(null),
-      imageUrl: Joi.string().uri().allow('', null),
+      imageUrl: Joi.string().uri({ allowRelative: true }).allow('', null),
       isActive: Joi.boolean().default(true)
     })).min(1).required()
   });
@@ -474,8 +304,8 @@ router.put('/products/:id', asyncHandler(async (req, res) => {
     shortDesc: Joi.string().allow('', null),
     sku: Joi.string(),
     categoryId: Joi.string(),
-    imageUrl: Joi.string().uri().allow('', null),
-    gallery: Joi.array().items(Joi.string().uri()).allow(null),
+    imageUrl: Joi.string().uri({ allowRelative: true }).allow('', null),
+    gallery: Joi.array().items(Joi.string().uri({ allowRelative: true })).allow(null),
     isActive: Joi.boolean(),
     isFeatured: Joi.boolean(),
     weight: Joi.number().positive().allow(null),
@@ -594,6 +424,45 @@ router.delete('/products/:id', asyncHandler(async (req, res) => {
   }
 }));
 
+// ==================== IMÁGENES ====================
+
+/**
+ * POST /api/admin/media
+ * Subir una imagen (multipart, campo `image`). Devuelve la URL con hash
+ * de contenido para usar en imageUrl/gallery; las renditions WebP/AVIF se
+ * generan en segundo plano.
+ */
+router.post('/media', singleImage('image'), asyncHandler(async (req, res) => {
+  if (!req.file) {
+    throw CommonErrors.BadRequest('Se requiere un archivo en el campo image');
+  }
+
+  const asset = await mediaService.store(req.file.buffer, { kind: 'product' });
+
+  res.status(201).json({
+    success: true,
+    data: asset
+  });
+}));
+
+/**
+ * GET /api/admin/media/:id
+ * Estado del procesamiento de una imagen y su imageSet. renditionsEnabled
+ * es false si sharp no está instalado: el asset sigue PENDING hasta que se
+ * instale y se reinicie el servidor.
+ */
+router.get('/media/:id', asyncHandler(async (req, res) => {
+  const asset = await mediaService.getAsset(req.params.id);
+  if (!asset) {
+    throw CommonErrors.NotFound('Imagen');
+  }
+
+  res.json({
+    success: true,
+    data: asset
+  });
+}));
+
 // ==================== VARIANTES DE PRODUCTOS ====================
 
 /**
@@ -610,7 +479,7 @@ router.post('/products/:id/variants', asyncHandler(async (req, res) => {
     comparePrice: Joi.number().positive().allow(null),
     stock: Joi.number().integer().default(0),
     weight: Joi.number().positive().allow(null),
-    imageUrl: Joi.string().uri().allow('', null),
+    imageUrl: Joi.string().uri({ allowRelative: true }).allow('', null),
     isActive: Joi.boolean().default(true)
   });
   
@@ -650,7 +519,7 @@ router.put('/products/:id/variants/:variantId', asyncHandler(async (req, res) =>
     comparePrice: Joi.number().positive().allow(null),
     stock: Joi.number().integer(),
     weight: Joi.number().positive().allow(null),
-    imageUrl: Joi.string().uri().allow('', null),
+    imageUrl: Joi.string().uri({ allowRelative: true }).allow('', null),
     isActive: Joi.boolean()
   }).min(1);
   
@@ -667,6 +536,11 @@ router.put('/products/:id/variants/:variantId', asyncHandler(async (req, res) =>
     data: value
   });
   
+  // Cambia el precio vigente del producto: alertas de wishlist
+  if (value.price !== undefined || value.isActive !== undefined) {
+    wishlistAlertService.schedule([variant.productId]);
+  }
+  
   res.json({
     success: true,
     message: 'Variante actualizada exitosamente',
@@ -674,6 +548,36 @@ router.put('/products/:id/variants/:variantId', asyncHandler(async (req, res) =>
   });
 }));
 
+/**
+ * PUT /api/admin/variants/prices
+ * Actualizar precios de variantes en bloque.
+ * Las alertas de wishlist de los productos afectados se generan en segundo plano.
+ */
+router.put('/variants/prices', asyncHandler(async (req, res) => {
+  const schema = Joi.object({
+    updates: Joi.array().items(Joi.object({
+      variantId: Joi.string().required(),
+      price: Joi.number().positive().required()
+    })).min(1).max(20000).unique('variantId').required()
+  });
+  
+  const { error, value } = schema.validate(req.body);
+  if (error) {
+    return res.status(400).json({
+      success: false,
+      error: error.details[0].message
+    });
+  }
+  
+  const result = await wishlistAlertService.updatePrices(value.updates);
+  
+  res.json({
+    success: true,
+    message: `${result.updated} precios actualizados`,
+    data: result
+  });
+}));
+
 /**
  * DELETE /api/admin/products/:id/variants/:variantId
  * Eliminar variante de producto
@@ -693,9 +597,25 @@ router.delete('/products/:id/variants/:variantId', asyncHandler(async (req, res)
 
 // ==================== ÓRDENES ====================
 
+// Campos no nulos por los que se pueden ordenar los listados
+const ORDER_SORT_FIELDS = ['createdAt', 'updatedAt', 'orderNumber', 'status', 'paymentStatus', 'total', 'id'];
+const USER_SORT_FIELDS = ['createdAt', 'updatedAt', 'name', 'email', 'role', 'id'];
+
+function parseSortOrThrow(query, allowedFields) {
+  const sort = parseSortQuery(query, allowedFields);
+  if (!sort) {
+    throw CommonErrors.BadRequest(
+      `Ordenamiento inválido: sortBy debe ser uno de ${allowedFields.join(', ')} y sortOrder asc o desc`
+    );
+  }
+  return sort;
+}
+
 /**
  * GET /api/admin/orders
  * Listar todas las órdenes con paginación y filtros
+ * Paginación: page/limit o cursor (keyset); count=false omite el total
+ * Orden: sortBy en ORDER_SORT_FIELDS, sortOrder asc|desc
  */
 router.get('/orders', asyncHandler(async (req, res) => {
   const {
@@ -704,14 +624,20 @@ router.get('/orders', asyncHandler(async (req, res) => {
     status = '',
     paymentStatus = '',
     search = '',
-    sortBy = 'createdAt',
-    sortOrder = 'desc',
     startDate = '',
     endDate = ''
   } = req.query;
+  const { sortField: sortBy, direction: sortOrder } = parseSortOrThrow(req.query, ORDER_SORT_FIELDS);
   
-  const skip = (parseInt(page) - 1) * parseInt(limit);
   const take = parseInt(limit);
+  const { cursor: rawCursor, includeTotal } = parseCursorQuery(req.query);
+  const cursor = decodeCursor(rawCursor, sortBy);
+  
+  if (rawCursor && !cursor) {
+    throw CommonErrors.BadRequest('Cursor inválido');
+  }
+  
+  const skip = cursor ? 0 : (parseInt(page) - 1) * take;
   
   // Construir filtros
   const where = {};
@@ -742,12 +668,14 @@ router.get('/orders', asyncHandler(async (req, res) => {
     }
   }
   
-  const [orders, total] = await Promise.all([
+  const keyset = keysetArgs({ where, sortField: sortBy, direction: sortOrder, cursor });
+  
+  const [rows, total] = await Promise.all([
     prisma.order.findMany({
-      where,
+      where: keyset.where,
       skip,
-      take,
-      orderBy: { [sortBy]: sortOrder },
+      take: take + 1,
+      orderBy: keyset.orderBy,
       include: {
         user: {
           select: {
@@ -789,9 +717,11 @@ router.get('/orders', asyncHandler(async (req, res) => {
         }
       }
     }),
-    prisma.order.count({ where })
+    includeTotal ? prisma.order.count({ where }) : Promise.resolve(null)
   ]);
   
+  const { items: orders, hasNext, nextCursor } = buildPage(rows, take, sortBy);
+  
   res.json({
     success: true,
     data: {
@@ -800,7 +730,9 @@ router.get('/orders', asyncHandler(async (req, res) => {
         total,
         page: parseInt(page),
         limit: parseInt(limit),
-        totalPages: Math.ceil(total / take)
+        totalPages: total !== null ? Math.ceil(total / take) : null,
+        hasNext,
+        nextCursor
       }
     }
   });
@@ -899,21 +831,34 @@ router.put('/orders/:id/status', asyncHandler(async (req, res) => {
   
   const { status, message, notifyUser } = value;
   
-  // Actualizar orden y crear registro de tracking
-  const [order] = await prisma.$transaction([
-    prisma.order.update({
+  // Estado anterior, actualización y tracking en la misma transacción; el
+  // FOR UPDATE evita que dos cambios concurrentes lean el mismo estado anterior
+  const { order, previousStatus } = await prisma.$transaction(async (tx) => {
+    const [previous] = await tx.$queryRaw`
+      SELECT "status" FROM "orders" WHERE "id" = ${id} FOR UPDATE
+    `;
+    if (!previous) {
+      throw CommonErrors.NotFound('Pedido');
+    }
+
+    const updated = await tx.order.update({
       where: { id },
       data: { status }
-    }),
-    prisma.orderTracking.create({
+    });
+    await tx.orderTracking.create({
       data: {
         orderId: id,
         status,
         message: message || `Estado actualizado a ${status}`,
         metadata: JSON.stringify({ updatedBy: req.user.id })
       }
-    })
-  ]);
+    });
+    return { order: updated, previousStatus: previous.status };
+  });
+  
+  // Actualizar agregados de segmentación del cliente
+  await segmentationService.handleOrderStatusChange(order, previousStatus, status);
+  await orderTrackingService.refresh(id);
   
   // TODO: Enviar notificación al usuario si notifyUser es true
   
@@ -956,6 +901,7 @@ router.put('/orders/:id/payment', asyncHandler(async (req, res) => {
     where: { id },
     data: updateData
   });
+  await salesCounterService.handlePaymentStatusChange(id);
   
   res.json({
     success: true,
@@ -1005,6 +951,7 @@ router.delete('/orders/:id', asyncHandler(async (req, res) => {
       }
     })
   ]);
+  await orderTrackingService.refresh(id);
   
   res.json({
     success: true,
@@ -1017,6 +964,8 @@ router.delete('/orders/:id', asyncHandler(async (req, res) => {
 /**
  * GET /api/admin/users
  * Listar todos los usuarios con paginación y filtros
+ * Paginación: page/limit o cursor (keyset); count=false omite el total
+ * Orden: sortBy en USER_SORT_FIELDS, sortOrder asc|desc
  */
 router.get('/users', asyncHandler(async (req, res) => {
   const {
@@ -1024,13 +973,19 @@ router.get('/users', asyncHandler(async (req, res) => {
     limit = 20,
     role = '',
     search = '',
-    status = '',
-    sortBy = 'createdAt',
-    sortOrder = 'desc'
+    status = ''
   } = req.query;
+  const { sortField: sortBy, direction: sortOrder } = parseSortOrThrow(req.query, USER_SORT_FIELDS);
   
-  const skip = (parseInt(page) - 1) * parseInt(limit);
   const take = parseInt(limit);
+  const { cursor: rawCursor, includeTotal } = parseCursorQuery(req.query);
+  const cursor = decodeCursor(rawCursor, sortBy);
+  
+  if (rawCursor && !cursor) {
+    throw CommonErrors.BadRequest('Cursor inválido');
+  }
+  
+  const skip = cursor ? 0 : (parseInt(page) - 1) * take;
   
   // Construir filtros
   const where = {};
@@ -1053,12 +1008,14 @@ router.get('/users', asyncHandler(async (req, res) => {
     ];
   }
   
-  const [users, total] = await Promise.all([
+  const keyset = keysetArgs({ where, sortField: sortBy, direction: sortOrder, cursor });
+  
+  const [rows, total] = await Promise.all([
     prisma.user.findMany({
-      where,
+      where: keyset.where,
       skip,
-      take,
-      orderBy: { [sortBy]: sortOrder },
+      take: take + 1,
+      orderBy: keyset.orderBy,
       select: {
         id: true,
         email: true,
@@ -1077,9 +1034,11 @@ router.get('/users', asyncHandler(async (req, res) => {
         }
       }
     }),
-    prisma.user.count({ where })
+    includeTotal ? prisma.user.count({ where }) : Promise.resolve(null)
   ]);
   
+  const { items: users, hasNext, nextCursor } = buildPage(rows, take, sortBy);
+  
   res.json({
     success: true,
     data: {
@@ -1088,7 +1047,9 @@ router.get('/users', asyncHandler(async (req, res) => {
         total,
         page: parseInt(page),
         limit: parseInt(limit),
-        totalPages: Math.ceil(total / take)
+        totalPages: total !== null ? Math.ceil(total / take) : null,
+        hasNext,
+        nextCursor
       }
     }
   });
@@ -1213,7 +1174,7 @@ router.post('/users', asyncHandler(async (req, res) => {
   }
   
   // Hash de la contraseña
-  const hashedPassword = await bcrypt.hash(value.password, 10);
+  const hashedPassword = await hashPassword(value.password, 10);
   
   const user = await prisma.user.create({
     data: {
@@ -1266,7 +1227,7 @@ router.put('/users/:id', asyncHandler(async (req, res) => {
   
   // Hash de la contraseña si se proporciona
   if (value.password) {
-    updateData.password = await bcrypt.hash(value.password, 10);
+    updateData.password = await hashPassword(value.password, 10);
   }
   
   const user = await prisma.user.update({
@@ -1382,7 +1343,7 @@ router.post('/categories', asyncHandler(async (req, res) => {
     name: Joi.string().required(),
     slug: Joi.string().required(),
     description: Joi.string().allow('', null),
-    imageUrl: Joi.string().uri().allow('', null),
+    imageUrl: Joi.string().uri({ allowRelative: true }).allow('', null),
     parentId: Joi.string().allow(null),
     isActive: Joi.boolean().default(true),
     sortOrder: Joi.number().integer().default(0)
@@ -1418,7 +1379,7 @@ router.put('/categories/:id', asyncHandler(async (req, res) => {
     name: Joi.string(),
     slug: Joi.string(),
     description: Joi.string().allow('', null),
-    imageUrl: Joi.string().uri().allow('', null),
+    imageUrl: Joi.string().uri({ allowRelative: true }).allow('', null),
     parentId: Joi.string().allow(null),
     isActive: Joi.boolean(),
     sortOrder: Joi.number().integer()
@@ -1473,4 +1434,313 @@ router.delete('/categories/:id', asyncHandler(async (req, res) => {
   });
 }));
 
+// ==================== CONTADORES DE VENTAS ====================
+
+/**
+ * POST /api/admin/sales-counters/rebuild
+ * Reconstruir las unidades vendidas por producto y por día desde los pedidos pagados
+ */
+router.post('/sales-counters/rebuild', asyncHandler(async (req, res) => {
+  const result = await salesCounterService.rebuildAll();
+
+  res.json({
+    success: true,
+    data: result
+  });
+}));
+
+// ==================== MÉTRICAS ====================
+
+/**
+ * GET /api/admin/metrics/queries
+ * Histogramas de queries por modelo/acción, queries por ruta (N+1) y queries lentas
+ */
+router.get('/metrics/queries', asyncHandler(async (req, res) => {
+  res.json({
+    success: true,
+    data: queryMetrics.snapshot()
+  });
+}));
+
+/**
+ * POST /api/admin/metrics/queries/reset
+ * Reiniciar las métricas de queries (antes de una corrida de carga)
+ */
+router.post('/metrics/queries/reset', asyncHandler(async (req, res) => {
+  queryMetrics.reset();
+
+  res.json({
+    success: true,
+    message: 'Métricas de queries reiniciadas'
+  });
+}));
+
+/**
+ * GET /api/admin/metrics/worker-pool
+ * Estado del pool de worker threads: hilos, profundidad de cola y tiempos por tarea
+ */
+router.get('/metrics/worker-pool', asyncHandler(async (req, res) => {
+  res.json({
+    success: true,
+    data: cpuPool.snapshot()
+  });
+}));
+
+/**
+ * POST /api/admin/metrics/worker-pool/reset
+ * Reiniciar las métricas del pool de worker threads
+ */
+router.post('/metrics/worker-pool/reset', asyncHandler(async (req, res) => {
+  cpuPool.reset();
+
+  res.json({
+    success: true,
+    message: 'Métricas del pool de workers reiniciadas'
+  });
+}));
+
+/**
+ * GET /api/admin/metrics/wishlist-alerts
+ * Evaluación de alertas de precio de wishlist: pendientes y última corrida
+ */
+router.get('/metrics/wishlist-alerts', asyncHandler(async (req, res) => {
+  res.json({
+    success: true,
+    data: wishlistAlertService.snapshot()
+  });
+}));
+
+/**
+ * GET /api/admin/metrics/tracking
+ * Modelo de lectura de tracking: backend (redis/memoria), aciertos y cargas desde la base
+ */
+router.get('/metrics/tracking', asyncHandler(async (req, res) => {
+  res.json({
+    success: true,
+    data: orderTrackingService.snapshot()
+  });
+}));
+
+/**
+ * POST /api/admin/metrics/tracking/reset
+ * Reiniciar las métricas del modelo de lectura de tracking
+ */
+router.post('/metrics/tracking/reset', asyncHandler(async (req, res) => {
+  orderTrackingService.resetStats();
+
+  res.json({
+    success: true,
+    message: 'Métricas de tracking reiniciadas'
+  });
+}));
+
+/**
+ * GET /api/admin/metrics/response-cache
+ * Cache de respuestas del catálogo: aciertos, 304, bytes enviados y compresión
+ */
+router.get('/metrics/response-cache', asyncHandler(async (req, res) => {
+  res.json({
+    success: true,
+    data: responseCache.snapshot()
+  });
+}));
+
+/**
+ * POST /api/admin/metrics/response-cache/reset
+ * Reiniciar las métricas del cache de respuestas (?flush=true también lo vacía)
+ */
+router.post('/metrics/response-cache/reset', asyncHandler(async (req, res) => {
+  if (req.query.flush === 'true') {
+    responseCache.clear();
+  }
+  responseCache.resetStats();
+
+  res.json({
+    success: true,
+    message: 'Métricas del cache de respuestas reiniciadas'
+  });
+}));
+
+/**
+ * GET /api/admin/metrics/dashboard
+ * Paneles del dashboard: antigüedad, tiempo de cálculo, TTL efectivo y recálculos
+ */
+router.get('/metrics/dashboard', asyncHandler(async (req, res) => {
+  res.json({
+    success: true,
+    data: adminDashboardService.snapshot()
+  });
+}));
+
+/**
+ * POST /api/admin/metrics/dashboard/reset
+ * Reiniciar las métricas del dashboard
+ */
+router.post('/metrics/dashboard/reset', asyncHandler(async (req, res) => {
+  adminDashboardService.resetStats();
+
+  res.json({
+    success: true,
+    message: 'Métricas del dashboard reiniciadas'
+  });
+}));
+
+/**
+ * GET /api/admin/metrics/referral-clicks
+ * Clics de referidos: recibidos, pendientes de volcar, volcados y cache de códigos
+ */
+router.get('/metrics/referral-clicks', asyncHandler(async (req, res) => {
+  res.json({
+    success: true,
+    data: referralClickService.snapshot()
+  });
+}));
+
+/**
+ * POST /api/admin/metrics/referral-clicks/reset
+ * Reiniciar las métricas de clics de referidos
+ */
+router.post('/metrics/referral-clicks/reset', asyncHandler(async (req, res) => {
+  referralClickService.resetStats();
+
+  res.json({
+    success: true,
+    message: 'Métricas de clics de referidos reiniciadas'
+  });
+}));
+
+// ==================== PROFILING ====================
+// En cluster las capturas se toman en un único worker: PROFILING_WORKER o
+// el índice pedido con ?worker=N (start y stop deben usar el mismo)
+
+function profilingWorker(req) {
+  if (req.query.worker === undefined) return undefined;
+  const index = parseInt(req.query.worker);
+  if (!Number.isInteger(index) || index < 0) {
+    throw CommonErrors.BadRequest('worker debe ser un índice de worker');
+  }
+  return index;
+}
+
+/**
+ * GET /api/admin/profiling
+ * Capturas en curso (del worker de profiling) y artefactos guardados
+ */
+router.get('/profiling', asyncHandler(async (req, res) => {
+  res.json({
+    success: true,
+    data: {
+      ...(await runProfiling('status', [], profilingWorker(req))),
+      artifacts: await profilingService.listArtifacts()
+    }
+  });
+}));
+
+/**
+ * POST /api/admin/profiling/cpu/start
+ * Iniciar un perfil de CPU (body: label, samplingIntervalUs)
+ */
+router.post('/profiling/cpu/start', asyncHandler(async (req, res) => {
+  const { label, samplingIntervalUs = 1000 } = req.body;
+
+  const interval = parseInt(samplingIntervalUs);
+  if (!Number.isInteger(interval) || interval < 50 || interval > 100000) {
+    throw CommonErrors.BadRequest('samplingIntervalUs debe estar entre 50 y 100000');
+  }
+
+  const profile = await runProfiling('startCpuProfile', [{ label, samplingIntervalUs: interval }], profilingWorker(req));
+
+  res.json({
+    success: true,
+    data: profile
+  });
+}));
+
+/**
+ * POST /api/admin/profiling/cpu/stop
+ * Detener el perfil de CPU y guardarlo como .cpuprofile
+ */
+router.post('/profiling/cpu/stop', asyncHandler(async (req, res) => {
+  const artifact = await runProfiling('stopCpuProfile', [], profilingWorker(req));
+
+  res.json({
+    success: true,
+    data: artifact
+  });
+}));
+
+/**
+ * POST /api/admin/profiling/heap-snapshot
+ * Tomar un heap snapshot (bloquea el proceso mientras se genera)
+ */
+router.post('/profiling/heap-snapshot', asyncHandler(async (req, res) => {
+  const artifact = await runProfiling('takeHeapSnapshot', [req.body.label], profilingWorker(req));
+
+  res.json({
+    success: true,
+    data: artifact
+  });
+}));
+
+/**
+ * POST /api/admin/profiling/event-loop/start
+ * Iniciar el histograma de retraso del event loop (body: label, resolutionMs)
+ */
+router.post('/profiling/event-loop/start', asyncHandler(async (req, res) => {
+  const { label, resolutionMs = 10 } = req.body;
+
+  const resolution = parseInt(resolutionMs);
+  if (!Number.isInteger(resolution) || resolution < 1 || resolution > 1000) {
+    throw CommonErrors.BadRequest('resolutionMs debe estar entre 1 y 1000');
+  }
+
+  const monitor = await runProfiling('startEventLoopMonitor', [{ label, resolutionMs: resolution }], profilingWorker(req));
+
+  res.json({
+    success: true,
+    data: monitor
+  });
+}));
+
+/**
+ * POST /api/admin/profiling/event-loop/stop
+ * Detener el monitor y guardar el histograma
+ */
+router.post('/profiling/event-loop/stop', asyncHandler(async (req, res) => {
+  const artifact = await runProfiling('stopEventLoopMonitor', [], profilingWorker(req));
+
+  res.json({
+    success: true,
+    data: artifact
+  });
+}));
+
+/**
+ * GET /api/admin/profiling/artifacts/:name
+ * Descargar un artefacto de profiling
+ */
+router.get('/profiling/artifacts/:name', asyncHandler(async (req, res) => {
+  const filepath = profilingService.artifactPath(req.params.name);
+  if (!filepath) {
+    throw CommonErrors.NotFound('Artefacto');
+  }
+
+  res.download(filepath, req.params.name);
+}));
+
+/**
+ * DELETE /api/admin/profiling/artifacts/:name
+ * Eliminar un artefacto de profiling
+ */
+router.delete('/profiling/artifacts/:name', asyncHandler(async (req, res) => {
+  if (!(await profilingService.deleteArtifact(req.params.name))) {
+    throw CommonErrors.NotFound('Artefacto');
+  }
+
+  res.json({
+    success: true,
+    message: 'Artefacto eliminado'
+  });
+}));
+
 module.exports = router;
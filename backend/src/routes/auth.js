@@ -1,5 +1,4 @@
 const express = require('express');
-const bcrypt = require('bcryptjs');
 const jwt = require('jsonwebtoken');
 const Joi = require('joi');
 const rateLimit = require('express-rate-limit');
@@ -8,13 +7,16 @@ const { getPrismaClient } = require('../database/connection');
 const { asyncHandler, CustomError, CommonErrors } = require('../middleware/errorHandler');
 const { generateToken, authMiddleware } = require('../middleware/auth');
 const RedisService = require('../services/RedisService');
+const { hashPassword, verifyPassword } = require('../utils/password');
+const { SharedRateLimitStore } = require('../utils/rateLimitStore');
 
 const router = express.Router();
 
 // Rate limiting específico para auth
 const authLimiter = rateLimit({
   windowMs: 15 * 60 * 1000, // 15 minutos
-  max: 5, // máximo 5 intentos por IP
+  max: parseInt(process.env.AUTH_RATE_LIMIT_MAX || '5'), // intentos por IP (5 por defecto)
+  store: new SharedRateLimitStore({ prefix: 'rl:auth:' }),
   message: {
     error: 'Demasiados intentos de inicio de sesión, intenta más tarde.'
   },
@@ -86,7 +88,7 @@ router.post('/register', asyncHandler(async (req, res) => {
 
   // Hash de la contraseña
   const saltRounds = 12;
-  const hashedPassword = await bcrypt.hash(password, saltRounds);
+  const hashedPassword = await hashPassword(password, saltRounds);
 
   try {
     // Crear usuario en transacción
@@ -200,7 +202,7 @@ router.post('/login', authLimiter, asyncHandler(async (req, res) => {
   }
 
   // Verificar contraseña
-  const isValidPassword = await bcrypt.compare(password, user.password);
+  const isValidPassword = await verifyPassword(password, user.password);
   if (!isValidPassword) {
     throw CommonErrors.Unauthorized('Email o contraseña incorrectos');
   }
@@ -395,7 +397,7 @@ router.post('/reset-password', asyncHandler(async (req, res) => {
     }
 
     // Hash nueva contraseña
-    const hashedPassword = await bcrypt.hash(password, 12);
+    const hashedPassword = await hashPassword(password, 12);
 
     // Actualizar contraseña
     await prisma.user.update({
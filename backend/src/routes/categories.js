@@ -3,6 +3,7 @@ const Joi = require('joi');
 const { getPrismaClient } = require('../database/connection');
 const { asyncHandler, CommonErrors } = require('../middleware/errorHandler');
 const RedisService = require('../services/RedisService');
+const { cacheResponse } = require('../utils/responseCache');
 
 const router = express.Router();
 
@@ -29,7 +30,7 @@ const createCategorySchema = Joi.object({
  * GET /api/categories
  * Obtener todas las categorías activas
  */
-router.get('/', asyncHandler(async (req, res) => {
+router.get('/', cacheResponse({ tags: ['categories'], maxAge: 60, staleWhileRevalidate: 600 }), asyncHandler(async (req, res) => {
   const prisma = getPrismaClient();
   const { all } = req.query; // Para admin: ?all=true trae todas
   
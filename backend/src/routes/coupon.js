@@ -1,7 +1,7 @@
 const express = require('express');
 const router = express.Router();
-const { PrismaClient } = require('@prisma/client');
-const prisma = new PrismaClient();
+const { getPrismaClient } = require('../database/connection');
+const prisma = getPrismaClient();
 const { authMiddleware, requireRole } = require('../middleware/auth');
 const asyncHandler = require('../middleware/asyncHandler');
 
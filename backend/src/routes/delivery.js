@@ -1,11 +1,13 @@
 const express = require('express');
-const { PrismaClient } = require('@prisma/client');
+const { getPrismaClient } = require('../database/connection');
 const { requireRole, authMiddleware } = require('../middleware/auth');
 const { asyncHandler } = require('../middleware/errorHandler');
 const socketService = require('../services/SocketService');
+const segmentationService = require('../services/segmentationService');
+const orderTrackingService = require('../services/orderTrackingService');
 
 const router = express.Router();
-const prisma = new PrismaClient();
+const prisma = getPrismaClient();
 
 /**
  * GET /api/delivery/my-deliveries
@@ -271,39 +273,57 @@ router.put('/:id/status', authMiddleware, requireRole('DRIVER'), asyncHandler(as
     data: updateData
   });
 
-  // Actualizar estado del pedido según el estado de delivery
-  let newOrderStatus = delivery.order.status;
-  
-  if (status === 'PICKED_UP' && delivery.order.status === 'READY') {
-    newOrderStatus = 'IN_TRANSIT';
-  } else if (status === 'IN_TRANSIT' && delivery.order.status === 'READY') {
-    newOrderStatus = 'IN_TRANSIT';
-  } else if (status === 'DELIVERED') {
-    newOrderStatus = 'DELIVERED';
-  }
+  // Actualizar estado del pedido según el estado de delivery. El estado
+  // anterior se lee con FOR UPDATE en la misma transacción para que la
+  // segmentación vea la transición real aunque haya cambios concurrentes
+  const { newOrderStatus, previousOrderStatus } = await prisma.$transaction(async (tx) => {
+    const [current] = await tx.$queryRaw`
+      SELECT "status" FROM "orders" WHERE "id" = ${delivery.orderId} FOR UPDATE
+    `;
+    const previous = current ? current.status : delivery.order.status;
+    let next = previous;
+
+    if (status === 'PICKED_UP' && previous === 'READY') {
+      next = 'IN_TRANSIT';
+    } else if (status === 'IN_TRANSIT' && previous === 'READY') {
+      next = 'IN_TRANSIT';
+    } else if (status === 'DELIVERED') {
+      next = 'DELIVERED';
+    }
 
-  if (newOrderStatus !== delivery.order.status) {
-    await prisma.order.update({
-      where: { id: delivery.orderId },
-      data: { status: newOrderStatus }
-    });
+    if (next !== previous) {
+      await tx.order.update({
+        where: { id: delivery.orderId },
+        data: { status: next }
+      });
+
+      // Crear evento de tracking
+      await tx.orderTracking.create({
+        data: {
+          orderId: delivery.orderId,
+          status: next,
+          message: `Pedido ${next === 'DELIVERED' ? 'entregado' : 'en camino'}`,
+          metadata: JSON.stringify({ deliveryStatus: status })
+        }
+      });
+    }
 
-    // Crear evento de tracking
-    await prisma.orderTracking.create({
-      data: {
-        orderId: delivery.orderId,
-        status: newOrderStatus,
-        message: `Pedido ${newOrderStatus === 'DELIVERED' ? 'entregado' : 'en camino'}`,
-        metadata: JSON.stringify({ deliveryStatus: status })
-      }
-    });
-  }
+    return { newOrderStatus: next, previousOrderStatus: previous };
+  });
+
+  // Actualizar agregados de segmentación del cliente
+  await segmentationService.handleOrderStatusChange(
+    { ...delivery.order, status: newOrderStatus },
+    previousOrderStatus,
+    newOrderStatus
+  );
 
   // Notificar al cliente vía WebSocket
   socketService.notifyOrderStatusUpdate(delivery.orderId, newOrderStatus, {
     deliveryStatus: status,
     notes
   });
+  await orderTrackingService.refresh(delivery.orderId);
 
   res.json({
     success: true,
@@ -361,6 +381,7 @@ router.put('/:id/location', authMiddleware, requireRole('DRIVER'), asyncHandler(
     accuracy,
     timestamp: new Date().toISOString()
   });
+  await orderTrackingService.updateLocation(delivery.orderId, { deliveryId: id, latitude, longitude });
 
   res.json({
     success: true,
@@ -418,13 +439,16 @@ router.post('/:id/complete', authMiddleware, requireRole('DRIVER'), asyncHandler
   });
 
   // Actualizar pedido
-  await prisma.order.update({
+  const order = await prisma.order.update({
     where: { id: delivery.orderId },
     data: {
       status: 'DELIVERED'
     }
   });
 
+  // Actualizar agregados de segmentación del cliente
+  await segmentationService.handleOrderStatusChange(order, delivery.order.status, 'DELIVERED');
+
   // Crear evento de tracking
   await prisma.orderTracking.create({
     data: {
@@ -446,6 +470,7 @@ router.post('/:id/complete', authMiddleware, requireRole('DRIVER'), asyncHandler
     deliveredAt: new Date(),
     notes
   });
+  await orderTrackingService.refresh(delivery.orderId);
 
   res.json({
     success: true,
@@ -1,9 +1,12 @@
 const express = require('express');
 const { getPrismaClient } = require('../database/connection');
 const { asyncHandler, CommonErrors } = require('../middleware/errorHandler');
+const { requireAdmin } = require('../middleware/auth');
+const { parseCursorQuery, decodeCursor, keysetArgs, buildPage } = require('../utils/pagination');
 const gamificationService = require('../services/gamificationService');
 const badgeService = require('../services/badgeService');
 const challengeService = require('../services/challengeService');
+const gamificationEngine = require('../services/gamificationEngine');
 const referralService = require('../services/referralService');
 const rewardService = require('../services/rewardService');
 
@@ -28,33 +31,45 @@ router.get('/loyalty', asyncHandler(async (req, res) => {
 /**
  * GET /api/gamification/loyalty/transactions
  * Obtener historial de transacciones de puntos
+ * Paginación: limit/offset o cursor (keyset); count=false omite el total
  */
 router.get('/loyalty/transactions', asyncHandler(async (req, res) => {
   const userId = req.userId;
   const { limit = 50, offset = 0, type } = req.query;
+  const take = parseInt(limit);
+  const { cursor: rawCursor, includeTotal } = parseCursorQuery(req.query);
+  const cursor = decodeCursor(rawCursor, 'createdAt');
+
+  if (rawCursor && !cursor) {
+    throw CommonErrors.BadRequest('Cursor inválido');
+  }
 
   const prisma = getPrismaClient();
   const where = { userId, ...(type && { type }) };
+  const keyset = keysetArgs({ where, sortField: 'createdAt', direction: 'desc', cursor });
 
-  const [transactions, total] = await Promise.all([
+  const [rows, total] = await Promise.all([
     prisma.loyaltyTransaction.findMany({
-      where,
-      orderBy: { createdAt: 'desc' },
-      take: parseInt(limit),
-      skip: parseInt(offset)
+      where: keyset.where,
+      orderBy: keyset.orderBy,
+      take: take + 1,
+      skip: cursor ? 0 : parseInt(offset)
     }),
-    prisma.loyaltyTransaction.count({ where })
+    includeTotal ? prisma.loyaltyTransaction.count({ where }) : Promise.resolve(null)
   ]);
 
+  const { items: transactions, hasNext, nextCursor } = buildPage(rows, take, 'createdAt');
+
   res.json({
     success: true,
     data: {
       transactions,
       pagination: {
         total,
-        limit: parseInt(limit),
+        limit: take,
         offset: parseInt(offset),
-        hasMore: total > parseInt(offset) + parseInt(limit)
+        hasMore: hasNext,
+        nextCursor
       }
     }
   });
@@ -367,6 +382,20 @@ router.post('/referrals/track-click', asyncHandler(async (req, res) => {
   });
 }));
 
+/**
+ * GET /api/gamification/referrals/clicks
+ * Clics del link de referido del usuario por minuto (?minutes=60)
+ */
+router.get('/referrals/clicks', asyncHandler(async (req, res) => {
+  const minutes = Math.min(Math.max(parseInt(req.query.minutes) || 60, 1), 24 * 60);
+  const clicks = await referralService.getReferralClicks(req.userId, minutes);
+
+  res.json({
+    success: true,
+    data: clicks
+  });
+}));
+
 /**
  * GET /api/gamification/referrals/qr
  * Generar QR code para referidos
@@ -992,4 +1021,28 @@ router.post('/admin/points/adjust', asyncHandler(async (req, res) => {
   });
 }));
 
+/**
+ * POST /api/gamification/admin/actions
+ * Registrar una acción de usuario en el motor de reglas (admin)
+ * Body: { userId, actionType: PURCHASE|REVIEW|REVIEW_REMOVED|REFERRAL|PAGE_VIEW, data }
+ */
+router.post('/admin/actions', requireAdmin, asyncHandler(async (req, res) => {
+  const { userId, actionType, data = {} } = req.body;
+
+  if (!userId || !actionType) {
+    throw CommonErrors.BadRequest('userId y actionType son requeridos');
+  }
+
+  if (!gamificationEngine.supportsAction(actionType)) {
+    throw CommonErrors.BadRequest(`Acción no soportada: ${actionType}`);
+  }
+
+  const result = await gamificationEngine.processAction(userId, actionType, data);
+
+  res.json({
+    success: true,
+    data: result
+  });
+}));
+
 module.exports = router;
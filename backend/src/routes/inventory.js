@@ -1,9 +1,10 @@
 const express = require('express');
 const router = express.Router();
-const { PrismaClient } = require('@prisma/client');
+const { getPrismaClient } = require('../database/connection');
 const { authMiddleware, requireAdmin } = require('../middleware/auth');
+const { parseCursorQuery, decodeCursor, keysetArgs, buildPage } = require('../utils/pagination');
 
-const prisma = new PrismaClient();
+const prisma = getPrismaClient();
 
 // ============================================
 // ENDPOINTS DE INVENTARIO (ADMIN)
@@ -382,6 +383,7 @@ router.post('/bulk-adjust', authMiddleware, requireAdmin, async (req, res) => {
 /**
  * GET /api/inventory/movements
  * Obtener historial de movimientos
+ * Paginación: page/limit o cursor (keyset); count=false omite el total
  */
 router.get('/movements', authMiddleware, requireAdmin, async (req, res) => {
   try {
@@ -396,8 +398,15 @@ router.get('/movements', authMiddleware, requireAdmin, async (req, res) => {
       limit = 50
     } = req.query;
 
-    const skip = (parseInt(page) - 1) * parseInt(limit);
     const take = parseInt(limit);
+    const { cursor: rawCursor, includeTotal } = parseCursorQuery(req.query);
+    const cursor = decodeCursor(rawCursor, 'createdAt');
+
+    if (rawCursor && !cursor) {
+      return res.status(400).json({ error: 'Cursor inválido' });
+    }
+
+    const skip = cursor ? 0 : (parseInt(page) - 1) * take;
 
     const where = {};
 
@@ -412,21 +421,25 @@ router.get('/movements', authMiddleware, requireAdmin, async (req, res) => {
       if (endDate) where.createdAt.lte = new Date(endDate);
     }
 
-    const [movements, total] = await Promise.all([
+    const keyset = keysetArgs({ where, sortField: 'createdAt', direction: 'desc', cursor });
+
+    const [rows, total] = await Promise.all([
       prisma.inventoryMovement.findMany({
-        where,
+        where: keyset.where,
         include: {
           supplier: {
             select: { id: true, name: true, code: true }
           }
         },
-        orderBy: { createdAt: 'desc' },
+        orderBy: keyset.orderBy,
         skip,
-        take
+        take: take + 1
       }),
-      prisma.inventoryMovement.count({ where })
+      includeTotal ? prisma.inventoryMovement.count({ where }) : Promise.resolve(null)
     ]);
 
+    const { items: movements, hasNext, nextCursor } = buildPage(rows, take, 'createdAt');
+
     // Enriquecer con información de producto/variante
     const enrichedMovements = await Promise.all(
       movements.map(async (movement) => {
@@ -471,7 +484,9 @@ router.get('/movements', authMiddleware, requireAdmin, async (req, res) => {
         total,
         page: parseInt(page),
         limit: parseInt(limit),
-        pages: Math.ceil(total / parseInt(limit))
+        pages: total !== null ? Math.ceil(total / parseInt(limit)) : null,
+        hasNext,
+        nextCursor
       }
     });
   } catch (error) {
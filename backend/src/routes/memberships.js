@@ -3,6 +3,7 @@ const Joi = require('joi');
 const { getPrismaClient } = require('../database/connection');
 const { asyncHandler, CommonErrors } = require('../middleware/errorHandler');
 const { authMiddleware } = require('../middleware/auth');
+const { cacheResponse } = require('../utils/responseCache');
 
 const router = express.Router();
 
@@ -20,7 +21,7 @@ const subscribeMembershipSchema = Joi.object({
  * GET /api/memberships/plans
  * Obtener todos los planes de membresía disponibles
  */
-router.get('/plans', asyncHandler(async (req, res) => {
+router.get('/plans', cacheResponse({ tags: ['membership-plans'], maxAge: 300, staleWhileRevalidate: 3600 }), asyncHandler(async (req, res) => {
   const prisma = getPrismaClient();
 
   const plans = await prisma.membershipPlan.findMany({
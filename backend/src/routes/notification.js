@@ -1,25 +1,24 @@
 const express = require('express');
 const router = express.Router();
-const { PrismaClient } = require('@prisma/client');
-const prisma = new PrismaClient();
-
-// Intentar cargar firebase-admin de manera opcional
-let admin = null;
-try {
-  admin = require('firebase-admin');
-} catch (error) {
-  console.warn('⚠️ firebase-admin no instalado. Las notificaciones push no funcionarán.');
-}
+const { getPrismaClient } = require('../database/connection');
+const { parseCursorQuery, decodeCursor, keysetArgs, buildPage } = require('../utils/pagination');
+const prisma = getPrismaClient();
 
 // ==================== INICIALIZAR FIREBASE ADMIN ====================
 
+// firebase-admin es opcional y pesado: se carga con el primer push, no al arrancar
+let admin = null;
 let firebaseInitialized = false;
+let firebaseAttempted = false;
 
 function initializeFirebase() {
-  if (firebaseInitialized) return;
-  
-  if (!admin) {
-    console.warn('⚠️ firebase-admin no disponible. Las notificaciones push están deshabilitadas.');
+  if (firebaseAttempted) return;
+  firebaseAttempted = true;
+
+  try {
+    admin = require('firebase-admin');
+  } catch (error) {
+    console.warn('⚠️ firebase-admin no instalado. Las notificaciones push no funcionarán.');
     return;
   }
   
@@ -43,14 +42,13 @@ function initializeFirebase() {
   }
 }
 
-initializeFirebase();
-
 // ==================== HELPERS ====================
 
 /**
  * Enviar notificación push via FCM
  */
 async function sendPushNotification(userId, notification) {
+  initializeFirebase();
   if (!firebaseInitialized) {
     console.warn('Firebase no inicializado. Omitiendo push notification.');
     return { success: false, error: 'Firebase no configurado' };
@@ -245,6 +243,7 @@ async function createAndSendNotification(data) {
 /**
  * GET /api/notification
  * Obtener notificaciones del usuario actual
+ * Paginación: page/limit o cursor (keyset); count=false omite el total
  */
 router.get('/', async (req, res) => {
   try {
@@ -257,23 +256,38 @@ router.get('/', async (req, res) => {
       priority 
     } = req.query;
 
-    const skip = (parseInt(page) - 1) * parseInt(limit);
+    const take = parseInt(limit);
+    const { cursor: rawCursor, includeTotal } = parseCursorQuery(req.query);
+    const cursor = decodeCursor(rawCursor, 'createdAt');
+
+    if (rawCursor && !cursor) {
+      return res.status(400).json({
+        success: false,
+        error: 'Cursor inválido'
+      });
+    }
+
+    const skip = cursor ? 0 : (parseInt(page) - 1) * take;
 
     const where = { userId };
     if (type) where.type = type;
     if (isRead !== undefined) where.isRead = isRead === 'true';
     if (priority) where.priority = priority;
 
-    const [notifications, total] = await Promise.all([
+    const keyset = keysetArgs({ where, sortField: 'createdAt', direction: 'desc', cursor });
+
+    const [rows, total] = await Promise.all([
       prisma.notification.findMany({
-        where,
-        orderBy: { createdAt: 'desc' },
+        where: keyset.where,
+        orderBy: keyset.orderBy,
         skip,
-        take: parseInt(limit)
+        take: take + 1
       }),
-      prisma.notification.count({ where })
+      includeTotal ? prisma.notification.count({ where }) : Promise.resolve(null)
     ]);
 
+    const { items: notifications, hasNext, nextCursor } = buildPage(rows, take, 'createdAt');
+
     res.json({
       success: true,
       data: notifications,
@@ -281,7 +295,9 @@ router.get('/', async (req, res) => {
         page: parseInt(page),
         limit: parseInt(limit),
         total,
-        pages: Math.ceil(total / parseInt(limit))
+        pages: total !== null ? Math.ceil(total / take) : null,
+        hasNext,
+        nextCursor
       }
     });
 
@@ -1,6 +1,7 @@
 const express = require('express');
 const { getPrismaClient } = require('../database/connection');
 const { asyncHandler, CommonErrors } = require('../middleware/errorHandler');
+const salesCounterService = require('../services/salesCounterService');
 
 const router = express.Router();
 
@@ -143,6 +144,7 @@ router.put('/:id/payment', asyncHandler(async (req, res) => {
     where: { id },
     data: { paymentStatus }
   });
+  await salesCounterService.handlePaymentStatusChange(id);
 
   res.json({ success: true, data: order });
 }));
@@ -1,10 +1,12 @@
 const express = require('express');
 const router = express.Router();
-const { PrismaClient } = require('@prisma/client');
+const { getPrismaClient } = require('../database/connection');
+const salesCounterService = require('../services/salesCounterService');
+const orderTrackingService = require('../services/orderTrackingService');
 const Stripe = require('stripe');
 const { MercadoPagoConfig, Payment } = require('mercadopago');
 
-const prisma = new PrismaClient();
+const prisma = getPrismaClient();
 
 // Inicializar Stripe
 const stripe = new Stripe(process.env.STRIPE_SECRET_KEY || 'sk_test_dummy');
@@ -120,6 +122,8 @@ async function handlePaymentIntentSucceeded(paymentIntent) {
         paymentMethod: 'CREDIT_CARD'
       }
     });
+    await salesCounterService.handlePaymentStatusChange(payment.orderId);
+    await orderTrackingService.refresh(payment.orderId);
 
     // Crear transacción
     await prisma.paymentTransaction.create({
@@ -264,6 +268,7 @@ async function handlePaymentIntentCanceled(paymentIntent) {
         paymentStatus: 'CANCELLED'
       }
     });
+    await orderTrackingService.refresh(payment.orderId);
 
   } catch (error) {
     console.error('Error handling payment cancellation:', error);
@@ -339,6 +344,8 @@ async function handleChargeRefunded(charge) {
           paymentStatus: 'REFUNDED'
         }
       });
+      await salesCounterService.handlePaymentStatusChange(payment.orderId);
+      await orderTrackingService.refresh(payment.orderId);
     }
 
     // Crear transacción de reembolso
@@ -527,6 +534,8 @@ async function handleMercadoPagoPayment(mpPayment) {
         paymentMethod: mpPayment.payment_method_id?.toUpperCase()
       }
     });
+    await salesCounterService.handlePaymentStatusChange(payment.orderId);
+    await orderTrackingService.refresh(payment.orderId);
 
     // Crear transacción
     let transactionType = 'AUTHORIZATION';
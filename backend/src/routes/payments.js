@@ -1,10 +1,12 @@
 const express = require('express');
 const router = express.Router();
-const { PrismaClient } = require('@prisma/client');
+const { getPrismaClient } = require('../database/connection');
+const salesCounterService = require('../services/salesCounterService');
+const orderTrackingService = require('../services/orderTrackingService');
 const Stripe = require('stripe');
 const { MercadoPagoConfig, Preference, Payment } = require('mercadopago');
 
-const prisma = new PrismaClient();
+const prisma = getPrismaClient();
 
 // ==================== CONFIGURACIÓN ====================
 
@@ -160,6 +162,8 @@ router.post('/stripe/create-payment-intent', async (req, res) => {
           status: 'CONFIRMED'
         }
       });
+      await salesCounterService.handlePaymentStatusChange(order.id);
+      await orderTrackingService.refresh(order.id);
     }
 
     res.json({
@@ -238,6 +242,8 @@ router.post('/stripe/confirm-payment', async (req, res) => {
         paymentStatus: paymentStatus
       }
     });
+    await salesCounterService.handlePaymentStatusChange(payment.orderId);
+    await orderTrackingService.refresh(payment.orderId);
 
     // Crear transacción de captura
     await createPaymentTransaction({
@@ -453,6 +459,8 @@ router.get('/mercadopago/payment-status/:mpPaymentId', async (req, res) => {
         paymentMethod: mpPayment.body.payment_method_id?.toUpperCase()
       }
     });
+    await salesCounterService.handlePaymentStatusChange(payment.orderId);
+    await orderTrackingService.refresh(payment.orderId);
 
     res.json({
       success: true,
@@ -969,6 +977,8 @@ router.post('/admin/refunds/:refundId/approve', async (req, res) => {
           paymentStatus: 'REFUNDED'
         }
       });
+      await salesCounterService.handlePaymentStatusChange(refund.orderId);
+      await orderTrackingService.refresh(refund.orderId);
 
       // Crear transacción de reembolso
       await createPaymentTransaction({
@@ -1,73 +1,104 @@
 const express = require('express');
 const { getPrismaClient } = require('../database/connection');
+const { parseCursorQuery, decodeCursor, keysetArgs, buildPage } = require('../utils/pagination');
+const salesCounterService = require('../services/salesCounterService');
+const mediaService = require('../services/mediaService');
+const { cacheResponse } = require('../utils/responseCache');
 
 const router = express.Router();
 
+// Campos de producto en listados (catálogo y destacados)
+const PRODUCT_LIST_SELECT = {
+  id: true,
+  name: true,
+  slug: true,
+  shortDesc: true,
+  sku: true,
+  imageUrl: true,
+  isFeatured: true,
+  weight: true,
+  unit: true,
+  origin: true,
+  brand: true,
+  averageRating: true,
+  totalReviews: true,
+  createdAt: true,
+  category: {
+    select: {
+      id: true,
+      name: true,
+      slug: true
+    }
+  },
+  variants: {
+    where: { isActive: true },
+    select: {
+      id: true,
+      name: true,
+      sku: true,
+      price: true,
+      comparePrice: true,
+      stock: true,
+      weight: true,
+      isDefault: true
+    },
+    orderBy: { isDefault: 'desc' }
+  }
+};
+
 /**
  * Obtener todos los productos (simplificado para SQLite)
+ * Paginación: page/limit o cursor (keyset); count=false omite el total
+ * Orden: más recientes primero; sortBy=rating_desc por rating promedio
  */
-router.get('/', async (req, res) => {
+router.get('/', cacheResponse({ tags: ['products', 'categories'], maxAge: 30, staleWhileRevalidate: 300 }), async (req, res) => {
   try {
     const prisma = getPrismaClient();
     
     // Obtener parámetros de consulta
     const page = parseInt(req.query.page) || 1;
     const limit = parseInt(req.query.limit) || 20;
-    const skip = (page - 1) * limit;
+    const sortField = req.query.sortBy === 'rating_desc' ? 'averageRating' : 'createdAt';
+    const { cursor: rawCursor, includeTotal } = parseCursorQuery(req.query);
+    const cursor = decodeCursor(rawCursor, sortField);
+
+    if (rawCursor && !cursor) {
+      return res.status(400).json({
+        success: false,
+        error: 'Cursor inválido',
+        code: 'INVALID_CURSOR'
+      });
+    }
+
+    // Con cursor se continúa por keyset; sin cursor se mantiene page/limit
+    const { where, orderBy } = keysetArgs({
+      where: { isActive: true },
+      sortField,
+      direction: 'desc',
+      cursor
+    });
+    const skip = cursor ? 0 : (page - 1) * limit;
     
     // Obtener productos con sus variantes
-    const [products, totalCount] = await Promise.all([
+    const [rows, totalCount] = await Promise.all([
       prisma.product.findMany({
-        where: { isActive: true },
-        orderBy: { createdAt: 'desc' },
+        where,
+        orderBy,
         skip,
-        take: limit,
-        select: {
-          id: true,
-          name: true,
-          slug: true,
-          shortDesc: true,
-          sku: true,
-          imageUrl: true,
-          isFeatured: true,
-          weight: true,
-          unit: true,
-          origin: true,
-          brand: true,
-          averageRating: true,
-          totalReviews: true,
-          category: {
-            select: {
-              id: true,
-              name: true,
-              slug: true
-            }
-          },
-          variants: {
-            where: { isActive: true },
-            select: {
-              id: true,
-              name: true,
-              sku: true,
-              price: true,
-              comparePrice: true,
-              stock: true,
-              weight: true,
-              isDefault: true
-            },
-            orderBy: { isDefault: 'desc' }
-          }
-        }
+        take: limit + 1,
+        select: PRODUCT_LIST_SELECT
       }),
-      prisma.product.count({
-        where: { isActive: true }
-      })
+      includeTotal
+        ? prisma.product.count({ where: { isActive: true } })
+        : Promise.resolve(null)
     ]);
 
+    const { items: products, hasNext, nextCursor } = buildPage(rows, limit, sortField);
+    await mediaService.attachImageSets(products);
+
     // Calcular metadatos de paginación
-    const totalPages = Math.ceil(totalCount / limit);
-    const hasNext = page < totalPages;
-    const hasPrev = page > 1;
+    const totalPages = totalCount !== null ? Math.ceil(totalCount / limit) : null;
+    const hasPrev = cursor ? true : page > 1;
 
     res.json({
       success: true,
@@ -79,7 +110,8 @@ router.get('/', async (req, res) => {
           limit,
           totalPages,
           hasNext,
-          hasPrev
+          hasPrev,
+          nextCursor
         }
       }
     });
@@ -184,6 +216,7 @@ router.get('/search', async (req, res) => {
         return true;
       });
     }
+    await mediaService.attachImageSets(filteredProducts);
 
     // Calcular metadatos de paginación
     const totalPages = Math.ceil(totalCount / limit);
@@ -221,10 +254,121 @@ router.get('/search', async (req, res) => {
   }
 });
 
+/**
+ * Productos destacados (debe estar antes de /:id)
+ */
+router.get('/featured', cacheResponse({ tags: ['products', 'categories'], maxAge: 60, staleWhileRevalidate: 600 }), async (req, res) => {
+  try {
+    const prisma = getPrismaClient();
+    const limit = Math.min(parseInt(req.query.limit) || 8, 50);
+
+    const products = await prisma.product.findMany({
+      where: { isActive: true, isFeatured: true },
+      orderBy: { createdAt: 'desc' },
+      take: limit,
+      select: PRODUCT_LIST_SELECT
+    });
+    await mediaService.attachImageSets(products);
+
+    res.json({
+      success: true,
+      data: products
+    });
+
+  } catch (error) {
+    console.error('Error obteniendo productos destacados:', error);
+    res.status(500).json({
+      success: false,
+      error: error.message,
+      code: 'INTERNAL_ERROR'
+    });
+  }
+});
+
+/**
+ * Productos más vendidos (debe estar antes de /:id)
+ * Se sirven desde los contadores de ventas; days=N limita a los últimos N días
+ */
+router.get('/top-selling', async (req, res) => {
+  try {
+    const prisma = getPrismaClient();
+    const limit = Math.min(parseInt(req.query.limit) || 12, 50);
+    const days = req.query.days ? parseInt(req.query.days) : null;
+
+    if (days !== null && (isNaN(days) || days < 1 || days > 365)) {
+      return res.status(400).json({
+        success: false,
+        error: 'days debe estar entre 1 y 365',
+        code: 'INVALID_WINDOW'
+      });
+    }
+
+    const ranking = await salesCounterService.getTopSelling({ limit, days });
+
+    const products = await prisma.product.findMany({
+      where: { id: { in: ranking.map(entry => entry.productId) } },
+      select: {
+        id: true,
+        name: true,
+        slug: true,
+        shortDesc: true,
+        imageUrl: true,
+        unit: true,
+        averageRating: true,
+        totalReviews: true,
+        category: {
+          select: {
+            id: true,
+            name: true,
+            slug: true
+          }
+        },
+        variants: {
+          where: { isActive: true, isDefault: true },
+          select: {
+            id: true,
+            name: true,
+            price: true,
+            comparePrice: true,
+            stock: true
+          },
+          take: 1
+        }
+      }
+    });
+
+    await mediaService.attachImageSets(products);
+
+    // Mantener el orden del ranking
+    const productsById = new Map(products.map(product => [product.id, product]));
+
+    res.json({
+      success: true,
+      data: {
+        products: ranking
+          .filter(entry => productsById.has(entry.productId))
+          .map(entry => ({
+            ...productsById.get(entry.productId),
+            totalSold: entry.unitsSold
+          })),
+        window: days ? `${days}d` : 'all'
+      }
+    });
+
+  } catch (error) {
+    console.error('Error obteniendo productos más vendidos:', error);
+    res.status(500).json({
+      success: false,
+      error: error.message,
+      code: 'INTERNAL_ERROR'
+    });
+  }
+});
+
 /**
  * Obtener producto por ID
  */
-router.get('/:id', async (req, res) => {
+router.get('/:id', cacheResponse({ tags: ['products', 'categories'], maxAge: 30, staleWhileRevalidate: 300 }), async (req, res) => {
   try {
     const prisma = getPrismaClient();
     const { id } = req.params;
@@ -260,6 +404,8 @@ router.get('/:id', async (req, res) => {
       });
     }
 
+    await mediaService.attachImageSets([product]);
+
     res.json({
       success: true,
       data: product
@@ -278,7 +424,7 @@ router.get('/:id', async (req, res) => {
 /**
  * Obtener categorías
  */
-router.get('/categories/list', async (req, res) => {
+router.get('/categories/list', cacheResponse({ tags: ['categories', 'products'], maxAge: 60, staleWhileRevalidate: 600 }), async (req, res) => {
   try {
     const prisma = getPrismaClient();
     
@@ -382,6 +528,8 @@ router.get('/:productId/reviews', async (req, res) => {
       })
     ]);
 
+    await mediaService.attachImageSets(reviews.flatMap(review => review.images));
+
     const totalPages = Math.ceil(totalCount / limit);
 
     res.json({
@@ -5,6 +5,7 @@ const { getPrismaClient } = require('../database/connection');
 const { asyncHandler, CommonErrors } = require('../middleware/errorHandler');
 const { optionalAuth } = require('../middleware/auth');
 const RedisService = require('../services/RedisService');
+const salesCounterService = require('../services/salesCounterService');
 
 const router = express.Router();
 
@@ -66,7 +67,7 @@ router.get('/', optionalAuth, asyncHandler(async (req, res) => {
   };
 
   // Construir orden
-  const orderBy = {};
+  let orderBy = {};
   switch (sortBy) {
     case 'price_asc':
       orderBy.price = 'asc';
@@ -84,8 +85,8 @@ router.get('/', optionalAuth, asyncHandler(async (req, res) => {
       orderBy.createdAt = 'desc';
       break;
     case 'rating_desc':
-      // Esto requeriría un campo calculado de rating promedio
-      orderBy.createdAt = 'desc'; // Fallback
+      // Promedio denormalizado en el producto (índice isActive, averageRating, id)
+      orderBy = [{ averageRating: 'desc' }, { id: 'desc' }];
       break;
     default:
       orderBy.createdAt = 'desc';
@@ -145,28 +146,20 @@ router.get('/', optionalAuth, asyncHandler(async (req, res) => {
           },
           take: 1
         },
-        reviews: {
-          select: {
-            rating: true
-          }
-        }
+        averageRating: true,
+        totalReviews: true
       }
     }),
     prisma.product.count({ where })
   ]);
 
-  // Calcular ratings promedio
+  // Ratings desde los agregados del producto
   const productsWithRatings = products.map(product => {
-    const ratings = product.reviews.map(r => r.rating);
-    const averageRating = ratings.length > 0 
-      ? ratings.reduce((sum, rating) => sum + rating, 0) / ratings.length 
-      : 0;
-    
-    const { reviews, ...productWithoutReviews } = product;
+    const { totalReviews, ...productWithoutReviews } = product;
     return {
       ...productWithoutReviews,
-      averageRating: parseFloat(averageRating.toFixed(1)),
-      reviewCount: ratings.length,
+      averageRating: parseFloat(product.averageRating.toFixed(1)),
+      reviewCount: totalReviews,
       primaryImage: product.images[0] || null
     };
   });
@@ -263,26 +256,18 @@ router.get('/featured', asyncHandler(async (req, res) => {
         },
         take: 1
       },
-      reviews: {
-        select: {
-          rating: true
-        }
-      }
+      averageRating: true,
+      totalReviews: true
     }
   });
 
-  // Procesar ratings
+  // Ratings desde los agregados del producto
   const processedProducts = featuredProducts.map(product => {
-    const ratings = product.reviews.map(r => r.rating);
-    const averageRating = ratings.length > 0 
-      ? ratings.reduce((sum, rating) => sum + rating, 0) / ratings.length 
-      : 0;
-    
-    const { reviews, ...productWithoutReviews } = product;
+    const { totalReviews, ...productWithoutReviews } = product;
     return {
       ...productWithoutReviews,
-      averageRating: parseFloat(averageRating.toFixed(1)),
-      reviewCount: ratings.length,
+      averageRating: parseFloat(product.averageRating.toFixed(1)),
+      reviewCount: totalReviews,
       primaryImage: product.images[0] || null
     };
   });
@@ -298,25 +283,23 @@ router.get('/featured', asyncHandler(async (req, res) => {
 
 /**
  * GET /api/products/top-selling
- * Obtener productos más vendidos
+ * Obtener productos más vendidos desde los contadores de ventas
+ * Query: days (opcional, 1-365) para una ventana de los últimos N días
  */
 router.get('/top-selling', asyncHandler(async (req, res) => {
   const prisma = getPrismaClient();
-  
-  // Intentar obtener de cache
-  const cached = await RedisService.getTopProducts();
-  if (cached) {
-    return res.json({
-      success: true,
-      data: cached,
-      fromCache: true
-    });
+  const days = req.query.days ? parseInt(req.query.days) : null;
+
+  if (days !== null && (isNaN(days) || days < 1 || days > 365)) {
+    throw CommonErrors.BadRequest('days debe estar entre 1 y 365');
   }
 
-  // Query para obtener productos más vendidos (basado en cantidad de items vendidos)
-  const topSellingProducts = await prisma.product.findMany({
+  // Ranking desde Product.totalSales / ProductDailySales (sin leer pedidos)
+  const ranking = await salesCounterService.getTopSelling({ limit: 12, days });
+
+  const products = await prisma.product.findMany({
     where: {
-      isActive: true
+      id: { in: ranking.map(entry => entry.productId) }
     },
     select: {
       id: true,
@@ -340,32 +323,22 @@ router.get('/top-selling', asyncHandler(async (req, res) => {
           altText: true
         },
         take: 1
-      },
-      orderItems: {
-        select: {
-          quantity: true
-        }
       }
     }
   });
 
-  // Calcular total vendido por producto
-  const productsWithSales = topSellingProducts
-    .map(product => {
-      const totalSold = product.orderItems.reduce((sum, item) => sum + item.quantity, 0);
-      const { orderItems, ...productWithoutOrders } = product;
-      
+  // Mantener el orden del ranking
+  const productsById = new Map(products.map(product => [product.id, product]));
+  const productsWithSales = ranking
+    .filter(entry => productsById.has(entry.productId))
+    .map(entry => {
+      const product = productsById.get(entry.productId);
       return {
-        ...productWithoutOrders,
-        totalSold,
+        ...product,
+        totalSold: entry.unitsSold,
         primaryImage: product.images[0] || null
       };
-    })
-    .sort((a, b) => b.totalSold - a.totalSold)
-    .slice(0, 12);
-
-  // Cachear por 30 minutos
-  await RedisService.cacheTopProducts(productsWithSales, 1800);
+    });
 
   res.json({
     success: true,
@@ -505,18 +478,13 @@ router.get('/:id', optionalAuth, asyncHandler(async (req, res) => {
     throw CommonErrors.NotFound('Producto');
   }
 
-  // Calcular estadísticas de reviews
-  const ratings = product.reviews.map(r => r.rating);
-  const averageRating = ratings.length > 0 
-    ? ratings.reduce((sum, rating) => sum + rating, 0) / ratings.length 
-    : 0;
-
-  // Distribución de ratings
+  // Distribución de ratings desde los agregados del producto (todas las
+  // reseñas aprobadas, no solo las 10 incluidas)
   const ratingDistribution = [1, 2, 3, 4, 5].map(star => ({
     star,
-    count: ratings.filter(rating => rating === star).length,
-    percentage: ratings.length > 0 
-      ? Math.round((ratings.filter(rating => rating === star).length / ratings.length) * 100)
+    count: product[`rating${star}Count`],
+    percentage: product.totalReviews > 0
+      ? Math.round((product[`rating${star}Count`] / product.totalReviews) * 100)
       : 0
   }));
 
@@ -536,8 +504,8 @@ router.get('/:id', optionalAuth, asyncHandler(async (req, res) => {
 
   const productDetails = {
     ...product,
-    averageRating: parseFloat(averageRating.toFixed(1)),
-    reviewCount: ratings.length,
+    averageRating: parseFloat(product.averageRating.toFixed(1)),
+    reviewCount: product.totalReviews,
     ratingDistribution,
     isInWishlist
   };
@@ -641,6 +641,34 @@ router.post('/admin/recalculate-segments', authMiddleware, requireAdmin, async (
   }
 });
 
+/**
+ * @route   POST /api/recommendations/admin/rebuild-segments
+ * @desc    Reconstruye los agregados de segmentación de todos los usuarios (Admin)
+ * @access  Admin
+ */
+router.post('/admin/rebuild-segments', authMiddleware, requireAdmin, async (req, res) => {
+  try {
+    const { batchSize, concurrency } = req.body;
+
+    const result = await segmentationService.rebuildAllSegments({
+      batchSize: batchSize ? parseInt(batchSize) : undefined,
+      concurrency: concurrency ? parseInt(concurrency) : undefined
+    });
+
+    res.json({
+      success: true,
+      ...result
+    });
+  } catch (error) {
+    console.error('Error rebuilding segments:', error);
+    res.status(500).json({
+      success: false,
+      message: 'Error al reconstruir segmentos',
+      error: error.message
+    });
+  }
+});
+
 /**
  * @route   DELETE /api/recommendations/admin/events/cleanup
  * @desc    Limpia eventos antiguos (Admin)
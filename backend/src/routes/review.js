@@ -1,8 +1,12 @@
 const express = require('express');
 const router = express.Router();
-const { PrismaClient } = require('@prisma/client');
-const prisma = new PrismaClient();
+const { getPrismaClient } = require('../database/connection');
+const prisma = getPrismaClient();
 const { triggerNewReview, triggerReviewModerated } = require('./notification');
+const ratingAggregateService = require('../services/ratingAggregateService');
+const gamificationEngine = require('../services/gamificationEngine');
+const mediaService = require('../services/mediaService');
+const { optionalImages } = require('../middleware/imageUpload');
 
 // ==================== MIDDLEWARE DE ROLES ====================
 
@@ -87,39 +91,9 @@ router.get('/product/:productId', async (req, res) => {
       prisma.review.count({ where })
     ]);
 
-    // Calcular estadísticas del producto
-    const stats = await prisma.review.aggregate({
-      where: {
-        productId,
-        status: 'APPROVED'
-      },
-      _avg: {
-        rating: true
-      },
-      _count: {
-        id: true
-      }
-    });
-
-    // Distribución de calificaciones
-    const ratingDistribution = await prisma.review.groupBy({
-      by: ['rating'],
-      where: {
-        productId,
-        status: 'APPROVED'
-      },
-      _count: {
-        rating: true
-      }
-    });
-
-    const distribution = [1, 2, 3, 4, 5].map(rating => {
-      const found = ratingDistribution.find(r => r.rating === rating);
-      return {
-        rating,
-        count: found ? found._count.rating : 0
-      };
-    });
+    // Estadísticas del producto (agregados guardados en el producto)
+    const summary = await ratingAggregateService.getSummary(productId);
+    await mediaService.attachImageSets(reviews.flatMap(review => review.images));
 
     res.json({
       reviews,
@@ -130,9 +104,9 @@ router.get('/product/:productId', async (req, res) => {
         pages: Math.ceil(total / parseInt(limit))
       },
       stats: {
-        averageRating: stats._avg.rating || 0,
-        totalReviews: stats._count.id,
-        distribution
+        averageRating: summary.averageRating,
+        totalReviews: summary.totalReviews,
+        distribution: summary.distribution.map(({ rating, count }) => ({ rating, count }))
       }
     });
   } catch (error) {
@@ -143,61 +117,16 @@ router.get('/product/:productId', async (req, res) => {
 
 /**
  * GET /api/review/product/:productId/summary
- * Obtener resumen de estadísticas de un producto
+ * Obtener resumen de estadísticas de un producto (lectura de los agregados
+ * guardados en el producto)
  */
 router.get('/product/:productId/summary', async (req, res) => {
   try {
     const { productId } = req.params;
 
-    const stats = await prisma.review.aggregate({
-      where: {
-        productId,
-        status: 'APPROVED'
-      },
-      _avg: {
-        rating: true
-      },
-      _count: {
-        id: true
-      }
-    });
-
-    const ratingDistribution = await prisma.review.groupBy({
-      by: ['rating'],
-      where: {
-        productId,
-        status: 'APPROVED'
-      },
-      _count: {
-        rating: true
-      }
-    });
-
-    const distribution = [1, 2, 3, 4, 5].map(rating => {
-      const found = ratingDistribution.find(r => r.rating === rating);
-      return {
-        rating,
-        count: found ? found._count.rating : 0,
-        percentage: stats._count.id > 0 
-          ? ((found ? found._count.rating : 0) / stats._count.id * 100).toFixed(1)
-          : 0
-      };
-    });
+    const summary = await ratingAggregateService.getSummary(productId);
 
-    const verifiedCount = await prisma.review.count({
-      where: {
-        productId,
-        status: 'APPROVED',
-        isVerifiedPurchase: true
-      }
-    });
-
-    res.json({
-      averageRating: stats._avg.rating ? parseFloat(stats._avg.rating.toFixed(2)) : 0,
-      totalReviews: stats._count.id,
-      verifiedPurchases: verifiedCount,
-      distribution
-    });
+    res.json(summary);
   } catch (error) {
     console.error('Error al obtener resumen:', error);
     res.status(500).json({ error: 'Error al obtener resumen de reseñas' });
@@ -232,6 +161,8 @@ router.get('/my-reviews', async (req, res) => {
       orderBy: { createdAt: 'desc' }
     });
 
+    await mediaService.attachImageSets(reviews.flatMap(review => review.images));
+
     res.json(reviews);
   } catch (error) {
     console.error('Error al obtener mis reseñas:', error);
@@ -371,28 +302,33 @@ router.post('/', async (req, res) => {
       }
     }
 
-    // Crear reseña
-    const review = await prisma.review.create({
-      data: {
-        userId,
-        productId,
-        orderId: validOrderId,
-        rating,
-        title,
-        comment,
-        isVerifiedPurchase,
-        status: 'PENDING' // Requiere moderación
-      },
-      include: {
-        user: {
-          select: {
-            id: true,
-            name: true,
-            email: true
-          }
+    // Crear reseña y aplicar su aporte a los agregados del producto
+    const review = await prisma.$transaction(async (tx) => {
+      const created = await tx.review.create({
+        data: {
+          userId,
+          productId,
+          orderId: validOrderId,
+          rating,
+          title,
+          comment,
+          isVerifiedPurchase,
+          status: 'PENDING' // Requiere moderación
         },
-        images: true
-      }
+        include: {
+          user: {
+            select: {
+              id: true,
+              name: true,
+              email: true
+            }
+          },
+          images: true
+        }
+      });
+
+      await ratingAggregateService.applyReviewChange(null, created, tx);
+      return created;
     });
 
     // Disparar notificación de nueva reseña para moderación
@@ -438,29 +374,38 @@ router.put('/:id', async (req, res) => {
       return res.status(400).json({ error: 'La calificación debe estar entre 1 y 5' });
     }
 
-    // Actualizar reseña (vuelve a estado PENDING para re-moderación)
-    const review = await prisma.review.update({
-      where: { id },
-      data: {
-        ...(rating && { rating }),
-        ...(title !== undefined && { title }),
-        ...(comment !== undefined && { comment }),
-        status: 'PENDING'
-      },
-      include: {
-        user: {
-          select: {
-            id: true,
-            name: true,
-            email: true
-          }
+    // Actualizar reseña (vuelve a estado PENDING para re-moderación);
+    // si estaba aprobada deja de contar en los agregados del producto
+    const { review, previousStatus } = await prisma.$transaction(async (tx) => {
+      const before = await lockReview(tx, id);
+      const updated = await tx.review.update({
+        where: { id },
+        data: {
+          ...(rating && { rating }),
+          ...(title !== undefined && { title }),
+          ...(comment !== undefined && { comment }),
+          status: 'PENDING'
         },
-        images: {
-          orderBy: { sortOrder: 'asc' }
+        include: {
+          user: {
+            select: {
+              id: true,
+              name: true,
+              email: true
+            }
+          },
+          images: {
+            orderBy: { sortOrder: 'asc' }
+          }
         }
-      }
+      });
+
+      await ratingAggregateService.applyReviewChange(before, updated, tx);
+      return { review: updated, previousStatus: before.status };
     });
 
+    await syncReviewGamification(userId, previousStatus, review.status);
+
     res.json(review);
   } catch (error) {
     console.error('Error al actualizar reseña:', error);
@@ -490,11 +435,20 @@ router.delete('/:id', async (req, res) => {
       return res.status(403).json({ error: 'No tienes permiso para eliminar esta reseña' });
     }
 
-    // Eliminar reseña (las imágenes se eliminan en cascada)
-    await prisma.review.delete({
-      where: { id }
+    // Eliminar reseña (las imágenes se eliminan en cascada) y descontar
+    // su aporte de los agregados del producto
+    const before = await prisma.$transaction(async (tx) => {
+      const current = await lockReview(tx, id);
+      await tx.review.delete({
+        where: { id }
+      });
+
+      await ratingAggregateService.applyReviewChange(current, null, tx);
+      return current;
     });
 
+    await syncReviewGamification(existingReview.userId, before.status, null);
+
     res.json({ message: 'Reseña eliminada exitosamente' });
   } catch (error) {
     console.error('Error al eliminar reseña:', error);
@@ -626,13 +580,21 @@ router.post('/:id/vote', async (req, res) => {
 
 /**
  * POST /api/review/:id/images
- * Agregar imágenes a una reseña (simulado - URLs)
+ * Agregar imágenes a una reseña
+ * - multipart/form-data: archivos en `images` (captions opcionales en `captions`)
+ * - JSON: { images: [{ imageUrl, caption, sortOrder }] }
  */
-router.post('/:id/images', async (req, res) => {
+router.post('/:id/images', optionalImages('images', 5), async (req, res) => {
   try {
     const { id } = req.params;
     const userId = req.user.id;
-    const { images } = req.body; // Array de { imageUrl, caption, sortOrder }
+    let { images } = req.body; // Array de { imageUrl, caption, sortOrder }
+    const files = req.files || [];
+
+    if (files.length > 0) {
+      const captions = [].concat(req.body.captions || []);
+      images = files.map((file, index) => ({ file, caption: captions[index] }));
+    }
 
     if (!images || !Array.isArray(images) || images.length === 0) {
       return res.status(400).json({ error: 'Se requiere al menos una imagen' });
@@ -660,6 +622,13 @@ router.post('/:id/images', async (req, res) => {
       return res.status(400).json({ error: 'Máximo 5 imágenes por reseña' });
     }
 
+    // Los archivos se guardan recién después de validar la reseña
+    for (const img of images) {
+      if (!img.file) continue;
+      const asset = await mediaService.store(img.file.buffer, { kind: 'review' });
+      img.imageUrl = asset.url;
+    }
+
     // Crear imágenes
     const createdImages = await prisma.$transaction(
       images.map((img, index) => 
@@ -674,8 +643,13 @@ router.post('/:id/images', async (req, res) => {
       )
     );
 
+    await mediaService.attachImageSets(createdImages);
+
     res.status(201).json(createdImages);
   } catch (error) {
+    if (error.isCustomError) {
+      return res.status(error.statusCode).json({ error: error.message });
+    }
     console.error('Error al agregar imágenes:', error);
     res.status(500).json({ error: 'Error al agregar imágenes a la reseña' });
   }
@@ -846,35 +820,19 @@ router.put('/admin/:id/approve', requireAdmin, async (req, res) => {
     const { id } = req.params;
     const moderatorId = req.user.id;
 
-    const review = await prisma.review.update({
-      where: { id },
-      data: {
-        status: 'APPROVED',
-        moderatedBy: moderatorId,
-        moderatedAt: new Date(),
-        rejectionReason: null
-      },
-      include: {
-        user: {
-          select: {
-            id: true,
-            name: true,
-            email: true
-          }
-        },
-        product: {
-          select: {
-            id: true,
-            name: true,
-            imageUrl: true
-          }
-        },
-        images: true
-      }
+    const result = await moderateReview(id, {
+      status: 'APPROVED',
+      moderatedBy: moderatorId,
+      moderatedAt: new Date(),
+      rejectionReason: null
     });
 
-    // Actualizar estadísticas del producto
-    await updateProductRatingStats(review.productId);
+    if (!result) {
+      return res.status(404).json({ error: 'Reseña no encontrada' });
+    }
+
+    const { review, previousStatus } = result;
+    await syncReviewGamification(review.userId, previousStatus, review.status);
 
     // Disparar notificación de reseña aprobada
     try {
@@ -905,33 +863,20 @@ router.put('/admin/:id/reject', requireAdmin, async (req, res) => {
       return res.status(400).json({ error: 'Se requiere una razón para rechazar la reseña' });
     }
 
-    const review = await prisma.review.update({
-      where: { id },
-      data: {
-        status: 'REJECTED',
-        moderatedBy: moderatorId,
-        moderatedAt: new Date(),
-        rejectionReason: reason
-      },
-      include: {
-        user: {
-          select: {
-            id: true,
-            name: true,
-            email: true
-          }
-        },
-        product: {
-          select: {
-            id: true,
-            name: true,
-            imageUrl: true
-          }
-        },
-        images: true
-      }
+    const result = await moderateReview(id, {
+      status: 'REJECTED',
+      moderatedBy: moderatorId,
+      moderatedAt: new Date(),
+      rejectionReason: reason
     });
 
+    if (!result) {
+      return res.status(404).json({ error: 'Reseña no encontrada' });
+    }
+
+    const { review, previousStatus } = result;
+    await syncReviewGamification(review.userId, previousStatus, review.status);
+
     // Disparar notificación de reseña rechazada
     try {
       await triggerReviewModerated(review.id, 'REJECTED');
@@ -1087,35 +1032,120 @@ router.get('/admin/stats', requireAdmin, async (req, res) => {
   }
 });
 
-// ==================== FUNCIONES AUXILIARES ====================
+/**
+ * POST /api/review/admin/ratings/rebuild
+ * Reconstruir los agregados de rating de todos los productos desde las reseñas
+ */
+router.post('/admin/ratings/rebuild', requireAdmin, async (req, res) => {
+  try {
+    const { batchSize, concurrency } = req.body;
+
+    const result = await ratingAggregateService.rebuildAll({
+      batchSize: batchSize ? parseInt(batchSize) : undefined,
+      concurrency: concurrency ? parseInt(concurrency) : undefined
+    });
+
+    res.json(result);
+  } catch (error) {
+    console.error('Error al reconstruir agregados de rating:', error);
+    res.status(500).json({ error: 'Error al reconstruir agregados de rating' });
+  }
+});
 
 /**
- * Actualizar estadísticas de rating de un producto
+ * GET /api/review/admin/ratings/verify
+ * Comparar los agregados guardados con los calculados desde las reseñas
+ * Query: productIds (separados por coma) o limit
  */
-async function updateProductRatingStats(productId) {
+router.get('/admin/ratings/verify', requireAdmin, async (req, res) => {
   try {
-    const stats = await prisma.review.aggregate({
-      where: {
-        productId,
-        status: 'APPROVED'
-      },
-      _avg: {
-        rating: true
-      },
-      _count: {
-        id: true
-      }
+    const { productIds, limit } = req.query;
+
+    const result = await ratingAggregateService.verify({
+      productIds: productIds ? productIds.split(',').filter(Boolean) : null,
+      limit: limit ? parseInt(limit) : undefined
     });
 
-    await prisma.product.update({
-      where: { id: productId },
-      data: {
-        averageRating: stats._avg.rating || 0,
-        totalReviews: stats._count.id
+    res.json(result);
+  } catch (error) {
+    console.error('Error al verificar agregados de rating:', error);
+    res.status(500).json({ error: 'Error al verificar agregados de rating' });
+  }
+});
+
+// ==================== FUNCIONES AUXILIARES ====================
+
+/**
+ * Leer una reseña bloqueando su fila hasta el fin de la transacción, para
+ * que dos cambios concurrentes no partan del mismo estado anterior
+ * @returns {Object|null} Estado previo de la reseña o null si no existe
+ */
+async function lockReview(tx, id) {
+  await tx.$queryRaw`SELECT "id" FROM "reviews" WHERE "id" = ${id} FOR UPDATE`;
+  return tx.review.findUnique({
+    where: { id },
+    select: { productId: true, status: true, rating: true, isVerifiedPurchase: true }
+  });
+}
+
+/**
+ * Cambiar el estado de moderación de una reseña y aplicar la diferencia
+ * a los agregados de rating del producto en la misma transacción
+ * @returns {Object|null} { review, previousStatus } o null si no existe
+ */
+async function moderateReview(id, data) {
+  return prisma.$transaction(async (tx) => {
+    const before = await lockReview(tx, id);
+
+    if (!before) return null;
+
+    const review = await tx.review.update({
+      where: { id },
+      data,
+      include: {
+        user: {
+          select: {
+            id: true,
+            name: true,
+            email: true
+          }
+        },
+        product: {
+          select: {
+            id: true,
+            name: true,
+            imageUrl: true
+          }
+        },
+        images: true
       }
     });
+
+    await ratingAggregateService.applyReviewChange(before, review, tx);
+    return { review, previousStatus: before.status };
+  });
+}
+
+/**
+ * Llevar el contador de reseñas de gamificación: REVIEW cuando una reseña
+ * pasa a aprobada y REVIEW_REMOVED cuando una aprobada se rechaza, se
+ * edita (vuelve a PENDING) o se elimina. Se llama después de confirmar la
+ * transacción, así que la acción ya está en las tablas fuente.
+ */
+async function syncReviewGamification(userId, previousStatus, nextStatus) {
+  const wasApproved = previousStatus === 'APPROVED';
+  const isApproved = nextStatus === 'APPROVED';
+  if (wasApproved === isApproved) return;
+
+  try {
+    await gamificationEngine.processAction(
+      userId,
+      isApproved ? 'REVIEW' : 'REVIEW_REMOVED',
+      { persisted: true }
+    );
   } catch (error) {
-    console.error('Error al actualizar estadísticas del producto:', error);
+    console.error('Error actualizando gamificación de reseña:', error);
+    // No fallar la moderación si falla la gamificación
   }
 }
 
@@ -4,6 +4,7 @@ const membershipService = require('../services/membershipService');
 const subscriptionService = require('../services/subscriptionService');
 const { authenticate } = require('../middleware/auth');
 const { requireAdmin } = require('../middleware/auth');
+const { cacheResponse } = require('../utils/responseCache');
 
 /**
  * ===================================================
@@ -211,7 +212,7 @@ router.get('/subscription-plans', async (req, res) => {
  * GET /api/subscriptions/plans
  * Alias de subscription-plans - Obtener planes de suscripción (compatible con tests)
  */
-router.get('/plans', async (req, res) => {
+router.get('/plans', cacheResponse({ tags: ['subscription-plans'], maxAge: 300, staleWhileRevalidate: 3600 }), async (req, res) => {
   try {
     const plans = await subscriptionService.getAllPlans({
       activeOnly: true,
@@ -571,6 +572,47 @@ router.post('/admin/deliveries/:id/complete', requireAdmin, async (req, res) =>
   }
 });
 
+/**
+ * POST /api/subscriptions/admin/delivery-cycle/run
+ * Generar entregas y órdenes de todas las suscripciones vencidas (admin)
+ * Retoma una corrida interrumpida con el mismo dueBefore (o la indicada en runId);
+ * responde 409 si otro proceso está ejecutando el ciclo
+ */
+router.post('/admin/delivery-cycle/run', authenticate, requireAdmin, async (req, res) => {
+  try {
+    const { dueBefore, pageSize, concurrency, runId } = req.body;
+    
+    const run = await subscriptionService.runDeliveryCycle({
+      dueBefore: dueBefore ? new Date(dueBefore) : new Date(),
+      pageSize: pageSize ? parseInt(pageSize) : 500,
+      concurrency: concurrency ? parseInt(concurrency) : 4,
+      runId
+    });
+    
+    res.json(run);
+  } catch (error) {
+    console.error('Error running delivery cycle:', error);
+    res.status(error.statusCode || 500).json({ error: error.message });
+  }
+});
+
+/**
+ * GET /api/subscriptions/admin/delivery-cycle/runs
+ * Corridas recientes del ciclo de entregas (admin)
+ */
+router.get('/admin/delivery-cycle/runs', authenticate, requireAdmin, async (req, res) => {
+  try {
+    const runs = await subscriptionService.getDeliveryCycleRuns(
+      req.query.limit ? parseInt(req.query.limit) : 10
+    );
+    
+    res.json(runs);
+  } catch (error) {
+    console.error('Error getting delivery cycle runs:', error);
+    res.status(500).json({ error: error.message });
+  }
+});
+
 /**
  * POST /api/subscriptions/admin/benefits
  * Crear beneficio para plan de membresía (admin)
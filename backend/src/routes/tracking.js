@@ -1,126 +1,33 @@
 const express = require('express');
-const { PrismaClient } = require('@prisma/client');
+const { getPrismaClient } = require('../database/connection');
 const { authMiddleware } = require('../middleware/auth');
 const { asyncHandler } = require('../middleware/errorHandler');
 const socketService = require('../services/SocketService');
+const orderTrackingService = require('../services/orderTrackingService');
 
 const router = express.Router();
-const prisma = new PrismaClient();
+const prisma = getPrismaClient();
 
 /**
  * GET /api/tracking/order/:orderId
  * Obtener información de tracking de un pedido (público con orderNumber)
+ * Se sirve del modelo de lectura (una lectura de cache)
  */
 router.get('/order/:orderId', asyncHandler(async (req, res) => {
   const { orderId } = req.params;
 
-  // Buscar el pedido con toda la información de tracking
-  const order = await prisma.order.findUnique({
-    where: { id: orderId },
-    include: {
-      user: {
-        select: {
-          id: true,
-          name: true,
-          email: true,
-          phone: true
-        }
-      },
-      items: {
-        include: {
-          product: {
-            select: {
-              id: true,
-              name: true,
-              imageUrl: true
-            }
-          },
-          variant: {
-            select: {
-              id: true,
-              name: true
-            }
-          }
-        }
-      },
-      tracking: {
-        orderBy: {
-          createdAt: 'desc'
-        }
-      },
-      delivery: {
-        include: {
-          driver: {
-            select: {
-              id: true,
-              name: true,
-              phone: true
-            }
-          }
-        }
-      }
-    }
-  });
+  const tracking = await orderTrackingService.getOrder(orderId);
 
-  if (!order) {
+  if (!tracking) {
     return res.status(404).json({
       success: false,
       message: 'Pedido no encontrado'
     });
   }
 
-  // Calcular progreso del pedido
-  const statusProgress = {
-    'PENDING': 10,
-    'CONFIRMED': 25,
-    'PREPARING': 40,
-    'READY': 60,
-    'IN_TRANSIT': 80,
-    'DELIVERED': 100,
-    'CANCELLED': 0
-  };
-
-  const progress = statusProgress[order.status] || 0;
-
   res.json({
     success: true,
-    data: {
-      order: {
-        id: order.id,
-        orderNumber: order.orderNumber,
-        status: order.status,
-        progress,
-        createdAt: order.createdAt,
-        total: order.total,
-        shippingAddress: order.shippingAddress,
-        estimatedDeliveryTime: order.estimatedDeliveryTime,
-        items: order.items.map(item => ({
-          id: item.id,
-          productName: item.product.name,
-          variantName: item.variant?.name,
-          quantity: item.quantity,
-          price: item.price,
-          imageUrl: item.product.imageUrl
-        }))
-      },
-      tracking: order.tracking,
-      delivery: order.delivery ? {
-        id: order.delivery.id,
-        status: order.delivery.status,
-        driver: order.delivery.driver,
-        estimatedTime: order.delivery.estimatedTime,
-        currentLocation: order.delivery.currentLat && order.delivery.currentLng ? {
-          lat: order.delivery.currentLat,
-          lng: order.delivery.currentLng
-        } : null,
-        distance: order.delivery.distance,
-        notes: order.delivery.notes
-      } : null,
-      customer: {
-        name: order.user.name,
-        phone: order.user.phone
-      }
-    }
+    data: tracking
   });
 }));
 
@@ -131,98 +38,18 @@ router.get('/order/:orderId', asyncHandler(async (req, res) => {
 router.get('/order-by-number/:orderNumber', asyncHandler(async (req, res) => {
   const { orderNumber } = req.params;
 
-  const order = await prisma.order.findFirst({
-    where: { orderNumber },
-    include: {
-      items: {
-        include: {
-          product: {
-            select: {
-              id: true,
-              name: true,
-              imageUrl: true
-            }
-          },
-          variant: {
-            select: {
-              id: true,
-              name: true
-            }
-          }
-        }
-      },
-      tracking: {
-        orderBy: {
-          createdAt: 'desc'
-        }
-      },
-      delivery: {
-        include: {
-          driver: {
-            select: {
-              id: true,
-              name: true,
-              phone: true
-            }
-          }
-        }
-      }
-    }
-  });
+  const tracking = await orderTrackingService.getOrderByNumber(orderNumber);
 
-  if (!order) {
+  if (!tracking) {
     return res.status(404).json({
       success: false,
       message: 'Pedido no encontrado'
     });
   }
 
-  const statusProgress = {
-    'PENDING': 10,
-    'CONFIRMED': 25,
-    'PREPARING': 40,
-    'READY': 60,
-    'IN_TRANSIT': 80,
-    'DELIVERED': 100,
-    'CANCELLED': 0
-  };
-
-  const progress = statusProgress[order.status] || 0;
-
   res.json({
     success: true,
-    data: {
-      order: {
-        id: order.id,
-        orderNumber: order.orderNumber,
-        status: order.status,
-        progress,
-        createdAt: order.createdAt,
-        total: order.total,
-        shippingAddress: order.shippingAddress,
-        estimatedDeliveryTime: order.estimatedDeliveryTime,
-        items: order.items.map(item => ({
-          id: item.id,
-          productName: item.product.name,
-          variantName: item.variant?.name,
-          quantity: item.quantity,
-          price: item.price,
-          imageUrl: item.product.imageUrl
-        }))
-      },
-      tracking: order.tracking,
-      delivery: order.delivery ? {
-        id: order.delivery.id,
-        status: order.delivery.status,
-        driver: order.delivery.driver,
-        estimatedTime: order.delivery.estimatedTime,
-        currentLocation: order.delivery.currentLat && order.delivery.currentLng ? {
-          lat: order.delivery.currentLat,
-          lng: order.delivery.currentLng
-        } : null,
-        distance: order.delivery.distance
-      } : null
-    }
+    data: tracking
   });
 }));
 
@@ -231,70 +58,11 @@ router.get('/order-by-number/:orderNumber', asyncHandler(async (req, res) => {
  * Obtener pedidos del usuario autenticado con tracking
  */
 router.get('/my-orders', authMiddleware, asyncHandler(async (req, res) => {
-  const userId = req.user.id;
-
-  const orders = await prisma.order.findMany({
-    where: { userId },
-    include: {
-      items: {
-        include: {
-          product: {
-            select: {
-              id: true,
-              name: true,
-              imageUrl: true
-            }
-          }
-        }
-      },
-      tracking: {
-        orderBy: {
-          createdAt: 'desc'
-        },
-        take: 1
-      },
-      delivery: {
-        select: {
-          id: true,
-          status: true,
-          estimatedTime: true,
-          currentLat: true,
-          currentLng: true
-        }
-      }
-    },
-    orderBy: {
-      createdAt: 'desc'
-    },
-    take: 20
-  });
-
-  const statusProgress = {
-    'PENDING': 10,
-    'CONFIRMED': 25,
-    'PREPARING': 40,
-    'READY': 60,
-    'IN_TRANSIT': 80,
-    'DELIVERED': 100,
-    'CANCELLED': 0
-  };
-
-  const ordersWithProgress = orders.map(order => ({
-    id: order.id,
-    orderNumber: order.orderNumber,
-    status: order.status,
-    progress: statusProgress[order.status] || 0,
-    createdAt: order.createdAt,
-    total: order.total,
-    itemCount: order.items.length,
-    latestTracking: order.tracking[0] || null,
-    delivery: order.delivery,
-    items: order.items
-  }));
+  const orders = await orderTrackingService.getUserOrders(req.user.id);
 
   res.json({
     success: true,
-    data: ordersWithProgress
+    data: orders
   });
 }));
 
@@ -326,6 +94,7 @@ router.post('/add-event', authMiddleware, asyncHandler(async (req, res) => {
     message,
     metadata
   });
+  await orderTrackingService.addEvent(orderId, tracking);
 
   res.json({
     success: true,
@@ -366,6 +135,7 @@ router.put('/update-location', authMiddleware, asyncHandler(async (req, res) =>
     longitude,
     timestamp: new Date().toISOString()
   });
+  await orderTrackingService.updateLocation(delivery.orderId, { deliveryId, latitude, longitude });
 
   res.json({
     success: true,
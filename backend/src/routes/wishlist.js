@@ -1,7 +1,8 @@
 const express = require('express');
 const router = express.Router();
-const { PrismaClient } = require('@prisma/client');
-const prisma = new PrismaClient();
+const { getPrismaClient } = require('../database/connection');
+const wishlistAlertService = require('../services/wishlistAlertService');
+const prisma = getPrismaClient();
 
 // Middleware para verificar roles de admin
 const requireAdmin = (req, res, next) => {
@@ -1009,98 +1010,20 @@ router.get('/admin/products/:productId/stats', requireAdmin, async (req, res) =>
 /**
  * POST /api/wishlist/admin/notify-price-changes
  * Proceso para detectar y notificar cambios de precio
- * (Este endpoint debería ser llamado por un cron job)
+ * (Este endpoint debería ser llamado por un cron job; los cambios hechos
+ * desde el panel ya generan sus alertas al actualizar el precio)
  */
 router.post('/admin/notify-price-changes', requireAdmin, async (req, res) => {
   try {
-    // Obtener todos los items con notificación de precio activada
-    const itemsWithAlerts = await prisma.wishlistItem.findMany({
-      where: {
-        notifyPriceChange: true,
-        priceWhenAdded: { not: null }
-      },
-      include: {
-        product: {
-          include: {
-            variants: {
-              where: { isActive: true },
-              orderBy: { isDefault: 'desc' }
-            }
-          }
-        },
-        user: {
-          select: {
-            id: true,
-            email: true,
-            name: true
-          }
-        }
-      }
-    });
-
-    const notifications = [];
-    const alerts = [];
-
-    for (const item of itemsWithAlerts) {
-      const defaultVariant = item.product.variants.find(v => v.isDefault) || item.product.variants[0];
-      const currentPrice = defaultVariant?.price || 0;
-      const previousPrice = item.priceWhenAdded;
-
-      // Verificar si hay cambio significativo (más de 1%)
-      const changePercent = ((currentPrice - previousPrice) / previousPrice * 100);
-      
-      if (Math.abs(changePercent) >= 1) {
-        // Si hay precio objetivo, verificar si se alcanzó
-        const shouldNotify = !item.targetPrice || currentPrice <= item.targetPrice;
-
-        if (shouldNotify) {
-          // Crear notificación
-          const notification = await prisma.notification.create({
-            data: {
-              userId: item.userId,
-              type: 'WISHLIST',
-              title: changePercent < 0 ? '¡Bajó de precio!' : 'Cambio de precio',
-              message: `${item.product.name} ${changePercent < 0 ? 'bajó' : 'subió'} ${Math.abs(changePercent).toFixed(1)}% - Ahora: $${currentPrice.toFixed(2)}`,
-              data: JSON.stringify({
-                productId: item.productId,
-                previousPrice,
-                currentPrice,
-                changePercent: changePercent.toFixed(2)
-              }),
-              priority: Math.abs(changePercent) >= 20 ? 'HIGH' : 'NORMAL'
-            }
-          });
-
-          // Registrar alerta de precio
-          const alert = await prisma.wishlistPriceAlert.create({
-            data: {
-              userId: item.userId,
-              productId: item.productId,
-              previousPrice,
-              newPrice: currentPrice,
-              changePercent
-            }
-          });
-
-          // Actualizar precio en wishlist
-          await prisma.wishlistItem.update({
-            where: { id: item.id },
-            data: { priceWhenAdded: currentPrice }
-          });
-
-          notifications.push(notification);
-          alerts.push(alert);
-        }
-      }
-    }
+    const result = await wishlistAlertService.evaluateAll();
 
     res.json({
       success: true,
-      message: `Se procesaron ${itemsWithAlerts.length} items. Se crearon ${notifications.length} notificaciones.`,
+      message: `Se procesaron ${result.items} items. Se crearon ${result.notifications} notificaciones.`,
       data: {
-        processed: itemsWithAlerts.length,
-        notificationsSent: notifications.length,
-        alertsCreated: alerts.length
+        processed: result.items,
+        notificationsSent: result.notifications,
+        alertsCreated: result.alerts
       }
     });
 
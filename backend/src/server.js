@@ -1,4 +1,7 @@
 require('dotenv').config();
+const { startupTimer, lazyRouter } = require('./utils/startup');
+startupTimer.mark('node');
+
 const express = require('express');
 const cors = require('cors');
 const helmet = require('helmet');
@@ -7,14 +10,22 @@ const morgan = require('morgan');
 const compression = require('compression');
 const rateLimit = require('express-rate-limit');
 const slowDown = require('express-slow-down');
+const cluster = require('cluster');
+const path = require('path');
 const { createServer } = require('http');
 const { Server } = require('socket.io');
 
 // Importar middlewares personalizados
 const { errorHandler } = require('./middleware/errorHandler');
 const { authMiddleware } = require('./middleware/auth');
-
-// Importar rutas
+const { requestMetricsMiddleware } = require('./utils/queryMetrics');
+const { SharedRateLimitStore } = require('./utils/rateLimitStore');
+const { createRelayTransport, createRelayAdapter } = require('./utils/socketRelayAdapter');
+const { cpuPool } = require('./utils/workerPool');
+const { responseCache } = require('./utils/responseCache');
+
+// Importar rutas (las de uso poco frecuente o con SDKs pesados se cargan
+// con la primera request: ver lazyRouter más abajo)
 const authRoutes = require('./routes/auth');
 const userRoutes = require('./routes/users');
 const productRoutes = require('./routes/products-simple');
@@ -28,24 +39,28 @@ const reviewRoutes = require('./routes/review');
 const notificationRoutes = require('./routes/notification');
 const wishlistRoutes = require('./routes/wishlist');
 const loyaltyRoutes = require('./routes/loyalty');
-const gamificationRoutes = require('./routes/gamification');
 const adminRoutes = require('./routes/admin');
-const routeOptimizationRoutes = require('./routes/routeOptimization');
-const paymentRoutes = require('./routes/payments');
-const paymentWebhookRoutes = require('./routes/payment-webhooks');
-const inventoryRoutes = require('./routes/inventory');
-const reportsRoutes = require('./routes/reports');
-const subscriptionRoutes = require('./routes/subscriptions');
-const recommendationRoutes = require('./routes/recommendations');
-const membershipRoutes = require('./routes/memberships');
-const analyticsRoutes = require('./routes/analytics');
-const chatRoutes = require('./routes/chat');
 
 // Importar servicios
-const { initializeDatabase } = require('./database/connection');
+const { initializeDatabase, verifyDatabase } = require('./database/connection');
 const RedisService = require('./services/RedisService');
 const SocketService = require('./services/SocketService');
 
+// Pagos (Stripe, MercadoPago), reportes (ExcelJS, PDFKit), chat (OpenAI) y
+// el resto de subsistemas de uso ocasional no se cargan al arrancar
+const paymentWebhookRoutes = lazyRouter('webhooks', () => require('./routes/payment-webhooks'));
+const paymentRoutes = lazyRouter('payments', () => require('./routes/payments'));
+const chatRoutes = lazyRouter('chat', () => require('./routes/chat'));
+const routeOptimizationRoutes = lazyRouter('routes', () => require('./routes/routeOptimization'));
+const inventoryRoutes = lazyRouter('inventory', () => require('./routes/inventory'));
+const reportsRoutes = lazyRouter('reports', () => require('./routes/reports'));
+const subscriptionRoutes = lazyRouter('subscriptions', () => require('./routes/subscriptions'));
+const membershipRoutes = lazyRouter('memberships', () => require('./routes/memberships'));
+const recommendationRoutes = lazyRouter('recommendations', () => require('./routes/recommendations'));
+const analyticsRoutes = lazyRouter('analytics', () => require('./routes/analytics'));
+const gamificationRoutes = lazyRouter('gamification', () => require('./routes/gamification'));
+startupTimer.mark('modules');
+
 const app = express();
 const server = createServer(app);
 const io = new Server(server, {
@@ -54,9 +69,16 @@ const io = new Server(server, {
       ? ['https://tu-dominio.com'] 
       : ['http://localhost:3000', 'http://localhost:3001', 'http://localhost:3002', 'http://localhost:3003'],
     methods: ['GET', 'POST']
-  }
+  },
+  // En cluster cada request HTTP puede caer en otro worker: sin sesiones
+  // sticky el long-polling no funciona, así que se usa solo WebSocket
+  ...(cluster.isWorker && { transports: ['websocket'] })
 });
 
+// Tareas programadas: una sola vez por cluster (worker 0)
+const runsScheduledJobs = !cluster.isWorker || process.env.WORKER_INDEX === '0';
+const SHUTDOWN_TIMEOUT_MS = parseInt(process.env.SHUTDOWN_TIMEOUT_MS || '30000');
+
 // ==================== CONFIGURACIÓN MIDDLEWARE ====================
 
 // Seguridad - Helmet configurado
@@ -81,9 +103,11 @@ app.use(cors({
 }));
 
 // Rate Limiting (aumentado para desarrollo y testing)
+// Los contadores viven en el estado compartido para contar una vez por cluster
 const limiter = rateLimit({
   windowMs: 15 * 60 * 1000, // 15 minutos
-  max: process.env.NODE_ENV === 'production' ? 100 : 5000, // 5000 en dev/test, 100 en producción
+  max: parseInt(process.env.RATE_LIMIT_MAX || (process.env.NODE_ENV === 'production' ? '100' : '5000')),
+  store: new SharedRateLimitStore({ prefix: 'rl:api:' }),
   message: {
     error: 'Demasiadas solicitudes desde esta IP, intenta más tarde.'
   }
@@ -94,11 +118,15 @@ app.use('/api', limiter);
 const speedLimiter = slowDown({
   windowMs: 15 * 60 * 1000, // 15 minutos
   delayAfter: process.env.NODE_ENV === 'production' ? 50 : 1000, // 1000 en dev/test, 50 en producción
-  delayMs: 500 // agregar 500ms de delay por cada request después del límite
+  delayMs: 500, // agregar 500ms de delay por cada request después del límite
+  store: new SharedRateLimitStore({ prefix: 'rl:slow:', windowMs: 15 * 60 * 1000 })
 });
 app.use('/api/auth', speedLimiter);
 app.use('/api/orders', speedLimiter);
 
+// Atribución de queries de Prisma a la ruta que las emite
+app.use(requestMetricsMiddleware);
+
 // Logging
 if (process.env.NODE_ENV !== 'test') {
   app.use(morgan('combined'));
@@ -113,16 +141,35 @@ app.use(express.json({ limit: '10mb' }));
 app.use(express.urlencoded({ extended: true, limit: '10mb' }));
 
 // Servir archivos estáticos
+// Imágenes con hash de contenido: la URL cambia con el archivo, así que se
+// cachean un año sin revalidar. ETag y Range los maneja express.static.
+app.use('/media', express.static(path.join(__dirname, '../uploads/media'), {
+  immutable: true,
+  maxAge: '365d',
+  fallthrough: false,
+  index: false
+}));
+// Los perfiles y heap snapshots solo se descargan por /api/admin/profiling
+app.use('/uploads/profiles', (req, res) => res.status(404).end());
 app.use('/uploads', express.static('uploads'));
 
 // ==================== HEALTH CHECK ====================
 
 app.get('/health', (req, res) => {
+  const memory = process.memoryUsage();
   res.status(200).json({
     status: 'OK',
     timestamp: new Date().toISOString(),
     uptime: process.uptime(),
-    environment: process.env.NODE_ENV
+    environment: process.env.NODE_ENV,
+    pid: process.pid,
+    memory: {
+      rss: memory.rss,
+      heapUsed: memory.heapUsed
+    },
+    // Microsegundos de CPU acumulados ({user, system})
+    cpu: process.cpuUsage(),
+    startup: startupTimer.summary()
   });
 });
 
@@ -191,6 +238,7 @@ app.use('*', (req, res) => {
 
 // Middleware de manejo de errores
 app.use(errorHandler);
+startupTimer.mark('app');
 
 // ==================== CONFIGURACIÓN SOCKET.IO ====================
 
@@ -212,6 +260,7 @@ async function startServer() {
     // Inicializar base de datos
     await initializeDatabase();
     console.log('✅ Base de datos conectada');
+    startupTimer.mark('database');
 
     // Inicializar Redis si está configurado
     if (process.env.REDIS_URL) {
@@ -220,29 +269,33 @@ async function startServer() {
     } else {
       console.log('⚠️ Redis no configurado - funcionando sin cache');
     }
+    startupTimer.mark('redis');
+
+    // Broadcasts de Socket.IO e invalidaciones del cache de respuestas
+    // compartidos entre procesos (Redis o IPC del cluster)
+    relayTransport = await createRelayTransport();
+    if (relayTransport) {
+      io.adapter(createRelayAdapter(relayTransport));
+      responseCache.attachTransport(relayTransport);
+      console.log(`✅ Socket.IO compartido entre procesos (${relayTransport.name})`);
+    }
 
     // Configurar Socket service
     SocketService.initialize(io);
     console.log('✅ Socket.IO configurado');
-
-    // Iniciar chequeo automático de alertas de inventario (cada 5 minutos)
-    const { runStockAlertCheck } = require('./routes/inventory');
-    setInterval(async () => {
-      try {
-        await runStockAlertCheck();
-        console.log('🔔 Chequeo automático de alertas de stock completado');
-      } catch (error) {
-        console.error('Error en chequeo automático de alertas:', error.message);
-      }
-    }, 5 * 60 * 1000); // 5 minutos
-    console.log('✅ Chequeo automático de alertas configurado (cada 5 min)');
+    startupTimer.mark('sockets');
 
     // Iniciar servidor
     const PORT = process.env.PORT || 3001;
     server.listen(PORT, () => {
+      startupTimer.ready('listen');
       console.log(`🚀 Servidor ejecutándose en puerto ${PORT}`);
       console.log(`🌍 Ambiente: ${process.env.NODE_ENV}`);
       console.log(`📊 Health check: http://localhost:${PORT}/health`);
+      startupTimer.print();
+
+      // Lo que no hace falta para atender requests se inicializa después
+      setImmediate(deferredInit);
     });
 
   } catch (error) {
@@ -251,17 +304,70 @@ async function startServer() {
   }
 }
 
+/**
+ * Inicialización no crítica, ya escuchando: verificación de tablas y
+ * tareas programadas
+ */
+function deferredInit() {
+  if (!runsScheduledJobs) return;
+
+  verifyDatabase()
+    .then(userCount => console.log(`Base de datos inicializada (${userCount} usuarios)`))
+    .catch(error => console.error('❌ Error verificando la base de datos:', error.message));
+
+  // Iniciar chequeo automático de alertas de inventario (cada 5 minutos)
+  stockAlertTimer = setInterval(async () => {
+    try {
+      const { runStockAlertCheck } = require('./routes/inventory');
+      await runStockAlertCheck();
+      console.log('🔔 Chequeo automático de alertas de stock completado');
+    } catch (error) {
+      console.error('Error en chequeo automático de alertas:', error.message);
+    }
+  }, 5 * 60 * 1000); // 5 minutos
+  console.log('✅ Chequeo automático de alertas configurado (cada 5 min)');
+
+  const mediaService = require('./services/mediaService');
+  mediaService.resumePending()
+    .then(count => count > 0 && console.log(`🖼️ ${count} imágenes pendientes reencoladas`))
+    .catch(error => console.error('Error reencolando imágenes pendientes:', error.message));
+}
+
 // Manejo graceful shutdown
-process.on('SIGTERM', async () => {
-  console.log('SIGTERM recibido, cerrando servidor...');
+let relayTransport = null;
+let stockAlertTimer = null;
+let shuttingDown = false;
+
+/**
+ * Deja de aceptar conexiones, espera a que terminen las requests en curso
+ * y cierra las conexiones externas. Los sockets se desconectan y los
+ * clientes reconectan contra otro worker.
+ */
+async function shutdown(reason) {
+  if (shuttingDown) return;
+  shuttingDown = true;
+  console.log(`${reason} recibido, cerrando servidor...`);
+
+  const forceExit = setTimeout(() => process.exit(1), SHUTDOWN_TIMEOUT_MS);
+  forceExit.unref();
+
+  clearInterval(stockAlertTimer);
+  await new Promise(resolve => io.close(() => resolve()));
+  // Clics de referidos aún en memoria
+  const referralClickService = require('./services/referralClickService');
+  await referralClickService.close().catch(error => console.error('Error volcando clics de referidos:', error.message));
+  await cpuPool.close();
+  if (relayTransport) await relayTransport.close();
   await RedisService.disconnect();
   process.exit(0);
-});
+}
 
-process.on('SIGINT', async () => {
-  console.log('SIGINT recibido, cerrando servidor...');
-  await RedisService.disconnect();
-  process.exit(0);
+process.on('SIGTERM', () => shutdown('SIGTERM'));
+process.on('SIGINT', () => shutdown('SIGINT'));
+
+// Reinicio escalonado del cluster (src/cluster.js)
+process.on('message', (message) => {
+  if (message && message.type === 'shutdown') shutdown('Drenado del cluster');
 });
 
 // Iniciar servidor
@@ -1,5 +1,23 @@
 const Redis = require('redis');
 
+// Reemplaza KEYS[1] solo si el valor guardado tiene ARGV[2] menor que
+// ARGV[3] (o igual con ARGV[5] = '1'); un valor ilegible se reemplaza
+const SET_IF_NEWER_SCRIPT = `
+local current = redis.call('GET', KEYS[1])
+if current then
+  local ok, decoded = pcall(cjson.decode, current)
+  if ok and type(decoded) == 'table' then
+    local stored = tonumber(decoded[ARGV[2]]) or 0
+    local incoming = tonumber(ARGV[3])
+    if stored > incoming or (stored == incoming and ARGV[5] ~= '1') then
+      return 0
+    end
+  end
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', tonumber(ARGV[4]))
+return 1
+`;
+
 class RedisService {
   constructor() {
     this.client = null;
@@ -64,6 +82,35 @@ class RedisService {
     }
   }
 
+  /**
+   * Guarda un valor solo si el guardado no es más nuevo: compara el campo
+   * numérico `field` de ambos valores de forma atómica (script Lua), así
+   * que varios procesos no se pisan con datos viejos.
+   * Con orEqual también se reemplaza un valor con el mismo campo.
+   * @returns {boolean|null} true si se guardó, false si se descartó,
+   *   null si Redis no está disponible o falló
+   */
+  async setIfNewer(key, value, field, expireInSeconds = 3600, orEqual = false) {
+    if (!this.isConnected) return null;
+
+    try {
+      const written = await this.client.eval(SET_IF_NEWER_SCRIPT, {
+        keys: [key],
+        arguments: [
+          JSON.stringify(value),
+          field,
+          String(value[field] || 0),
+          String(expireInSeconds),
+          orEqual ? '1' : '0'
+        ]
+      });
+      return written === 1;
+    } catch (error) {
+      console.error('Error guardando en Redis:', error);
+      return null;
+    }
+  }
+
   /**
    * Obtiene un valor del cache
    */
@@ -79,6 +126,21 @@ class RedisService {
     }
   }
 
+  /**
+   * Obtiene varios valores del cache en una sola llamada (null los que falten)
+   */
+  async mget(keys) {
+    if (!this.isConnected || keys.length === 0) return keys.map(() => null);
+    
+    try {
+      const values = await this.client.mGet(keys);
+      return values.map(value => (value ? JSON.parse(value) : null));
+    } catch (error) {
+      console.error('Error obteniendo de Redis:', error);
+      return keys.map(() => null);
+    }
+  }
+
   /**
    * Elimina una clave del cache
    */
@@ -1,8 +1,18 @@
+const { getSharedState } = require('../utils/sharedState');
+
+/**
+ * Las emisiones van siempre a salas (user_<id>, driver_<id>, drivers) para
+ * que el adaptador las reparta entre workers del cluster; la presencia se
+ * cuenta en el estado compartido (un usuario puede tener varios sockets).
+ */
+const PRESENCE_KEYS = {
+  CUSTOMER: 'presence:customers',
+  DRIVER: 'presence:drivers'
+};
+
 class SocketService {
   constructor() {
     this.io = null;
-    this.connectedUsers = new Map(); // userId -> socketId
-    this.connectedDrivers = new Map(); // driverId -> socketId
   }
 
   /**
@@ -57,14 +67,13 @@ class SocketService {
       socket.role = role;
 
       if (role === 'DRIVER') {
-        this.connectedDrivers.set(userId, socket.id);
-        socket.join(`driver_${userId}`);
+        socket.join([`driver_${userId}`, 'drivers']);
         console.log(`Repartidor ${userId} conectado`);
       } else if (role === 'CUSTOMER') {
-        this.connectedUsers.set(userId, socket.id);
         socket.join(`user_${userId}`);
         console.log(`Cliente ${userId} conectado`);
       }
+      this.updatePresence(role, userId, 1);
 
       socket.emit('authenticated', { success: true, userId, role });
     } catch (error) {
@@ -106,8 +115,8 @@ class SocketService {
     // Unir al cliente a la sala del pedido
     socket.join(`order_${orderId}`);
     
-    // Emitir estado actual del pedido
-    this.emitOrderStatus(orderId);
+    // Emitir estado actual del pedido solo a quien se unió
+    this.emitOrderStatus(orderId, null, socket);
   }
 
   /**
@@ -128,12 +137,7 @@ class SocketService {
       this.io.to(`order_${orderId}`).emit('chat_message', chatMessage);
     } else if (recipientId) {
       // Mensaje directo
-      const recipientSocketId = this.connectedUsers.get(recipientId) || 
-                               this.connectedDrivers.get(recipientId);
-      
-      if (recipientSocketId) {
-        this.io.to(recipientSocketId).emit('chat_message', chatMessage);
-      }
+      this.io.to([`user_${recipientId}`, `driver_${recipientId}`]).emit('chat_message', chatMessage);
     }
 
     // Guardar mensaje en base de datos
@@ -148,12 +152,24 @@ class SocketService {
 
     if (socket.userId) {
       if (socket.role === 'DRIVER') {
-        this.connectedDrivers.delete(socket.userId);
         console.log(`Repartidor ${socket.userId} desconectado`);
       } else if (socket.role === 'CUSTOMER') {
-        this.connectedUsers.delete(socket.userId);
         console.log(`Cliente ${socket.userId} desconectado`);
       }
+      this.updatePresence(socket.role, socket.userId, -1);
+    }
+  }
+
+  /**
+   * Suma o resta un socket a la presencia compartida del usuario
+   */
+  async updatePresence(role, userId, delta) {
+    const key = PRESENCE_KEYS[role];
+    if (!key) return;
+    try {
+      await getSharedState().hashIncrement(key, String(userId), delta);
+    } catch (error) {
+      console.error('Error actualizando presencia:', error.message);
     }
   }
 
@@ -177,40 +193,39 @@ class SocketService {
    * Notifica nueva ruta asignada a repartidor
    */
   notifyDriverNewRoute(driverId, route) {
-    const socketId = this.connectedDrivers.get(driverId);
-    
-    if (socketId) {
-      this.io.to(socketId).emit('new_route_assigned', {
-        route,
-        timestamp: new Date().toISOString()
-      });
-    }
+    this.io.to(`driver_${driverId}`).emit('new_route_assigned', {
+      route,
+      timestamp: new Date().toISOString()
+    });
   }
 
   /**
    * Notifica a cliente sobre repartidor en camino
    */
   notifyCustomerDriverEnRoute(userId, driverInfo, estimatedArrival) {
-    const socketId = this.connectedUsers.get(userId);
-    
-    if (socketId) {
-      this.io.to(socketId).emit('driver_en_route', {
-        driver: driverInfo,
-        estimatedArrival,
-        timestamp: new Date().toISOString()
-      });
-    }
+    this.io.to(`user_${userId}`).emit('driver_en_route', {
+      driver: driverInfo,
+      estimatedArrival,
+      timestamp: new Date().toISOString()
+    });
   }
 
   /**
    * Notifica promoción especial a usuarios específicos
    */
   notifyPromotion(userIds, promotion) {
-    userIds.forEach(userId => {
-      const socketId = this.connectedUsers.get(userId);
-      if (socketId) {
-        this.io.to(socketId).emit('special_promotion', promotion);
-      }
+    if (userIds.length === 0) return;
+    this.io.to(userIds.map(userId => `user_${userId}`)).emit('special_promotion', promotion);
+  }
+
+  /**
+   * Notifica cambio de precio de un producto a quienes lo tienen en su wishlist
+   */
+  notifyWishlistPriceAlert(userIds, alert) {
+    if (!this.io || userIds.length === 0) return;
+    this.io.to(userIds.map(userId => `user_${userId}`)).emit('wishlist_price_alert', {
+      ...alert,
+      timestamp: new Date().toISOString()
     });
   }
 
@@ -225,9 +240,7 @@ class SocketService {
    * Broadcast solo a repartidores
    */
   broadcastToDrivers(event, data) {
-    this.connectedDrivers.forEach((socketId) => {
-      this.io.to(socketId).emit(event, data);
-    });
+    this.io.to('drivers').emit(event, data);
   }
 
   // ==================== MÉTODOS AUXILIARES ====================
@@ -246,14 +259,29 @@ class SocketService {
   }
 
   /**
-   * Emite estado actual del pedido
+   * Emite el tracking del pedido a su sala order_<id>.
+   * Con delta (evento, ubicación o snapshot tras un cambio de estado) se
+   * envía solo el cambio; sin delta se envía la vista pública actual, al
+   * socket que se acaba de unir o a toda la sala.
    */
-  async emitOrderStatus(orderId) {
+  async emitOrderStatus(orderId, delta = null, socket = null) {
+    if (!this.io) return;
+
     try {
-      // Obtener estado actual del pedido de la base de datos
-      // const order = await OrderService.getOrderWithStatus(orderId);
-      // this.io.to(`order_${orderId}`).emit('order_current_status', order);
-      console.log(`Emitiendo estado actual del pedido ${orderId}`);
+      if (delta) {
+        this.io.to(`order_${orderId}`).emit('order_tracking_delta', {
+          orderId,
+          ...delta,
+          timestamp: new Date().toISOString()
+        });
+        return;
+      }
+
+      // Carga diferida: orderTrackingService depende de este servicio
+      const orderTrackingService = require('./orderTrackingService');
+      const tracking = await orderTrackingService.getPublicOrder(orderId);
+      if (!tracking) return;
+      (socket || this.io.to(`order_${orderId}`)).emit('order_current_status', tracking);
     } catch (error) {
       console.error('Error obteniendo estado del pedido:', error);
     }
@@ -275,37 +303,34 @@ class SocketService {
   // ==================== MÉTODOS DE UTILIDAD ====================
 
   /**
-   * Obtiene usuarios conectados
+   * Obtiene usuarios conectados (en todos los workers)
    */
-  getConnectedUsers() {
+  async getConnectedUsers() {
+    const state = getSharedState();
+    const [customers, drivers] = await Promise.all([
+      state.hashGetAll(PRESENCE_KEYS.CUSTOMER),
+      state.hashGetAll(PRESENCE_KEYS.DRIVER)
+    ]);
     return {
-      customers: Array.from(this.connectedUsers.keys()),
-      drivers: Array.from(this.connectedDrivers.keys()),
-      total: this.connectedUsers.size + this.connectedDrivers.size
+      customers: Object.keys(customers),
+      drivers: Object.keys(drivers),
+      total: Object.keys(customers).length + Object.keys(drivers).length
     };
   }
 
   /**
    * Verifica si un usuario está conectado
    */
-  isUserConnected(userId) {
-    return this.connectedUsers.has(userId) || this.connectedDrivers.has(userId);
+  async isUserConnected(userId) {
+    const { customers, drivers } = await this.getConnectedUsers();
+    return customers.includes(String(userId)) || drivers.includes(String(userId));
   }
 
   /**
-   * Desconecta un usuario específico
+   * Desconecta un usuario específico (todos sus sockets, en cualquier worker)
    */
   disconnectUser(userId) {
-    const customerSocketId = this.connectedUsers.get(userId);
-    const driverSocketId = this.connectedDrivers.get(userId);
-    
-    if (customerSocketId) {
-      this.io.sockets.sockets.get(customerSocketId)?.disconnect();
-    }
-    
-    if (driverSocketId) {
-      this.io.sockets.sockets.get(driverSocketId)?.disconnect();
-    }
+    this.io.in([`user_${userId}`, `driver_${userId}`]).disconnectSockets();
   }
 }
 
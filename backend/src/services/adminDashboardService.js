@@ -0,0 +1,395 @@
+const { getPrismaClient } = require('../database/connection');
+const { runOutsideRequest } = require('../utils/queryMetrics');
+const prisma = getPrismaClient();
+
+/**
+ * Servicio del Dashboard Administrativo
+ * El dashboard se arma con paneles independientes (pedidos y revenue,
+ * catálogo, últimos pedidos, bajo stock, más vendidos, gráficas por
+ * período), cada uno cacheado con su propio TTL. Un refresco en segundo
+ * plano los recalcula de a uno mientras haya admins mirando, así los
+ * requests (y el auto-refresh de cada admin) se responden desde cache y
+ * la base ve un recálculo por panel y TTL, no uno por admin.
+ *
+ * El refresco se adapta a la carga: un panel que tarda en calcularse se
+ * recalcula con menos frecuencia (TTL efectivo >= LOAD_FACTOR x duración).
+ *
+ * Con DASHBOARD_CACHE=false cada request calcula todos los paneles (línea base).
+ */
+const ENABLED = process.env.DASHBOARD_CACHE !== 'false';
+const TICK_MS = 1000;
+// Sin requests ni suscriptores durante este tiempo el refresco se detiene
+const IDLE_MS = parseInt(process.env.DASHBOARD_IDLE_MS || '120000');
+const LOAD_FACTOR = 20;
+// Un panel más viejo que STALE_FACTOR x TTL (p. ej. tras estar inactivo) se espera en vez de servirse
+const STALE_FACTOR = 3;
+
+const DASHBOARD_PANELS = ['orders', 'catalog', 'recentOrders', 'lowStock', 'topProducts'];
+const ANALYTICS_PERIODS = ['week', 'month', 'year'];
+
+function startOfToday() {
+  return new Date(new Date().setHours(0, 0, 0, 0));
+}
+
+function startOfMonth() {
+  const now = new Date();
+  return new Date(now.getFullYear(), now.getMonth(), 1);
+}
+
+function startOfYear() {
+  return new Date(new Date().getFullYear(), 0, 1);
+}
+
+function periodStart(period) {
+  switch (period) {
+    case 'week':
+      return new Date(Date.now() - 7 * 24 * 60 * 60 * 1000);
+    case 'year':
+      return startOfYear();
+    default:
+      return startOfMonth();
+  }
+}
+
+/**
+ * Conteos y revenue de pedidos en un solo recorrido de la tabla
+ */
+async function computeOrders() {
+  const today = startOfToday();
+  const month = startOfMonth();
+  const [row] = await prisma.$queryRaw`
+    SELECT
+      COUNT(*)::int AS "totalOrders",
+      (COUNT(*) FILTER (WHERE "createdAt" >= ${today}))::int AS "ordersToday",
+      (COUNT(*) FILTER (WHERE "createdAt" >= ${month}))::int AS "ordersThisMonth",
+      (COUNT(*) FILTER (WHERE "createdAt" >= ${startOfYear()}))::int AS "ordersThisYear",
+      COALESCE(SUM("total") FILTER (WHERE "paymentStatus" = 'PAID'), 0) AS "totalRevenue",
+      COALESCE(SUM("total") FILTER (WHERE "paymentStatus" = 'PAID' AND "createdAt" >= ${today}), 0) AS "revenueToday",
+      COALESCE(SUM("total") FILTER (WHERE "paymentStatus" = 'PAID' AND "createdAt" >= ${month}), 0) AS "revenueThisMonth"
+    FROM "orders"
+  `;
+  return row;
+}
+
+async function computeCatalog() {
+  const [totalUsers, totalProducts, activeProducts] = await Promise.all([
+    prisma.user.count({ where: { role: 'CUSTOMER' } }),
+    prisma.product.count(),
+    prisma.product.count({ where: { isActive: true } })
+  ]);
+  return { totalUsers, totalProducts, activeProducts };
+}
+
+function computeRecentOrders() {
+  return prisma.order.findMany({
+    take: 5,
+    orderBy: { createdAt: 'desc' },
+    include: {
+      user: {
+        select: { id: true, name: true, email: true }
+      },
+      items: {
+        include: {
+          product: {
+            select: { id: true, name: true, imageUrl: true }
+          }
+        }
+      }
+    }
+  });
+}
+
+function computeLowStock() {
+  return prisma.productVariant.findMany({
+    where: {
+      stock: {
+        lte: prisma.productVariant.fields.reorderPoint
+      }
+    },
+    take: 10,
+    include: {
+      product: {
+        select: { id: true, name: true, imageUrl: true }
+      }
+    },
+    orderBy: { stock: 'asc' }
+  });
+}
+
+function computeTopProducts() {
+  return prisma.product.findMany({
+    take: 10,
+    orderBy: { totalSales: 'desc' },
+    select: {
+      id: true,
+      name: true,
+      imageUrl: true,
+      totalSales: true,
+      averageRating: true
+    }
+  });
+}
+
+/**
+ * Pedidos y revenue por día del período, agrupados en la base
+ */
+async function computeAnalytics(period) {
+  const chartData = await prisma.$queryRaw`
+    SELECT
+      to_char(date_trunc('day', "createdAt"), 'YYYY-MM-DD') AS "date",
+      COUNT(*)::int AS "orders",
+      COALESCE(SUM("total"), 0) AS "revenue",
+      (COUNT(*) FILTER (WHERE "paymentStatus" = 'PAID'))::int AS "paid",
+      (COUNT(*) FILTER (WHERE "paymentStatus" <> 'PAID'))::int AS "pending"
+    FROM "orders"
+    WHERE "createdAt" >= ${periodStart(period)}
+    GROUP BY 1
+    ORDER BY 1
+  `;
+
+  const totalOrders = chartData.reduce((sum, day) => sum + day.orders, 0);
+  const totalRevenue = chartData.reduce((sum, day) => sum + day.revenue, 0);
+  return {
+    chartData,
+    summary: {
+      totalOrders,
+      totalRevenue,
+      averageOrderValue: totalOrders > 0 ? totalRevenue / totalOrders : 0
+    }
+  };
+}
+
+// Panel -> { ttlMs, compute }
+const PANELS = {
+  orders: { ttlMs: 30 * 1000, compute: computeOrders },
+  catalog: { ttlMs: 5 * 60 * 1000, compute: computeCatalog },
+  recentOrders: { ttlMs: 10 * 1000, compute: computeRecentOrders },
+  lowStock: { ttlMs: 60 * 1000, compute: computeLowStock },
+  topProducts: { ttlMs: 60 * 1000, compute: computeTopProducts },
+  ...Object.fromEntries(ANALYTICS_PERIODS.map(period => [`analytics:${period}`, {
+    ttlMs: period === 'week' ? 60 * 1000 : period === 'month' ? 2 * 60 * 1000 : 10 * 60 * 1000,
+    compute: () => computeAnalytics(period)
+  }]))
+};
+
+class AdminDashboardService {
+  constructor() {
+    // panel -> { data, updatedAt, durationMs, lastReadAt, loading }
+    this.panels = new Map();
+    this.subscribers = new Set();
+    this.lastDemandAt = 0;
+    this.timer = null;
+    this.ticking = false;
+    this.resetStats();
+  }
+
+  resetStats() {
+    this.stats = {
+      since: new Date().toISOString(),
+      reads: 0,
+      panelHits: 0,
+      panelWaits: 0,
+      refreshes: 0,
+      failed: 0,
+      refreshMs: 0
+    };
+  }
+
+  entry(name) {
+    if (!this.panels.has(name)) {
+      this.panels.set(name, { data: null, updatedAt: 0, durationMs: 0, lastReadAt: 0, loading: null });
+    }
+    return this.panels.get(name);
+  }
+
+  effectiveTtl(name, entry) {
+    return Math.max(PANELS[name].ttlMs, entry.durationMs * LOAD_FACTOR);
+  }
+
+  /**
+   * Recalcula un panel. Las cargas simultáneas del mismo panel comparten
+   * la misma query.
+   */
+  load(name) {
+    const entry = this.entry(name);
+    if (!entry.loading) {
+      const startedAt = Date.now();
+      entry.loading = PANELS[name].compute()
+        .then(data => {
+          entry.data = data;
+          entry.updatedAt = Date.now();
+          entry.durationMs = entry.updatedAt - startedAt;
+          this.stats.refreshes++;
+          this.stats.refreshMs += entry.durationMs;
+          this.publish(name, entry);
+          return entry;
+        })
+        .finally(() => {
+          entry.loading = null;
+        });
+    }
+    return entry.loading;
+  }
+
+  /**
+   * Paneles pedidos desde cache; solo se espera a los que nunca se
+   * calcularon o quedaron muy viejos
+   * @returns {Object} nombre -> { data, updatedAt, durationMs }
+   */
+  async getPanels(names) {
+    this.stats.reads++;
+    if (!ENABLED) {
+      const computed = await Promise.all(names.map(name => PANELS[name].compute()));
+      return Object.fromEntries(names.map((name, i) => [name, { data: computed[i], updatedAt: Date.now(), durationMs: 0 }]));
+    }
+
+    const now = Date.now();
+    this.lastDemandAt = now;
+    this.startRefresher();
+
+    const entries = await Promise.all(names.map(name => {
+      const entry = this.entry(name);
+      entry.lastReadAt = now;
+      const tooOld = now - entry.updatedAt > this.effectiveTtl(name, entry) * STALE_FACTOR;
+      if (entry.updatedAt && !tooOld) {
+        this.stats.panelHits++;
+        return entry;
+      }
+      this.stats.panelWaits++;
+      return this.load(name);
+    }));
+    return Object.fromEntries(names.map((name, i) => [name, entries[i]]));
+  }
+
+  /**
+   * Dashboard completo (misma forma que la respuesta anterior) y la
+   * antigüedad de cada panel
+   */
+  async getDashboard() {
+    const panels = await this.getPanels(DASHBOARD_PANELS);
+    return {
+      overview: {
+        ...panels.orders.data,
+        ...panels.catalog.data
+      },
+      recentOrders: panels.recentOrders.data,
+      lowStockProducts: panels.lowStock.data,
+      topProducts: panels.topProducts.data,
+      panels: this.describe(panels)
+    };
+  }
+
+  /**
+   * Gráfica de pedidos y revenue por día (week, month o year; otro valor
+   * se toma como month)
+   */
+  async getAnalytics(period) {
+    const name = `analytics:${ANALYTICS_PERIODS.includes(period) ? period : 'month'}`;
+    const panels = await this.getPanels([name]);
+    return {
+      period,
+      ...panels[name].data,
+      panels: this.describe(panels)
+    };
+  }
+
+  describe(panels) {
+    const now = Date.now();
+    return Object.fromEntries(Object.entries(panels).map(([name, entry]) => [name, {
+      updatedAt: new Date(entry.updatedAt).toISOString(),
+      ageMs: now - entry.updatedAt,
+      computeMs: entry.durationMs
+    }]));
+  }
+
+  // ==================== REFRESCO EN SEGUNDO PLANO ====================
+
+  startRefresher() {
+    if (this.timer) return;
+    // Fuera del contexto del request que lo arranca: sus queries no son de ese request
+    runOutsideRequest(() => {
+      this.timer = setInterval(() => this.tick(), TICK_MS);
+      this.timer.unref();
+    });
+  }
+
+  stopRefresher() {
+    clearInterval(this.timer);
+    this.timer = null;
+  }
+
+  /**
+   * Recalcula de a uno los paneles vencidos que alguien miró hace poco
+   */
+  async tick() {
+    if (this.ticking) return;
+    const now = Date.now();
+    if (this.subscribers.size > 0) {
+      this.lastDemandAt = now;
+      DASHBOARD_PANELS.forEach(name => { this.entry(name).lastReadAt = now; });
+    }
+    if (now - this.lastDemandAt > IDLE_MS) {
+      this.stopRefresher();
+      return;
+    }
+
+    this.ticking = true;
+    try {
+      for (const [name, entry] of this.panels) {
+        if (now - entry.lastReadAt > IDLE_MS) continue;
+        if (Date.now() - entry.updatedAt < this.effectiveTtl(name, entry)) continue;
+        try {
+          await this.load(name);
+        } catch (error) {
+          this.stats.failed++;
+          console.error(`Error recalculando el panel ${name} del dashboard:`, error.message);
+        }
+      }
+    } finally {
+      this.ticking = false;
+    }
+  }
+
+  // ==================== SSE ====================
+
+  /**
+   * Suscribe a los paneles recalculados mientras el suscriptor esté
+   * conectado (cuenta como demanda para el refresco)
+   * @param {Function} listener - ({ panel, data, updatedAt }) => void
+   * @returns {Function} Para desuscribirse
+   */
+  subscribe(listener) {
+    this.subscribers.add(listener);
+    this.lastDemandAt = Date.now();
+    this.startRefresher();
+    return () => this.subscribers.delete(listener);
+  }
+
+  publish(name, entry) {
+    const update = { panel: name, data: entry.data, updatedAt: new Date(entry.updatedAt).toISOString() };
+    for (const listener of this.subscribers) {
+      try {
+        listener(update);
+      } catch (error) {
+        console.error('Error enviando panel del dashboard:', error.message);
+      }
+    }
+  }
+
+  snapshot() {
+    const now = Date.now();
+    return {
+      enabled: ENABLED,
+      ...this.stats,
+      refreshing: Boolean(this.timer),
+      subscribers: this.subscribers.size,
+      panels: Object.fromEntries([...this.panels].map(([name, entry]) => [name, {
+        ageMs: entry.updatedAt ? now - entry.updatedAt : null,
+        computeMs: entry.durationMs,
+        ttlMs: this.effectiveTtl(name, entry)
+      }]))
+    };
+  }
+}
+
+module.exports = new AdminDashboardService();
@@ -1,5 +1,6 @@
 const { getPrismaClient } = require('../database/connection');
 const gamificationService = require('./gamificationService');
+const gamificationEngine = require('./gamificationEngine');
 
 /**
  * =====================================================
@@ -374,6 +375,8 @@ class BadgeService {
       }
     }
 
+    gamificationEngine.invalidate();
+
     return results;
   }
 
@@ -495,20 +498,12 @@ class BadgeService {
 
   /**
    * Verificar y otorgar badges basados en reviews
+   * Reevalúa con los contadores almacenados; una review nueva se registra
+   * con gamificationEngine.processAction(userId, 'REVIEW')
    */
   async checkReviewBadges(userId) {
-    const reviewCount = await this.prisma.review.count({
-      where: {
-        userId,
-        status: 'APPROVED'
-      }
-    });
-
-    if (reviewCount >= 10) await gamificationService.checkAndAwardBadge(userId, 'REVIEWS_10');
-    else if (reviewCount >= 5) await gamificationService.checkAndAwardBadge(userId, 'REVIEWS_5');
-    else if (reviewCount >= 1) await gamificationService.checkAndAwardBadge(userId, 'FIRST_REVIEW');
-
-    return { reviewCount };
+    const result = await gamificationEngine.evaluateCounters(userId, ['totalReviews']);
+    return { reviewCount: result.counters.totalReviews };
   }
 
   /**
@@ -541,42 +536,16 @@ class BadgeService {
    * Verificar badges de referidos
    */
   async checkReferralBadges(userId) {
-    const referralCount = await this.prisma.referral.count({
-      where: {
-        referrerId: userId,
-        status: 'COMPLETED'
-      }
-    });
-
-    if (referralCount >= 10) await gamificationService.checkAndAwardBadge(userId, 'REFERRALS_10');
-    else if (referralCount >= 5) await gamificationService.checkAndAwardBadge(userId, 'REFERRALS_5');
-    else if (referralCount >= 1) await gamificationService.checkAndAwardBadge(userId, 'FIRST_REFERRAL');
-
-    return { referralCount };
+    const result = await gamificationEngine.evaluateCounters(userId, ['completedReferrals']);
+    return { referralCount: result.counters.completedReferrals };
   }
 
   /**
    * Verificar badges de racha
    */
   async checkStreakBadges(userId) {
-    const streak = await this.prisma.streak.findUnique({
-      where: {
-        userId_type: {
-          userId,
-          type: 'PURCHASE_MONTHLY'
-        }
-      }
-    });
-
-    if (!streak) return null;
-
-    const streakCount = streak.currentStreak;
-
-    if (streakCount >= 12) await gamificationService.checkAndAwardBadge(userId, 'STREAK_12');
-    else if (streakCount >= 6) await gamificationService.checkAndAwardBadge(userId, 'STREAK_6');
-    else if (streakCount >= 3) await gamificationService.checkAndAwardBadge(userId, 'STREAK_3');
-
-    return { streakCount };
+    const result = await gamificationEngine.evaluateCounters(userId, ['currentStreak']);
+    return { streakCount: result.counters.currentStreak };
   }
 
   /**
@@ -617,81 +586,28 @@ class BadgeService {
    * Obtener próximos badges por conseguir
    */
   async getNextBadgesToEarn(userId) {
-    const userBadges = await this.getUserBadges(userId);
-    const earnedCodes = new Set(userBadges.map(ub => ub.badge.code));
-    
-    // Obtener estadísticas del usuario
-    const orderCount = await this.prisma.order.count({
-      where: { userId, status: 'DELIVERED' }
-    });
-
-    const totalSpent = await this.prisma.order.aggregate({
-      where: { userId, status: 'DELIVERED' },
-      _sum: { total: true }
-    });
-
-    const reviewCount = await this.prisma.review.count({
-      where: { userId, status: 'APPROVED' }
-    });
-
-    const referralCount = await this.prisma.referral.count({
-      where: { referrerId: userId, status: 'COMPLETED' }
-    });
+    // Contadores almacenados en LoyaltyPoints: sin consultas por badge
+    const [userBadges, counters, allBadges] = await Promise.all([
+      this.prisma.userBadge.findMany({
+        where: { userId },
+        select: { badgeId: true }
+      }),
+      gamificationEngine.getUserCounters(userId),
+      this.getAllBadges(false)
+    ]);
+    const earnedIds = new Set(userBadges.map(ub => ub.badgeId));
 
-    const streak = await this.prisma.streak.findUnique({
-      where: {
-        userId_type: {
-          userId,
-          type: 'PURCHASE_MONTHLY'
-        }
-      }
-    });
-
-    const loyalty = await gamificationService.getOrCreateLoyalty(userId);
-
-    const allBadges = await this.getAllBadges(false);
     const nextBadges = [];
 
     for (const badge of allBadges) {
-      if (earnedCodes.has(badge.code)) continue;
-
-      let progress = 0;
-      let current = 0;
-      let target = badge.requirementValue || 0;
-      let canEarn = false;
-
-      switch (badge.requirementType) {
-        case 'PURCHASE_COUNT':
-          current = orderCount;
-          progress = target > 0 ? (current / target) * 100 : 0;
-          canEarn = current >= target;
-          break;
-        case 'TOTAL_SPENT':
-          current = totalSpent._sum.total || 0;
-          progress = target > 0 ? (current / target) * 100 : 0;
-          canEarn = current >= target;
-          break;
-        case 'REVIEW_COUNT':
-          current = reviewCount;
-          progress = target > 0 ? (current / target) * 100 : 0;
-          canEarn = current >= target;
-          break;
-        case 'REFERRAL_COUNT':
-          current = referralCount;
-          progress = target > 0 ? (current / target) * 100 : 0;
-          canEarn = current >= target;
-          break;
-        case 'STREAK':
-          current = streak?.currentStreak || 0;
-          progress = target > 0 ? (current / target) * 100 : 0;
-          canEarn = current >= target;
-          break;
-        case 'TIER':
-          current = loyalty.currentPoints;
-          progress = target > 0 ? (current / target) * 100 : 0;
-          canEarn = current >= target;
-          break;
-      }
+      if (earnedIds.has(badge.id)) continue;
+
+      const counter = gamificationEngine.getBadgeCounter(badge);
+      if (!counter) continue;
+
+      const current = counters[counter] || 0;
+      const target = badge.requirementValue || 0;
+      const progress = target > 0 ? (current / target) * 100 : 0;
 
       if (progress > 0 && progress < 100) {
         nextBadges.push({
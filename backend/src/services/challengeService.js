@@ -1,5 +1,6 @@
 const { getPrismaClient } = require('../database/connection');
 const gamificationService = require('./gamificationService');
+const gamificationEngine = require('./gamificationEngine');
 
 /**
  * =====================================================
@@ -251,65 +252,18 @@ class ChallengeService {
 
   /**
    * Procesar acción que puede progresar challenges
+   * Solo se evalúan los challenges indexados para el tipo de acción
    */
   async processAction(userId, actionType, data = {}) {
-    const activeChallenges = await this.getActiveChallenges();
-    const results = [];
-
-    for (const challenge of activeChallenges) {
-      let shouldUpdate = false;
-      let increment = 1;
-
-      switch (challenge.targetType) {
-        case 'BUY_PRODUCTS':
-          if (actionType === 'PURCHASE' && data.orderTotal) {
-            shouldUpdate = true;
-            increment = data.productCount || 1;
-          }
-          break;
-
-        case 'WRITE_REVIEWS':
-          if (actionType === 'REVIEW') {
-            shouldUpdate = true;
-          }
-          break;
-
-        case 'REFER_FRIENDS':
-          if (actionType === 'REFERRAL') {
-            shouldUpdate = true;
-          }
-          break;
-
-        case 'SPEND_AMOUNT':
-          if (actionType === 'PURCHASE' && data.orderTotal) {
-            shouldUpdate = true;
-            increment = Math.floor(data.orderTotal);
-          }
-          break;
-
-        case 'VISIT_PAGES':
-          if (actionType === 'PAGE_VIEW') {
-            shouldUpdate = true;
-          }
-          break;
-      }
-
-      if (shouldUpdate) {
-        const result = await this.updateChallengeProgress(userId, challenge.code, increment);
-        if (result) {
-          results.push(result);
-        }
-      }
-    }
-
-    return results;
+    const result = await gamificationEngine.processAction(userId, actionType, data);
+    return result.challenges;
   }
 
   /**
    * Crear challenge (admin)
    */
   async createChallenge(data) {
-    return await this.prisma.challenge.create({
+    const challenge = await this.prisma.challenge.create({
       data: {
         code: data.code,
         name: data.name,
@@ -331,6 +285,10 @@ class ChallengeService {
         difficulty: data.difficulty || 'MEDIUM'
       }
     });
+
+    gamificationEngine.invalidate();
+
+    return challenge;
   }
 
   /**
@@ -0,0 +1,579 @@
+const { getPrismaClient } = require('../database/connection');
+const gamificationService = require('./gamificationService');
+
+/**
+ * =====================================================
+ * GAMIFICATION RULES ENGINE
+ * =====================================================
+ * Evalúa badges y challenges a partir de acciones de usuario:
+ * - Índice de reglas por acción/contador (en memoria con TTL)
+ * - Contadores por usuario guardados en LoyaltyPoints
+ * - Solo se evalúan las reglas afectadas por la acción recibida
+ * - Lectura y escritura en una transacción con la fila de LoyaltyPoints
+ *   bloqueada: acciones concurrentes del mismo usuario se serializan y no
+ *   otorgan dos veces el mismo badge, challenge o puntos
+ */
+
+const INDEX_TTL_MS = 60 * 1000;
+
+// Contadores que incrementa cada acción
+const ACTION_COUNTERS = {
+  PURCHASE: (data) => ({ totalPurchases: 1, totalSpent: data.orderTotal || 0 }),
+  REVIEW: () => ({ totalReviews: 1 }),
+  // Review aprobada que deja de estarlo (rechazada, editada o eliminada)
+  REVIEW_REMOVED: () => ({ totalReviews: -1 }),
+  REFERRAL: () => ({ completedReferrals: 1 }),
+  PAGE_VIEW: () => ({})
+};
+
+// Contadores que una acción puede modificar indirectamente
+// (la racha mensual se actualiza al procesar una compra)
+const ACTION_SIDE_COUNTERS = {
+  PURCHASE: ['currentStreak']
+};
+
+// requirementType del badge → contador del que depende
+const BADGE_COUNTERS = {
+  PURCHASE_COUNT: 'totalPurchases',
+  TOTAL_SPENT: 'totalSpent',
+  REVIEW_COUNT: 'totalReviews',
+  REFERRAL_COUNT: 'completedReferrals',
+  STREAK: 'currentStreak',
+  TIER: 'currentPoints'
+};
+
+// targetType del challenge → acción que lo hace progresar
+const CHALLENGE_TRIGGERS = {
+  BUY_PRODUCTS: {
+    action: 'PURCHASE',
+    increment: (data) => (data.orderTotal ? data.productCount || 1 : 0)
+  },
+  SPEND_AMOUNT: {
+    action: 'PURCHASE',
+    increment: (data) => (data.orderTotal ? Math.floor(data.orderTotal) : 0)
+  },
+  WRITE_REVIEWS: { action: 'REVIEW', increment: () => 1 },
+  REFER_FRIENDS: { action: 'REFERRAL', increment: () => 1 },
+  VISIT_PAGES: { action: 'PAGE_VIEW', increment: () => 1 }
+};
+
+const COUNTER_FIELDS = ['totalPurchases', 'totalSpent', 'totalReviews', 'completedReferrals'];
+
+class GamificationEngine {
+  constructor() {
+    this.prisma = getPrismaClient();
+    this.index = null;
+    this.indexBuiltAt = 0;
+    this.indexPromise = null;
+  }
+
+  /**
+   * Invalida el índice de reglas (al crear badges o challenges)
+   */
+  invalidate() {
+    this.index = null;
+    this.indexBuiltAt = 0;
+  }
+
+  /**
+   * Obtiene el índice de reglas, reconstruyéndolo si expiró
+   */
+  async getIndex() {
+    if (this.index && Date.now() - this.indexBuiltAt < INDEX_TTL_MS) {
+      return this.index;
+    }
+
+    if (!this.indexPromise) {
+      this.indexPromise = this.buildIndex()
+        .then((index) => {
+          this.index = index;
+          this.indexBuiltAt = Date.now();
+          return index;
+        })
+        .finally(() => {
+          this.indexPromise = null;
+        });
+    }
+
+    return this.indexPromise;
+  }
+
+  /**
+   * Construye el índice: badges por contador y challenges por acción
+   */
+  async buildIndex() {
+    const now = new Date();
+
+    const [badges, challenges] = await Promise.all([
+      this.prisma.badge.findMany({
+        where: {
+          isActive: true,
+          requirementType: { in: Object.keys(BADGE_COUNTERS) }
+        },
+        orderBy: [{ sortOrder: 'asc' }, { requirementValue: 'asc' }]
+      }),
+      this.prisma.challenge.findMany({
+        where: {
+          isActive: true,
+          targetType: { in: Object.keys(CHALLENGE_TRIGGERS) },
+          OR: [{ endDate: null }, { endDate: { gte: now } }]
+        }
+      })
+    ]);
+
+    const badgesByCounter = new Map();
+    for (const badge of badges) {
+      const counter = BADGE_COUNTERS[badge.requirementType];
+      if (!badgesByCounter.has(counter)) badgesByCounter.set(counter, []);
+      badgesByCounter.get(counter).push(badge);
+    }
+
+    const challengesByAction = new Map();
+    for (const challenge of challenges) {
+      const { action } = CHALLENGE_TRIGGERS[challenge.targetType];
+      if (!challengesByAction.has(action)) challengesByAction.set(action, []);
+      challengesByAction.get(action).push(challenge);
+    }
+
+    return { badges, badgesByCounter, challengesByAction };
+  }
+
+  /**
+   * Procesa una acción del usuario: incrementa contadores y evalúa
+   * solo los badges y challenges que dependen de ella.
+   *
+   * @param {string} userId
+   * @param {string} actionType - PURCHASE, REVIEW, REVIEW_REMOVED, REFERRAL, PAGE_VIEW
+   * @param {Object} data - { orderTotal, productCount, persisted }
+   *   persisted: la acción ya está reflejada en las tablas fuente
+   *   (se usa al sincronizar contadores por primera vez)
+   */
+  async processAction(userId, actionType, data = {}) {
+    if (!this.supportsAction(actionType)) {
+      throw new Error(`Acción de gamificación no soportada: ${actionType}`);
+    }
+
+    const deltas = ACTION_COUNTERS[actionType](data);
+    const counters = [
+      ...Object.keys(deltas),
+      ...(ACTION_SIDE_COUNTERS[actionType] || [])
+    ];
+
+    return await this.evaluate(userId, {
+      actionType,
+      data,
+      deltas,
+      counters
+    });
+  }
+
+  /**
+   * Reevalúa badges de los contadores dados sin registrar una acción nueva
+   */
+  async evaluateCounters(userId, counters) {
+    return await this.evaluate(userId, {
+      actionType: null,
+      data: { persisted: true },
+      deltas: {},
+      counters
+    });
+  }
+
+  /**
+   * Núcleo del motor: evalúa dentro de una transacción que bloquea la
+   * fila de LoyaltyPoints del usuario. Si la fila no existe se crea fuera
+   * de la transacción y se reintenta una vez.
+   */
+  async evaluate(userId, action) {
+    const index = await this.getIndex();
+    const run = () => this.prisma.$transaction(
+      tx => this.evaluateLocked(tx, index, userId, action)
+    );
+
+    const result = await run();
+    if (result) return result;
+
+    await gamificationService.getOrCreateLoyalty(userId);
+    return await run();
+  }
+
+  /**
+   * Lectura, cálculo en memoria y escritura con la fila bloqueada
+   * @returns {Promise<Object|null>} null si el usuario no tiene LoyaltyPoints
+   */
+  async evaluateLocked(tx, index, userId, { actionType, data, deltas, counters }) {
+    // FOR UPDATE serializa las acciones concurrentes del mismo usuario
+    const [locked] = await tx.$queryRaw`
+      SELECT "id" FROM "loyalty_points" WHERE "userId" = ${userId} FOR UPDATE
+    `;
+    if (!locked) return null;
+
+    const now = new Date();
+
+    const candidateBadges = counters.flatMap(c => index.badgesByCounter.get(c) || []);
+    const tierBadges = index.badgesByCounter.get('currentPoints') || [];
+    const candidateChallenges = (index.challengesByAction.get(actionType) || [])
+      .filter(c => c.startDate <= now && (!c.endDate || c.endDate >= now));
+
+    const badgeIds = [...new Set([...candidateBadges, ...tierBadges].map(b => b.id))];
+    const challengeIds = candidateChallenges.map(c => c.id);
+
+    // Lectura agrupada: loyalty, badges ya obtenidos e intentos de challenges
+    const [loyaltyRow, earned, attempts] = await Promise.all([
+      tx.loyaltyPoints.findUnique({ where: { userId } }),
+      tx.userBadge.findMany({
+        where: { userId, badgeId: { in: badgeIds } },
+        select: { badgeId: true }
+      }),
+      tx.userChallenge.findMany({
+        where: { userId, challengeId: { in: challengeIds } },
+        select: {
+          id: true,
+          challengeId: true,
+          currentProgress: true,
+          isCompleted: true,
+          attemptNumber: true
+        }
+      })
+    ]);
+
+    let loyalty = loyaltyRow;
+
+    // Primera evaluación del usuario: inicializar contadores desde el historial
+    let appliedDeltas = deltas;
+    if (!loyalty.countersSyncedAt) {
+      loyalty = { ...loyalty, ...(await this.loadCountersFromHistory(userId, tx)) };
+      if (data.persisted) appliedDeltas = {};
+    }
+
+    const values = { ...loyalty };
+    for (const [field, delta] of Object.entries(appliedDeltas)) {
+      values[field] = (values[field] || 0) + delta;
+    }
+
+    const earnedIds = new Set(earned.map(e => e.badgeId));
+    const grants = [];
+    const awardedBadges = [];
+
+    const awardBadge = (badge) => {
+      earnedIds.add(badge.id);
+      awardedBadges.push(badge);
+      if (badge.pointsReward > 0) {
+        grants.push({
+          points: badge.pointsReward,
+          action: 'BONUS',
+          referenceType: 'BADGE',
+          referenceId: badge.id,
+          description: `Puntos bonus por conseguir: ${badge.name}`
+        });
+      }
+    };
+
+    // Badges por umbral de contador
+    for (const badge of candidateBadges) {
+      if (earnedIds.has(badge.id)) continue;
+      const counter = BADGE_COUNTERS[badge.requirementType];
+      if ((values[counter] || 0) >= (badge.requirementValue || 0)) {
+        awardBadge(badge);
+      }
+    }
+
+    // Progreso de challenges afectados
+    const attemptsByChallenge = new Map();
+    for (const attempt of attempts) {
+      if (!attemptsByChallenge.has(attempt.challengeId)) {
+        attemptsByChallenge.set(attempt.challengeId, []);
+      }
+      attemptsByChallenge.get(attempt.challengeId).push(attempt);
+    }
+    const challengeCreates = [];
+    const challengeUpdates = [];
+    const challengeResults = [];
+    const completedChallengeIds = [];
+    const newParticipantIds = [];
+
+    for (const challenge of candidateChallenges) {
+      const increment = CHALLENGE_TRIGGERS[challenge.targetType].increment(data);
+      if (increment <= 0) continue;
+
+      const previous = attemptsByChallenge.get(challenge.id) || [];
+      const existing = previous.find(a => !a.isCompleted);
+      const completedAttempts = previous.length - (existing ? 1 : 0);
+
+      // Sin intento abierto: solo se reabre si el challenge es repetible
+      if (!existing && completedAttempts > 0 &&
+          (!challenge.isRepeatable || completedAttempts >= challenge.maxCompletions)) {
+        continue;
+      }
+
+      const current = (existing ? existing.currentProgress : 0) + increment;
+      const isCompleted = current >= challenge.targetValue;
+
+      if (isCompleted) {
+        completedChallengeIds.push(challenge.id);
+        if (challenge.pointsReward > 0) {
+          grants.push({
+            points: challenge.pointsReward,
+            action: 'CHALLENGE',
+            referenceType: 'CHALLENGE',
+            referenceId: challenge.id,
+            description: `Challenge completado: ${challenge.name}`
+          });
+        }
+      }
+
+      const progressData = {
+        currentProgress: current,
+        isCompleted,
+        completedAt: isCompleted ? now : null,
+        lastProgressAt: now,
+        ...(isCompleted && {
+          rewardClaimed: true,
+          claimedAt: now,
+          pointsEarned: challenge.pointsReward
+        })
+      };
+
+      if (existing) {
+        challengeUpdates.push({ id: existing.id, data: progressData });
+      } else {
+        if (completedAttempts === 0) newParticipantIds.push(challenge.id);
+        challengeCreates.push({
+          userId,
+          loyaltyId: loyalty.id,
+          challengeId: challenge.id,
+          targetProgress: challenge.targetValue,
+          attemptNumber: completedAttempts + 1,
+          ...progressData
+        });
+      }
+
+      challengeResults.push({
+        challengeId: challenge.id,
+        code: challenge.code,
+        isCompleted,
+        progress: {
+          current,
+          target: challenge.targetValue,
+          percentage: (current / challenge.targetValue) * 100
+        }
+      });
+    }
+
+    // Aplicar puntos con el multiplicador del tier, encadenando balances
+    const transactions = [];
+    let balance = loyalty.currentPoints;
+    let tier = loyalty.tier;
+    let pointsAwarded = 0;
+
+    const applyGrants = (pending) => {
+      for (const grant of pending) {
+        const multiplier = gamificationService.getTierConfig(tier).pointsMultiplier;
+        const finalPoints = Math.floor(grant.points * multiplier);
+        transactions.push({
+          loyaltyId: loyalty.id,
+          userId,
+          type: 'EARNED',
+          action: grant.action,
+          points: finalPoints,
+          balanceBefore: balance,
+          balanceAfter: balance + finalPoints,
+          referenceType: grant.referenceType,
+          referenceId: grant.referenceId,
+          multiplier,
+          bonusPoints: finalPoints - grant.points,
+          description: grant.description,
+          createdAt: now
+        });
+        balance += finalPoints;
+        pointsAwarded += finalPoints;
+        tier = gamificationService.calculateTier(balance);
+      }
+    };
+
+    applyGrants(grants);
+
+    // Badges de tier alcanzados con los puntos otorgados (una sola pasada)
+    const tierGrantsStart = grants.length;
+    for (const badge of tierBadges) {
+      if (!earnedIds.has(badge.id) && badge.code === `TIER_${tier}`) {
+        awardBadge(badge);
+      }
+    }
+    applyGrants(grants.slice(tierGrantsStart));
+
+    const tierChanged = tier !== loyalty.tier;
+    const hasCounterChanges = Object.keys(appliedDeltas).length > 0 || !loyalty.countersSyncedAt;
+
+    if (!hasCounterChanges && awardedBadges.length === 0 &&
+        challengeCreates.length === 0 && challengeUpdates.length === 0) {
+      return this.buildResult(actionType, values, [], [], 0, false);
+    }
+
+    // Escritura en la misma transacción
+    const loyaltyData = {
+      countersSyncedAt: loyalty.countersSyncedAt || now,
+      ...(pointsAwarded > 0 && {
+        currentPoints: { increment: pointsAwarded },
+        totalEarned: { increment: pointsAwarded },
+        lifetimePoints: { increment: pointsAwarded },
+        lastPointsEarned: now,
+        tier,
+        tierProgress: gamificationService.calculateTierProgress(balance, tier),
+        nextTierPoints: gamificationService.getNextTierPoints(tier),
+        ...(tierChanged && { lastTierUpgrade: now })
+      }),
+      ...(awardedBadges.length > 0 && {
+        totalBadges: { increment: awardedBadges.length }
+      }),
+      ...(completedChallengeIds.length > 0 && {
+        totalChallengesCompleted: { increment: completedChallengeIds.length }
+      })
+    };
+
+    if (loyaltyRow.countersSyncedAt) {
+      for (const [field, delta] of Object.entries(appliedDeltas)) {
+        loyaltyData[field] = { increment: delta };
+      }
+    } else {
+      for (const field of COUNTER_FIELDS) {
+        loyaltyData[field] = values[field] || 0;
+      }
+    }
+
+    await tx.loyaltyPoints.update({
+      where: { id: loyalty.id },
+      data: loyaltyData
+    });
+
+    if (awardedBadges.length > 0) {
+      await tx.userBadge.createMany({
+        data: awardedBadges.map(badge => ({
+          userId,
+          loyaltyId: loyalty.id,
+          badgeId: badge.id,
+          earnedFromType: actionType
+        })),
+        skipDuplicates: true
+      });
+      await tx.badge.updateMany({
+        where: { id: { in: awardedBadges.map(b => b.id) } },
+        data: { totalAwarded: { increment: 1 } }
+      });
+    }
+
+    if (challengeCreates.length > 0) {
+      await tx.userChallenge.createMany({ data: challengeCreates });
+    }
+
+    for (const update of challengeUpdates) {
+      await tx.userChallenge.update({
+        where: { id: update.id },
+        data: update.data
+      });
+    }
+
+    if (newParticipantIds.length > 0) {
+      await tx.challenge.updateMany({
+        where: { id: { in: newParticipantIds } },
+        data: { totalParticipants: { increment: 1 } }
+      });
+    }
+
+    if (completedChallengeIds.length > 0) {
+      await tx.challenge.updateMany({
+        where: { id: { in: completedChallengeIds } },
+        data: { totalCompletions: { increment: 1 } }
+      });
+    }
+
+    if (transactions.length > 0) {
+      await tx.loyaltyTransaction.createMany({ data: transactions });
+    }
+
+    return this.buildResult(
+      actionType,
+      { ...values, currentPoints: balance },
+      awardedBadges,
+      challengeResults,
+      pointsAwarded,
+      tierChanged ? tier : false
+    );
+  }
+
+  buildResult(actionType, values, awardedBadges, challenges, pointsAwarded, newTier) {
+    return {
+      actionType,
+      counters: {
+        totalPurchases: values.totalPurchases || 0,
+        totalSpent: values.totalSpent || 0,
+        totalReviews: values.totalReviews || 0,
+        completedReferrals: values.completedReferrals || 0,
+        currentStreak: values.currentStreak || 0,
+        currentPoints: values.currentPoints || 0
+      },
+      badgesAwarded: awardedBadges.map(b => ({ id: b.id, code: b.code, name: b.name })),
+      challenges,
+      pointsAwarded,
+      tierChanged: Boolean(newTier),
+      newTier: newTier || null
+    };
+  }
+
+  /**
+   * Calcula los contadores desde las tablas fuente (solo la primera vez)
+   */
+  async loadCountersFromHistory(userId, client = this.prisma) {
+    const [orders, totalReviews, completedReferrals] = await Promise.all([
+      client.order.aggregate({
+        where: { userId, status: 'DELIVERED' },
+        _count: { _all: true },
+        _sum: { total: true }
+      }),
+      client.review.count({ where: { userId, status: 'APPROVED' } }),
+      client.referral.count({ where: { referrerId: userId, status: 'COMPLETED' } })
+    ]);
+
+    return {
+      totalPurchases: orders._count._all,
+      totalSpent: orders._sum.total || 0,
+      totalReviews,
+      completedReferrals
+    };
+  }
+
+  /**
+   * Devuelve los contadores del usuario, inicializándolos si hace falta
+   */
+  async getUserCounters(userId) {
+    const loyalty = await this.prisma.loyaltyPoints.findUnique({ where: { userId } })
+      || await gamificationService.getOrCreateLoyalty(userId);
+
+    if (!loyalty.countersSyncedAt) {
+      const counters = await this.loadCountersFromHistory(userId);
+      await this.prisma.loyaltyPoints.update({
+        where: { id: loyalty.id },
+        data: { ...counters, countersSyncedAt: new Date() }
+      });
+      return { ...loyalty, ...counters };
+    }
+
+    return loyalty;
+  }
+
+  /**
+   * Indica si el motor reconoce el tipo de acción
+   */
+  supportsAction(actionType) {
+    return Object.prototype.hasOwnProperty.call(ACTION_COUNTERS, actionType);
+  }
+
+  /**
+   * Contador asociado a un badge (para cálculo de progreso)
+   */
+  getBadgeCounter(badge) {
+    return BADGE_COUNTERS[badge.requirementType] || null;
+  }
+}
+
+module.exports = new GamificationEngine();
@@ -523,8 +523,12 @@ class GamificationService {
     // 3. Actualizar streak de compras mensuales
     await this.updatePurchaseStreak(userId);
 
-    // 4. Verificar badges relacionados con compras
-    await this.checkPurchaseBasedBadges(userId);
+    // 4. Contadores, badges y challenges afectados por la compra
+    const gamificationEngine = require('./gamificationEngine');
+    results.push(await gamificationEngine.processAction(userId, 'PURCHASE', {
+      orderTotal,
+      persisted: true
+    }));
 
     return results;
   }
@@ -635,30 +639,11 @@ class GamificationService {
    * Verificar y otorgar badges basados en compras
    */
   async checkPurchaseBasedBadges(userId) {
-    const orderCount = await this.prisma.order.count({
-      where: { userId, status: 'DELIVERED' }
-    });
-
-    const totalSpent = await this.prisma.order.aggregate({
-      where: { userId, status: 'DELIVERED' },
-      _sum: { total: true }
-    });
-
-    const spent = totalSpent._sum.total || 0;
-
-    // Badges por cantidad de compras
-    if (orderCount >= 100) await this.checkAndAwardBadge(userId, 'PURCHASES_100');
-    else if (orderCount >= 50) await this.checkAndAwardBadge(userId, 'PURCHASES_50');
-    else if (orderCount >= 20) await this.checkAndAwardBadge(userId, 'PURCHASES_20');
-    else if (orderCount >= 10) await this.checkAndAwardBadge(userId, 'PURCHASES_10');
-    else if (orderCount >= 5) await this.checkAndAwardBadge(userId, 'PURCHASES_5');
-
-    // Badges por total gastado
-    if (spent >= 10000) await this.checkAndAwardBadge(userId, 'SPENT_10K');
-    else if (spent >= 5000) await this.checkAndAwardBadge(userId, 'SPENT_5K');
-    else if (spent >= 1000) await this.checkAndAwardBadge(userId, 'SPENT_1K');
+    const gamificationEngine = require('./gamificationEngine');
+    return await gamificationEngine.evaluateCounters(userId, ['totalPurchases', 'totalSpent']);
   }
 
+
   /**
    * Verificar y otorgar badge genérico
    */
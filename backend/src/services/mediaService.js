@@ -0,0 +1,325 @@
+const crypto = require('crypto');
+const fs = require('fs/promises');
+const path = require('path');
+const { getPrismaClient } = require('../database/connection');
+const { CommonErrors } = require('../middleware/errorHandler');
+const prisma = getPrismaClient();
+
+// sharp es opcional (sin él se sirven los originales sin renditions) y se
+// carga con la primera imagen a procesar, no al arrancar. Sin sharp los
+// assets quedan PENDING y se procesan al reiniciar con sharp instalado.
+let sharp;
+const SHARP_MISSING = 'sharp no instalado';
+
+function loadSharp() {
+  if (sharp === undefined) {
+    try {
+      sharp = require('sharp');
+    } catch (error) {
+      sharp = null;
+      console.warn('⚠️ sharp no instalado. Las imágenes se servirán sin renditions WebP/AVIF.');
+    }
+  }
+  return sharp;
+}
+
+/**
+ * Servicio de Imágenes
+ * Guarda las imágenes subidas con nombre por hash de contenido (la URL
+ * cambia si cambia el archivo, así se pueden cachear como immutable) y
+ * genera renditions WebP/AVIF a anchos fijos fuera del request, en una
+ * cola en proceso. Las APIs devuelven un imageSet con src/srcset por
+ * formato para <picture>.
+ */
+const MEDIA_DIR = path.join(__dirname, '../../uploads/media');
+const MEDIA_URL = '/media';
+const RENDITION_WIDTHS = [320, 640, 1024, 1600];
+// Orden de preferencia para <picture>: AVIF primero, WebP como respaldo
+const RENDITION_FORMATS = [
+  { format: 'avif', mimeType: 'image/avif', options: { quality: 50, effort: 4 } },
+  { format: 'webp', mimeType: 'image/webp', options: { quality: 75 } }
+];
+const CONCURRENCY = parseInt(process.env.MEDIA_CONCURRENCY || '1');
+const URL_PATTERN = /\/media\/([a-f0-9]{32})\.(jpg|png|webp|avif)$/;
+const IMAGE_SET_CACHE_SIZE = 2000;
+
+/**
+ * Tipo real de la imagen por sus bytes iniciales (no se confía en el
+ * Content-Type del cliente)
+ * @returns {{mimeType: string, extension: string}|null}
+ */
+function detectImageType(buffer) {
+  if (buffer.length < 12) return null;
+  if (buffer[0] === 0xff && buffer[1] === 0xd8 && buffer[2] === 0xff) {
+    return { mimeType: 'image/jpeg', extension: 'jpg' };
+  }
+  if (buffer.subarray(0, 8).equals(Buffer.from([0x89, 0x50, 0x4e, 0x47, 0x0d, 0x0a, 0x1a, 0x0a]))) {
+    return { mimeType: 'image/png', extension: 'png' };
+  }
+  if (buffer.toString('ascii', 0, 4) === 'RIFF' && buffer.toString('ascii', 8, 12) === 'WEBP') {
+    return { mimeType: 'image/webp', extension: 'webp' };
+  }
+  if (buffer.toString('ascii', 4, 8) === 'ftyp' && ['avif', 'avis'].includes(buffer.toString('ascii', 8, 12))) {
+    return { mimeType: 'image/avif', extension: 'avif' };
+  }
+  return null;
+}
+
+/**
+ * Anchos a generar: los fijos menores al original, más el original si
+ * cabe debajo del mayor (nunca se amplía)
+ */
+function targetWidths(width) {
+  const widths = RENDITION_WIDTHS.filter(w => w < width);
+  if (width <= RENDITION_WIDTHS[RENDITION_WIDTHS.length - 1]) widths.push(width);
+  return widths;
+}
+
+class MediaService {
+  constructor() {
+    this.queue = [];
+    this.active = 0;
+    // hash -> imageSet de assets terminados (no cambian)
+    this.imageSets = new Map();
+  }
+
+  /**
+   * Guarda una imagen subida y encola sus renditions
+   * @param {Buffer} buffer - Contenido del archivo
+   * @param {Object} options - { kind: 'product' | 'review' }
+   * @returns {Object} Asset con su URL
+   */
+  async store(buffer, { kind }) {
+    const type = detectImageType(buffer);
+    if (!type) {
+      throw CommonErrors.BadRequest('Formato de imagen no soportado (JPEG, PNG, WebP o AVIF)');
+    }
+
+    const hash = crypto.createHash('sha256').update(buffer).digest('hex').slice(0, 32);
+    const existing = await prisma.mediaAsset.findUnique({ where: { hash } });
+    if (existing) return this.serialize(existing);
+
+    // Escritura atómica: nunca se sirve un archivo a medio escribir
+    await fs.mkdir(MEDIA_DIR, { recursive: true });
+    const filepath = path.join(MEDIA_DIR, `${hash}.${type.extension}`);
+    const tmpPath = `${filepath}.${process.pid}.tmp`;
+    await fs.writeFile(tmpPath, buffer);
+    await fs.rename(tmpPath, filepath);
+
+    let asset;
+    try {
+      asset = await prisma.mediaAsset.create({
+        data: {
+          hash,
+          extension: type.extension,
+          kind,
+          mimeType: type.mimeType,
+          bytes: buffer.length
+        }
+      });
+    } catch (error) {
+      // La misma imagen subida en paralelo
+      if (error.code !== 'P2002') throw error;
+      return this.serialize(await prisma.mediaAsset.findUnique({ where: { hash } }));
+    }
+
+    this.enqueue(asset.id);
+    return this.serialize(asset);
+  }
+
+  /**
+   * Asset por ID (estado del procesamiento)
+   */
+  async getAsset(id) {
+    const asset = await prisma.mediaAsset.findUnique({ where: { id } });
+    return asset ? this.serialize(asset) : null;
+  }
+
+  serialize(asset) {
+    return {
+      id: asset.id,
+      url: `${MEDIA_URL}/${asset.hash}.${asset.extension}`,
+      kind: asset.kind,
+      mimeType: asset.mimeType,
+      bytes: asset.bytes,
+      width: asset.width,
+      height: asset.height,
+      status: asset.status,
+      error: asset.error,
+      // Sin sharp las renditions no se generan y el asset queda PENDING
+      renditionsEnabled: Boolean(loadSharp()),
+      imageSet: this.buildImageSet(asset)
+    };
+  }
+
+  // ==================== COLA DE RENDITIONS ====================
+
+  enqueue(assetId) {
+    this.queue.push(assetId);
+    this.drain();
+  }
+
+  drain() {
+    while (this.active < CONCURRENCY && this.queue.length > 0) {
+      const assetId = this.queue.shift();
+      this.active++;
+      this.process(assetId)
+        .catch(error => console.error(`Error procesando imagen ${assetId}:`, error))
+        .finally(() => {
+          this.active--;
+          this.drain();
+        });
+    }
+  }
+
+  /**
+   * Reencola los assets que quedaron pendientes (reinicio del servidor).
+   * Los que fallaron solo por falta de sharp vuelven a PENDING.
+   */
+  async resumePending() {
+    if (!loadSharp()) return 0;
+
+    await prisma.mediaAsset.updateMany({
+      where: { status: 'FAILED', error: SHARP_MISSING },
+      data: { status: 'PENDING', error: null }
+    });
+
+    const pending = await prisma.mediaAsset.findMany({
+      where: { status: 'PENDING' },
+      select: { id: true },
+      orderBy: { createdAt: 'asc' }
+    });
+    pending.forEach(asset => this.enqueue(asset.id));
+    return pending.length;
+  }
+
+  async process(assetId) {
+    const asset = await prisma.mediaAsset.findUnique({ where: { id: assetId } });
+    if (!asset || asset.status !== 'PENDING') return;
+    // Sin sharp no es un fallo del archivo: queda PENDING para más adelante
+    if (!loadSharp()) return;
+
+    let data;
+    try {
+      const result = await this.renderRenditions(asset);
+      data = {
+        status: 'READY',
+        width: result.width,
+        height: result.height,
+        renditions: JSON.stringify(result.renditions),
+        error: null
+      };
+    } catch (error) {
+      data = { status: 'FAILED', error: error.message };
+    }
+
+    await prisma.mediaAsset.update({ where: { id: assetId }, data });
+    this.imageSets.delete(asset.hash);
+  }
+
+  async renderRenditions(asset) {
+    const sharp = loadSharp();
+    if (!sharp) throw new Error(SHARP_MISSING);
+
+    const source = path.join(MEDIA_DIR, `${asset.hash}.${asset.extension}`);
+    const metadata = await sharp(source).metadata();
+    // Orientación EXIF 5-8: la imagen se rota 90°
+    const rotated = metadata.orientation >= 5;
+    const width = rotated ? metadata.height : metadata.width;
+    const height = rotated ? metadata.width : metadata.height;
+
+    const renditions = [];
+    for (const targetWidth of targetWidths(width)) {
+      for (const { format, options } of RENDITION_FORMATS) {
+        const file = `${asset.hash}-${targetWidth}.${format}`;
+        const info = await sharp(source)
+          .rotate()
+          .resize({ width: targetWidth, withoutEnlargement: true })
+          .toFormat(format, options)
+          .toFile(path.join(MEDIA_DIR, file));
+        renditions.push({ format, width: info.width, height: info.height, bytes: info.size, file });
+      }
+    }
+
+    return { width, height, renditions };
+  }
+
+  // ==================== SRCSET ====================
+
+  /**
+   * src + srcset por formato. Sin renditions (pendiente o fallida) solo
+   * queda el original.
+   */
+  buildImageSet(asset) {
+    const renditions = asset.status === 'READY' && asset.renditions ? JSON.parse(asset.renditions) : [];
+    const sources = RENDITION_FORMATS
+      .map(({ format, mimeType }) => ({
+        type: mimeType,
+        srcset: renditions
+          .filter(r => r.format === format)
+          .sort((a, b) => a.width - b.width)
+          .map(r => `${MEDIA_URL}/${r.file} ${r.width}w`)
+          .join(', ')
+      }))
+      .filter(source => source.srcset);
+
+    return {
+      src: `${MEDIA_URL}/${asset.hash}.${asset.extension}`,
+      width: asset.width,
+      height: asset.height,
+      sources
+    };
+  }
+
+  /**
+   * imageSet por URL para un lote de URLs (una sola query)
+   * @param {Array<string>} urls - URLs de imagen (externas se ignoran)
+   * @returns {Map<string, Object>}
+   */
+  async imageSetsFor(urls) {
+    const hashesByUrl = new Map();
+    for (const url of urls) {
+      const match = url && URL_PATTERN.exec(url);
+      if (match) hashesByUrl.set(url, match[1]);
+    }
+
+    const fetched = new Map();
+    const missing = [...new Set(hashesByUrl.values())].filter(hash => !this.imageSets.has(hash));
+    if (missing.length > 0) {
+      const assets = await prisma.mediaAsset.findMany({ where: { hash: { in: missing } } });
+      for (const asset of assets) {
+        const imageSet = this.buildImageSet(asset);
+        fetched.set(asset.hash, imageSet);
+        // Los pendientes se vuelven a consultar hasta que terminen (sin
+        // sharp no terminan en este proceso y se cachean como están)
+        if (asset.status === 'PENDING' && loadSharp()) continue;
+        if (this.imageSets.size >= IMAGE_SET_CACHE_SIZE) {
+          this.imageSets.delete(this.imageSets.keys().next().value);
+        }
+        this.imageSets.set(asset.hash, imageSet);
+      }
+    }
+
+    const result = new Map();
+    for (const [url, hash] of hashesByUrl) {
+      const imageSet = this.imageSets.get(hash) || fetched.get(hash);
+      if (imageSet) result.set(url, imageSet);
+    }
+    return result;
+  }
+
+  /**
+   * Agrega `imageSet` a cada item según su campo de URL
+   * @param {Array<Object>} items - Productos, imágenes de reseña, etc.
+   * @param {string} field - Campo con la URL de la imagen
+   */
+  async attachImageSets(items, field = 'imageUrl') {
+    const imageSets = await this.imageSetsFor(items.map(item => item[field]));
+    for (const item of items) {
+      item.imageSet = imageSets.get(item[field]) || null;
+    }
+    return items;
+  }
+}
+
+module.exports = new MediaService();
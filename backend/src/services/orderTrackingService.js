@@ -0,0 +1,506 @@
+const cluster = require('cluster');
+const { getPrismaClient } = require('../database/connection');
+const RedisService = require('./RedisService');
+const socketService = require('./SocketService');
+const prisma = getPrismaClient();
+
+/**
+ * Servicio de Tracking de Pedidos (modelo de lectura)
+ * Guarda por pedido la vista de tracking ya armada (pedido, items,
+ * eventos, entrega, repartidor y ubicación) en Redis, o en memoria si
+ * Redis no está disponible. Las consultas de los clientes se responden
+ * con una lectura de cache; los eventos, cambios de ubicación y de estado
+ * actualizan la vista y empujan el delta a la sala order_<id>.
+ *
+ * Cada vista lleva sourceUpdatedAt (el cambio más reciente de pedido,
+ * entrega o eventos que refleja). Las escrituras comparan ese campo con
+ * la vista guardada, en Redis de forma atómica, así que una lectura
+ * lenta o un refresco de otro proceso no pisan una vista más nueva.
+ */
+const ENABLED = process.env.TRACKING_READ_MODEL !== 'false';
+const CACHE_TTL_SECONDS = parseInt(process.env.TRACKING_CACHE_TTL_SECONDS || '3600');
+// Sin Redis cada worker del cluster tiene su propia copia y no ve los
+// cambios hechos en otro: se vence rápido para acotar lo desactualizado
+const MEMORY_TTL_MS = cluster.isWorker ? 5000 : CACHE_TTL_SECONDS * 1000;
+const MEMORY_MAX_ENTRIES = 20000;
+const MY_ORDERS_LIMIT = 20;
+
+const STATUS_PROGRESS = {
+  'PENDING': 10,
+  'CONFIRMED': 25,
+  'PREPARING': 40,
+  'READY': 60,
+  'IN_TRANSIT': 80,
+  'DELIVERED': 100,
+  'CANCELLED': 0
+};
+
+const ORDER_INCLUDE = {
+  user: {
+    select: { id: true, name: true, phone: true }
+  },
+  items: {
+    include: {
+      product: { select: { id: true, name: true, imageUrl: true } },
+      variant: { select: { id: true, name: true } }
+    }
+  },
+  tracking: {
+    orderBy: { createdAt: 'desc' }
+  },
+  delivery: {
+    include: {
+      driver: { select: { id: true, name: true, phone: true } }
+    }
+  }
+};
+
+const orderKey = (orderId) => `tracking:order:${orderId}`;
+const numberKey = (orderNumber) => `tracking:number:${orderNumber}`;
+
+/**
+ * Momento del último cambio reflejado en la vista (ms)
+ */
+function sourceUpdatedAt(order) {
+  const stamps = [order.updatedAt, order.delivery?.updatedAt, order.tracking[0]?.createdAt];
+  return Math.max(0, ...stamps.filter(Boolean).map(stamp => new Date(stamp).getTime()));
+}
+
+/**
+ * Vista completa a partir del pedido con ORDER_INCLUDE
+ */
+function buildView(order, version = 1) {
+  return {
+    version,
+    sourceUpdatedAt: sourceUpdatedAt(order),
+    userId: order.userId,
+    order: {
+      id: order.id,
+      orderNumber: order.orderNumber,
+      status: order.status,
+      progress: STATUS_PROGRESS[order.status] || 0,
+      createdAt: order.createdAt,
+      total: order.total,
+      shippingAddress: order.shippingAddress,
+      estimatedDeliveryTime: order.estimatedDeliveryTime,
+      items: order.items.map(item => ({
+        id: item.id,
+        productId: item.productId,
+        variantId: item.variantId,
+        productName: item.product.name,
+        variantName: item.variant?.name,
+        quantity: item.quantity,
+        price: item.price,
+        total: item.total,
+        imageUrl: item.product.imageUrl
+      }))
+    },
+    tracking: order.tracking,
+    delivery: order.delivery ? {
+      id: order.delivery.id,
+      status: order.delivery.status,
+      driver: order.delivery.driver,
+      estimatedTime: order.delivery.estimatedTime,
+      currentLocation: order.delivery.currentLat && order.delivery.currentLng ? {
+        lat: order.delivery.currentLat,
+        lng: order.delivery.currentLng
+      } : null,
+      distance: order.delivery.distance,
+      notes: order.delivery.notes
+    } : null,
+    customer: order.user ? {
+      name: order.user.name,
+      phone: order.user.phone
+    } : null
+  };
+}
+
+/**
+ * Vista pública (por número de pedido y sockets): sin datos del cliente
+ * ni notas de la entrega
+ */
+function publicView(view) {
+  const { notes, ...delivery } = view.delivery || {};
+  return {
+    version: view.version,
+    order: view.order,
+    tracking: view.tracking,
+    delivery: view.delivery ? delivery : null
+  };
+}
+
+function fullView(view) {
+  return {
+    version: view.version,
+    order: view.order,
+    tracking: view.tracking,
+    delivery: view.delivery,
+    customer: view.customer
+  };
+}
+
+/**
+ * Resumen para el listado de pedidos del usuario
+ */
+function summaryView(view) {
+  const { order, delivery } = view;
+  return {
+    id: order.id,
+    orderNumber: order.orderNumber,
+    status: order.status,
+    progress: order.progress,
+    createdAt: order.createdAt,
+    total: order.total,
+    itemCount: order.items.length,
+    latestTracking: view.tracking[0] || null,
+    delivery: delivery ? {
+      id: delivery.id,
+      status: delivery.status,
+      estimatedTime: delivery.estimatedTime,
+      currentLat: delivery.currentLocation?.lat ?? null,
+      currentLng: delivery.currentLocation?.lng ?? null
+    } : null,
+    items: order.items.map(item => ({
+      id: item.id,
+      productId: item.productId,
+      variantId: item.variantId,
+      quantity: item.quantity,
+      price: item.price,
+      total: item.total,
+      product: { id: item.productId, name: item.productName, imageUrl: item.imageUrl }
+    }))
+  };
+}
+
+/**
+ * Respaldo en memoria con vencimiento y tope de entradas
+ */
+class MemoryStore {
+  constructor() {
+    this.entries = new Map(); // key -> { value, expiresAt }
+  }
+
+  get(key) {
+    const entry = this.entries.get(key);
+    if (!entry) return null;
+    if (entry.expiresAt <= Date.now()) {
+      this.entries.delete(key);
+      return null;
+    }
+    return entry.value;
+  }
+
+  /**
+   * Guarda salvo que la vista guardada sea más nueva (ver RedisService.setIfNewer)
+   */
+  setIfNewer(key, value, orEqual) {
+    const current = this.get(key);
+    if (current) {
+      const stored = current.sourceUpdatedAt || 0;
+      if (stored > value.sourceUpdatedAt || (stored === value.sourceUpdatedAt && !orEqual)) {
+        return false;
+      }
+    }
+    this.set(key, value);
+    return true;
+  }
+
+  set(key, value) {
+    this.entries.delete(key);
+    if (this.entries.size >= MEMORY_MAX_ENTRIES) {
+      this.entries.delete(this.entries.keys().next().value);
+    }
+    this.entries.set(key, { value, expiresAt: Date.now() + MEMORY_TTL_MS });
+  }
+
+  delete(key) {
+    this.entries.delete(key);
+  }
+}
+
+class OrderTrackingService {
+  constructor() {
+    this.memory = new MemoryStore();
+    // Cargas en curso por pedido: muchos clientes con cache vacío, una query
+    this.loading = new Map();
+    // Cambios en curso por pedido, para no pisar un cambio con otro
+    this.updating = new Map();
+    this.resetStats();
+  }
+
+  resetStats() {
+    this.stats = {
+      since: new Date().toISOString(),
+      hits: 0,
+      misses: 0,
+      loads: 0,
+      patches: 0,
+      refreshes: 0,
+      staleWrites: 0,
+      deltas: 0
+    };
+  }
+
+  get backend() {
+    if (!ENABLED) return 'disabled';
+    return RedisService.isHealthy() ? 'redis' : 'memory';
+  }
+
+  // ==================== ALMACENAMIENTO ====================
+
+  async read(key) {
+    if (!ENABLED) return null;
+    if (RedisService.isHealthy()) return RedisService.get(key);
+    return this.memory.get(key);
+  }
+
+  async readMany(keys) {
+    if (!ENABLED || keys.length === 0) return keys.map(() => null);
+    if (RedisService.isHealthy()) return RedisService.mget(keys);
+    return keys.map(key => this.memory.get(key));
+  }
+
+  /**
+   * Guarda la vista salvo que la guardada sea más nueva. Una vista armada
+   * desde la base tampoco reemplaza a una con el mismo sourceUpdatedAt
+   * (ya refleja ese estado, quizá con patches encima); un patch sí.
+   * @returns {boolean} false si se descartó por desactualizada
+   */
+  async write(view, { orEqual = false } = {}) {
+    if (!ENABLED) return true;
+    const keys = [orderKey(view.order.id), numberKey(view.order.orderNumber)];
+    let results;
+    if (RedisService.isHealthy()) {
+      results = await Promise.all(keys.map(key =>
+        RedisService.setIfNewer(key, view, 'sourceUpdatedAt', CACHE_TTL_SECONDS, orEqual)
+      ));
+    } else {
+      results = keys.map(key => this.memory.setIfNewer(key, view, orEqual));
+    }
+    if (results[0] === false) {
+      this.stats.staleWrites++;
+      return false;
+    }
+    return true;
+  }
+
+  async remove(orderId) {
+    const view = await this.read(orderKey(orderId));
+    const keys = [orderKey(orderId)];
+    if (view) keys.push(numberKey(view.order.orderNumber));
+    if (RedisService.isHealthy()) {
+      await Promise.all(keys.map(key => RedisService.del(key)));
+    }
+    keys.forEach(key => this.memory.delete(key));
+  }
+
+  // ==================== LECTURA ====================
+
+  /**
+   * Vista de un pedido: cache o, si no está, una query que la arma
+   * @param {Object} where - { id } o { orderNumber }
+   */
+  async load(key, where) {
+    if (!ENABLED) return this.query(where);
+    if (this.loading.has(key)) return this.loading.get(key);
+
+    const promise = this.query(where)
+      .then(async (view) => {
+        if (view) await this.write(view);
+        return view;
+      })
+      .finally(() => this.loading.delete(key));
+
+    this.loading.set(key, promise);
+    return promise;
+  }
+
+  async query(where, version = 1) {
+    this.stats.loads++;
+    const order = await prisma.order.findFirst({ where, include: ORDER_INCLUDE });
+    return order ? buildView(order, version) : null;
+  }
+
+  async getView(key, where) {
+    const cached = await this.read(key);
+    if (cached) {
+      this.stats.hits++;
+      return cached;
+    }
+    this.stats.misses++;
+    return this.load(key, where);
+  }
+
+  /**
+   * Tracking completo de un pedido (incluye datos del cliente)
+   */
+  async getOrder(orderId) {
+    const view = await this.getView(orderKey(orderId), { id: orderId });
+    return view ? fullView(view) : null;
+  }
+
+  /**
+   * Tracking público por ID (sockets)
+   */
+  async getPublicOrder(orderId) {
+    const view = await this.getView(orderKey(orderId), { id: orderId });
+    return view ? publicView(view) : null;
+  }
+
+  /**
+   * Tracking público por número de pedido
+   */
+  async getOrderByNumber(orderNumber) {
+    const view = await this.getView(numberKey(orderNumber), { orderNumber });
+    return view ? publicView(view) : null;
+  }
+
+  /**
+   * Últimos pedidos del usuario: una query por los IDs y una lectura
+   * múltiple del cache; los que falten se arman juntos
+   */
+  async getUserOrders(userId, limit = MY_ORDERS_LIMIT) {
+    const orders = await prisma.order.findMany({
+      where: { userId },
+      select: { id: true },
+      orderBy: { createdAt: 'desc' },
+      take: limit
+    });
+    const ids = orders.map(order => order.id);
+    const views = await this.readMany(ids.map(orderKey));
+
+    const missing = ids.filter((id, index) => !views[index]);
+    this.stats.hits += ids.length - missing.length;
+    this.stats.misses += missing.length;
+    if (missing.length > 0) {
+      this.stats.loads++;
+      const loaded = await prisma.order.findMany({
+        where: { id: { in: missing } },
+        include: ORDER_INCLUDE
+      });
+      const byId = new Map(loaded.map(order => [order.id, buildView(order)]));
+      await Promise.all([...byId.values()].map(view => this.write(view)));
+      ids.forEach((id, index) => {
+        if (!views[index]) views[index] = byId.get(id) || null;
+      });
+    }
+
+    return views.filter(Boolean).map(summaryView);
+  }
+
+  // ==================== ACTUALIZACIÓN ====================
+
+  /**
+   * Serializa los cambios de un mismo pedido dentro del proceso (entre
+   * procesos los ordena la comparación de sourceUpdatedAt en write)
+   */
+  async withLock(orderId, fn) {
+    const previous = this.updating.get(orderId) || Promise.resolve();
+    const current = previous.then(fn, fn);
+    this.updating.set(orderId, current);
+    try {
+      return await current;
+    } finally {
+      if (this.updating.get(orderId) === current) this.updating.delete(orderId);
+    }
+  }
+
+  /**
+   * Aplica un cambio a la vista en cache y empuja el delta. Si el pedido
+   * no está en cache se arma desde la base de datos.
+   * Si mutate devuelve false no hay cambio que guardar ni emitir.
+   */
+  async patch(orderId, mutate, delta) {
+    if (!ENABLED) {
+      socketService.emitOrderStatus(orderId, delta);
+      return;
+    }
+
+    try {
+      await this.withLock(orderId, async () => {
+        const view = await this.read(orderKey(orderId));
+        if (!view) {
+          await this.rebuild(orderId);
+          return;
+        }
+        if (mutate(view) === false) return;
+        view.version++;
+        if (!(await this.write(view, { orEqual: true }))) return;
+        this.stats.patches++;
+        this.emit(orderId, { version: view.version, ...delta });
+      });
+    } catch (error) {
+      console.error(`Error actualizando tracking del pedido ${orderId}:`, error);
+      await this.remove(orderId).catch(() => {});
+    }
+  }
+
+  /**
+   * Nuevo evento de tracking
+   */
+  async addEvent(orderId, event) {
+    await this.patch(orderId, (view) => {
+      // Un refresco de otro proceso pudo haber traído ya el evento
+      if (view.tracking.some(e => e.id === event.id)) return false;
+      view.tracking.unshift(event);
+      view.sourceUpdatedAt = Math.max(view.sourceUpdatedAt || 0, new Date(event.createdAt).getTime());
+    }, { type: 'event', event });
+  }
+
+  /**
+   * Nueva ubicación del repartidor
+   */
+  async updateLocation(orderId, { deliveryId, latitude, longitude }) {
+    const location = { lat: latitude, lng: longitude };
+    await this.patch(orderId, (view) => {
+      if (view.delivery) view.delivery.currentLocation = location;
+    }, { type: 'location', deliveryId, location });
+  }
+
+  /**
+   * Cambio de estado u otro cambio del pedido o la entrega: se vuelve a
+   * armar la vista completa. Nunca lanza; si falla se invalida.
+   */
+  async refresh(orderId) {
+    try {
+      await this.withLock(orderId, () => this.rebuild(orderId));
+    } catch (error) {
+      console.error(`Error refrescando tracking del pedido ${orderId}:`, error);
+      await this.remove(orderId).catch(() => {});
+    }
+  }
+
+  async rebuild(orderId) {
+    const previous = ENABLED ? await this.read(orderKey(orderId)) : null;
+    this.stats.refreshes++;
+    const view = await this.query({ id: orderId }, (previous?.version || 0) + 1);
+    if (!view) {
+      await this.remove(orderId);
+      return;
+    }
+    // Otro proceso ya guardó una vista igual o más nueva (y emitió la suya)
+    if (!(await this.write(view))) return;
+    this.emit(orderId, {
+      version: view.version,
+      type: 'snapshot',
+      ...publicView(view)
+    });
+  }
+
+  emit(orderId, delta) {
+    this.stats.deltas++;
+    socketService.emitOrderStatus(orderId, delta);
+  }
+
+  snapshot() {
+    const reads = this.stats.hits + this.stats.misses;
+    return {
+      ...this.stats,
+      backend: this.backend,
+      hitRate: reads > 0 ? Math.round((this.stats.hits / reads) * 10000) / 100 : 0,
+      memoryEntries: this.memory.entries.size
+    };
+  }
+}
+
+module.exports = new OrderTrackingService();
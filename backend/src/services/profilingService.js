@@ -0,0 +1,262 @@
+const inspector = require('inspector');
+const { monitorEventLoopDelay } = require('perf_hooks');
+const fs = require('fs');
+const path = require('path');
+const { CommonErrors } = require('../middleware/errorHandler');
+
+/**
+ * Servicio de Profiling
+ * Perfiles de CPU y heap snapshots con la API de inspector, e histogramas
+ * de retraso del event loop con perf_hooks. Los artefactos se escriben en
+ * uploads/profiles (excluido del estático público) para descargarlos desde
+ * las rutas de administración; los .cpuprofile se abren en Chrome DevTools
+ * o speedscope como flamegraph.
+ *
+ * Las capturas son de este proceso. En cluster las rutas de
+ * administración las envían a un único worker (utils/profilingRelay).
+ */
+const PROFILE_DIR = path.join(__dirname, '../../uploads/profiles');
+// Un perfil olvidado se detiene solo pasado este tiempo
+const MAX_CPU_PROFILE_MS = parseInt(process.env.MAX_CPU_PROFILE_MS || '600000');
+const ARTIFACT_NAME = /^[\w.-]+$/;
+
+/**
+ * Nombre de archivo seguro: etiqueta saneada + marca de tiempo
+ */
+function artifactName(label, extension) {
+  const safeLabel = String(label || 'profile').replace(/[^\w-]/g, '_').slice(0, 40);
+  const stamp = new Date().toISOString().replace(/[:.]/g, '-');
+  return `${safeLabel}-${stamp}${extension}`;
+}
+
+/**
+ * Los histogramas de perf_hooks están en nanosegundos
+ */
+function nsToMs(value) {
+  return Math.round((value / 1e6) * 1000) / 1000;
+}
+
+class ProfilingService {
+  constructor() {
+    this.session = null;
+    this.cpuProfile = null;
+    this.eventLoop = null;
+  }
+
+  post(method, params = {}) {
+    if (!this.session) {
+      this.session = new inspector.Session();
+      this.session.connect();
+    }
+    return new Promise((resolve, reject) => {
+      this.session.post(method, params, (error, result) => {
+        if (error) reject(error);
+        else resolve(result);
+      });
+    });
+  }
+
+  async writeArtifact(name, content) {
+    await fs.promises.mkdir(PROFILE_DIR, { recursive: true });
+    const filepath = path.join(PROFILE_DIR, name);
+    await fs.promises.writeFile(filepath, content);
+    const { size } = await fs.promises.stat(filepath);
+    return { name, bytes: size };
+  }
+
+  /**
+   * Inicia un perfil de CPU por muestreo
+   * @param {Object} options
+   * @param {string} options.label - Etiqueta para el nombre del archivo
+   * @param {number} options.samplingIntervalUs - Intervalo de muestreo en µs
+   */
+  async startCpuProfile(options = {}) {
+    if (this.cpuProfile) {
+      throw CommonErrors.Conflict('Ya hay un perfil de CPU en curso');
+    }
+    const { label = 'cpu', samplingIntervalUs = 1000 } = options;
+
+    // Se registra antes del primer await: un segundo inicio concurrente
+    // ve el perfil en curso y un stop espera a que termine de arrancar
+    const capture = { label, samplingIntervalUs, startedAt: new Date(), timer: null };
+    capture.ready = (async () => {
+      await this.post('Profiler.enable');
+      await this.post('Profiler.setSamplingInterval', { interval: samplingIntervalUs });
+      await this.post('Profiler.start');
+    })();
+    this.cpuProfile = capture;
+
+    try {
+      await capture.ready;
+    } catch (error) {
+      if (this.cpuProfile === capture) this.cpuProfile = null;
+      throw error;
+    }
+
+    if (this.cpuProfile === capture) {
+      capture.timer = setTimeout(() => {
+        if (this.cpuProfile !== capture) return;
+        this.stopCpuProfile().catch(error => console.error('Error stopping CPU profile:', error));
+      }, MAX_CPU_PROFILE_MS);
+      capture.timer.unref();
+    }
+    return this.status().cpuProfile;
+  }
+
+  /**
+   * Detiene el perfil de CPU en curso y lo guarda como .cpuprofile
+   * @returns {Object} { name, bytes, durationMs, label }
+   */
+  async stopCpuProfile() {
+    if (!this.cpuProfile) {
+      throw CommonErrors.Conflict('No hay un perfil de CPU en curso');
+    }
+    const { label, startedAt, timer, ready } = this.cpuProfile;
+    clearTimeout(timer);
+    this.cpuProfile = null;
+
+    await ready;
+    const { profile } = await this.post('Profiler.stop');
+    await this.post('Profiler.disable');
+
+    const artifact = await this.writeArtifact(artifactName(label, '.cpuprofile'), JSON.stringify(profile));
+    return { ...artifact, label, durationMs: Date.now() - startedAt.getTime() };
+  }
+
+  /**
+   * Heap snapshot completo. Bloquea el event loop mientras se genera
+   * (segundos con heaps grandes): tomarlo fuera de la fase medida.
+   * @returns {Object} { name, bytes, durationMs }
+   */
+  async takeHeapSnapshot(label = 'heap') {
+    await fs.promises.mkdir(PROFILE_DIR, { recursive: true });
+    const name = artifactName(label, '.heapsnapshot');
+    const filepath = path.join(PROFILE_DIR, name);
+    const stream = fs.createWriteStream(filepath);
+    const startedAt = Date.now();
+
+    const onChunk = (message) => stream.write(message.params.chunk);
+    await this.post('HeapProfiler.enable');
+    this.session.on('HeapProfiler.addHeapSnapshotChunk', onChunk);
+    try {
+      await this.post('HeapProfiler.takeHeapSnapshot', { reportProgress: false });
+    } finally {
+      this.session.removeListener('HeapProfiler.addHeapSnapshotChunk', onChunk);
+      await new Promise(resolve => stream.end(resolve));
+    }
+
+    const { size } = await fs.promises.stat(filepath);
+    return { name, bytes: size, durationMs: Date.now() - startedAt };
+  }
+
+  /**
+   * Comienza a registrar el retraso del event loop
+   * @param {Object} options
+   * @param {string} options.label - Etiqueta para el nombre del archivo
+   * @param {number} options.resolutionMs - Resolución del muestreo
+   */
+  startEventLoopMonitor(options = {}) {
+    if (this.eventLoop) {
+      throw CommonErrors.Conflict('Ya hay un monitor de event loop en curso');
+    }
+    const { label = 'event-loop', resolutionMs = 10 } = options;
+    const histogram = monitorEventLoopDelay({ resolution: resolutionMs });
+    histogram.enable();
+
+    this.eventLoop = { label, resolutionMs, startedAt: new Date(), histogram };
+    return this.status().eventLoop;
+  }
+
+  /**
+   * Detiene el monitor y guarda el histograma (ms) como JSON. Los valores
+   * incluyen la resolución: el retraso real es valor - resolutionMs.
+   * @returns {Object} { name, bytes, summary }
+   */
+  async stopEventLoopMonitor() {
+    if (!this.eventLoop) {
+      throw CommonErrors.Conflict('No hay un monitor de event loop en curso');
+    }
+    const { label, resolutionMs, startedAt, histogram } = this.eventLoop;
+    histogram.disable();
+    this.eventLoop = null;
+
+    const percentiles = {};
+    for (const [pct, value] of histogram.percentiles) {
+      percentiles[pct] = nsToMs(value);
+    }
+    const summary = {
+      resolutionMs,
+      startedAt,
+      durationMs: Date.now() - startedAt.getTime(),
+      count: histogram.count,
+      minMs: nsToMs(histogram.min),
+      maxMs: nsToMs(histogram.max),
+      meanMs: nsToMs(histogram.mean),
+      stddevMs: nsToMs(histogram.stddev),
+      p50Ms: nsToMs(histogram.percentile(50)),
+      p90Ms: nsToMs(histogram.percentile(90)),
+      p99Ms: nsToMs(histogram.percentile(99)),
+      exceeds: histogram.exceeds
+    };
+
+    const artifact = await this.writeArtifact(
+      artifactName(label, '.eventloop.json'),
+      JSON.stringify({ ...summary, percentiles }, null, 2)
+    );
+    return { ...artifact, summary };
+  }
+
+  status() {
+    return {
+      pid: process.pid,
+      workerIndex: process.env.WORKER_INDEX ?? null,
+      cpuProfile: this.cpuProfile && {
+        label: this.cpuProfile.label,
+        samplingIntervalUs: this.cpuProfile.samplingIntervalUs,
+        startedAt: this.cpuProfile.startedAt
+      },
+      eventLoop: this.eventLoop && {
+        label: this.eventLoop.label,
+        resolutionMs: this.eventLoop.resolutionMs,
+        startedAt: this.eventLoop.startedAt
+      }
+    };
+  }
+
+  /**
+   * Artefactos guardados, del más reciente al más antiguo
+   */
+  async listArtifacts() {
+    let names;
+    try {
+      names = await fs.promises.readdir(PROFILE_DIR);
+    } catch (error) {
+      if (error.code === 'ENOENT') return [];
+      throw error;
+    }
+
+    const artifacts = await Promise.all(names.map(async (name) => {
+      const stats = await fs.promises.stat(path.join(PROFILE_DIR, name));
+      return { name, bytes: stats.size, createdAt: stats.mtime };
+    }));
+    return artifacts.sort((a, b) => b.createdAt - a.createdAt);
+  }
+
+  /**
+   * Ruta absoluta de un artefacto, o null si el nombre no es válido o no existe
+   */
+  artifactPath(name) {
+    if (!ARTIFACT_NAME.test(name) || name.startsWith('.')) return null;
+    const filepath = path.join(PROFILE_DIR, name);
+    return fs.existsSync(filepath) ? filepath : null;
+  }
+
+  async deleteArtifact(name) {
+    const filepath = this.artifactPath(name);
+    if (!filepath) return false;
+    await fs.promises.unlink(filepath);
+    return true;
+  }
+}
+
+module.exports = new ProfilingService();
@@ -0,0 +1,300 @@
+const { getPrismaClient } = require('../database/connection');
+const { forEachPage } = require('../utils/batch');
+const prisma = getPrismaClient();
+
+/**
+ * Servicio de Agregados de Calificación
+ * Mantiene en el producto el promedio, el conteo, el histograma 1-5 y las
+ * compras verificadas de sus reseñas aprobadas. Cada alta, edición,
+ * moderación o baja de una reseña aplica solo su diferencia, de modo que
+ * el resumen es una lectura de una fila y el orden por rating usa índice.
+ */
+const HISTOGRAM_FIELDS = {
+  1: 'rating1Count',
+  2: 'rating2Count',
+  3: 'rating3Count',
+  4: 'rating4Count',
+  5: 'rating5Count'
+};
+
+// Campos del producto que forman el agregado
+const AGGREGATE_SELECT = {
+  id: true,
+  averageRating: true,
+  totalReviews: true,
+  ratingSum: true,
+  rating1Count: true,
+  rating2Count: true,
+  rating3Count: true,
+  rating4Count: true,
+  rating5Count: true,
+  verifiedReviews: true
+};
+
+/**
+ * Aporte de una reseña al agregado: solo cuentan las aprobadas
+ * @param {Object|null} review - { status, rating, isVerifiedPurchase }
+ * @returns {{rating: number, verified: boolean}|null}
+ */
+function reviewContribution(review) {
+  if (!review || review.status !== 'APPROVED' || !HISTOGRAM_FIELDS[review.rating]) {
+    return null;
+  }
+  return { rating: review.rating, verified: !!review.isVerifiedPurchase };
+}
+
+/**
+ * Diferencia entre el aporte anterior y el nuevo de una reseña.
+ * Función pura: devuelve solo los contadores que cambian.
+ *
+ * @param {Object|null} before - Reseña antes del cambio (null si es nueva)
+ * @param {Object|null} after - Reseña después del cambio (null si se elimina)
+ * @returns {Object} { campo: delta }
+ */
+function ratingDelta(before, after) {
+  const delta = {};
+  const add = (field, amount) => {
+    delta[field] = (delta[field] || 0) + amount;
+  };
+
+  for (const [contribution, sign] of [[reviewContribution(before), -1], [reviewContribution(after), 1]]) {
+    if (!contribution) continue;
+    add('totalReviews', sign);
+    add('ratingSum', sign * contribution.rating);
+    add(HISTOGRAM_FIELDS[contribution.rating], sign);
+    if (contribution.verified) add('verifiedReviews', sign);
+  }
+
+  for (const field of Object.keys(delta)) {
+    if (delta[field] === 0) delete delta[field];
+  }
+  return delta;
+}
+
+function averageFrom(sum, count) {
+  return count > 0 ? sum / count : 0;
+}
+
+/**
+ * Agregado completo a partir de filas agrupadas por rating y verificación
+ * @param {Array} groups - [{ rating, isVerifiedPurchase, count }]
+ */
+function aggregatesFromGroups(groups = []) {
+  const aggregates = {
+    totalReviews: 0,
+    ratingSum: 0,
+    rating1Count: 0,
+    rating2Count: 0,
+    rating3Count: 0,
+    rating4Count: 0,
+    rating5Count: 0,
+    verifiedReviews: 0
+  };
+
+  for (const group of groups) {
+    const field = HISTOGRAM_FIELDS[group.rating];
+    if (!field) continue;
+    aggregates.totalReviews += group.count;
+    aggregates.ratingSum += group.rating * group.count;
+    aggregates[field] += group.count;
+    if (group.isVerifiedPurchase) aggregates.verifiedReviews += group.count;
+  }
+
+  aggregates.averageRating = averageFrom(aggregates.ratingSum, aggregates.totalReviews);
+  return aggregates;
+}
+
+/**
+ * Resumen público (mismo formato que el endpoint de resumen)
+ * @param {Object} product - Fila del producto con AGGREGATE_SELECT
+ */
+function buildRatingSummary(product) {
+  const total = product.totalReviews;
+
+  return {
+    averageRating: total > 0 ? parseFloat(product.averageRating.toFixed(2)) : 0,
+    totalReviews: total,
+    verifiedPurchases: product.verifiedReviews,
+    distribution: [1, 2, 3, 4, 5].map(rating => {
+      const count = product[HISTOGRAM_FIELDS[rating]];
+      return {
+        rating,
+        count,
+        percentage: total > 0 ? (count / total * 100).toFixed(1) : 0
+      };
+    })
+  };
+}
+
+class RatingAggregateService {
+  /**
+   * Aplica al producto el cambio de una reseña.
+   * Los contadores se incrementan atómicamente y el promedio se recalcula
+   * con los valores resultantes dentro de la misma transacción (la fila
+   * queda bloqueada desde el primer update).
+   *
+   * @param {Object|null} before - Reseña antes del cambio
+   * @param {Object|null} after - Reseña después del cambio
+   * @param {Object} tx - Cliente de transacción (opcional)
+   * @returns {Object|null} Agregado actualizado o null si no hubo cambios
+   */
+  async applyReviewChange(before, after, tx = null) {
+    const productId = (after || before || {}).productId;
+    const delta = ratingDelta(before, after);
+    if (!productId || Object.keys(delta).length === 0) return null;
+
+    const apply = async (client) => {
+      const data = {};
+      for (const [field, amount] of Object.entries(delta)) {
+        data[field] = { increment: amount };
+      }
+
+      const counters = await client.product.update({
+        where: { id: productId },
+        data,
+        select: { ratingSum: true, totalReviews: true }
+      });
+
+      return client.product.update({
+        where: { id: productId },
+        data: { averageRating: averageFrom(counters.ratingSum, counters.totalReviews) },
+        select: AGGREGATE_SELECT
+      });
+    };
+
+    return tx ? apply(tx) : prisma.$transaction(apply);
+  }
+
+  /**
+   * Resumen de calificaciones de un producto (una lectura).
+   * Un producto inexistente devuelve el resumen vacío.
+   */
+  async getSummary(productId) {
+    const product = await prisma.product.findUnique({
+      where: { id: productId },
+      select: AGGREGATE_SELECT
+    });
+
+    return buildRatingSummary(product || aggregatesFromGroups());
+  }
+
+  /**
+   * Agregados calculados desde las reseñas aprobadas de un lote de productos
+   * @returns {Map<string, Object>} productId -> agregado
+   */
+  async loadRawAggregates(productIds) {
+    const rows = await prisma.review.groupBy({
+      by: ['productId', 'rating', 'isVerifiedPurchase'],
+      where: { productId: { in: productIds }, status: 'APPROVED' },
+      _count: { _all: true }
+    });
+
+    const groupsByProduct = new Map();
+    for (const row of rows) {
+      if (!groupsByProduct.has(row.productId)) groupsByProduct.set(row.productId, []);
+      groupsByProduct.get(row.productId).push({
+        rating: row.rating,
+        isVerifiedPurchase: row.isVerifiedPurchase,
+        count: row._count._all
+      });
+    }
+
+    return new Map(productIds.map(id => [id, aggregatesFromGroups(groupsByProduct.get(id))]));
+  }
+
+  /**
+   * Reconstruye los agregados de un lote de productos con una consulta
+   * agrupada y una sola transacción de escritura
+   */
+  async rebuildBatch(productIds) {
+    if (productIds.length === 0) return 0;
+
+    const aggregates = await this.loadRawAggregates(productIds);
+
+    await prisma.$transaction(productIds.map(id => prisma.product.update({
+      where: { id },
+      data: aggregates.get(id)
+    })));
+
+    return productIds.length;
+  }
+
+  /**
+   * Reconstruye los agregados de todos los productos desde las reseñas.
+   * Corrige cualquier deriva (cambios hechos fuera de la API, carreras
+   * entre moderaciones simultáneas).
+   *
+   * @param {Object} options
+   * @param {number} options.batchSize - Productos por lote
+   * @param {number} options.concurrency - Lotes simultáneos
+   * @returns {Object} { processed, batches, durationMs, productsPerSecond }
+   */
+  async rebuildAll(options = {}) {
+    const { batchSize = 500, concurrency = 4 } = options;
+    const startedAt = Date.now();
+
+    const result = await forEachPage(
+      (cursor) => prisma.product.findMany({
+        select: { id: true },
+        orderBy: { id: 'asc' },
+        take: batchSize,
+        ...(cursor && { cursor: { id: cursor }, skip: 1 })
+      }),
+      (products) => this.rebuildBatch(products.map(p => p.id)),
+      { concurrency }
+    );
+
+    const durationMs = Date.now() - startedAt;
+
+    return {
+      processed: result.rows,
+      batches: result.pages,
+      durationMs,
+      productsPerSecond: durationMs > 0
+        ? Math.round((result.rows / durationMs) * 1000)
+        : result.rows
+    };
+  }
+
+  /**
+   * Compara los agregados guardados con los calculados desde las reseñas
+   * @param {Object} options
+   * @param {Array<string>} options.productIds - Productos a verificar (opcional)
+   * @param {number} options.limit - Máximo de productos si no se indican ids
+   * @returns {Object} { checked, mismatches: [{ productId, field, stored, actual }] }
+   */
+  async verify(options = {}) {
+    const { productIds = null, limit = 1000 } = options;
+
+    const products = await prisma.product.findMany({
+      where: productIds ? { id: { in: productIds } } : {},
+      select: AGGREGATE_SELECT,
+      orderBy: { id: 'asc' },
+      ...(!productIds && { take: limit })
+    });
+
+    const raw = await this.loadRawAggregates(products.map(p => p.id));
+    const mismatches = [];
+
+    for (const product of products) {
+      const actual = raw.get(product.id);
+      for (const field of Object.keys(actual)) {
+        const matches = field === 'averageRating'
+          ? Math.abs(product[field] - actual[field]) < 1e-6
+          : product[field] === actual[field];
+        if (!matches) {
+          mismatches.push({
+            productId: product.id,
+            field,
+            stored: product[field],
+            actual: actual[field]
+          });
+        }
+      }
+    }
+
+    return { checked: products.length, mismatches };
+  }
+}
+
+module.exports = new RatingAggregateService();
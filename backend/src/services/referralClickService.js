@@ -0,0 +1,321 @@
+const { Prisma } = require('@prisma/client');
+const { getPrismaClient } = require('../database/connection');
+const { chunk } = require('../utils/batch');
+const { runOutsideRequest } = require('../utils/queryMetrics');
+const prisma = getPrismaClient();
+
+/**
+ * Servicio de Clics de Referidos
+ * Los clics en links de referido no se escriben de a uno: se validan
+ * contra un cache de código → referido y se acumulan en memoria por
+ * código y minuto. Cada FLUSH_MS los acumulados se vuelcan con tres
+ * sentencias por lote: upsert en referral_click_minutes, incremento de
+ * clickCount en referrals y de referralClicks en loyalty_points. Un
+ * código con miles de clics por segundo cuesta una fila actualizada por
+ * volcado en lugar de un UPDATE (y su lock) por clic.
+ *
+ * Cada proceso tiene su propio buffer; los incrementos son aditivos, así
+ * que varios workers vuelcan sin pisarse. Si un volcado falla, los
+ * acumulados vuelven al buffer para el siguiente.
+ *
+ * Con REFERRAL_CLICK_BUFFER=false cada clic se vuelca en su request (línea base).
+ */
+const ENABLED = process.env.REFERRAL_CLICK_BUFFER !== 'false';
+const FLUSH_MS = parseInt(process.env.REFERRAL_CLICK_FLUSH_MS || '2000');
+// Con más claves pendientes se vuelca sin esperar al timer
+const MAX_PENDING_KEYS = 5000;
+const FLUSH_CHUNK = 1000;
+const CODE_CACHE_SIZE = 50000;
+const CODE_TTL_MS = 10 * 60 * 1000;
+// Los códigos inexistentes se recuerdan menos tiempo
+const UNKNOWN_CODE_TTL_MS = 60 * 1000;
+const MINUTE_MS = 60 * 1000;
+
+class ReferralClickService {
+  constructor() {
+    // `${code}|${minute}` -> { code, loyaltyId, minute, clicks, lastClickAt }
+    this.pending = new Map();
+    // code -> { referral, expiresAt } (referral null si el código no existe)
+    this.codes = new Map();
+    this.lookups = new Map();
+    this.timer = null;
+    this.flushing = null;
+    this.resetStats();
+  }
+
+  resetStats() {
+    this.stats = {
+      since: new Date().toISOString(),
+      clicks: 0,
+      unknownCodes: 0,
+      codeCacheHits: 0,
+      codeLookups: 0,
+      flushes: 0,
+      flushedClicks: 0,
+      flushedRows: 0,
+      flushMs: 0,
+      failed: 0,
+      lastFlush: null
+    };
+  }
+
+  /**
+   * Referido de un código, desde cache o con una consulta por índice
+   * único. Las consultas concurrentes del mismo código se comparten.
+   * @param {string} code - Código de referido
+   * @returns {Promise<Object|null>} { id, referrerId, referrerLoyaltyId } o null
+   */
+  async resolve(code) {
+    const cached = this.codes.get(code);
+    if (cached && cached.expiresAt > Date.now()) {
+      // Reinserción para mantener el orden LRU
+      this.codes.delete(code);
+      this.codes.set(code, cached);
+      this.stats.codeCacheHits++;
+      return cached.referral;
+    }
+
+    if (!this.lookups.has(code)) {
+      this.stats.codeLookups++;
+      const lookup = prisma.referral.findUnique({
+        where: { referralCode: code },
+        select: { id: true, referrerId: true, referrerLoyaltyId: true }
+      }).then(referral => {
+        this.remember(code, referral);
+        return referral;
+      }).finally(() => {
+        this.lookups.delete(code);
+      });
+      this.lookups.set(code, lookup);
+    }
+    return this.lookups.get(code);
+  }
+
+  remember(code, referral) {
+    this.codes.delete(code);
+    this.codes.set(code, {
+      referral,
+      expiresAt: Date.now() + (referral ? CODE_TTL_MS : UNKNOWN_CODE_TTL_MS)
+    });
+    if (this.codes.size > CODE_CACHE_SIZE) {
+      this.codes.delete(this.codes.keys().next().value);
+    }
+  }
+
+  /**
+   * Registra un clic. No escribe en la base salvo con el buffer
+   * deshabilitado o si el buffer superó MAX_PENDING_KEYS.
+   * @param {string} code - Código de referido
+   * @returns {Promise<boolean>} false si el código no existe
+   */
+  async record(code) {
+    const referral = await this.resolve(code);
+    if (!referral) {
+      this.stats.unknownCodes++;
+      return false;
+    }
+
+    const now = new Date();
+    const minute = Math.floor(now.getTime() / MINUTE_MS) * MINUTE_MS;
+    const key = `${code}|${minute}`;
+    const entry = this.pending.get(key);
+    if (entry) {
+      entry.clicks++;
+      entry.lastClickAt = now;
+    } else {
+      this.pending.set(key, {
+        code,
+        loyaltyId: referral.referrerLoyaltyId,
+        minute: new Date(minute),
+        clicks: 1,
+        lastClickAt: now
+      });
+    }
+    this.stats.clicks++;
+
+    if (!ENABLED) {
+      await this.flush();
+    } else if (this.pending.size >= MAX_PENDING_KEYS) {
+      this.flush().catch(error => {
+        console.error('Error volcando clics de referidos:', error.message);
+      });
+    } else {
+      this.startTimer();
+    }
+    return true;
+  }
+
+  startTimer() {
+    if (this.timer) return;
+    this.timer = setTimeout(() => {
+      this.timer = null;
+      runOutsideRequest(() => this.flush()).catch(error => {
+        console.error('Error volcando clics de referidos:', error.message);
+      });
+    }, FLUSH_MS);
+    this.timer.unref();
+  }
+
+  /**
+   * Vuelca los clics acumulados. Un volcado en curso se espera y, si
+   * llegaron clics mientras tanto, se vuelca de nuevo.
+   * @returns {Promise<number>} Clics volcados
+   */
+  async flush() {
+    let flushed = 0;
+    while (this.flushing || this.pending.size > 0) {
+      if (this.flushing) {
+        flushed += await this.flushing.catch(() => 0);
+        continue;
+      }
+      const entries = [...this.pending.values()];
+      this.pending.clear();
+      this.flushing = this.writeAll(entries).finally(() => {
+        this.flushing = null;
+      });
+      flushed += await this.flushing;
+    }
+    if (this.pending.size > 0) this.startTimer();
+    return flushed;
+  }
+
+  /**
+   * Escribe por lotes; si un lote falla, ese y los siguientes vuelven al
+   * buffer (los ya confirmados no se repiten)
+   */
+  async writeAll(entries) {
+    const startedAt = Date.now();
+    const batches = chunk(entries, FLUSH_CHUNK);
+    let clicks = 0;
+
+    for (let i = 0; i < batches.length; i++) {
+      try {
+        clicks += await this.write(batches[i]);
+      } catch (error) {
+        this.stats.failed++;
+        this.requeue(batches.slice(i).flat());
+        throw error;
+      }
+    }
+
+    const durationMs = Date.now() - startedAt;
+    this.stats.flushes++;
+    this.stats.flushedClicks += clicks;
+    this.stats.flushedRows += entries.length;
+    this.stats.flushMs += durationMs;
+    this.stats.lastFlush = { clicks, rows: entries.length, durationMs, finishedAt: new Date().toISOString() };
+    return clicks;
+  }
+
+  /**
+   * Devuelve al buffer los acumulados de un volcado fallido
+   */
+  requeue(entries) {
+    for (const entry of entries) {
+      const key = `${entry.code}|${entry.minute.getTime()}`;
+      const current = this.pending.get(key);
+      if (current) {
+        current.clicks += entry.clicks;
+        if (entry.lastClickAt > current.lastClickAt) current.lastClickAt = entry.lastClickAt;
+      } else {
+        this.pending.set(key, entry);
+      }
+    }
+    this.startTimer();
+  }
+
+  /**
+   * Un lote en una transacción: minutos, referrals y loyalty_points
+   * @returns {Promise<number>} Clics del lote
+   */
+  async write(batch) {
+    // Totales por código y por referrer del lote
+    const byCode = new Map();
+    const byLoyalty = new Map();
+    let clicks = 0;
+    for (const entry of batch) {
+      const code = byCode.get(entry.code) || { clicks: 0, lastClickAt: entry.lastClickAt };
+      code.clicks += entry.clicks;
+      if (entry.lastClickAt > code.lastClickAt) code.lastClickAt = entry.lastClickAt;
+      byCode.set(entry.code, code);
+      byLoyalty.set(entry.loyaltyId, (byLoyalty.get(entry.loyaltyId) || 0) + entry.clicks);
+      clicks += entry.clicks;
+    }
+
+    const minutes = batch.map(e => Prisma.sql`(${e.code}, ${e.minute}::timestamp, ${e.clicks}::int)`);
+    const codes = [...byCode].map(([code, c]) => Prisma.sql`(${code}, ${c.clicks}::int, ${c.lastClickAt}::timestamp)`);
+    const loyalties = [...byLoyalty].map(([id, n]) => Prisma.sql`(${id}, ${n}::int)`);
+
+    await prisma.$transaction([
+      prisma.$executeRaw`
+        INSERT INTO "referral_click_minutes" ("referralCode", "minute", "clicks")
+        VALUES ${Prisma.join(minutes)}
+        ON CONFLICT ("referralCode", "minute")
+        DO UPDATE SET "clicks" = "referral_click_minutes"."clicks" + EXCLUDED."clicks"
+      `,
+      prisma.$executeRaw`
+        UPDATE "referrals" AS r SET
+          "clickCount" = r."clickCount" + u.clicks,
+          "lastClickAt" = GREATEST(COALESCE(r."lastClickAt", u.at), u.at),
+          "updatedAt" = NOW()
+        FROM (VALUES ${Prisma.join(codes)}) AS u(code, clicks, at)
+        WHERE r."referralCode" = u.code
+      `,
+      prisma.$executeRaw`
+        UPDATE "loyalty_points" AS l SET
+          "referralClicks" = l."referralClicks" + u.clicks,
+          "updatedAt" = NOW()
+        FROM (VALUES ${Prisma.join(loyalties)}) AS u(id, clicks)
+        WHERE l."id" = u.id
+      `
+    ]);
+    return clicks;
+  }
+
+  /**
+   * Clics por minuto de un código (incluye los aún no volcados)
+   * @param {string} code - Código de referido
+   * @param {Date} since - Desde qué minuto
+   * @returns {Promise<Array>} [{ minute, clicks }]
+   */
+  async getClicksByMinute(code, since) {
+    const rows = await prisma.referralClickMinute.findMany({
+      where: { referralCode: code, minute: { gte: since } },
+      orderBy: { minute: 'asc' },
+      select: { minute: true, clicks: true }
+    });
+    const byMinute = new Map(rows.map(row => [row.minute.getTime(), row.clicks]));
+    for (const entry of this.pending.values()) {
+      if (entry.code !== code || entry.minute < since) continue;
+      const key = entry.minute.getTime();
+      byMinute.set(key, (byMinute.get(key) || 0) + entry.clicks);
+    }
+    return [...byMinute]
+      .sort(([a], [b]) => a - b)
+      .map(([minute, clicks]) => ({ minute: new Date(minute), clicks }));
+  }
+
+  /**
+   * Vuelca lo pendiente y detiene el timer (apagado del servidor)
+   */
+  async close() {
+    clearTimeout(this.timer);
+    this.timer = null;
+    await this.flush();
+  }
+
+  snapshot() {
+    let pendingClicks = 0;
+    for (const entry of this.pending.values()) pendingClicks += entry.clicks;
+    return {
+      enabled: ENABLED,
+      flushIntervalMs: FLUSH_MS,
+      ...this.stats,
+      pendingKeys: this.pending.size,
+      pendingClicks,
+      cachedCodes: this.codes.size
+    };
+  }
+}
+
+module.exports = new ReferralClickService();
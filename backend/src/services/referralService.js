@@ -1,5 +1,6 @@
 const { getPrismaClient } = require('../database/connection');
 const gamificationService = require('./gamificationService');
+const referralClickService = require('./referralClickService');
 const crypto = require('crypto');
 
 /**
@@ -11,7 +12,13 @@ const crypto = require('crypto');
  * - Tracking de referidos
  * - Recompensas escalonadas
  * - Estadísticas
+ *
+ * Las estadísticas y el ranking salen de los contadores de loyalty_points
+ * (totalReferrals, completedReferrals, referralPoints, referralClicks),
+ * que se mantienen al registrar, convertir y volcar clics, en lugar de
+ * recontar las filas de referrals.
  */
+const RECENT_REFERRALS_LIMIT = 50;
 
 class ReferralService {
   constructor() {
@@ -63,17 +70,36 @@ class ReferralService {
    * Obtener estadísticas de referidos de un usuario
    */
   async getUserReferralStats(userId) {
-    const referrals = await this.prisma.referral.findMany({
-      where: { referrerId: userId },
-      orderBy: { createdAt: 'desc' }
-    });
+    const [loyalty, referrals] = await Promise.all([
+      this.prisma.loyaltyPoints.findUnique({
+        where: { userId },
+        select: { totalReferrals: true, completedReferrals: true, referralPoints: true, referralClicks: true }
+      }),
+      this.prisma.referral.findMany({
+        where: { referrerId: userId },
+        orderBy: { createdAt: 'desc' },
+        take: RECENT_REFERRALS_LIMIT,
+        select: {
+          referredEmail: true,
+          status: true,
+          referrerPoints: true,
+          registeredAt: true,
+          firstPurchaseAt: true,
+          firstPurchaseAmount: true
+        }
+      })
+    ]);
 
+    const registered = loyalty?.totalReferrals || 0;
+    // Pendientes: el código propio aún sin registro (a lo sumo unas pocas filas)
+    const pending = referrals.filter(r => r.status === 'PENDING').length;
     const stats = {
-      total: referrals.length,
-      registered: referrals.filter(r => r.status !== 'PENDING').length,
-      converted: referrals.filter(r => r.status === 'COMPLETED').length,
-      pending: referrals.filter(r => r.status === 'PENDING').length,
-      totalPointsEarned: referrals.reduce((sum, r) => sum + r.referrerPoints, 0),
+      total: registered + pending,
+      registered,
+      converted: loyalty?.completedReferrals || 0,
+      pending,
+      clicks: loyalty?.referralClicks || 0,
+      totalPointsEarned: loyalty?.referralPoints || 0,
       conversionRate: 0
     };
 
@@ -95,35 +121,36 @@ class ReferralService {
   }
 
   /**
-   * Registrar clic en link de referido
+   * Registrar clic en link de referido. Se acumula en memoria y se vuelca
+   * por código y minuto (ver referralClickService)
+   * @returns {Promise<boolean>} false si el código no existe
    */
   async trackReferralClick(referralCode) {
-    const referral = await this.prisma.referral.findUnique({
-      where: { referralCode }
-    });
-
-    if (!referral) {
-      return null;
-    }
-
-    await this.prisma.referral.update({
-      where: { referralCode },
-      data: {
-        clickCount: { increment: 1 },
-        lastClickAt: new Date()
-      }
-    });
+    return referralClickService.record(referralCode);
+  }
 
-    return referral;
+  /**
+   * Clics por minuto del código del usuario
+   * @param {string} userId - Usuario referrer
+   * @param {number} minutes - Ventana en minutos
+   */
+  async getReferralClicks(userId, minutes = 60) {
+    const { code } = await this.getOrCreateReferralCode(userId);
+    const since = new Date(Date.now() - minutes * 60 * 1000);
+    const byMinute = await referralClickService.getClicksByMinute(code, since);
+    return {
+      code,
+      total: byMinute.reduce((sum, m) => sum + m.clicks, 0),
+      byMinute
+    };
   }
 
   /**
    * Procesar registro de usuario referido
    */
   async processReferralSignup(referralCode, referredUserId, referredEmail) {
-    const referral = await this.prisma.referral.findUnique({
-      where: { referralCode }
-    });
+    // Mismo cache código → referrer que usan los clics
+    const referral = await referralClickService.resolve(referralCode);
 
     if (!referral) {
       throw new Error('Código de referido inválido');
@@ -180,12 +207,12 @@ class ReferralService {
       }
     });
 
-    // Actualizar contador de referidos del referrer
-    const loyalty = await gamificationService.getOrCreateLoyalty(referral.referrerId);
+    // Actualizar contadores de referidos del referrer
     await this.prisma.loyaltyPoints.update({
-      where: { id: loyalty.id },
+      where: { id: referral.referrerLoyaltyId },
       data: {
-        totalReferrals: { increment: 1 }
+        totalReferrals: { increment: 1 },
+        referralPoints: { increment: SIGNUP_POINTS }
       }
     });
 
@@ -200,6 +227,7 @@ class ReferralService {
    * Procesar primera compra de usuario referido
    */
   async processReferralFirstPurchase(referredUserId, orderTotal) {
+    // Índice (referredUserId, status)
     const referral = await this.prisma.referral.findFirst({
       where: {
         referredUserId,
@@ -269,13 +297,19 @@ class ReferralService {
       });
     }
 
-    // Verificar badges de referidos
-    const badgeService = require('./badgeService');
-    await badgeService.checkReferralBadges(referral.referrerId);
+    const bonusPoints = orderTotal >= 100 ? FIRST_PURCHASE_BONUS + 250 : FIRST_PURCHASE_BONUS;
+    await this.prisma.loyaltyPoints.update({
+      where: { id: referral.referrerLoyaltyId },
+      data: { referralPoints: { increment: bonusPoints } }
+    });
+
+    // Contador de referidos, badges y challenges del referrer
+    const gamificationEngine = require('./gamificationEngine');
+    await gamificationEngine.processAction(referral.referrerId, 'REFERRAL', { persisted: true });
 
     return {
       success: true,
-      bonusPoints: orderTotal >= 100 ? FIRST_PURCHASE_BONUS + 250 : FIRST_PURCHASE_BONUS
+      bonusPoints
     };
   }
 
@@ -283,40 +317,23 @@ class ReferralService {
    * Obtener top referrers (admin/leaderboard)
    */
   async getTopReferrers(limit = 10) {
-    const referrals = await this.prisma.referral.groupBy({
-      by: ['referrerId'],
-      _count: {
-        id: true
-      },
-      _sum: {
-        referrerPoints: true
-      },
-      where: {
-        status: { in: ['REGISTERED', 'FIRST_PURCHASE', 'COMPLETED'] }
-      },
-      orderBy: {
-        _count: {
-          id: 'desc'
-        }
-      },
-      take: limit
+    // Índice (totalReferrals, referralPoints) recorrido en orden inverso
+    const leaders = await this.prisma.loyaltyPoints.findMany({
+      where: { totalReferrals: { gt: 0 } },
+      orderBy: [{ totalReferrals: 'desc' }, { referralPoints: 'desc' }],
+      take: limit,
+      select: {
+        totalReferrals: true,
+        referralPoints: true,
+        user: { select: { id: true, name: true, email: true } }
+      }
     });
 
-    const results = [];
-    for (const ref of referrals) {
-      const user = await this.prisma.user.findUnique({
-        where: { id: ref.referrerId },
-        select: { id: true, name: true, email: true }
-      });
-
-      results.push({
-        user,
-        totalReferrals: ref._count.id,
-        totalPointsEarned: ref._sum.referrerPoints || 0
-      });
-    }
-
-    return results;
+    return leaders.map(leader => ({
+      user: leader.user,
+      totalReferrals: leader.totalReferrals,
+      totalPointsEarned: leader.referralPoints
+    }));
   }
 
   /**
@@ -2,15 +2,30 @@ const PDFDocument = require('pdfkit');
 const ExcelJS = require('exceljs');
 const fs = require('fs');
 const path = require('path');
+const { cpuPool } = require('../utils/workerPool');
 
 class ReportExportService {
   /**
-   * Exportar reporte de ventas a PDF
+   * Genera el archivo en el pool de worker threads: PDFKit y ExcelJS son
+   * CPU puro y un reporte grande bloquearía el event loop de todo el
+   * servidor. Los datos se pasan por JSON (los Decimal de Prisma quedan
+   * como string, que parseFloat acepta).
+   * @param {String} renderer - Método render* a ejecutar en el hilo
    * @param {Object} data - Datos del reporte
    * @param {String} filename - Nombre del archivo
    * @returns {String} Path del archivo generado
    */
-  async exportSalesReportToPDF(data, filename = 'sales-report.pdf') {
+  async renderInPool(renderer, data, filename) {
+    return cpuPool.run('report.render', [renderer, JSON.parse(JSON.stringify(data)), filename]);
+  }
+
+  /**
+   * Generar reporte de ventas a PDF (corre en un worker thread)
+   * @param {Object} data - Datos del reporte
+   * @param {String} filename - Nombre del archivo
+   * @returns {String} Path del archivo generado
+   */
+  async renderSalesReportPDF(data, filename = 'sales-report.pdf') {
     return new Promise((resolve, reject) => {
       try {
         const doc = new PDFDocument({ margin: 50, size: 'A4' });
@@ -101,12 +116,12 @@ class ReportExportService {
   }
 
   /**
-   * Exportar reporte de ventas a Excel
+   * Generar reporte de ventas a Excel (corre en un worker thread)
    * @param {Object} data - Datos del reporte
    * @param {String} filename - Nombre del archivo
    * @returns {String} Path del archivo generado
    */
-  async exportSalesReportToExcel(data, filename = 'sales-report.xlsx') {
+  async renderSalesReportExcel(data, filename = 'sales-report.xlsx') {
     const workbook = new ExcelJS.Workbook();
     workbook.creator = 'Carnes Premium';
     workbook.created = new Date();
@@ -216,12 +231,12 @@ class ReportExportService {
   }
 
   /**
-   * Exportar dashboard de analytics a PDF
+   * Generar dashboard de analytics a PDF (corre en un worker thread)
    * @param {Object} data - Datos del dashboard
    * @param {String} filename - Nombre del archivo
    * @returns {String} Path del archivo generado
    */
-  async exportDashboardToPDF(data, filename = 'dashboard-report.pdf') {
+  async renderDashboardPDF(data, filename = 'dashboard-report.pdf') {
     return new Promise((resolve, reject) => {
       try {
         const doc = new PDFDocument({ margin: 50, size: 'A4' });
@@ -316,12 +331,12 @@ class ReportExportService {
   }
 
   /**
-   * Exportar analytics de clientes a Excel
+   * Generar analytics de clientes a Excel (corre en un worker thread)
    * @param {Object} data - Datos de analytics de clientes
    * @param {String} filename - Nombre del archivo
    * @returns {String} Path del archivo generado
    */
-  async exportCustomerAnalyticsToExcel(data, filename = 'customer-analytics.xlsx') {
+  async renderCustomerAnalyticsExcel(data, filename = 'customer-analytics.xlsx') {
     const workbook = new ExcelJS.Workbook();
     workbook.creator = 'Carnes Premium';
     workbook.created = new Date();
@@ -403,12 +418,12 @@ class ReportExportService {
   }
 
   /**
-   * Exportar reporte de inventario a Excel
+   * Generar reporte de inventario a Excel (corre en un worker thread)
    * @param {Object} data - Datos del inventario
    * @param {String} filename - Nombre del archivo
    * @returns {String} Path del archivo generado
    */
-  async exportInventoryReportToExcel(data, filename = 'inventory-report.xlsx') {
+  async renderInventoryReportExcel(data, filename = 'inventory-report.xlsx') {
     const workbook = new ExcelJS.Workbook();
     workbook.creator = 'Carnes Premium';
     workbook.created = new Date();
@@ -532,6 +547,43 @@ class ReportExportService {
     return filepath;
   }
 
+  // ==================== EXPORTACIÓN (pool de workers) ====================
+
+  /**
+   * Exportar reporte de ventas a PDF
+   */
+  async exportSalesReportToPDF(data, filename = 'sales-report.pdf') {
+    return this.renderInPool('renderSalesReportPDF', data, filename);
+  }
+
+  /**
+   * Exportar reporte de ventas a Excel
+   */
+  async exportSalesReportToExcel(data, filename = 'sales-report.xlsx') {
+    return this.renderInPool('renderSalesReportExcel', data, filename);
+  }
+
+  /**
+   * Exportar dashboard de analytics a PDF
+   */
+  async exportDashboardToPDF(data, filename = 'dashboard-report.pdf') {
+    return this.renderInPool('renderDashboardPDF', data, filename);
+  }
+
+  /**
+   * Exportar analytics de clientes a Excel
+   */
+  async exportCustomerAnalyticsToExcel(data, filename = 'customer-analytics.xlsx') {
+    return this.renderInPool('renderCustomerAnalyticsExcel', data, filename);
+  }
+
+  /**
+   * Exportar reporte de inventario a Excel
+   */
+  async exportInventoryReportToExcel(data, filename = 'inventory-report.xlsx') {
+    return this.renderInPool('renderInventoryReportExcel', data, filename);
+  }
+
   /**
    * Traducir estado de orden
    * @param {String} status - Estado en inglés
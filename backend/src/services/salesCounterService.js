@@ -0,0 +1,265 @@
+const { getPrismaClient } = require('../database/connection');
+const prisma = getPrismaClient();
+
+/**
+ * Servicio de Contadores de Ventas
+ * Mantiene las unidades vendidas por producto (Product.totalSales) y por
+ * día (ProductDailySales) cuando un pedido se paga o se reembolsa. El
+ * ranking de más vendidos se lee de esos contadores con un índice, sin
+ * recorrer el historial de pedidos.
+ */
+const PAID_STATUSES = ['CAPTURED', 'PAID', 'COD_COLLECTED'];
+const REFUNDED_STATUSES = ['REFUNDED'];
+const TOP_TTL_MS = 60 * 1000;
+const DAY_MS = 24 * 60 * 60 * 1000;
+// Advisory lock de los contadores: syncOrder lo toma compartido y rebuildAll
+// exclusivo, así la reconstrucción no se intercala con pagos ni reembolsos
+const COUNTERS_LOCK_KEY = 0x53414c45; // 'SALE'
+// syncOrder puede esperar a que termine una reconstrucción en curso
+const SYNC_TIMEOUT_MS = parseInt(process.env.SALES_SYNC_TIMEOUT_MS || '30000');
+const REBUILD_TIMEOUT_MS = parseInt(process.env.SALES_REBUILD_TIMEOUT_MS || '600000');
+
+/**
+ * Medianoche UTC del día de una fecha
+ */
+function dayOf(date) {
+  const d = new Date(date);
+  return new Date(Date.UTC(d.getUTCFullYear(), d.getUTCMonth(), d.getUTCDate()));
+}
+
+/**
+ * Unidades e ingresos por producto de los items de un pedido
+ * @returns {Map<string, {units: number, revenue: number}>}
+ */
+function salesByProduct(items) {
+  const totals = new Map();
+  for (const item of items) {
+    const current = totals.get(item.productId) || { units: 0, revenue: 0 };
+    current.units += item.quantity;
+    current.revenue += item.total || 0;
+    totals.set(item.productId, current);
+  }
+  return totals;
+}
+
+class SalesCounterService {
+  constructor() {
+    // Ranking en memoria por (limit, days), invalidado en cada cambio
+    this.topCache = new Map();
+  }
+
+  invalidate() {
+    this.topCache.clear();
+  }
+
+  /**
+   * Sincroniza los contadores con el estado de pago de un pedido.
+   * Idempotente: salesCountedAt marca si el pedido ya está sumado, y el
+   * cambio se reclama con un update condicional para que dos webhooks
+   * simultáneos no cuenten dos veces.
+   *
+   * @param {string} orderId - Pedido a sincronizar
+   * @param {Object} tx - Cliente de transacción (opcional)
+   * @returns {string|null} 'COUNTED', 'UNCOUNTED' o null si no hubo cambios
+   */
+  async syncOrder(orderId, tx = null) {
+    const sync = async (client) => {
+      await client.$executeRaw`SELECT pg_advisory_xact_lock_shared(${COUNTERS_LOCK_KEY}::bigint)`;
+
+      const order = await client.order.findUnique({
+        where: { id: orderId },
+        select: { id: true, paymentStatus: true, salesCountedAt: true, createdAt: true }
+      });
+      if (!order) return null;
+
+      let sign = 0;
+      if (PAID_STATUSES.includes(order.paymentStatus) && !order.salesCountedAt) {
+        const claimed = await client.order.updateMany({
+          where: { id: orderId, salesCountedAt: null },
+          data: { salesCountedAt: new Date() }
+        });
+        sign = claimed.count === 1 ? 1 : 0;
+      } else if (REFUNDED_STATUSES.includes(order.paymentStatus) && order.salesCountedAt) {
+        const claimed = await client.order.updateMany({
+          where: { id: orderId, salesCountedAt: { not: null } },
+          data: { salesCountedAt: null }
+        });
+        sign = claimed.count === 1 ? -1 : 0;
+      }
+
+      if (sign === 0) return null;
+
+      const items = await client.orderItem.findMany({
+        where: { orderId },
+        select: { productId: true, quantity: true, total: true }
+      });
+      await this.applySales(client, salesByProduct(items), dayOf(order.createdAt), sign);
+
+      return sign > 0 ? 'COUNTED' : 'UNCOUNTED';
+    };
+
+    const result = tx
+      ? await sync(tx)
+      : await prisma.$transaction(sync, { maxWait: SYNC_TIMEOUT_MS, timeout: SYNC_TIMEOUT_MS });
+    if (result) this.invalidate();
+    return result;
+  }
+
+  /**
+   * Variante que no interrumpe el flujo de pago si falla: los contadores
+   * se pueden reconstruir con rebuildAll
+   */
+  async handlePaymentStatusChange(orderId) {
+    try {
+      return await this.syncOrder(orderId);
+    } catch (error) {
+      console.error('Error updating sales counters:', error);
+      // No lanzar error, es una operación secundaria
+      return null;
+    }
+  }
+
+  /**
+   * Aplica unidades (sign = 1) o las descuenta (sign = -1)
+   */
+  async applySales(client, totals, day, sign) {
+    for (const [productId, { units, revenue }] of totals) {
+      await client.product.update({
+        where: { id: productId },
+        data: { totalSales: { increment: sign * units } }
+      });
+
+      await client.productDailySales.upsert({
+        where: { productId_day: { productId, day } },
+        update: {
+          units: { increment: sign * units },
+          revenue: { increment: sign * revenue }
+        },
+        create: { productId, day, units: sign * units, revenue: sign * revenue }
+      });
+    }
+  }
+
+  /**
+   * Ranking de productos más vendidos
+   * @param {Object} options
+   * @param {number} options.limit - Tamaño del ranking
+   * @param {number|null} options.days - Ventana en días (null = histórico)
+   * @returns {Array<{productId: string, unitsSold: number}>}
+   */
+  async getTopSelling(options = {}) {
+    const { limit = 12, days = null } = options;
+    const key = `${limit}:${days || 'all'}`;
+    const cached = this.topCache.get(key);
+    if (cached && Date.now() - cached.loadedAt < TOP_TTL_MS) {
+      return cached.ranking;
+    }
+
+    const ranking = days
+      ? await this.loadWindowRanking(limit, days)
+      : (await prisma.product.findMany({
+        where: { isActive: true, totalSales: { gt: 0 } },
+        orderBy: [{ totalSales: 'desc' }, { id: 'asc' }],
+        take: limit,
+        select: { id: true, totalSales: true }
+      })).map(p => ({ productId: p.id, unitsSold: p.totalSales }));
+
+    this.topCache.set(key, { ranking, loadedAt: Date.now() });
+    return ranking;
+  }
+
+  /**
+   * Ranking sobre los contadores diarios de los últimos `days` días
+   */
+  async loadWindowRanking(limit, days) {
+    const since = dayOf(Date.now() - (days - 1) * DAY_MS);
+
+    // Se piden candidatos de más por si alguno está inactivo
+    const groups = await prisma.productDailySales.groupBy({
+      by: ['productId'],
+      where: { day: { gte: since } },
+      _sum: { units: true },
+      orderBy: { _sum: { units: 'desc' } },
+      take: limit * 2
+    });
+
+    const active = await prisma.product.findMany({
+      where: { id: { in: groups.map(g => g.productId) }, isActive: true },
+      select: { id: true }
+    });
+    const activeIds = new Set(active.map(p => p.id));
+
+    return groups
+      .filter(g => activeIds.has(g.productId) && g._sum.units > 0)
+      .slice(0, limit)
+      .map(g => ({ productId: g.productId, unitsSold: g._sum.units }));
+  }
+
+  /**
+   * Reconstruye los contadores desde los pedidos pagados.
+   * Todo ocurre en una transacción con el advisory lock exclusivo: marcar
+   * los pedidos sumados, agregar por producto y día en la base y reemplazar
+   * los contadores. syncOrder espera el lock, así ningún pago o reembolso
+   * queda fuera ni se cuenta dos veces, y las lecturas ven los contadores
+   * anteriores hasta el commit (nunca una tabla vacía).
+   *
+   * @returns {Object} { orders, products, days, durationMs, ordersPerSecond }
+   */
+  async rebuildAll() {
+    const startedAt = Date.now();
+
+    const result = await prisma.$transaction(async (tx) => {
+      await tx.$executeRaw`SELECT pg_advisory_xact_lock(${COUNTERS_LOCK_KEY}::bigint)`;
+      const stamp = new Date();
+
+      // Todos los pedidos pagados quedan marcados como sumados por esta corrida
+      const counted = await tx.order.updateMany({
+        where: { paymentStatus: { in: PAID_STATUSES } },
+        data: { salesCountedAt: stamp }
+      });
+      await tx.order.updateMany({
+        where: { paymentStatus: { notIn: PAID_STATUSES }, salesCountedAt: { not: null } },
+        data: { salesCountedAt: null }
+      });
+
+      await tx.productDailySales.deleteMany({});
+      const days = await tx.$executeRaw`
+        INSERT INTO "product_daily_sales" ("id", "productId", "day", "units", "revenue", "updatedAt")
+        SELECT md5(i."productId" || date_trunc('day', o."createdAt")::text),
+               i."productId", date_trunc('day', o."createdAt"),
+               SUM(i."quantity")::int, SUM(i."total"), NOW()
+        FROM "order_items" i
+        JOIN "orders" o ON o."id" = i."orderId"
+        WHERE o."salesCountedAt" IS NOT NULL
+        GROUP BY i."productId", date_trunc('day', o."createdAt")
+      `;
+
+      await tx.product.updateMany({ where: { totalSales: { not: 0 } }, data: { totalSales: 0 } });
+      const products = await tx.$executeRaw`
+        UPDATE "products" AS p SET "totalSales" = s.units
+        FROM (
+          SELECT "productId", SUM("units")::int AS units
+          FROM "product_daily_sales"
+          GROUP BY "productId"
+        ) AS s
+        WHERE p."id" = s."productId"
+      `;
+
+      return { orders: counted.count, products, days };
+    }, { maxWait: REBUILD_TIMEOUT_MS, timeout: REBUILD_TIMEOUT_MS });
+
+    // Rankings cacheados durante la reconstrucción
+    this.invalidate();
+    const durationMs = Date.now() - startedAt;
+
+    return {
+      ...result,
+      durationMs,
+      ordersPerSecond: durationMs > 0
+        ? Math.round((result.orders / durationMs) * 1000)
+        : result.orders
+    };
+  }
+}
+
+module.exports = new SalesCounterService();
@@ -1,233 +1,247 @@
-const { PrismaClient } = require('@prisma/client');
-const prisma = new PrismaClient();
+const { getPrismaClient } = require('../database/connection');
+const { forEachPage, mapWithConcurrency, chunk } = require('../utils/batch');
+const prisma = getPrismaClient();
 
 /**
  * Servicio de Segmentación de Usuarios
  * Clasifica usuarios en segmentos para personalización y marketing
  */
-class SegmentationService {
-  /**
-   * Calcula y actualiza el segmento de un usuario
-   */
-  async calculateUserSegment(userId) {
-    try {
-      // Obtener datos del usuario
-      const user = await prisma.user.findUnique({
-        where: { id: userId },
-        include: {
-          orders: {
-            include: {
-              items: true
-            }
-          },
-          loyalty: true,
-          membership: {
-            include: {
-              plan: true
-            }
-          }
-        }
-      });
+const DAY_MS = 24 * 60 * 60 * 1000;
+const STALE_AFTER_MS = 7 * DAY_MS;
 
-      if (!user) {
-        throw new Error('Usuario no encontrado');
+/**
+ * Construye el perfil de segmentación a partir de los agregados del usuario.
+ * Función pura: no toca la base de datos.
+ *
+ * @param {Object} aggregates - { totalOrders, totalSpent, firstOrderAt, lastOrderAt }
+ * @param {Object} context - { loyaltyPoints, membership: { status } | null }
+ * @param {Date} now - Fecha de referencia
+ * @returns {Object} Datos listos para guardar en UserSegment
+ */
+function buildSegmentProfile(aggregates, context = {}, now = new Date()) {
+  const totalOrders = aggregates.totalOrders || 0;
+  const totalSpent = aggregates.totalSpent || 0;
+  const firstOrderAt = aggregates.firstOrderAt ? new Date(aggregates.firstOrderAt) : null;
+  const lastOrderAt = aggregates.lastOrderAt ? new Date(aggregates.lastOrderAt) : null;
+  const membership = context.membership || null;
+  const loyaltyPoints = context.loyaltyPoints || 0;
+
+  const averageOrderValue = totalOrders > 0 ? totalSpent / totalOrders : 0;
+
+  // Días desde primera y última compra
+  const daysSinceLastPurchase = lastOrderAt
+    ? Math.floor((now - lastOrderAt) / DAY_MS)
+    : null;
+
+  const daysSinceFirstPurchase = firstOrderAt
+    ? Math.floor((now - firstOrderAt) / DAY_MS)
+    : 0;
+
+  // Hubo compras en los últimos 30 días si la última cae dentro de la ventana
+  const hasRecentOrders = lastOrderAt !== null && (now - lastOrderAt) <= 30 * DAY_MS;
+
+  // Calcular frecuencia de compra (compras por mes)
+  const monthsSinceFirst = daysSinceFirstPurchase > 0 ? daysSinceFirstPurchase / 30 : 1;
+  const purchaseFrequency = totalOrders / monthsSinceFirst;
+
+  // Calcular engagement score (0-100)
+  let engagementScore = 0;
+
+  // Factores de engagement
+  if (hasRecentOrders) engagementScore += 30;
+  if (purchaseFrequency > 1) engagementScore += 20;
+  if (loyaltyPoints > 0) engagementScore += 15;
+  if (membership) engagementScore += 25;
+  if (totalOrders > 5) engagementScore += 10;
+
+  engagementScore = Math.min(engagementScore, 100);
+
+  // Calcular riesgo de churn (0-100)
+  let churnRisk = 0;
+
+  if (daysSinceLastPurchase > 90) churnRisk += 40;
+  else if (daysSinceLastPurchase > 60) churnRisk += 25;
+  else if (daysSinceLastPurchase > 30) churnRisk += 10;
+
+  if (purchaseFrequency < 0.5) churnRisk += 20;
+  if (totalOrders < 2) churnRisk += 15;
+  if (!membership) churnRisk += 10;
+  if (!hasRecentOrders) churnRisk += 15;
+
+  churnRisk = Math.min(churnRisk, 100);
+
+  // Determinar segmentos
+  const segments = [];
+  let primarySegment = 'NEW_USER';
+
+  // Clasificación principal
+  if (totalOrders === 0) {
+    segments.push('NEW_USER');
+    primarySegment = 'NEW_USER';
+  } else if (totalOrders === 1) {
+    segments.push('FIRST_TIME_BUYER');
+    primarySegment = 'FIRST_TIME_BUYER';
+  } else {
+    // Usuario recurrente
+    if (purchaseFrequency >= 2) {
+      segments.push('FREQUENT_BUYER');
+      primarySegment = 'FREQUENT_BUYER';
+    }
+
+    if (totalSpent >= 1000 || averageOrderValue >= 200) {
+      segments.push('HIGH_VALUE');
+      if (!segments.includes('FREQUENT_BUYER')) {
+        primarySegment = 'HIGH_VALUE';
       }
+    }
 
-      // Calcular métricas
-      const now = new Date();
-      const thirtyDaysAgo = new Date(now.getTime() - 30 * 24 * 60 * 60 * 1000);
-      const ninetyDaysAgo = new Date(now.getTime() - 90 * 24 * 60 * 60 * 1000);
-
-      const orders = user.orders.filter(o => o.status === 'DELIVERED');
-      const recentOrders = orders.filter(o => o.createdAt >= thirtyDaysAgo);
-      
-      const totalOrders = orders.length;
-      const totalSpent = orders.reduce((sum, order) => sum + order.total, 0);
-      const averageOrderValue = totalOrders > 0 ? totalSpent / totalOrders : 0;
-
-      // Días desde primera y última compra
-      const sortedOrders = orders.sort((a, b) => b.createdAt - a.createdAt);
-      const lastOrder = sortedOrders[0];
-      const firstOrder = sortedOrders[sortedOrders.length - 1];
-
-      const daysSinceLastPurchase = lastOrder 
-        ? Math.floor((now - lastOrder.createdAt) / (1000 * 60 * 60 * 24))
-        : null;
-
-      const daysSinceFirstPurchase = firstOrder
-        ? Math.floor((now - firstOrder.createdAt) / (1000 * 60 * 60 * 24))
-        : 0;
-
-      // Calcular frecuencia de compra (compras por mes)
-      const monthsSinceFirst = daysSinceFirstPurchase > 0 ? daysSinceFirstPurchase / 30 : 1;
-      const purchaseFrequency = totalOrders / monthsSinceFirst;
-
-      // Obtener categorías preferidas
-      const categoryPurchases = {};
-      orders.forEach(order => {
-        order.items.forEach(item => {
-          // Aquí necesitaríamos join con Product, lo haremos después
-        });
-      });
+    if (membership && membership.status === 'ACTIVE') {
+      segments.push('PREMIUM');
+      primarySegment = 'PREMIUM';
+    }
 
-      // Calcular engagement score (0-100)
-      let engagementScore = 0;
-      
-      // Factores de engagement
-      if (recentOrders.length > 0) engagementScore += 30;
-      if (purchaseFrequency > 1) engagementScore += 20;
-      if (user.loyalty && user.loyalty.currentPoints > 0) engagementScore += 15;
-      if (user.membership) engagementScore += 25;
-      if (totalOrders > 5) engagementScore += 10;
-
-      engagementScore = Math.min(engagementScore, 100);
-
-      // Calcular riesgo de churn (0-100)
-      let churnRisk = 0;
-
-      if (daysSinceLastPurchase > 90) churnRisk += 40;
-      else if (daysSinceLastPurchase > 60) churnRisk += 25;
-      else if (daysSinceLastPurchase > 30) churnRisk += 10;
-
-      if (purchaseFrequency < 0.5) churnRisk += 20;
-      if (totalOrders < 2) churnRisk += 15;
-      if (!user.membership) churnRisk += 10;
-      if (recentOrders.length === 0) churnRisk += 15;
-
-      churnRisk = Math.min(churnRisk, 100);
-
-      // Determinar segmentos
-      const segments = [];
-      let primarySegment = 'NEW_USER';
-
-      // Clasificación principal
-      if (totalOrders === 0) {
-        segments.push('NEW_USER');
-        primarySegment = 'NEW_USER';
-      } else if (totalOrders === 1) {
-        segments.push('FIRST_TIME_BUYER');
-        primarySegment = 'FIRST_TIME_BUYER';
-      } else {
-        // Usuario recurrente
-        if (purchaseFrequency >= 2) {
-          segments.push('FREQUENT_BUYER');
-          primarySegment = 'FREQUENT_BUYER';
-        }
+    if (churnRisk > 60) {
+      segments.push('AT_RISK');
+      primarySegment = 'AT_RISK';
+    }
 
-        if (totalSpent >= 1000 || averageOrderValue >= 200) {
-          segments.push('HIGH_VALUE');
-          if (!segments.includes('FREQUENT_BUYER')) {
-            primarySegment = 'HIGH_VALUE';
-          }
-        }
+    if (daysSinceLastPurchase > 90) {
+      segments.push('INACTIVE');
+      if (primarySegment !== 'AT_RISK') {
+        primarySegment = 'INACTIVE';
+      }
+    }
 
-        if (user.membership && user.membership.status === 'ACTIVE') {
-          segments.push('PREMIUM');
-          primarySegment = 'PREMIUM';
-        }
+    if (averageOrderValue < 50) {
+      segments.push('BARGAIN_HUNTER');
+    }
 
-        if (churnRisk > 60) {
-          segments.push('AT_RISK');
-          primarySegment = 'AT_RISK';
-        }
+    if (totalOrders >= 10 && purchaseFrequency >= 1) {
+      segments.push('LOYAL');
+    }
+  }
 
-        if (daysSinceLastPurchase > 90) {
-          segments.push('INACTIVE');
-          if (primarySegment !== 'AT_RISK') {
-            primarySegment = 'INACTIVE';
-          }
-        }
+  // Predicción de próxima compra
+  let predictedNextPurchase = null;
+  if (purchaseFrequency > 0 && lastOrderAt) {
+    const avgDaysBetweenPurchases = 30 / purchaseFrequency;
+    const nextPurchaseDate = new Date(lastOrderAt);
+    nextPurchaseDate.setDate(nextPurchaseDate.getDate() + Math.ceil(avgDaysBetweenPurchases));
+    predictedNextPurchase = nextPurchaseDate;
+  }
 
-        if (averageOrderValue < 50) {
-          segments.push('BARGAIN_HUNTER');
-        }
+  // Acciones recomendadas
+  const recommendedActions = [];
 
-        if (totalOrders >= 10 && purchaseFrequency >= 1) {
-          segments.push('LOYAL');
-        }
-      }
+  if (churnRisk > 50) {
+    recommendedActions.push({
+      action: 'SEND_WINBACK_EMAIL',
+      priority: 'HIGH',
+      message: 'Enviar email de reactivación con cupón'
+    });
+  }
 
-      // Predicción de próxima compra
-      let predictedNextPurchase = null;
-      if (purchaseFrequency > 0 && daysSinceLastPurchase !== null) {
-        const avgDaysBetweenPurchases = 30 / purchaseFrequency;
-        const nextPurchaseDate = new Date(lastOrder.createdAt);
-        nextPurchaseDate.setDate(nextPurchaseDate.getDate() + Math.ceil(avgDaysBetweenPurchases));
-        predictedNextPurchase = nextPurchaseDate;
-      }
+  if (totalOrders === 1) {
+    recommendedActions.push({
+      action: 'SEND_SECOND_PURCHASE_INCENTIVE',
+      priority: 'MEDIUM',
+      message: 'Ofrecer descuento para segunda compra'
+    });
+  }
 
-      // Acciones recomendadas
-      const recommendedActions = [];
-      
-      if (churnRisk > 50) {
-        recommendedActions.push({
-          action: 'SEND_WINBACK_EMAIL',
-          priority: 'HIGH',
-          message: 'Enviar email de reactivación con cupón'
-        });
-      }
+  if (totalSpent >= 500 && !membership) {
+    recommendedActions.push({
+      action: 'OFFER_MEMBERSHIP',
+      priority: 'HIGH',
+      message: 'Recomendar membresía premium'
+    });
+  }
 
-      if (totalOrders === 1) {
-        recommendedActions.push({
-          action: 'SEND_SECOND_PURCHASE_INCENTIVE',
-          priority: 'MEDIUM',
-          message: 'Ofrecer descuento para segunda compra'
-        });
-      }
+  if (segments.includes('FREQUENT_BUYER') && averageOrderValue > 100) {
+    recommendedActions.push({
+      action: 'VIP_TREATMENT',
+      priority: 'MEDIUM',
+      message: 'Ofrecer beneficios VIP y acceso anticipado'
+    });
+  }
 
-      if (totalSpent >= 500 && !user.membership) {
-        recommendedActions.push({
-          action: 'OFFER_MEMBERSHIP',
-          priority: 'HIGH',
-          message: 'Recomendar membresía premium'
-        });
-      }
+  return {
+    segments: JSON.stringify(segments),
+    primarySegment,
+    engagementScore,
+    purchaseFrequency,
+    averageOrderValue,
+    lifetimeValue: totalSpent,
+    churnRisk,
+    daysSinceLastPurchase,
+    daysSinceFirstPurchase,
+    totalOrders,
+    totalSpent,
+    firstOrderAt,
+    lastOrderAt,
+    predictedNextPurchase,
+    recommendedActions: JSON.stringify(recommendedActions),
+    lastCalculated: now,
+    needsRecalculation: false
+  };
+}
+
+/**
+ * Servicio de Segmentación de Usuarios
+ * Clasifica usuarios en segmentos para personalización y marketing.
+ *
+ * Los segmentos se derivan de agregados por usuario (pedidos entregados,
+ * gasto, primera/última compra) guardados en UserSegment. Los agregados se
+ * actualizan incrementalmente cuando un pedido cambia de estado y se
+ * reconstruyen por lotes con rebuildAllSegments().
+ */
+class SegmentationService {
+  /**
+   * Calcula y actualiza el segmento de un usuario
+   * Agrega el historial en la base de datos en lugar de cargarlo completo
+   */
+  async calculateUserSegment(userId) {
+    try {
+      const [user, orderStats] = await Promise.all([
+        prisma.user.findUnique({
+          where: { id: userId },
+          select: {
+            id: true,
+            loyalty: { select: { currentPoints: true } },
+            membership: { select: { status: true } }
+          }
+        }),
+        prisma.order.aggregate({
+          where: { userId, status: 'DELIVERED' },
+          _count: { _all: true },
+          _sum: { total: true },
+          _min: { createdAt: true },
+          _max: { createdAt: true }
+        })
+      ]);
 
-      if (segments.includes('FREQUENT_BUYER') && averageOrderValue > 100) {
-        recommendedActions.push({
-          action: 'VIP_TREATMENT',
-          priority: 'MEDIUM',
-          message: 'Ofrecer beneficios VIP y acceso anticipado'
-        });
+      if (!user) {
+        throw new Error('Usuario no encontrado');
       }
 
+      const profile = buildSegmentProfile(
+        {
+          totalOrders: orderStats._count._all,
+          totalSpent: orderStats._sum.total || 0,
+          firstOrderAt: orderStats._min.createdAt,
+          lastOrderAt: orderStats._max.createdAt
+        },
+        {
+          loyaltyPoints: user.loyalty ? user.loyalty.currentPoints : 0,
+          membership: user.membership
+        }
+      );
+
       // Guardar o actualizar segmento
       const segment = await prisma.userSegment.upsert({
         where: { userId },
-        update: {
-          segments: JSON.stringify(segments),
-          primarySegment,
-          engagementScore,
-          purchaseFrequency,
-          averageOrderValue,
-          lifetimeValue: totalSpent,
-          churnRisk,
-          daysSinceLastPurchase,
-          daysSinceFirstPurchase,
-          totalOrders,
-          totalSpent,
-          predictedNextPurchase,
-          recommendedActions: JSON.stringify(recommendedActions),
-          lastCalculated: new Date(),
-          needsRecalculation: false
-        },
-        create: {
-          userId,
-          segments: JSON.stringify(segments),
-          primarySegment,
-          engagementScore,
-          purchaseFrequency,
-          averageOrderValue,
-          lifetimeValue: totalSpent,
-          churnRisk,
-          daysSinceLastPurchase,
-          daysSinceFirstPurchase,
-          totalOrders,
-          totalSpent,
-          predictedNextPurchase,
-          recommendedActions: JSON.stringify(recommendedActions),
-          needsRecalculation: false
-        }
+        update: profile,
+        create: { userId, ...profile }
       });
 
       return {
@@ -243,6 +257,216 @@ class SegmentationService {
     }
   }
 
+  /**
+   * Aplica el cambio de estado de un pedido a los agregados del usuario.
+   * Entrar en DELIVERED suma el pedido sin leer el historial; salir de
+   * DELIVERED (cancelación/reembolso) vuelve a agregar solo a ese usuario.
+   *
+   * @param {Object} order - { userId, total, createdAt }
+   * @param {string} previousStatus - Estado anterior del pedido
+   * @param {string} nextStatus - Estado nuevo del pedido
+   */
+  async handleOrderStatusChange(order, previousStatus, nextStatus) {
+    if (!order || previousStatus === nextStatus) return null;
+
+    try {
+      if (nextStatus === 'DELIVERED') {
+        return await this.recordDeliveredOrder(order);
+      }
+
+      if (previousStatus === 'DELIVERED') {
+        return await this.calculateUserSegment(order.userId);
+      }
+
+      return null;
+    } catch (error) {
+      console.error('Error updating segment aggregates:', error);
+      // No lanzar error, es una operación secundaria
+      return null;
+    }
+  }
+
+  /**
+   * Suma un pedido entregado a los agregados existentes del usuario
+   */
+  async recordDeliveredOrder(order) {
+    const { userId } = order;
+    const orderDate = new Date(order.createdAt || Date.now());
+
+    const [current, user] = await Promise.all([
+      prisma.userSegment.findUnique({
+        where: { userId },
+        select: {
+          totalOrders: true,
+          totalSpent: true,
+          firstOrderAt: true,
+          lastOrderAt: true,
+          needsRecalculation: true
+        }
+      }),
+      prisma.user.findUnique({
+        where: { id: userId },
+        select: {
+          loyalty: { select: { currentPoints: true } },
+          membership: { select: { status: true } }
+        }
+      })
+    ]);
+
+    if (!user) return null;
+
+    // Sin agregados previos confiables, agregar el historial una vez
+    if (!current || current.needsRecalculation) {
+      return await this.calculateUserSegment(userId);
+    }
+
+    const aggregates = {
+      totalOrders: current.totalOrders + 1,
+      totalSpent: current.totalSpent + (order.total || 0),
+      firstOrderAt: current.firstOrderAt && current.firstOrderAt < orderDate
+        ? current.firstOrderAt
+        : orderDate,
+      lastOrderAt: current.lastOrderAt && current.lastOrderAt > orderDate
+        ? current.lastOrderAt
+        : orderDate
+    };
+
+    const profile = buildSegmentProfile(aggregates, {
+      loyaltyPoints: user.loyalty ? user.loyalty.currentPoints : 0,
+      membership: user.membership
+    });
+
+    return await prisma.userSegment.update({
+      where: { userId },
+      data: profile
+    });
+  }
+
+  /**
+   * Reconstruye los agregados de todos los usuarios desde el historial de
+   * pedidos. Recorre usuarios por cursor y procesa varios lotes en paralelo,
+   * con una consulta agrupada por lote en lugar de una por usuario.
+   *
+   * @param {Object} options
+   * @param {number} options.batchSize - Usuarios por lote
+   * @param {number} options.concurrency - Lotes simultáneos
+   * @returns {Object} { processed, batches, durationMs, usersPerSecond }
+   */
+  async rebuildAllSegments(options = {}) {
+    const { batchSize = 1000, concurrency = 4 } = options;
+    const startedAt = Date.now();
+
+    const result = await forEachPage(
+      (cursor) => prisma.user.findMany({
+        select: { id: true },
+        orderBy: { id: 'asc' },
+        take: batchSize,
+        ...(cursor && { cursor: { id: cursor }, skip: 1 })
+      }),
+      (users) => this.rebuildSegmentBatch(users.map(u => u.id)),
+      { concurrency }
+    );
+
+    const durationMs = Date.now() - startedAt;
+
+    return {
+      processed: result.rows,
+      batches: result.pages,
+      durationMs,
+      usersPerSecond: durationMs > 0
+        ? Math.round((result.rows / durationMs) * 1000)
+        : result.rows
+    };
+  }
+
+  /**
+   * Carga en dos consultas los datos de contexto (puntos y membresía)
+   * de un lote de usuarios
+   */
+  async loadSegmentContext(userIds) {
+    const [loyalties, memberships] = await Promise.all([
+      prisma.loyaltyPoints.findMany({
+        where: { userId: { in: userIds } },
+        select: { userId: true, currentPoints: true }
+      }),
+      prisma.userMembership.findMany({
+        where: { userId: { in: userIds } },
+        select: { userId: true, status: true }
+      })
+    ]);
+
+    const pointsByUser = new Map(loyalties.map(l => [l.userId, l.currentPoints]));
+    const membershipByUser = new Map(memberships.map(m => [m.userId, m]));
+
+    return (userId) => ({
+      loyaltyPoints: pointsByUser.get(userId) || 0,
+      membership: membershipByUser.get(userId) || null
+    });
+  }
+
+  /**
+   * Reconstruye los agregados de un lote de usuarios con una consulta
+   * agrupada de pedidos y una sola transacción de escritura
+   */
+  async rebuildSegmentBatch(userIds, now = new Date()) {
+    if (userIds.length === 0) return 0;
+
+    const [orderStats, contextFor] = await Promise.all([
+      prisma.order.groupBy({
+        by: ['userId'],
+        where: { userId: { in: userIds }, status: 'DELIVERED' },
+        _count: { _all: true },
+        _sum: { total: true },
+        _min: { createdAt: true },
+        _max: { createdAt: true }
+      }),
+      this.loadSegmentContext(userIds)
+    ]);
+
+    const statsByUser = new Map(orderStats.map(s => [s.userId, s]));
+
+    const writes = userIds.map(userId => {
+      const stats = statsByUser.get(userId);
+      const profile = buildSegmentProfile(
+        {
+          totalOrders: stats ? stats._count._all : 0,
+          totalSpent: stats ? stats._sum.total || 0 : 0,
+          firstOrderAt: stats ? stats._min.createdAt : null,
+          lastOrderAt: stats ? stats._max.createdAt : null
+        },
+        contextFor(userId),
+        now
+      );
+
+      return prisma.userSegment.upsert({
+        where: { userId },
+        update: profile,
+        create: { userId, ...profile }
+      });
+    });
+
+    await prisma.$transaction(writes);
+    return userIds.length;
+  }
+
+  /**
+   * Recalcula scores dependientes del tiempo (recencia, churn) a partir de
+   * los agregados ya guardados, sin leer pedidos
+   */
+  async refreshSegmentBatch(segments, now = new Date()) {
+    if (segments.length === 0) return 0;
+
+    const contextFor = await this.loadSegmentContext(segments.map(s => s.userId));
+
+    const writes = segments.map(segment => prisma.userSegment.update({
+      where: { userId: segment.userId },
+      data: buildSegmentProfile(segment, contextFor(segment.userId), now)
+    }));
+
+    await prisma.$transaction(writes);
+    return segments.length;
+  }
+
   /**
    * Obtiene el segmento de un usuario
    */
@@ -339,44 +563,47 @@ class SegmentationService {
 
   /**
    * Obtiene estadísticas de segmentos
+   * Se resuelve con agregaciones sobre columnas indexadas
    */
   async getSegmentStats() {
     try {
-      const segments = await prisma.userSegment.findMany();
+      const [bySegment, averages, atRiskUsers, highValueUsers] = await Promise.all([
+        prisma.userSegment.groupBy({
+          by: ['primarySegment'],
+          _count: { _all: true }
+        }),
+        prisma.userSegment.aggregate({
+          _count: { _all: true },
+          _avg: {
+            engagementScore: true,
+            churnRisk: true,
+            lifetimeValue: true
+          }
+        }),
+        prisma.userSegment.count({ where: { churnRisk: { gt: 60 } } }),
+        prisma.userSegment.count({ where: { lifetimeValue: { gt: 500 } } })
+      ]);
+
+      const totalUsers = averages._count._all;
 
       const stats = {
-        totalUsers: segments.length,
+        totalUsers,
         byPrimarySegment: {},
         averageEngagement: 0,
         averageChurnRisk: 0,
         averageLifetimeValue: 0,
-        atRiskUsers: 0,
-        highValueUsers: 0
+        atRiskUsers,
+        highValueUsers
       };
 
-      let totalEngagement = 0;
-      let totalChurnRisk = 0;
-      let totalLTV = 0;
-
-      segments.forEach(segment => {
-        // Contar por segmento primario
-        stats.byPrimarySegment[segment.primarySegment] = 
-          (stats.byPrimarySegment[segment.primarySegment] || 0) + 1;
-
-        // Acumular para promedios
-        totalEngagement += segment.engagementScore;
-        totalChurnRisk += segment.churnRisk;
-        totalLTV += segment.lifetimeValue;
-
-        // Contar usuarios en riesgo y alto valor
-        if (segment.churnRisk > 60) stats.atRiskUsers++;
-        if (segment.lifetimeValue > 500) stats.highValueUsers++;
+      bySegment.forEach(row => {
+        stats.byPrimarySegment[row.primarySegment] = row._count._all;
       });
 
-      if (segments.length > 0) {
-        stats.averageEngagement = (totalEngagement / segments.length).toFixed(2);
-        stats.averageChurnRisk = (totalChurnRisk / segments.length).toFixed(2);
-        stats.averageLifetimeValue = (totalLTV / segments.length).toFixed(2);
+      if (totalUsers > 0) {
+        stats.averageEngagement = (averages._avg.engagementScore || 0).toFixed(2);
+        stats.averageChurnRisk = (averages._avg.churnRisk || 0).toFixed(2);
+        stats.averageLifetimeValue = (averages._avg.lifetimeValue || 0).toFixed(2);
       }
 
       // Calcular distribución porcentual
@@ -394,9 +621,14 @@ class SegmentationService {
   }
 
   /**
-   * Recalcula segmentos para usuarios que lo necesitan
+   * Recalcula segmentos para usuarios que lo necesitan.
+   * Los marcados con needsRecalculation se vuelven a agregar desde pedidos;
+   * los que solo están desactualizados se refrescan desde sus agregados.
+   * Ambos se procesan por lotes con concurrencia acotada.
    */
-  async recalculateStaleSegments(limit = 100) {
+  async recalculateStaleSegments(limit = 10000, options = {}) {
+    const { batchSize = 500, concurrency = 4 } = options;
+
     try {
       const staleSegments = await prisma.userSegment.findMany({
         where: {
@@ -404,23 +636,47 @@ class SegmentationService {
             { needsRecalculation: true },
             {
               lastCalculated: {
-                lt: new Date(Date.now() - 7 * 24 * 60 * 60 * 1000) // 7 días
+                lt: new Date(Date.now() - STALE_AFTER_MS)
               }
             }
           ]
         },
         take: limit,
-        select: { userId: true }
+        select: {
+          userId: true,
+          needsRecalculation: true,
+          totalOrders: true,
+          totalSpent: true,
+          firstOrderAt: true,
+          lastOrderAt: true
+        }
       });
 
-      const results = await Promise.allSettled(
-        staleSegments.map(s => this.calculateUserSegment(s.userId))
-      );
+      const toRebuild = staleSegments.filter(s => s.needsRecalculation).map(s => s.userId);
+      const toRefresh = staleSegments.filter(s => !s.needsRecalculation);
+
+      const tasks = [
+        ...chunk(toRebuild, batchSize).map(ids => () => this.rebuildSegmentBatch(ids)),
+        ...chunk(toRefresh, batchSize).map(rows => () => this.refreshSegmentBatch(rows))
+      ];
+
+      const results = await mapWithConcurrency(tasks, concurrency, async (task) => {
+        try {
+          return { processed: await task(), failed: 0 };
+        } catch (error) {
+          console.error('Error recalculating segment batch:', error);
+          return { processed: 0, failed: 1 };
+        }
+      });
+
+      const processed = results.reduce((sum, r) => sum + r.processed, 0);
 
       return {
-        processed: results.filter(r => r.status === 'fulfilled').length,
-        failed: results.filter(r => r.status === 'rejected').length,
-        total: staleSegments.length
+        processed,
+        failed: staleSegments.length - processed,
+        total: staleSegments.length,
+        rebuilt: toRebuild.length,
+        refreshed: toRefresh.length
       };
     } catch (error) {
       console.error('Error recalculating stale segments:', error);
@@ -1,4 +1,27 @@
+const crypto = require('crypto');
 const { getPrismaClient } = require('../database/connection');
+const { forEachPage } = require('../utils/batch');
+
+// Reintentos de una página cuando otra página consumió el stock asignado
+const MAX_PAGE_ATTEMPTS = 3;
+// Vigencia de la concesión de una corrida; se renueva al confirmar cada página
+const CYCLE_LEASE_MS = parseInt(process.env.SUBSCRIPTION_CYCLE_LEASE_MS || '300000');
+
+class InsufficientStockError extends Error {
+  constructor(variantId) {
+    super(`Stock insuficiente para la variante ${variantId}`);
+    this.name = 'InsufficientStockError';
+    this.variantId = variantId;
+  }
+}
+
+class CycleRunConflictError extends Error {
+  constructor(message) {
+    super(message);
+    this.name = 'CycleRunConflictError';
+    this.statusCode = 409;
+  }
+}
 
 /**
  * ===================================================
@@ -604,6 +627,485 @@ class SubscriptionService {
     }));
   }
   
+  // ==================== CICLO MASIVO DE ENTREGAS ====================
+
+  /**
+   * Generar entregas y órdenes del ciclo para todas las suscripciones vencidas.
+   * Recorre las suscripciones por páginas (keyset por id) y procesa cada página
+   * en una transacción: reserva de inventario agrupada por variante, órdenes,
+   * items, entregas y avance de nextDeliveryDate.
+   *
+   * El progreso se guarda en SubscriptionCycleRun. La corrida se reclama en la
+   * base de datos con una concesión (leaseOwner/leaseExpiresAt) que se renueva
+   * en cada página, de modo que dos workers del cluster nunca ejecutan la misma
+   * corrida. Una corrida FAILED, o RUNNING con la concesión vencida, se retoma
+   * desde el último cursor solo si se pide por runId o si tiene el mismo
+   * dueBefore; las pendientes con otra fecha se marcan ABANDONED.
+   *
+   * @param {Object} options
+   * @param {Date} options.dueBefore - Procesar suscripciones con entrega hasta esta fecha
+   * @param {number} options.pageSize - Suscripciones por página/transacción
+   * @param {number} options.concurrency - Páginas procesadas simultáneamente
+   * @param {string} options.runId - Retomar una corrida específica
+   */
+  async runDeliveryCycle({ dueBefore = new Date(), pageSize = 500, concurrency = 4, runId = null } = {}) {
+    const prisma = getPrismaClient();
+
+    // Atajo local; la exclusión entre procesos la da la concesión en la base
+    if (this.cycleInProgress) {
+      throw new CycleRunConflictError('Ya hay un ciclo de entregas en ejecución');
+    }
+    this.cycleInProgress = true;
+
+    try {
+      const leaseOwner = crypto.randomUUID();
+      let run = await this._claimCycleRun({ dueBefore: new Date(dueBefore), pageSize, concurrency, runId, leaseOwner });
+
+      if (run.status === 'COMPLETED') {
+        return this._formatCycleRun(run);
+      }
+
+      const startedAt = Date.now();
+      const cycleDueBefore = run.dueBefore;
+      const totals = { processed: 0, ordersCreated: 0, failed: 0 };
+      const ownedRun = { id: run.id, leaseOwner };
+
+      const fetchPage = (cursor) => prisma.subscription.findMany({
+        where: {
+          status: 'ACTIVE',
+          nextDeliveryDate: { lte: cycleDueBefore },
+          ...(cursor && { id: { gt: cursor } })
+        },
+        include: { plan: true },
+        orderBy: { id: 'asc' },
+        take: pageSize
+      });
+
+      try {
+        await forEachPage(fetchPage, async (subscriptions) => {
+          const result = await this._processCyclePage(subscriptions, run.id);
+          totals.processed += subscriptions.length;
+          totals.ordersCreated += result.ordersCreated;
+          totals.failed += result.failed;
+        }, {
+          concurrency,
+          cursor: run.cursor,
+          onPageDone: async (cursor) => {
+            // Avance del cursor y renovación de la concesión
+            const { count } = await prisma.subscriptionCycleRun.updateMany({
+              where: ownedRun,
+              data: { cursor, pages: { increment: 1 }, leaseExpiresAt: this._cycleLeaseExpiry() }
+            });
+            if (count === 0) {
+              throw new CycleRunConflictError('La corrida fue reclamada por otro proceso');
+            }
+          }
+        });
+      } catch (error) {
+        await prisma.subscriptionCycleRun.updateMany({
+          where: ownedRun,
+          data: {
+            status: 'FAILED',
+            lastError: error.message,
+            leaseOwner: null,
+            leaseExpiresAt: null,
+            ...this._cycleCounterIncrements(totals, Date.now() - startedAt)
+          }
+        });
+        throw error;
+      }
+
+      const { count } = await prisma.subscriptionCycleRun.updateMany({
+        where: ownedRun,
+        data: {
+          status: 'COMPLETED',
+          finishedAt: new Date(),
+          leaseOwner: null,
+          leaseExpiresAt: null,
+          ...this._cycleCounterIncrements(totals, Date.now() - startedAt)
+        }
+      });
+      if (count === 0) {
+        throw new CycleRunConflictError('La corrida fue reclamada por otro proceso');
+      }
+
+      run = await prisma.subscriptionCycleRun.findUnique({ where: { id: run.id } });
+      return this._formatCycleRun(run);
+    } finally {
+      this.cycleInProgress = false;
+    }
+  }
+
+  /**
+   * Reclamar (o crear) la corrida a ejecutar con una concesión propia.
+   * El reclamo es un updateMany condicional: si otro proceso tomó la corrida
+   * entre la lectura y la escritura, no afecta filas y se rechaza.
+   */
+  async _claimCycleRun({ dueBefore, pageSize, concurrency, runId, leaseOwner }) {
+    const prisma = getPrismaClient();
+    const now = new Date();
+    // FAILED o RUNNING sin un proceso vivo detrás
+    const claimable = {
+      OR: [
+        { status: 'FAILED' },
+        { status: 'RUNNING', leaseExpiresAt: null },
+        { status: 'RUNNING', leaseExpiresAt: { lt: now } }
+      ]
+    };
+
+    let run;
+    if (runId) {
+      run = await prisma.subscriptionCycleRun.findUnique({ where: { id: runId } });
+      if (!run) {
+        throw new Error('Corrida de ciclo no encontrada');
+      }
+      if (run.status === 'COMPLETED') {
+        return run;
+      }
+      if (run.status === 'ABANDONED') {
+        throw new CycleRunConflictError('La corrida de ciclo fue abandonada');
+      }
+    } else {
+      // Las corridas pendientes de otra fecha de corte no bloquean las siguientes
+      await prisma.subscriptionCycleRun.updateMany({
+        where: { ...claimable, NOT: { dueBefore } },
+        data: { status: 'ABANDONED', finishedAt: now, leaseOwner: null, leaseExpiresAt: null }
+      });
+      run = await prisma.subscriptionCycleRun.findFirst({
+        where: { status: { in: ['RUNNING', 'FAILED'] }, dueBefore },
+        orderBy: { startedAt: 'desc' }
+      });
+    }
+
+    try {
+      if (!run) {
+        return await prisma.subscriptionCycleRun.create({
+          data: {
+            dueBefore,
+            status: 'RUNNING',
+            pageSize,
+            concurrency,
+            leaseOwner,
+            leaseExpiresAt: this._cycleLeaseExpiry()
+          }
+        });
+      }
+
+      const { count } = await prisma.subscriptionCycleRun.updateMany({
+        where: { id: run.id, ...claimable },
+        data: {
+          status: 'RUNNING',
+          lastError: null,
+          pageSize,
+          concurrency,
+          leaseOwner,
+          leaseExpiresAt: this._cycleLeaseExpiry(),
+          resumedCount: { increment: 1 }
+        }
+      });
+      if (count === 0) {
+        throw new CycleRunConflictError('La corrida de ciclo está en ejecución en otro proceso');
+      }
+    } catch (error) {
+      // Índice único parcial: ya hay otra corrida RUNNING
+      if (error.code === 'P2002') {
+        throw new CycleRunConflictError('Ya hay un ciclo de entregas en ejecución');
+      }
+      throw error;
+    }
+
+    return prisma.subscriptionCycleRun.findUnique({ where: { id: run.id } });
+  }
+
+  _cycleLeaseExpiry() {
+    return new Date(Date.now() + CYCLE_LEASE_MS);
+  }
+
+  /**
+   * Obtener corridas recientes del ciclo de entregas
+   */
+  async getDeliveryCycleRuns(limit = 10) {
+    const prisma = getPrismaClient();
+
+    const runs = await prisma.subscriptionCycleRun.findMany({
+      orderBy: { startedAt: 'desc' },
+      take: limit
+    });
+
+    return runs.map(run => this._formatCycleRun(run));
+  }
+
+  /**
+   * Procesar una página del ciclo, reintentando si otra página
+   * consumió el stock entre la lectura y la reserva
+   */
+  async _processCyclePage(subscriptions, runId) {
+    for (let attempt = 1; ; attempt++) {
+      try {
+        return await this._commitCyclePage(subscriptions, runId);
+      } catch (error) {
+        if (!(error instanceof InsufficientStockError) || attempt >= MAX_PAGE_ATTEMPTS) {
+          throw error;
+        }
+      }
+    }
+  }
+
+  /**
+   * Transacción de una página: reserva de inventario, órdenes y entregas
+   */
+  async _commitCyclePage(subscriptions, runId) {
+    const prisma = getPrismaClient();
+    const now = new Date();
+
+    const subscriptionIds = subscriptions.map(sub => sub.id);
+    const boxes = new Map(subscriptions.map(sub => [
+      sub.id,
+      sub.plan.includedProducts ? JSON.parse(sub.plan.includedProducts) : []
+    ]));
+
+    // Variante por defecto para productos del plan sin variante explícita
+    const productsWithoutVariant = new Set();
+    for (const products of boxes.values()) {
+      for (const item of products) {
+        if (item.productId && !item.variantId) productsWithoutVariant.add(item.productId);
+      }
+    }
+
+    return await prisma.$transaction(async (tx) => {
+      const defaultVariants = productsWithoutVariant.size > 0
+        ? await tx.productVariant.findMany({
+          where: { productId: { in: [...productsWithoutVariant] }, isActive: true },
+          orderBy: [{ isDefault: 'desc' }, { createdAt: 'asc' }]
+        })
+        : [];
+      const defaultVariantByProduct = new Map();
+      for (const variant of defaultVariants) {
+        if (!defaultVariantByProduct.has(variant.productId)) {
+          defaultVariantByProduct.set(variant.productId, variant.id);
+        }
+      }
+
+      const lineItemsFor = (sub) => boxes.get(sub.id)
+        .filter(item => item.productId)
+        .map(item => ({
+          productId: item.productId,
+          variantId: item.variantId || defaultVariantByProduct.get(item.productId) || null,
+          quantity: item.quantity || 1
+        }));
+
+      const variantIds = new Set();
+      for (const sub of subscriptions) {
+        for (const item of lineItemsFor(sub)) {
+          if (item.variantId) variantIds.add(item.variantId);
+        }
+      }
+
+      const [variants, placeholders] = await Promise.all([
+        tx.productVariant.findMany({
+          where: { id: { in: [...variantIds] } },
+          select: { id: true, productId: true, stock: true, price: true, cost: true }
+        }),
+        tx.subscriptionDelivery.findMany({
+          where: { subscriptionId: { in: subscriptionIds }, status: 'SCHEDULED', orderId: null }
+        })
+      ]);
+
+      const variantById = new Map(variants.map(v => [v.id, v]));
+      const available = new Map(variants.map(v => [v.id, v.stock]));
+      const subscriptionById = new Map(subscriptions.map(sub => [sub.id, sub]));
+      const placeholderBySubscription = new Map();
+      for (const delivery of placeholders) {
+        const sub = subscriptionById.get(delivery.subscriptionId);
+        if (delivery.scheduledDate.getTime() === sub.nextDeliveryDate.getTime()) {
+          placeholderBySubscription.set(sub.id, delivery);
+        }
+      }
+
+      const reserved = new Map();
+      const orders = [];
+      const orderItems = [];
+      const deliveries = [];
+      const nextDeliveries = [];
+      const advances = new Map();
+      const replacedPlaceholderIds = [];
+      let failed = 0;
+
+      for (const sub of subscriptions) {
+        const items = lineItemsFor(sub);
+        const placeholder = placeholderBySubscription.get(sub.id);
+        const scheduledDate = sub.nextDeliveryDate;
+        const nextDate = this._calculateNextDelivery(scheduledDate, sub.frequency);
+
+        // Asignación en memoria: la caja completa o nada
+        const fits = items.every(item => !item.variantId ||
+          (available.get(item.variantId) || 0) >= item.quantity);
+
+        const deliveryBase = {
+          id: placeholder ? placeholder.id : crypto.randomUUID(),
+          subscriptionId: sub.id,
+          scheduledDate,
+          products: placeholder ? placeholder.products : JSON.stringify(boxes.get(sub.id)),
+          totalValue: placeholder ? placeholder.totalValue : sub.plan.estimatedValue,
+          createdAt: placeholder ? placeholder.createdAt : now
+        };
+        if (placeholder) replacedPlaceholderIds.push(placeholder.id);
+
+        if (!fits) {
+          failed++;
+          deliveries.push({
+            ...deliveryBase,
+            status: 'FAILED',
+            skipReason: 'Stock insuficiente para la caja',
+            metadata: JSON.stringify({ cycleRunId: runId })
+          });
+        } else {
+          const orderId = crypto.randomUUID();
+          let itemsTotal = 0;
+
+          for (const item of items) {
+            const variant = item.variantId ? variantById.get(item.variantId) : null;
+            const price = variant ? variant.price : 0;
+            itemsTotal += price * item.quantity;
+            orderItems.push({
+              orderId,
+              productId: item.productId,
+              variantId: item.variantId,
+              quantity: item.quantity,
+              price,
+              total: price * item.quantity
+            });
+
+            if (item.variantId) {
+              available.set(item.variantId, available.get(item.variantId) - item.quantity);
+              reserved.set(item.variantId, (reserved.get(item.variantId) || 0) + item.quantity);
+            }
+          }
+
+          const address = sub.shippingAddress || JSON.stringify({});
+          orders.push({
+            id: orderId,
+            orderNumber: `SUB-${scheduledDate.toISOString().slice(0, 10).replace(/-/g, '')}-${sub.id}`,
+            userId: sub.userId,
+            status: 'CONFIRMED',
+            paymentStatus: 'PENDING',
+            paymentMethod: sub.paymentMethod,
+            subtotal: sub.plan.price,
+            discount: Math.max(0, itemsTotal - sub.plan.price),
+            total: sub.plan.price,
+            billingAddress: address,
+            shippingAddress: address,
+            deliveryDate: scheduledDate,
+            notes: `Suscripción: ${sub.plan.name}`,
+            metadata: JSON.stringify({ subscriptionId: sub.id, deliveryId: deliveryBase.id, cycleRunId: runId })
+          });
+
+          deliveries.push({
+            ...deliveryBase,
+            orderId,
+            status: 'PREPARING',
+            metadata: JSON.stringify({ cycleRunId: runId })
+          });
+        }
+
+        // Siguiente entrega del ciclo
+        nextDeliveries.push({
+          subscriptionId: sub.id,
+          scheduledDate: nextDate,
+          status: 'SCHEDULED',
+          products: JSON.stringify(boxes.get(sub.id)),
+          totalValue: sub.plan.estimatedValue
+        });
+
+        // Agrupar avances por fecha para actualizar con updateMany
+        const key = `${scheduledDate.getTime()}|${nextDate.getTime()}|${placeholder ? 1 : 2}`;
+        if (!advances.has(key)) {
+          advances.set(key, { scheduledDate, nextDate, increment: placeholder ? 1 : 2, ids: [] });
+        }
+        advances.get(key).ids.push(sub.id);
+      }
+
+      // Avance condicionado a la fecha leída: si otro proceso ya generó esta
+      // entrega, la página se revierte completa antes de reservar inventario
+      for (const { scheduledDate, nextDate, increment, ids } of advances.values()) {
+        const { count } = await tx.subscription.updateMany({
+          where: { id: { in: ids }, nextDeliveryDate: scheduledDate },
+          data: {
+            nextDeliveryDate: nextDate,
+            totalDeliveries: { increment }
+          }
+        });
+        if (count !== ids.length) {
+          throw new CycleRunConflictError('Suscripciones de la página ya avanzadas por otro proceso');
+        }
+      }
+
+      // Reserva de inventario: una actualización por variante
+      const movements = [];
+      for (const [variantId, quantity] of reserved) {
+        const updated = await tx.productVariant.update({
+          where: { id: variantId },
+          data: { stock: { decrement: quantity } },
+          select: { stock: true }
+        });
+
+        if (updated.stock < 0) {
+          throw new InsufficientStockError(variantId);
+        }
+
+        const variant = variantById.get(variantId);
+        movements.push({
+          productId: variant.productId,
+          variantId,
+          type: 'OUT',
+          quantity: -quantity,
+          previousStock: updated.stock + quantity,
+          newStock: updated.stock,
+          referenceType: 'SUBSCRIPTION_CYCLE',
+          referenceId: runId,
+          unitCost: variant.cost,
+          totalCost: (variant.cost || 0) * quantity,
+          reason: 'Reserva de cajas de suscripción'
+        });
+      }
+
+      if (movements.length > 0) {
+        await tx.inventoryMovement.createMany({ data: movements });
+      }
+
+      if (orders.length > 0) {
+        await tx.order.createMany({ data: orders });
+        await tx.orderItem.createMany({ data: orderItems });
+      }
+
+      // Las entregas programadas se reemplazan conservando su id
+      if (replacedPlaceholderIds.length > 0) {
+        await tx.subscriptionDelivery.deleteMany({ where: { id: { in: replacedPlaceholderIds } } });
+      }
+      await tx.subscriptionDelivery.createMany({ data: [...deliveries, ...nextDeliveries] });
+
+      return { ordersCreated: orders.length, failed };
+    }, { timeout: 60000 });
+  }
+
+  _cycleCounterIncrements(totals, durationMs) {
+    return {
+      processed: { increment: totals.processed },
+      ordersCreated: { increment: totals.ordersCreated },
+      failed: { increment: totals.failed },
+      durationMs: { increment: durationMs }
+    };
+  }
+
+  _formatCycleRun(run) {
+    const seconds = run.durationMs / 1000;
+    return {
+      ...run,
+      subscriptionsPerSecond: seconds > 0 ? Math.round(run.processed / seconds) : 0,
+      ordersPerSecond: seconds > 0 ? Math.round(run.ordersCreated / seconds) : 0
+    };
+  }
+
   // ==================== ESTADÍSTICAS ====================
   
   /**
@@ -1,5 +1,5 @@
-const { PrismaClient } = require('@prisma/client');
-const prisma = new PrismaClient();
+const { getPrismaClient } = require('../database/connection');
+const prisma = getPrismaClient();
 
 /**
  * Servicio de Tracking de Eventos de Usuario
@@ -0,0 +1,280 @@
+const { Prisma } = require('@prisma/client');
+const { getPrismaClient } = require('../database/connection');
+const { chunk } = require('../utils/batch');
+const { responseCache } = require('../utils/responseCache');
+const socketService = require('./SocketService');
+const prisma = getPrismaClient();
+
+/**
+ * Servicio de Alertas de Precio de Wishlist
+ * Cuando cambia el precio de un producto se evalúan solo los items de
+ * wishlist de ese producto (índice productId → usuarios) en lugar de
+ * recorrer toda la tabla. Las alertas y notificaciones se insertan con
+ * createMany por lote de productos y el aviso por socket sale una vez
+ * por producto a todos sus usuarios.
+ */
+const PRODUCT_BATCH_SIZE = parseInt(process.env.WISHLIST_ALERT_BATCH_SIZE || '200');
+const PRICE_UPDATE_CHUNK = 5000;
+const MIN_CHANGE_PERCENT = 1;
+const HIGH_PRIORITY_PERCENT = 20;
+
+/**
+ * Precio vigente por producto: variante por defecto activa o la primera
+ * activa (mismo criterio que la wishlist)
+ * @returns {Map<string, number>}
+ */
+function currentPrices(variants) {
+  const prices = new Map();
+  for (const variant of variants) {
+    if (!prices.has(variant.productId) || variant.isDefault) {
+      prices.set(variant.productId, variant.price);
+    }
+  }
+  return prices;
+}
+
+/**
+ * Cambio porcentual que dispara alerta, o null si no corresponde:
+ * al menos 1% y, si hay precio objetivo, que se haya alcanzado
+ */
+function alertChange(item, currentPrice) {
+  const changePercent = (currentPrice - item.priceWhenAdded) / item.priceWhenAdded * 100;
+  if (Math.abs(changePercent) < MIN_CHANGE_PERCENT) return null;
+  if (item.targetPrice && currentPrice > item.targetPrice) return null;
+  return changePercent;
+}
+
+class WishlistAlertService {
+  constructor() {
+    // Productos con precio cambiado a la espera de evaluarse
+    this.pending = new Set();
+    this.running = null;
+    this.resetStats();
+  }
+
+  resetStats() {
+    this.stats = {
+      since: new Date().toISOString(),
+      runs: 0,
+      products: 0,
+      items: 0,
+      alerts: 0,
+      notifications: 0,
+      failed: 0,
+      lastRun: null
+    };
+  }
+
+  /**
+   * Encola productos para evaluar fuera del request. Los cambios que
+   * llegan mientras corre una evaluación se juntan en la siguiente.
+   * @param {Array<string>} productIds - Productos con precio cambiado
+   */
+  schedule(productIds) {
+    productIds.forEach(id => this.pending.add(id));
+    if (!this.running && this.pending.size > 0) {
+      this.running = this.drain().finally(() => {
+        this.running = null;
+      });
+    }
+  }
+
+  async drain() {
+    while (this.pending.size > 0) {
+      const productIds = [...this.pending];
+      this.pending.clear();
+      try {
+        await this.evaluateProducts(productIds);
+      } catch (error) {
+        this.stats.failed++;
+        console.error('Error evaluando alertas de precio de wishlist:', error);
+      }
+    }
+  }
+
+  /**
+   * Evalúa los items con alerta de precio de los productos dados
+   * @param {Array<string>} productIds - Productos a evaluar
+   * @returns {Object} { products, items, alerts, notifications, durationMs }
+   */
+  async evaluateProducts(productIds) {
+    const startedAt = Date.now();
+    const result = { products: productIds.length, items: 0, alerts: 0, notifications: 0 };
+
+    for (const batch of chunk(productIds, PRODUCT_BATCH_SIZE)) {
+      const batchResult = await this.evaluateBatch(batch);
+      result.items += batchResult.items;
+      result.alerts += batchResult.alerts;
+      result.notifications += batchResult.notifications;
+    }
+
+    result.durationMs = Date.now() - startedAt;
+    this.stats.runs++;
+    this.stats.products += result.products;
+    this.stats.items += result.items;
+    this.stats.alerts += result.alerts;
+    this.stats.notifications += result.notifications;
+    this.stats.lastRun = { ...result, finishedAt: new Date().toISOString() };
+    return result;
+  }
+
+  async evaluateBatch(productIds) {
+    const [variants, items] = await Promise.all([
+      prisma.productVariant.findMany({
+        where: { productId: { in: productIds }, isActive: true },
+        select: { productId: true, price: true, isDefault: true }
+      }),
+      prisma.wishlistItem.findMany({
+        where: {
+          productId: { in: productIds },
+          notifyPriceChange: true,
+          priceWhenAdded: { not: null }
+        },
+        select: { id: true, userId: true, productId: true, priceWhenAdded: true, targetPrice: true }
+      })
+    ]);
+
+    const prices = currentPrices(variants);
+    const triggered = [];
+    for (const item of items) {
+      // Sin variantes activas no hay precio vigente con qué comparar
+      if (!item.priceWhenAdded || !prices.has(item.productId)) continue;
+      const currentPrice = prices.get(item.productId);
+      const changePercent = alertChange(item, currentPrice);
+      if (changePercent !== null) triggered.push({ item, currentPrice, changePercent });
+    }
+
+    if (triggered.length === 0) {
+      return { items: items.length, alerts: 0, notifications: 0 };
+    }
+
+    const userIds = [...new Set(triggered.map(t => t.item.userId))];
+    const [products, mutedPreferences] = await Promise.all([
+      prisma.product.findMany({
+        where: { id: { in: [...new Set(triggered.map(t => t.item.productId))] } },
+        select: { id: true, name: true, slug: true, imageUrl: true }
+      }),
+      prisma.notificationPreference.findMany({
+        where: { userId: { in: userIds }, enableWishlist: false },
+        select: { userId: true }
+      })
+    ]);
+    const productsById = new Map(products.map(p => [p.id, p]));
+    const muted = new Set(mutedPreferences.map(p => p.userId));
+
+    const alerts = [];
+    const notifications = [];
+    // productId -> { currentPrice, itemIds, userIds }
+    const byProduct = new Map();
+
+    for (const { item, currentPrice, changePercent } of triggered) {
+      const product = productsById.get(item.productId);
+      alerts.push({
+        userId: item.userId,
+        productId: item.productId,
+        previousPrice: item.priceWhenAdded,
+        newPrice: currentPrice,
+        changePercent
+      });
+
+      if (!muted.has(item.userId)) {
+        notifications.push({
+          userId: item.userId,
+          type: 'WISHLIST',
+          title: changePercent < 0 ? '¡Bajó de precio!' : 'Cambio de precio',
+          message: `${product?.name || 'Un producto de tu wishlist'} ${changePercent < 0 ? 'bajó' : 'subió'} ${Math.abs(changePercent).toFixed(1)}% - Ahora: $${currentPrice.toFixed(2)}`,
+          data: JSON.stringify({
+            productId: item.productId,
+            previousPrice: item.priceWhenAdded,
+            currentPrice,
+            changePercent: changePercent.toFixed(2)
+          }),
+          actionUrl: product ? `/products/${product.slug}` : null,
+          actionType: 'VIEW_PRODUCT',
+          imageUrl: product?.imageUrl || null,
+          priority: Math.abs(changePercent) >= HIGH_PRIORITY_PERCENT ? 'HIGH' : 'NORMAL',
+          sentVia: 'IN_APP'
+        });
+      }
+
+      const entry = byProduct.get(item.productId) || { currentPrice, itemIds: [], userIds: [] };
+      entry.itemIds.push(item.id);
+      if (!muted.has(item.userId)) entry.userIds.push(item.userId);
+      byProduct.set(item.productId, entry);
+    }
+
+    // El precio guardado pasa al actual: la próxima alerta es sobre este precio
+    await prisma.$transaction([
+      prisma.wishlistPriceAlert.createMany({ data: alerts }),
+      prisma.notification.createMany({ data: notifications }),
+      ...[...byProduct].map(([, entry]) => prisma.wishlistItem.updateMany({
+        where: { id: { in: entry.itemIds } },
+        data: { priceWhenAdded: entry.currentPrice }
+      }))
+    ]);
+
+    for (const [productId, entry] of byProduct) {
+      const product = productsById.get(productId);
+      socketService.notifyWishlistPriceAlert(entry.userIds, {
+        productId,
+        name: product?.name,
+        slug: product?.slug,
+        currentPrice: entry.currentPrice
+      });
+    }
+
+    return { items: items.length, alerts: alerts.length, notifications: notifications.length };
+  }
+
+  /**
+   * Evalúa todos los productos que alguien sigue con alerta de precio
+   * (recorrido completo, para el job programado)
+   */
+  async evaluateAll() {
+    const rows = await prisma.wishlistItem.findMany({
+      where: { notifyPriceChange: true },
+      distinct: ['productId'],
+      select: { productId: true }
+    });
+    return this.evaluateProducts(rows.map(row => row.productId));
+  }
+
+  /**
+   * Actualiza precios de variantes en bloque (un UPDATE ... FROM VALUES
+   * por bloque) y encola la evaluación de los productos afectados
+   * @param {Array<{variantId: string, price: number}>} updates
+   * @returns {Object} { updated, products }
+   */
+  async updatePrices(updates) {
+    const productIds = new Set();
+    let updated = 0;
+
+    for (const batch of chunk(updates, PRICE_UPDATE_CHUNK)) {
+      const values = batch.map(u => Prisma.sql`(${u.variantId}, ${u.price}::double precision)`);
+      const rows = await prisma.$queryRaw`
+        UPDATE "product_variants" AS v
+        SET "price" = u.price, "updatedAt" = NOW()
+        FROM (VALUES ${Prisma.join(values)}) AS u(id, price)
+        WHERE v."id" = u.id
+        RETURNING v."productId"
+      `;
+      updated += rows.length;
+      rows.forEach(row => productIds.add(row.productId));
+    }
+
+    // El UPDATE crudo no pasa por el middleware de Prisma que invalida el catálogo
+    if (updated > 0) responseCache.invalidate(['products']);
+    this.schedule([...productIds]);
+    return { updated, products: productIds.size };
+  }
+
+  snapshot() {
+    return {
+      ...this.stats,
+      pending: this.pending.size,
+      running: Boolean(this.running)
+    };
+  }
+}
+
+module.exports = new WishlistAlertService();
@@ -0,0 +1,135 @@
+/**
+ * Utilidades para procesamiento por lotes
+ * Paginación por cursor y concurrencia acotada para jobs de backfill
+ */
+
+/**
+ * Divide un arreglo en bloques de tamaño fijo
+ * @param {Array} items - Elementos a dividir
+ * @param {number} size - Tamaño de cada bloque
+ * @returns {Array<Array>} Bloques
+ */
+function chunk(items, size) {
+  const chunks = [];
+  for (let i = 0; i < items.length; i += size) {
+    chunks.push(items.slice(i, i + size));
+  }
+  return chunks;
+}
+
+/**
+ * Ejecuta fn sobre cada elemento con un máximo de `concurrency` promesas activas
+ * @param {Array} items - Elementos a procesar
+ * @param {number} concurrency - Máximo de tareas simultáneas
+ * @param {Function} fn - Función async (item, index) => resultado
+ * @returns {Promise<Array>} Resultados en el mismo orden que items
+ */
+async function mapWithConcurrency(items, concurrency, fn) {
+  const results = new Array(items.length);
+  let nextIndex = 0;
+
+  const worker = async () => {
+    while (nextIndex < items.length) {
+      const index = nextIndex++;
+      results[index] = await fn(items[index], index);
+    }
+  };
+
+  const workers = Array.from(
+    { length: Math.max(1, Math.min(concurrency, items.length)) },
+    worker
+  );
+  await Promise.all(workers);
+
+  return results;
+}
+
+/**
+ * Recorre una tabla página a página (keyset) procesando varias páginas en paralelo.
+ * La lectura de páginas se serializa para que el cursor avance en orden;
+ * el procesamiento de cada página corre con concurrencia acotada.
+ *
+ * @param {Function} fetchPage - async (cursor) => Array de filas (vacío al terminar)
+ * @param {Function} handler - async (rows) => void
+ * @param {Object} options
+ * @param {number} options.concurrency - Páginas procesadas simultáneamente
+ * @param {*} options.cursor - Cursor inicial (para reanudar)
+ * @param {Function} options.getCursor - (row) => cursor de la fila
+ * @param {Function} options.onPageDone - async (cursor, rows) => void, en orden de lectura
+ * @returns {Promise<{pages: number, rows: number, cursor: *}>} cursor = última página confirmada
+ */
+async function forEachPage(fetchPage, handler, options = {}) {
+  const {
+    concurrency = 4,
+    cursor: initialCursor = null,
+    getCursor = (row) => row.id,
+    onPageDone = null
+  } = options;
+
+  let cursor = initialCursor;
+  let exhausted = false;
+  let readChain = Promise.resolve();
+  let doneChain = Promise.resolve();
+  let pages = 0;
+  let rows = 0;
+  let failure = null;
+  let committedCursor = initialCursor;
+
+  // Lectura serializada: cada llamada espera a la anterior
+  const nextPage = () => {
+    readChain = readChain.then(async () => {
+      if (exhausted) return null;
+      const page = await fetchPage(cursor);
+      if (!page || page.length === 0) {
+        exhausted = true;
+        return null;
+      }
+      cursor = getCursor(page[page.length - 1]);
+      return { rows: page, cursor };
+    });
+    return readChain;
+  };
+
+  const worker = async () => {
+    for (;;) {
+      const page = await nextPage();
+      if (!page) return;
+
+      // Registrar el turno antes de procesar para confirmar en orden de lectura
+      const previousDone = doneChain;
+      let markDone;
+      doneChain = new Promise((resolve) => { markDone = resolve; });
+
+      try {
+        await handler(page.rows);
+        await previousDone;
+        // Si una página anterior falló, no avanzar el cursor confirmado
+        if (failure) return;
+        pages++;
+        rows += page.rows.length;
+        committedCursor = page.cursor;
+        if (onPageDone) await onPageDone(page.cursor, page.rows);
+      } catch (error) {
+        failure = failure || error;
+        exhausted = true;
+        return;
+      } finally {
+        markDone();
+      }
+    }
+  };
+
+  await Promise.all(Array.from({ length: Math.max(1, concurrency) }, worker));
+
+  if (failure) {
+    throw failure;
+  }
+
+  return { pages, rows, cursor: committedCursor };
+}
+
+module.exports = {
+  chunk,
+  mapWithConcurrency,
+  forEachPage
+};
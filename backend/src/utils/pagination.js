@@ -0,0 +1,130 @@
+/**
+ * Paginación por cursor (keyset)
+ * Ordena por un campo estable + id como desempate y continúa desde el
+ * último elemento de la página anterior, sin OFFSET: la página 1000 cuesta
+ * lo mismo que la página 1.
+ *
+ * El cursor es opaco para el cliente (JSON en base64url):
+ *   { f: campo, v: valor, d: valor es fecha, id: id de la fila }
+ */
+
+/**
+ * Codifica el cursor a partir de la última fila de la página
+ * @param {Object} row - Última fila devuelta
+ * @param {string} sortField - Campo de ordenamiento
+ * @returns {string|null} Cursor opaco
+ */
+function encodeCursor(row, sortField) {
+  if (!row) return null;
+  const value = row[sortField];
+  const payload = {
+    f: sortField,
+    v: value instanceof Date ? value.toISOString() : value,
+    d: value instanceof Date,
+    id: row.id
+  };
+  return Buffer.from(JSON.stringify(payload)).toString('base64url');
+}
+
+/**
+ * Decodifica un cursor; devuelve null si es inválido o de otro ordenamiento
+ * @param {string} cursor - Cursor opaco recibido
+ * @param {string} sortField - Campo de ordenamiento esperado
+ * @returns {{value: *, id: string}|null}
+ */
+function decodeCursor(cursor, sortField) {
+  if (!cursor) return null;
+  try {
+    const payload = JSON.parse(Buffer.from(String(cursor), 'base64url').toString('utf8'));
+    if (payload.f !== sortField || typeof payload.id !== 'string') return null;
+    const value = payload.d ? new Date(payload.v) : payload.v;
+    if (payload.d && isNaN(value.getTime())) return null;
+    return { value, id: payload.id };
+  } catch (error) {
+    return null;
+  }
+}
+
+/**
+ * Lee los parámetros de paginación por cursor del query string
+ * - cursor: cursor opaco de la página anterior
+ * - count=false: omitir el conteo total (opt-in para listas grandes)
+ * @returns {{cursor: string|null, includeTotal: boolean}}
+ */
+function parseCursorQuery(query) {
+  return {
+    cursor: query.cursor || null,
+    includeTotal: query.count !== 'false'
+  };
+}
+
+/**
+ * Lee sortBy/sortOrder del query string y los valida contra los campos
+ * permitidos. Solo deben permitirse campos no nulos: el filtro keyset
+ * compara con el valor del cursor y no admite NULL.
+ * @param {Object} query - req.query
+ * @param {Array<string>} allowedFields - Campos ordenables
+ * @returns {{sortField: string, direction: string}|null} null si es inválido
+ */
+function parseSortQuery(query, allowedFields, defaultField = 'createdAt') {
+  const sortField = query.sortBy || defaultField;
+  const direction = query.sortOrder || 'desc';
+  if (!allowedFields.includes(sortField) || !['asc', 'desc'].includes(direction)) {
+    return null;
+  }
+  return { sortField, direction };
+}
+
+/**
+ * Construye orderBy y filtro keyset para findMany
+ * @param {Object} options
+ * @param {Object} options.where - Filtro base
+ * @param {string} options.sortField - Campo de ordenamiento (no nulo)
+ * @param {string} options.direction - 'asc' | 'desc'
+ * @param {{value: *, id: string}|null} options.cursor - Cursor decodificado
+ * @returns {{where: Object, orderBy: Array}}
+ */
+function keysetArgs({ where = {}, sortField = 'createdAt', direction = 'desc', cursor = null }) {
+  const orderBy = sortField === 'id'
+    ? [{ id: direction }]
+    : [{ [sortField]: direction }, { id: direction }];
+
+  if (!cursor) {
+    return { where, orderBy };
+  }
+
+  const op = direction === 'desc' ? 'lt' : 'gt';
+  const after = sortField === 'id'
+    ? { id: { [op]: cursor.id } }
+    : {
+      OR: [
+        { [sortField]: { [op]: cursor.value } },
+        { [sortField]: cursor.value, id: { [op]: cursor.id } }
+      ]
+    };
+
+  return { where: { AND: [where, after] }, orderBy };
+}
+
+/**
+ * Recorta la página (se pide limit + 1 para saber si hay siguiente)
+ * @returns {{items: Array, hasNext: boolean, nextCursor: string|null}}
+ */
+function buildPage(rows, limit, sortField) {
+  const hasNext = rows.length > limit;
+  const items = hasNext ? rows.slice(0, limit) : rows;
+  return {
+    items,
+    hasNext,
+    nextCursor: hasNext ? encodeCursor(items[items.length - 1], sortField) : null
+  };
+}
+
+module.exports = {
+  encodeCursor,
+  decodeCursor,
+  parseCursorQuery,
+  parseSortQuery,
+  keysetArgs,
+  buildPage
+};
@@ -0,0 +1,30 @@
+/**
+ * Hash y verificación de contraseñas en el pool de worker threads
+ * bcrypt es CPU puro (bcryptjs no tiene binding nativo): en el hilo
+ * principal cada login bloquea el event loop decenas de milisegundos.
+ */
+
+const { cpuPool } = require('./workerPool');
+
+/**
+ * @param {string} password - Contraseña en texto plano
+ * @param {number} rounds - Costo de bcrypt
+ * @returns {Promise<string>} Hash
+ */
+function hashPassword(password, rounds) {
+  return cpuPool.run('bcrypt.hash', [password, rounds]);
+}
+
+/**
+ * @param {string} password - Contraseña en texto plano
+ * @param {string} hash - Hash guardado
+ * @returns {Promise<boolean>} Si la contraseña coincide
+ */
+function verifyPassword(password, hash) {
+  return cpuPool.run('bcrypt.compare', [password, hash]);
+}
+
+module.exports = {
+  hashPassword,
+  verifyPassword
+};
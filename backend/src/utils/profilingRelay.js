@@ -0,0 +1,138 @@
+/**
+ * Profiling en un único worker del cluster
+ * Las capturas (perfil de CPU, monitor del event loop, heap snapshot) son
+ * del proceso que las toma. En cluster el balanceo reparte start y stop
+ * entre workers distintos, así que las rutas de administración ejecutan
+ * los comandos siempre en el mismo worker: PROFILING_WORKER (índice, por
+ * defecto 0) o el que se pida en la request. Un worker que recibe la
+ * request y no es el elegido la reenvía por IPC a través del primario.
+ *
+ * En un proceso único los comandos se ejecutan localmente.
+ */
+
+const cluster = require('cluster');
+const crypto = require('crypto');
+const { CustomError } = require('../middleware/errorHandler');
+
+const MESSAGE_TYPE = 'profiling';
+const DEFAULT_WORKER = parseInt(process.env.PROFILING_WORKER || '0');
+// Detener un perfil largo o tomar un heap snapshot tarda segundos
+const IPC_TIMEOUT_MS = parseInt(process.env.PROFILING_IPC_TIMEOUT_MS || '120000');
+const COMMANDS = new Set([
+  'status',
+  'startCpuProfile',
+  'stopCpuProfile',
+  'takeHeapSnapshot',
+  'startEventLoopMonitor',
+  'stopEventLoopMonitor'
+]);
+
+const pending = new Map(); // id -> { resolve, reject, timer }
+
+// Carga diferida: el primario atiende mensajes sin cargar el servicio
+function execute(command, args) {
+  if (!COMMANDS.has(command)) {
+    throw new CustomError(`Comando de profiling desconocido: ${command}`, 400, 'BAD_REQUEST');
+  }
+  const profilingService = require('../services/profilingService');
+  return profilingService[command](...args);
+}
+
+function serializeError(error) {
+  return {
+    message: error.message,
+    statusCode: error.isCustomError ? error.statusCode : 500,
+    code: error.isCustomError ? error.code : 'PROFILING_ERROR'
+  };
+}
+
+/**
+ * Ejecuta un comando de profiling en el worker de profiling
+ * @param {string} command - Método de profilingService
+ * @param {Array} args - Argumentos del método
+ * @param {number} workerIndex - Índice del worker (por defecto PROFILING_WORKER)
+ */
+async function runProfiling(command, args = [], workerIndex = DEFAULT_WORKER) {
+  if (!cluster.isWorker || String(workerIndex) === process.env.WORKER_INDEX) {
+    return execute(command, args);
+  }
+
+  return new Promise((resolve, reject) => {
+    const id = crypto.randomUUID();
+    const timer = setTimeout(() => {
+      pending.delete(id);
+      reject(new CustomError(`El worker ${workerIndex} no respondió (${command})`, 504, 'PROFILING_TIMEOUT'));
+    }, IPC_TIMEOUT_MS);
+    pending.set(id, { resolve, reject, timer });
+    process.send({ type: MESSAGE_TYPE, id, target: workerIndex, command, args });
+  });
+}
+
+// ==================== LADO WORKER ====================
+
+if (cluster.isWorker) {
+  process.on('message', async (message) => {
+    if (!message || message.type !== MESSAGE_TYPE) return;
+
+    // Respuesta a un comando que este worker reenvió
+    if (message.reply) {
+      const waiting = pending.get(message.id);
+      if (!waiting) return;
+      clearTimeout(waiting.timer);
+      pending.delete(message.id);
+      if (message.error) {
+        const { message: text, statusCode, code } = message.error;
+        waiting.reject(new CustomError(text, statusCode, code));
+      } else {
+        waiting.resolve(message.result);
+      }
+      return;
+    }
+
+    // Comando reenviado desde otro worker
+    const reply = { type: MESSAGE_TYPE, id: message.id, to: message.from, reply: true };
+    try {
+      reply.result = await execute(message.command, message.args);
+    } catch (error) {
+      reply.error = serializeError(error);
+    }
+    if (process.connected) process.send(reply);
+  });
+}
+
+// ==================== LADO PRIMARIO ====================
+
+/**
+ * Reenvía comandos al worker de destino y las respuestas al de origen.
+ * Devuelve false si el mensaje no es de profiling.
+ */
+function relayProfilingMessage(sender, message) {
+  if (!message || message.type !== MESSAGE_TYPE) return false;
+
+  if (message.reply) {
+    const origin = cluster.workers[message.to];
+    if (origin && origin.isConnected()) origin.send(message);
+    return true;
+  }
+
+  const target = Object.values(cluster.workers)
+    .find(worker => worker && worker.index === message.target && !worker.stopping && worker.isConnected());
+  if (!target) {
+    if (!sender.isConnected()) return true;
+    sender.send({
+      type: MESSAGE_TYPE,
+      id: message.id,
+      reply: true,
+      error: { message: `No hay un worker ${message.target} activo`, statusCode: 409, code: 'CONFLICT' }
+    });
+    return true;
+  }
+
+  target.send({ ...message, from: sender.id });
+  return true;
+}
+
+module.exports = {
+  runProfiling,
+  relayProfilingMessage
+};
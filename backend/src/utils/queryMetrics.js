@@ -0,0 +1,286 @@
+/**
+ * Instrumentación de queries de Prisma
+ * - Histogramas de latencia por modelo/acción
+ * - Atribución de queries a la ruta Express que las emitió
+ * - Conteo de queries por request (detección de N+1)
+ * - Ring buffer de queries lentas con la forma de sus argumentos
+ */
+
+const { AsyncLocalStorage } = require('async_hooks');
+
+// Límites superiores de los buckets en ms (el último es +Inf)
+const LATENCY_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000];
+// Buckets para cantidad de queries por request
+const QUERY_COUNT_BUCKETS = [0, 1, 2, 5, 10, 20, 50, 100, 250];
+
+const SLOW_QUERY_MS = parseInt(process.env.SLOW_QUERY_MS || '100');
+const SLOW_QUERY_BUFFER_SIZE = parseInt(process.env.SLOW_QUERY_BUFFER_SIZE || '100');
+// Repeticiones de la misma query en un request para marcarla como posible N+1
+const N_PLUS_ONE_THRESHOLD = parseInt(process.env.N_PLUS_ONE_THRESHOLD || '10');
+
+const requestContext = new AsyncLocalStorage();
+
+function createHistogram(buckets) {
+  return {
+    buckets,
+    counts: new Array(buckets.length + 1).fill(0),
+    count: 0,
+    sum: 0,
+    max: 0
+  };
+}
+
+function observe(histogram, value) {
+  let index = histogram.buckets.findIndex(bound => value <= bound);
+  if (index === -1) index = histogram.buckets.length;
+  histogram.counts[index]++;
+  histogram.count++;
+  histogram.sum += value;
+  if (value > histogram.max) histogram.max = value;
+}
+
+/**
+ * Percentil aproximado a partir de los buckets (límite superior del bucket,
+ * acotado por el máximo observado)
+ */
+function histogramPercentile(histogram, pct) {
+  if (histogram.count === 0) return 0;
+  const target = Math.ceil((pct / 100) * histogram.count);
+  let seen = 0;
+  for (let i = 0; i < histogram.counts.length; i++) {
+    seen += histogram.counts[i];
+    if (seen >= target) {
+      return i < histogram.buckets.length
+        ? Math.min(histogram.buckets[i], histogram.max)
+        : histogram.max;
+    }
+  }
+  return histogram.max;
+}
+
+function summarizeHistogram(histogram) {
+  return {
+    count: histogram.count,
+    sum: Math.round(histogram.sum * 100) / 100,
+    mean: histogram.count > 0 ? Math.round((histogram.sum / histogram.count) * 100) / 100 : 0,
+    max: Math.round(histogram.max * 100) / 100,
+    p50: Math.round(histogramPercentile(histogram, 50) * 100) / 100,
+    p95: Math.round(histogramPercentile(histogram, 95) * 100) / 100,
+    p99: Math.round(histogramPercentile(histogram, 99) * 100) / 100,
+    buckets: histogram.buckets.map((le, i) => ({ le, count: histogram.counts[i] }))
+      .concat([{ le: '+Inf', count: histogram.counts[histogram.buckets.length] }])
+  };
+}
+
+/**
+ * Forma de los argumentos de una query: estructura sin valores
+ * ({ where: { id: 'string' }, take: 'number' })
+ */
+function argsShape(value, depth = 0) {
+  if (value === null || value === undefined) return String(value);
+  if (depth > 4) return '…';
+  if (Array.isArray(value)) {
+    return value.length > 0 ? [argsShape(value[0], depth + 1), `x${value.length}`] : [];
+  }
+  if (value instanceof Date) return 'Date';
+  if (typeof value === 'object') {
+    const shape = {};
+    for (const key of Object.keys(value)) {
+      shape[key] = argsShape(value[key], depth + 1);
+    }
+    return shape;
+  }
+  return typeof value;
+}
+
+class QueryMetrics {
+  constructor() {
+    this.reset();
+  }
+
+  reset() {
+    this.startedAt = new Date();
+    this.queries = new Map();
+    this.routes = new Map();
+    this.slowQueries = new Array(SLOW_QUERY_BUFFER_SIZE);
+    this.slowQueriesNext = 0;
+    this.slowQueriesTotal = 0;
+    this.unattributedQueries = 0;
+  }
+
+  /**
+   * Registrar una query ejecutada
+   */
+  recordQuery(model, action, durationMs, args) {
+    const key = `${model || 'raw'}.${action}`;
+    if (!this.queries.has(key)) {
+      this.queries.set(key, createHistogram(LATENCY_BUCKETS_MS));
+    }
+    observe(this.queries.get(key), durationMs);
+
+    const context = requestContext.getStore();
+    if (context) {
+      context.queryCount++;
+      context.queryTimeMs += durationMs;
+      context.byQuery.set(key, (context.byQuery.get(key) || 0) + 1);
+    } else {
+      this.unattributedQueries++;
+    }
+
+    if (durationMs >= SLOW_QUERY_MS) {
+      this.slowQueries[this.slowQueriesNext] = {
+        query: key,
+        durationMs: Math.round(durationMs * 100) / 100,
+        route: context ? `${context.method} ${context.path}` : null,
+        argsShape: argsShape(args),
+        at: new Date().toISOString()
+      };
+      this.slowQueriesNext = (this.slowQueriesNext + 1) % SLOW_QUERY_BUFFER_SIZE;
+      this.slowQueriesTotal++;
+    }
+  }
+
+  /**
+   * Cerrar el contexto de un request y atribuirlo a su ruta
+   */
+  recordRequest(route, context, durationMs) {
+    if (!this.routes.has(route)) {
+      this.routes.set(route, {
+        requests: 0,
+        queries: 0,
+        queryTimeMs: 0,
+        maxQueriesPerRequest: 0,
+        latency: createHistogram(LATENCY_BUCKETS_MS),
+        queriesPerRequest: createHistogram(QUERY_COUNT_BUCKETS),
+        nPlusOneRequests: 0,
+        repeatedQueries: new Map()
+      });
+    }
+
+    const stats = this.routes.get(route);
+    stats.requests++;
+    stats.queries += context.queryCount;
+    stats.queryTimeMs += context.queryTimeMs;
+    stats.maxQueriesPerRequest = Math.max(stats.maxQueriesPerRequest, context.queryCount);
+    observe(stats.latency, durationMs);
+    observe(stats.queriesPerRequest, context.queryCount);
+
+    let suspicious = false;
+    for (const [query, count] of context.byQuery) {
+      if (count >= N_PLUS_ONE_THRESHOLD) {
+        suspicious = true;
+        stats.repeatedQueries.set(query, Math.max(stats.repeatedQueries.get(query) || 0, count));
+      }
+    }
+    if (suspicious) stats.nPlusOneRequests++;
+  }
+
+  /**
+   * Foto de las métricas para el endpoint de administración
+   */
+  snapshot() {
+    const queries = {};
+    for (const [key, histogram] of this.queries) {
+      queries[key] = summarizeHistogram(histogram);
+    }
+
+    const routes = {};
+    for (const [route, stats] of this.routes) {
+      routes[route] = {
+        requests: stats.requests,
+        queries: stats.queries,
+        queriesPerRequest: stats.requests > 0
+          ? Math.round((stats.queries / stats.requests) * 100) / 100
+          : 0,
+        maxQueriesPerRequest: stats.maxQueriesPerRequest,
+        queryTimeMs: Math.round(stats.queryTimeMs * 100) / 100,
+        latency: summarizeHistogram(stats.latency),
+        queryCountHistogram: summarizeHistogram(stats.queriesPerRequest),
+        nPlusOneRequests: stats.nPlusOneRequests,
+        repeatedQueries: Object.fromEntries(stats.repeatedQueries)
+      };
+    }
+
+    const slowQueries = this.slowQueries
+      .filter(Boolean)
+      .sort((a, b) => b.durationMs - a.durationMs);
+
+    return {
+      startedAt: this.startedAt.toISOString(),
+      config: {
+        slowQueryMs: SLOW_QUERY_MS,
+        slowQueryBufferSize: SLOW_QUERY_BUFFER_SIZE,
+        nPlusOneThreshold: N_PLUS_ONE_THRESHOLD
+      },
+      unattributedQueries: this.unattributedQueries,
+      slowQueriesTotal: this.slowQueriesTotal,
+      queries,
+      routes,
+      slowQueries
+    };
+  }
+}
+
+const queryMetrics = new QueryMetrics();
+
+/**
+ * Middleware $use de Prisma que mide cada query
+ */
+async function prismaQueryMiddleware(params, next) {
+  const start = process.hrtime.bigint();
+  try {
+    return await next(params);
+  } finally {
+    const durationMs = Number(process.hrtime.bigint() - start) / 1e6;
+    queryMetrics.recordQuery(params.model, params.action, durationMs, params.args);
+
+    if (process.env.NODE_ENV === 'development') {
+      console.log(`Query ${params.model}.${params.action} tomó ${durationMs.toFixed(1)}ms`);
+    }
+  }
+}
+
+/**
+ * Corre fn fuera del contexto del request actual: los timers y tareas de
+ * fondo que arranca un request no le atribuyen sus queries
+ */
+function runOutsideRequest(fn) {
+  return requestContext.exit(fn);
+}
+
+/**
+ * Middleware Express: abre un contexto por request para atribuir queries
+ */
+function requestMetricsMiddleware(req, res, next) {
+  const context = {
+    method: req.method,
+    path: req.originalUrl.split('?')[0],
+    queryCount: 0,
+    queryTimeMs: 0,
+    byQuery: new Map()
+  };
+  const start = process.hrtime.bigint();
+
+  res.on('finish', () => {
+    // Plantilla de la ruta (/api/products/:id) para agrupar requests
+    const route = req.route
+      ? `${req.method} ${req.baseUrl}${req.route.path === '/' ? '' : req.route.path}`
+      : `${req.method} (unmatched)`;
+    const durationMs = Number(process.hrtime.bigint() - start) / 1e6;
+    queryMetrics.recordRequest(route, context, durationMs);
+  });
+
+  requestContext.run(context, next);
+}
+
+module.exports = {
+  queryMetrics,
+  prismaQueryMiddleware,
+  requestMetricsMiddleware,
+  runOutsideRequest,
+  argsShape,
+  LATENCY_BUCKETS_MS,
+  createHistogram,
+  observe,
+  summarizeHistogram
+};
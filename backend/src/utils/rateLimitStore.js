@@ -0,0 +1,71 @@
+/**
+ * Store de rate limiting sobre el estado compartido, para que el límite
+ * por IP se cuente una sola vez entre todos los workers del cluster.
+ *
+ * Implementa la interfaz de express-rate-limit 7 (increment/decrement/
+ * resetKey) y la de callback que usa express-slow-down 1.x (incr).
+ * Si el estado compartido falla, deja pasar la request: el rate limit es
+ * una protección secundaria y no debe tumbar la API.
+ */
+
+const { getSharedState } = require('./sharedState');
+
+class SharedRateLimitStore {
+  /**
+   * @param {Object} options
+   * @param {string} options.prefix - Prefijo de las claves (uno por limitador)
+   * @param {number} options.windowMs - Ventana (express-slow-down no llama a init)
+   */
+  constructor(options = {}) {
+    this.prefix = options.prefix || 'rl:';
+    this.windowMs = options.windowMs || 60 * 1000;
+    // Las claves no viven en este proceso
+    this.localKeys = false;
+  }
+
+  init(options) {
+    this.windowMs = options.windowMs;
+  }
+
+  key(key) {
+    return `${this.prefix}${key}`;
+  }
+
+  async increment(key) {
+    try {
+      const { totalHits, resetTime } = await getSharedState().increment(this.key(key), this.windowMs);
+      return { totalHits, resetTime: new Date(resetTime) };
+    } catch (error) {
+      console.error('Error en rate limiting compartido:', error.message);
+      return { totalHits: 0, resetTime: new Date(Date.now() + this.windowMs) };
+    }
+  }
+
+  async decrement(key) {
+    try {
+      await getSharedState().decrement(this.key(key));
+    } catch (error) {
+      console.error('Error en rate limiting compartido:', error.message);
+    }
+  }
+
+  async resetKey(key) {
+    try {
+      await getSharedState().reset(this.key(key));
+    } catch (error) {
+      console.error('Error en rate limiting compartido:', error.message);
+    }
+  }
+
+  /**
+   * Interfaz de callback (express-slow-down 1.x)
+   */
+  incr(key, callback) {
+    this.increment(key).then(
+      ({ totalHits, resetTime }) => callback(null, totalHits, resetTime),
+      callback
+    );
+  }
+}
+
+module.exports = { SharedRateLimitStore };
@@ -0,0 +1,407 @@
+/**
+ * Cache de respuestas HTTP para endpoints públicos de catálogo
+ * - Guarda el cuerpo ya serializado y precomprimido (gzip y brotli) por
+ *   ruta y parámetros: un acierto no vuelve a serializar ni comprimir
+ * - ETag fuerte por codificación y 304 con If-None-Match
+ * - Cache-Control con max-age y stale-while-revalidate. Vencido el
+ *   max-age se sigue sirviendo la copia mientras una sola request la
+ *   regenera en segundo plano
+ * - Invalidación por etiquetas cuando se escribe el catálogo (middleware
+ *   de Prisma) y reenvío a los demás procesos por el transporte de relay.
+ *   Las escrituras dentro de $transaction invalidan recién tras el commit
+ *
+ * Con RESPONSE_CACHE=false las rutas responden como siempre (línea base).
+ */
+
+const crypto = require('crypto');
+const zlib = require('zlib');
+const { promisify } = require('util');
+const { AsyncLocalStorage } = require('async_hooks');
+
+const gzip = promisify(zlib.gzip);
+const brotliCompress = promisify(zlib.brotliCompress);
+
+const ENABLED = process.env.RESPONSE_CACHE !== 'false';
+const MAX_BYTES = parseInt(process.env.RESPONSE_CACHE_MAX_MB || '64') * 1024 * 1024;
+// Por debajo de esto comprimir no compensa (mismo umbral que compression())
+const MIN_COMPRESS_BYTES = 1024;
+const CHANNEL = 'response-cache';
+
+// Etiquetas a invalidar al confirmar la transacción en curso
+const transactionScope = new AsyncLocalStorage();
+
+const WRITE_ACTIONS = new Set(['create', 'createMany', 'update', 'updateMany', 'upsert', 'delete', 'deleteMany']);
+
+// Modelo -> etiquetas que invalida al escribirse. Los campos volátiles
+// (stock, contadores) cambian con cada pedido: un update que solo toca
+// esos campos no invalida y la copia se renueva al vencer su max-age.
+const MODEL_TAGS = {
+  Category: { tags: ['categories', 'products'] },
+  Product: { tags: ['products'], volatile: ['totalSales'] },
+  ProductVariant: { tags: ['products'], volatile: ['stock'] },
+  // El detalle de producto incluye sus últimas reviews
+  Review: { tags: ['products'], volatile: ['helpfulCount', 'notHelpfulCount'] },
+  MembershipPlan: { tags: ['membership-plans'] },
+  SubscriptionPlan: { tags: ['subscription-plans'], volatile: ['currentSubscribers'] }
+};
+
+/**
+ * Clave de la respuesta: ruta y query con los parámetros ordenados
+ */
+function cacheKey(req) {
+  const query = new URLSearchParams(req.originalUrl.split('?')[1] || '');
+  query.sort();
+  const search = query.toString();
+  return `${req.baseUrl}${req.path}${search ? `?${search}` : ''}`;
+}
+
+/**
+ * Codificación a servir según Accept-Encoding y las disponibles
+ * @returns {'br'|'gzip'|'identity'}
+ */
+function negotiateEncoding(header, bodies) {
+  const accepted = new Set();
+  for (const part of (header || '').split(',')) {
+    const [name, ...params] = part.trim().toLowerCase().split(';');
+    const q = params.find(p => p.trim().startsWith('q='));
+    if (name && (!q || parseFloat(q.trim().slice(2)) > 0)) accepted.add(name);
+  }
+  if (bodies.br && (accepted.has('br') || accepted.has('*'))) return 'br';
+  if (bodies.gzip && (accepted.has('gzip') || accepted.has('*'))) return 'gzip';
+  return 'identity';
+}
+
+/**
+ * If-None-Match coincide con alguna codificación de la entrada
+ * (comparación débil, como pide la RFC 9110 para If-None-Match)
+ */
+function matchesEtag(header, entry) {
+  if (!header) return false;
+  if (header.trim() === '*') return true;
+  const etags = new Set(Object.values(entry.etags));
+  return header.split(',').some(tag => etags.has(tag.trim().replace(/^W\//, '')));
+}
+
+/**
+ * Un update que solo toca campos volátiles del modelo no invalida
+ */
+function touchesOnlyVolatile(params, rule) {
+  if (!rule.volatile || !['update', 'updateMany'].includes(params.action)) return false;
+  const fields = Object.keys((params.args && params.args.data) || {});
+  return fields.length > 0 && fields.every(field => field === 'updatedAt' || rule.volatile.includes(field));
+}
+
+class ResponseCache {
+  constructor() {
+    this.entries = new Map(); // key -> entry (orden de inserción = LRU)
+    this.byTag = new Map(); // tag -> Set(key)
+    this.generations = new Map(); // tag -> número de invalidaciones
+    this.bytes = 0;
+    this.transport = null;
+    this.prismaMiddleware = this.prismaMiddleware.bind(this);
+    this.resetStats();
+  }
+
+  resetStats() {
+    this.stats = {
+      since: new Date().toISOString(),
+      hits: 0,
+      stale: 0,
+      misses: 0,
+      notModified: 0,
+      revalidations: 0,
+      invalidations: 0,
+      evictions: 0,
+      compressMs: 0,
+      bytesSent: 0,
+      // Lo que se habría enviado sin comprimir
+      bytesIdentity: 0,
+      encodings: { br: 0, gzip: 0, identity: 0 }
+    };
+  }
+
+  /**
+   * Middleware de ruta
+   * @param {Object} options
+   * @param {Array<string>} options.tags - Etiquetas que invalidan la respuesta
+   * @param {number} options.maxAge - Segundos de frescura (cliente y servidor)
+   * @param {number} options.staleWhileRevalidate - Segundos que se sirve vencida mientras se regenera
+   * @returns {Function} Middleware de Express
+   */
+  middleware({ tags, maxAge = 60, staleWhileRevalidate = 300 }) {
+    const policy = {
+      tags,
+      maxAgeMs: maxAge * 1000,
+      staleMs: staleWhileRevalidate * 1000,
+      cacheControl: `public, max-age=${maxAge}, stale-while-revalidate=${staleWhileRevalidate}`
+    };
+
+    return (req, res, next) => {
+      if (!ENABLED || (req.method !== 'GET' && req.method !== 'HEAD')) return next();
+
+      const key = cacheKey(req);
+      const entry = this.entries.get(key);
+      const age = entry ? Date.now() - entry.storedAt : Infinity;
+
+      if (entry && age < policy.maxAgeMs) {
+        this.stats.hits++;
+        this.touch(key, entry);
+        return this.send(req, res, entry, 'HIT');
+      }
+
+      if (entry && age < policy.maxAgeMs + policy.staleMs) {
+        this.stats.stale++;
+        this.send(req, res, entry, 'STALE');
+        if (entry.refreshing) return undefined;
+        // Esta misma request regenera la copia: el cliente ya tiene su respuesta
+        entry.refreshing = true;
+        this.stats.revalidations++;
+        this.capture(req, res, key, policy, entry);
+        return next();
+      }
+
+      this.stats.misses++;
+      this.capture(req, res, key, policy, null);
+      return next();
+    };
+  }
+
+  /**
+   * Intercepta res.json del handler para guardar la respuesta. En la
+   * regeneración (stale) la respuesta ya salió y solo se guarda.
+   */
+  capture(req, res, key, policy, staleEntry) {
+    const generation = this.generationOf(policy.tags);
+    const json = res.json.bind(res);
+    let status = null;
+
+    if (staleEntry) {
+      res.status = (code) => {
+        status = code;
+        return res;
+      };
+    }
+
+    res.json = (body) => {
+      const statusCode = staleEntry ? (status || 200) : res.statusCode;
+      if (statusCode !== 200) {
+        if (staleEntry) staleEntry.refreshing = false;
+        else json(body);
+        return res;
+      }
+
+      this.store(key, policy, generation, body)
+        .then(entry => {
+          if (!staleEntry) this.send(req, res, entry, 'MISS');
+        })
+        .catch(error => {
+          console.error('Error guardando respuesta en cache:', error.message);
+          if (!staleEntry) json(body);
+        })
+        .finally(() => {
+          if (staleEntry) staleEntry.refreshing = false;
+        });
+      return res;
+    };
+  }
+
+  /**
+   * Serializa, comprime y guarda. Si se invalidó alguna etiqueta mientras
+   * corría el handler, la respuesta se sirve pero no se guarda.
+   */
+  async store(key, policy, generation, body) {
+    const identity = Buffer.from(JSON.stringify(body));
+    const bodies = { identity };
+
+    if (identity.length >= MIN_COMPRESS_BYTES) {
+      const started = process.hrtime.bigint();
+      [bodies.gzip, bodies.br] = await Promise.all([
+        gzip(identity, { level: zlib.constants.Z_BEST_COMPRESSION }),
+        brotliCompress(identity, {
+          params: {
+            [zlib.constants.BROTLI_PARAM_QUALITY]: 9,
+            [zlib.constants.BROTLI_PARAM_SIZE_HINT]: identity.length
+          }
+        })
+      ]);
+      this.stats.compressMs += Number(process.hrtime.bigint() - started) / 1e6;
+    }
+
+    const hash = crypto.createHash('sha1').update(identity).digest('base64url').slice(0, 22);
+    const entry = {
+      key,
+      tags: policy.tags,
+      cacheControl: policy.cacheControl,
+      storedAt: Date.now(),
+      refreshing: false,
+      size: Object.values(bodies).reduce((sum, buffer) => sum + buffer.length, 0),
+      bodies,
+      etags: {
+        identity: `"${hash}"`,
+        ...(bodies.gzip && { gzip: `"${hash}-gz"` }),
+        ...(bodies.br && { br: `"${hash}-br"` })
+      }
+    };
+
+    if (generation === this.generationOf(policy.tags)) {
+      this.remove(key);
+      this.entries.set(key, entry);
+      this.bytes += entry.size;
+      for (const tag of entry.tags) {
+        if (!this.byTag.has(tag)) this.byTag.set(tag, new Set());
+        this.byTag.get(tag).add(key);
+      }
+      this.evict();
+    }
+    return entry;
+  }
+
+  send(req, res, entry, state) {
+    const encoding = negotiateEncoding(req.headers['accept-encoding'], entry.bodies);
+    res.setHeader('Cache-Control', entry.cacheControl);
+    res.setHeader('Vary', 'Accept-Encoding');
+    res.setHeader('ETag', entry.etags[encoding]);
+    res.setHeader('Age', Math.floor((Date.now() - entry.storedAt) / 1000));
+    res.setHeader('X-Cache', state);
+
+    if (matchesEtag(req.headers['if-none-match'], entry)) {
+      this.stats.notModified++;
+      return res.status(304).end();
+    }
+
+    const body = entry.bodies[encoding];
+    res.setHeader('Content-Type', 'application/json; charset=utf-8');
+    res.setHeader('Content-Length', body.length);
+    if (encoding !== 'identity') res.setHeader('Content-Encoding', encoding);
+    this.stats.encodings[encoding]++;
+    this.stats.bytesSent += body.length;
+    this.stats.bytesIdentity += entry.bodies.identity.length;
+    return res.status(200).end(req.method === 'HEAD' ? undefined : body);
+  }
+
+  touch(key, entry) {
+    this.entries.delete(key);
+    this.entries.set(key, entry);
+  }
+
+  remove(key) {
+    const entry = this.entries.get(key);
+    if (!entry) return;
+    this.entries.delete(key);
+    this.bytes -= entry.size;
+    for (const tag of entry.tags) {
+      const keys = this.byTag.get(tag);
+      if (keys) keys.delete(key);
+    }
+  }
+
+  evict() {
+    for (const key of this.entries.keys()) {
+      if (this.bytes <= MAX_BYTES) break;
+      this.remove(key);
+      this.stats.evictions++;
+    }
+  }
+
+  generationOf(tags) {
+    return tags.map(tag => this.generations.get(tag) || 0).join(':');
+  }
+
+  /**
+   * Descarta las respuestas con alguna de las etiquetas, en este proceso
+   * y (si hay transporte) en los demás
+   * @param {Array<string>} tags
+   * @param {boolean} publish - false al aplicar una invalidación recibida
+   */
+  invalidate(tags, publish = true) {
+    for (const tag of tags) {
+      this.generations.set(tag, (this.generations.get(tag) || 0) + 1);
+      for (const key of [...(this.byTag.get(tag) || [])]) this.remove(key);
+    }
+    this.stats.invalidations++;
+    if (publish && this.transport) this.transport.publish(CHANNEL, { tags });
+  }
+
+  /**
+   * Descarta todas las respuestas del catálogo
+   */
+  clear() {
+    this.invalidate([...new Set(Object.values(MODEL_TAGS).flatMap(rule => rule.tags))]);
+  }
+
+  /**
+   * Recibe las invalidaciones de los demás procesos (Redis o IPC)
+   * @param {Object} transport - Transporte de utils/socketRelayAdapter
+   */
+  attachTransport(transport) {
+    this.transport = transport;
+    transport.subscribe(CHANNEL, ({ tags }) => this.invalidate(tags, false));
+  }
+
+  /**
+   * Middleware de Prisma: invalida al escribir modelos del catálogo.
+   * Dentro de una transacción la escritura todavía no es visible: las
+   * etiquetas se acumulan y se invalidan al confirmarse (si no, una request
+   * intermedia volvería a cachear los datos anteriores al commit).
+   */
+  async prismaMiddleware(params, next) {
+    const result = await next(params);
+    const rule = MODEL_TAGS[params.model];
+    if (rule && WRITE_ACTIONS.has(params.action) && !touchesOnlyVolatile(params, rule)) {
+      const pending = transactionScope.getStore();
+      if (params.runInTransaction && pending && pending.open) {
+        rule.tags.forEach(tag => pending.tags.add(tag));
+      } else {
+        this.invalidate(rule.tags);
+      }
+    }
+    return result;
+  }
+
+  /**
+   * Envuelve $transaction del cliente para aplicar las invalidaciones
+   * acumuladas cuando la transacción (interactiva o en lote) se confirma.
+   * Si se revierte no hubo cambios y se descartan.
+   * @param {PrismaClient} client
+   */
+  deferTransactionInvalidations(client) {
+    const transaction = client.$transaction.bind(client);
+    client.$transaction = (...args) => {
+      const pending = { tags: new Set(), open: true };
+      return transactionScope.run(pending, () => transaction(...args)).then(
+        (result) => {
+          pending.open = false;
+          if (pending.tags.size > 0) this.invalidate([...pending.tags]);
+          return result;
+        },
+        (error) => {
+          pending.open = false;
+          throw error;
+        }
+      );
+    };
+  }
+
+  snapshot() {
+    const served = this.stats.hits + this.stats.stale + this.stats.misses;
+    return {
+      enabled: ENABLED,
+      entries: this.entries.size,
+      bytes: this.bytes,
+      maxBytes: MAX_BYTES,
+      ...this.stats,
+      compressMs: Math.round(this.stats.compressMs * 10) / 10,
+      hitRate: served ? Math.round((this.stats.hits + this.stats.stale) / served * 1000) / 10 : 0,
+      compressionRatio: this.stats.bytesIdentity
+        ? Math.round(this.stats.bytesSent / this.stats.bytesIdentity * 1000) / 1000
+        : null
+    };
+  }
+}
+
+const responseCache = new ResponseCache();
+
+module.exports = {
+  responseCache,
+  cacheResponse: (options) => responseCache.middleware(options)
+};
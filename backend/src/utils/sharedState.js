@@ -0,0 +1,222 @@
+/**
+ * Estado compartido entre procesos
+ * - Contadores con ventana (rate limiting)
+ * - Hashes de conteo (presencia de sockets)
+ *
+ * Con Redis conectado el estado vive en Redis. Sin Redis, en modo cluster
+ * lo guarda el proceso primario y los workers lo consultan por IPC; en un
+ * proceso único queda en memoria.
+ */
+
+const cluster = require('cluster');
+const crypto = require('crypto');
+const RedisService = require('../services/RedisService');
+
+const MESSAGE_TYPE = 'shared-state';
+const IPC_TIMEOUT_MS = parseInt(process.env.SHARED_STATE_TIMEOUT_MS || '2000');
+const SWEEP_INTERVAL_MS = 60 * 1000;
+
+class MemoryState {
+  constructor() {
+    this.counters = new Map(); // key -> { hits, resetTime }
+    this.hashes = new Map(); // hash -> Map(field -> count)
+
+    // Las ventanas vencidas se limpian periódicamente
+    this.sweeper = setInterval(() => this.sweep(), SWEEP_INTERVAL_MS);
+    this.sweeper.unref();
+  }
+
+  sweep() {
+    const now = Date.now();
+    for (const [key, entry] of this.counters) {
+      if (entry.resetTime <= now) this.counters.delete(key);
+    }
+  }
+
+  increment(key, windowMs) {
+    const now = Date.now();
+    let entry = this.counters.get(key);
+    if (!entry || entry.resetTime <= now) {
+      entry = { hits: 0, resetTime: now + windowMs };
+      this.counters.set(key, entry);
+    }
+    entry.hits++;
+    return { totalHits: entry.hits, resetTime: entry.resetTime };
+  }
+
+  decrement(key) {
+    const entry = this.counters.get(key);
+    if (entry && entry.hits > 0) entry.hits--;
+  }
+
+  reset(key) {
+    this.counters.delete(key);
+  }
+
+  hashIncrement(hash, field, delta) {
+    const fields = this.hashes.get(hash) || new Map();
+    const value = (fields.get(field) || 0) + delta;
+    if (value > 0) fields.set(field, value);
+    else fields.delete(field);
+    this.hashes.set(hash, fields);
+    return Math.max(0, value);
+  }
+
+  hashGetAll(hash) {
+    return Object.fromEntries(this.hashes.get(hash) || []);
+  }
+}
+
+class RedisState {
+  get client() {
+    return RedisService.client;
+  }
+
+  async increment(key, windowMs) {
+    const [hits, ttl] = await this.client.multi().incr(key).pTTL(key).exec();
+    let remaining = ttl;
+    if (remaining < 0) {
+      await this.client.pExpire(key, windowMs);
+      remaining = windowMs;
+    }
+    return { totalHits: hits, resetTime: Date.now() + remaining };
+  }
+
+  async decrement(key) {
+    await this.client.decr(key);
+  }
+
+  async reset(key) {
+    await this.client.del(key);
+  }
+
+  async hashIncrement(hash, field, delta) {
+    const value = await this.client.hIncrBy(hash, field, delta);
+    if (value <= 0) await this.client.hDel(hash, field);
+    return Math.max(0, value);
+  }
+
+  async hashGetAll(hash) {
+    const raw = await this.client.hGetAll(hash);
+    return Object.fromEntries(Object.entries(raw).map(([field, value]) => [field, parseInt(value)]));
+  }
+}
+
+/**
+ * Cliente de worker: cada operación es un mensaje al primario
+ */
+class IpcState {
+  constructor() {
+    this.pending = new Map();
+    process.on('message', (message) => {
+      if (!message || message.type !== MESSAGE_TYPE || !this.pending.has(message.id)) return;
+      const { resolve, reject, timer } = this.pending.get(message.id);
+      clearTimeout(timer);
+      this.pending.delete(message.id);
+      if (message.error) reject(new Error(message.error));
+      else resolve(message.result);
+    });
+  }
+
+  call(op, args) {
+    return new Promise((resolve, reject) => {
+      const id = crypto.randomUUID();
+      const timer = setTimeout(() => {
+        this.pending.delete(id);
+        reject(new Error(`Estado compartido sin respuesta (${op})`));
+      }, IPC_TIMEOUT_MS);
+      this.pending.set(id, { resolve, reject, timer });
+      process.send({ type: MESSAGE_TYPE, id, op, args });
+    });
+  }
+
+  increment(key, windowMs) {
+    return this.call('increment', [key, windowMs]);
+  }
+
+  decrement(key) {
+    return this.call('decrement', [key]);
+  }
+
+  reset(key) {
+    return this.call('reset', [key]);
+  }
+
+  hashIncrement(hash, field, delta) {
+    return this.call('hashIncrement', [hash, field, delta]);
+  }
+
+  hashGetAll(hash) {
+    return this.call('hashGetAll', [hash]);
+  }
+}
+
+const memoryState = new MemoryState();
+const redisState = new RedisState();
+let ipcState = null;
+
+/**
+ * Backend del estado compartido para este proceso. Se resuelve en cada
+ * llamada porque Redis se conecta después de montar los middlewares.
+ */
+function getSharedState() {
+  if (RedisService.isHealthy()) return redisState;
+  if (cluster.isWorker) {
+    ipcState = ipcState || new IpcState();
+    return ipcState;
+  }
+  return memoryState;
+}
+
+// ==================== LADO PRIMARIO ====================
+
+// Aportes de cada worker a los hashes, para descontarlos si muere
+const contributions = new Map(); // workerId -> Map("hash\0field" -> delta)
+
+/**
+ * Atiende una operación de un worker. Devuelve false si el mensaje no es
+ * de estado compartido.
+ */
+function handleWorkerMessage(worker, message) {
+  if (!message || message.type !== MESSAGE_TYPE) return false;
+
+  const { id, op, args } = message;
+  let reply;
+  try {
+    if (typeof memoryState[op] !== 'function' || op === 'sweep') {
+      throw new Error(`Operación desconocida: ${op}`);
+    }
+    if (op === 'hashIncrement') {
+      const [hash, field, delta] = args;
+      const own = contributions.get(worker.id) || new Map();
+      const key = `${hash}\0${field}`;
+      own.set(key, (own.get(key) || 0) + delta);
+      contributions.set(worker.id, own);
+    }
+    reply = { type: MESSAGE_TYPE, id, result: memoryState[op](...args) };
+  } catch (error) {
+    reply = { type: MESSAGE_TYPE, id, error: error.message };
+  }
+
+  if (worker.isConnected()) worker.send(reply);
+  return true;
+}
+
+/**
+ * Descuenta la presencia registrada por un worker que terminó
+ */
+function releaseWorker(worker) {
+  const own = contributions.get(worker.id);
+  if (!own) return;
+  for (const [key, delta] of own) {
+    const [hash, field] = key.split('\0');
+    if (delta !== 0) memoryState.hashIncrement(hash, field, -delta);
+  }
+  contributions.delete(worker.id);
+}
+
+module.exports = {
+  getSharedState,
+  handleWorkerMessage,
+  releaseWorker
+};
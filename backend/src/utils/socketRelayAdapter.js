@@ -0,0 +1,177 @@
+/**
+ * Adaptador de Socket.IO para varios procesos
+ * Cada broadcast (io.to(room).emit, disconnectSockets, socketsJoin...) se
+ * aplica localmente y se reenvía a los demás procesos, que lo aplican a
+ * sus propios sockets. Transporte:
+ * - Redis pub/sub si Redis está conectado (varios hosts)
+ * - IPC a través del primario del cluster como sustituto local sin Redis
+ *
+ * Los paquetes viajan como JSON por Redis: solo datos serializables.
+ * fetchSockets y los emits con ack siguen siendo locales a cada proceso.
+ */
+
+const cluster = require('cluster');
+const crypto = require('crypto');
+const { Adapter } = require('socket.io-adapter');
+const RedisService = require('../services/RedisService');
+
+const MESSAGE_TYPE = 'socket-relay';
+const CHANNEL_PREFIX = 'socket.io-relay:';
+// Redis entrega los mensajes también a quien los publica
+const ORIGIN = crypto.randomUUID();
+
+function serializeOptions(opts) {
+  return {
+    rooms: [...(opts.rooms || [])],
+    except: [...(opts.except || [])],
+    flags: opts.flags || {}
+  };
+}
+
+function deserializeOptions(opts) {
+  return {
+    rooms: new Set(opts.rooms),
+    except: new Set(opts.except),
+    flags: { ...opts.flags, local: true }
+  };
+}
+
+/**
+ * Transporte IPC: el primario reenvía cada mensaje al resto de workers
+ */
+function createIpcTransport() {
+  const handlers = new Map(); // namespace -> handler
+  process.on('message', (message) => {
+    if (!message || message.type !== MESSAGE_TYPE) return;
+    const handler = handlers.get(message.nsp);
+    if (handler) handler(message.payload);
+  });
+
+  return {
+    name: 'ipc',
+    publish(nsp, payload) {
+      process.send({ type: MESSAGE_TYPE, nsp, payload });
+    },
+    subscribe(nsp, handler) {
+      handlers.set(nsp, handler);
+      return () => handlers.delete(nsp);
+    },
+    close: async () => {}
+  };
+}
+
+/**
+ * Transporte Redis: un canal por namespace, suscriptor en conexión aparte
+ */
+async function createRedisTransport() {
+  const publisher = RedisService.client;
+  const subscriber = publisher.duplicate();
+  subscriber.on('error', (error) => console.error('Redis relay error:', error));
+  await subscriber.connect();
+
+  return {
+    name: 'redis',
+    publish(nsp, payload) {
+      publisher.publish(CHANNEL_PREFIX + nsp, JSON.stringify({ origin: ORIGIN, payload }))
+        .catch(error => console.error('Error publicando en Redis relay:', error.message));
+    },
+    subscribe(nsp, handler) {
+      const channel = CHANNEL_PREFIX + nsp;
+      const listener = (raw) => {
+        const message = JSON.parse(raw);
+        if (message.origin !== ORIGIN) handler(message.payload);
+      };
+      subscriber.subscribe(channel, listener)
+        .catch(error => console.error('Error suscribiendo Redis relay:', error.message));
+      return () => subscriber.unsubscribe(channel, listener).catch(() => {});
+    },
+    close: () => subscriber.quit()
+  };
+}
+
+/**
+ * Transporte según el entorno, o null en un proceso único sin Redis
+ * (el adaptador por defecto alcanza)
+ */
+async function createRelayTransport() {
+  if (RedisService.isHealthy()) return createRedisTransport();
+  if (cluster.isWorker) return createIpcTransport();
+  return null;
+}
+
+/**
+ * Clase de adaptador para io.adapter() sobre un transporte
+ */
+function createRelayAdapter(transport) {
+  return class RelayAdapter extends Adapter {
+    constructor(nsp) {
+      super(nsp);
+      this.unsubscribe = transport.subscribe(nsp.name, (payload) => this.onRelay(payload));
+    }
+
+    relay(kind, opts, extra) {
+      if (opts.flags && opts.flags.local) return;
+      transport.publish(this.nsp.name, { kind, opts: serializeOptions(opts), ...extra });
+    }
+
+    broadcast(packet, opts) {
+      this.relay('broadcast', opts, { packet });
+      super.broadcast(packet, opts);
+    }
+
+    addSockets(opts, rooms) {
+      this.relay('addSockets', opts, { rooms });
+      super.addSockets(opts, rooms);
+    }
+
+    delSockets(opts, rooms) {
+      this.relay('delSockets', opts, { rooms });
+      super.delSockets(opts, rooms);
+    }
+
+    disconnectSockets(opts, close) {
+      this.relay('disconnectSockets', opts, { close });
+      super.disconnectSockets(opts, close);
+    }
+
+    onRelay({ kind, opts, packet, rooms, close }) {
+      const local = deserializeOptions(opts);
+      switch (kind) {
+        case 'broadcast':
+          return super.broadcast(packet, local);
+        case 'addSockets':
+          return super.addSockets(local, rooms);
+        case 'delSockets':
+          return super.delSockets(local, rooms);
+        case 'disconnectSockets':
+          return super.disconnectSockets(local, close);
+        default:
+          return undefined;
+      }
+    }
+
+    close() {
+      this.unsubscribe();
+    }
+  };
+}
+
+/**
+ * Lado primario: reenvía un mensaje de relay al resto de workers.
+ * Devuelve false si el mensaje no es de relay.
+ */
+function relayToWorkers(sender, message) {
+  if (!message || message.type !== MESSAGE_TYPE) return false;
+  for (const worker of Object.values(cluster.workers)) {
+    if (worker && worker.id !== sender.id && worker.isConnected()) {
+      worker.send(message);
+    }
+  }
+  return true;
+}
+
+module.exports = {
+  createRelayTransport,
+  createRelayAdapter,
+  relayToWorkers
+};
@@ -0,0 +1,90 @@
+/**
+ * Arranque del servidor
+ * - Cronómetro por fase desde que arrancó el proceso (performance.now()
+ *   cuenta desde el inicio de Node), para ver en qué se va el arranque
+ * - Routers diferidos: el módulo de la ruta (y sus SDKs) se carga con la
+ *   primera request que lo usa en vez de al arrancar
+ *
+ * Con LAZY_ROUTES=false los routers se cargan al montarlos (línea base
+ * para comparar tiempos de arranque).
+ */
+
+const { performance } = require('perf_hooks');
+
+const LAZY_ROUTES = process.env.LAZY_ROUTES !== 'false';
+
+class StartupTimer {
+  constructor() {
+    this.phases = [];
+    this.last = 0;
+    this.readyAt = null;
+  }
+
+  /**
+   * Cierra la fase actual: el tiempo desde la marca anterior
+   * @param {string} name - Nombre de la fase que termina
+   */
+  mark(name) {
+    const now = performance.now();
+    this.phases.push({ name, ms: Math.round((now - this.last) * 10) / 10 });
+    this.last = now;
+  }
+
+  /**
+   * Marca la última fase y deja el arranque como terminado
+   */
+  ready(name) {
+    this.mark(name);
+    this.readyAt = this.last;
+  }
+
+  summary() {
+    return {
+      totalMs: this.readyAt === null ? null : Math.round(this.readyAt * 10) / 10,
+      lazyRoutes: LAZY_ROUTES,
+      phases: this.phases
+    };
+  }
+
+  print() {
+    const total = this.readyAt || this.last;
+    console.log(`⏱️ Arranque en ${total.toFixed(0)}ms:`);
+    for (const phase of this.phases) {
+      const share = total ? (phase.ms / total * 100).toFixed(0) : 0;
+      console.log(`   ${phase.name.padEnd(12)} ${phase.ms.toFixed(1).padStart(8)}ms ${String(share).padStart(3)}%`);
+    }
+  }
+}
+
+const startupTimer = new StartupTimer();
+
+/**
+ * Router que se carga con la primera request. Si el módulo falla al
+ * cargar, el error va al errorHandler y se reintenta en la siguiente.
+ * @param {string} name - Nombre para el log
+ * @param {Function} load - () => require('./routes/...')
+ * @returns {Function} Middleware de Express
+ */
+function lazyRouter(name, load) {
+  if (!LAZY_ROUTES) return load();
+
+  let router = null;
+  return (req, res, next) => {
+    if (!router) {
+      const started = performance.now();
+      try {
+        router = load();
+      } catch (error) {
+        return next(error);
+      }
+      console.log(`📦 Rutas ${name} cargadas en ${(performance.now() - started).toFixed(0)}ms`);
+    }
+    return router(req, res, next);
+  };
+}
+
+module.exports = {
+  LAZY_ROUTES,
+  startupTimer,
+  lazyRouter
+};
@@ -0,0 +1,264 @@
+/**
+ * Pool acotado de worker threads para trabajo de CPU
+ * - Hilos creados a demanda hasta `size`
+ * - Cola FIFO acotada: si se llena, la tarea se rechaza con 503 en vez de
+ *   acumular memoria y latencia
+ * - Timeout por tarea: el hilo se termina y se reemplaza
+ * - Métricas: profundidad de cola (actual, pico, histograma al encolar),
+ *   espera en cola y tiempo de ejecución por tarea
+ *
+ * Con size 0 las tareas corren en el hilo principal (sirve de línea base
+ * para comparar con y sin pool).
+ */
+
+const cluster = require('cluster');
+const os = require('os');
+const path = require('path');
+const { Worker } = require('worker_threads');
+const { CustomError } = require('../middleware/errorHandler');
+const { LATENCY_BUCKETS_MS, createHistogram, observe, summarizeHistogram } = require('./queryMetrics');
+
+// Buckets de profundidad de cola al encolar
+const QUEUE_DEPTH_BUCKETS = [0, 1, 2, 5, 10, 20, 50, 100, 250];
+
+function defaultSize() {
+  // En cluster cada worker del servidor ya ocupa un núcleo
+  if (cluster.isWorker) return 1;
+  return Math.max(1, Math.min(4, os.availableParallelism() - 1));
+}
+
+class WorkerPool {
+  /**
+   * @param {Object} options
+   * @param {string} options.filename - Módulo de tareas (exporta runTask)
+   * @param {number} options.size - Hilos máximos (0 = en el hilo principal)
+   * @param {number} options.maxQueue - Tareas en espera antes de rechazar
+   * @param {number} options.taskTimeoutMs - Tiempo máximo por tarea
+   */
+  constructor({ filename, size, maxQueue, taskTimeoutMs }) {
+    this.filename = filename;
+    this.size = size;
+    this.maxQueue = maxQueue;
+    this.taskTimeoutMs = taskTimeoutMs;
+
+    this.threads = new Set();
+    this.idle = [];
+    this.queue = [];
+    this.nextId = 1;
+    this.closed = false;
+    this.reset();
+  }
+
+  reset() {
+    this.startedAt = new Date();
+    this.counters = { submitted: 0, completed: 0, failed: 0, rejected: 0, timedOut: 0 };
+    this.peakQueueDepth = this.queue.length;
+    this.queueDepth = createHistogram(QUEUE_DEPTH_BUCKETS);
+    this.tasks = new Map(); // task -> { wait, run }
+  }
+
+  taskMetrics(task) {
+    let metrics = this.tasks.get(task);
+    if (!metrics) {
+      metrics = {
+        wait: createHistogram(LATENCY_BUCKETS_MS),
+        run: createHistogram(LATENCY_BUCKETS_MS),
+        failed: 0
+      };
+      this.tasks.set(task, metrics);
+    }
+    return metrics;
+  }
+
+  /**
+   * Ejecuta una tarea en el pool
+   * @param {string} task - Nombre registrado en el módulo de tareas
+   * @param {Array} args - Argumentos (structured clone)
+   * @param {Object} options - { timeoutMs }
+   * @returns {Promise<*>} Resultado de la tarea
+   */
+  run(task, args = [], options = {}) {
+    if (this.closed) {
+      return Promise.reject(new Error('El pool de workers está cerrado'));
+    }
+    this.counters.submitted++;
+
+    if (this.size === 0) return this.runInline(task, args);
+
+    if (this.queue.length >= this.maxQueue) {
+      this.counters.rejected++;
+      return Promise.reject(new CustomError(
+        'Servidor ocupado, intenta nuevamente en unos segundos',
+        503,
+        'SERVER_BUSY'
+      ));
+    }
+
+    return new Promise((resolve, reject) => {
+      observe(this.queueDepth, this.queue.length);
+      this.queue.push({
+        id: this.nextId++,
+        task,
+        args,
+        resolve,
+        reject,
+        enqueuedAt: process.hrtime.bigint(),
+        timeoutMs: options.timeoutMs || this.taskTimeoutMs
+      });
+      this.peakQueueDepth = Math.max(this.peakQueueDepth, this.queue.length);
+      this.dispatch();
+    });
+  }
+
+  async runInline(task, args) {
+    const { runTask } = require(this.filename);
+    const metrics = this.taskMetrics(task);
+    const start = process.hrtime.bigint();
+    observe(metrics.wait, 0);
+    try {
+      const result = await runTask(task, args);
+      this.counters.completed++;
+      return result;
+    } catch (error) {
+      this.counters.failed++;
+      metrics.failed++;
+      throw error;
+    } finally {
+      observe(metrics.run, Number(process.hrtime.bigint() - start) / 1e6);
+    }
+  }
+
+  dispatch() {
+    while (this.queue.length > 0) {
+      let thread = this.idle.pop();
+      if (!thread) {
+        if (this.threads.size >= this.size) return;
+        thread = this.spawn();
+      }
+      this.assign(thread, this.queue.shift());
+    }
+  }
+
+  spawn() {
+    const thread = new Worker(this.filename);
+    thread.job = null;
+    // Los hilos no mantienen vivo el proceso por sí solos
+    thread.unref();
+
+    thread.on('message', ({ id, result, error }) => {
+      const job = thread.job;
+      if (!job || job.id !== id) return;
+      this.settle(thread, job, error
+        ? Object.assign(new Error(error.message), { stack: error.stack })
+        : null, result);
+      thread.job = null;
+      this.idle.push(thread);
+      this.dispatch();
+    });
+
+    thread.on('error', (error) => {
+      console.error('Error en worker thread:', error);
+      if (thread.job) this.settle(thread, thread.job, error);
+      thread.job = null;
+    });
+
+    thread.on('exit', () => {
+      this.threads.delete(thread);
+      this.idle = this.idle.filter(t => t !== thread);
+      if (thread.job) {
+        this.settle(thread, thread.job, new Error('El worker thread terminó durante la tarea'));
+        thread.job = null;
+      }
+      // Las tareas en cola siguen en un hilo nuevo
+      if (!this.closed) this.dispatch();
+    });
+
+    this.threads.add(thread);
+    return thread;
+  }
+
+  assign(thread, job) {
+    thread.job = job;
+    job.startedAt = process.hrtime.bigint();
+    observe(this.taskMetrics(job.task).wait, Number(job.startedAt - job.enqueuedAt) / 1e6);
+
+    job.timer = setTimeout(() => {
+      this.counters.timedOut++;
+      this.settle(thread, job, new Error(`Tarea ${job.task} excedió ${job.timeoutMs}ms`));
+      thread.job = null;
+      // No hay forma de interrumpir la tarea: se descarta el hilo
+      thread.terminate();
+    }, job.timeoutMs);
+
+    thread.postMessage({ id: job.id, task: job.task, args: job.args });
+  }
+
+  settle(thread, job, error, result) {
+    if (job.settled) return;
+    job.settled = true;
+    clearTimeout(job.timer);
+
+    const metrics = this.taskMetrics(job.task);
+    observe(metrics.run, Number(process.hrtime.bigint() - job.startedAt) / 1e6);
+    if (error) {
+      this.counters.failed++;
+      metrics.failed++;
+      job.reject(error);
+    } else {
+      this.counters.completed++;
+      job.resolve(result);
+    }
+  }
+
+  /**
+   * Estado y métricas del pool
+   */
+  snapshot() {
+    const tasks = {};
+    for (const [task, metrics] of this.tasks) {
+      tasks[task] = {
+        failed: metrics.failed,
+        waitMs: summarizeHistogram(metrics.wait),
+        runMs: summarizeHistogram(metrics.run)
+      };
+    }
+
+    return {
+      since: this.startedAt.toISOString(),
+      size: this.size,
+      threads: this.threads.size,
+      busy: this.threads.size - this.idle.length,
+      queue: {
+        depth: this.queue.length,
+        max: this.maxQueue,
+        peak: this.peakQueueDepth,
+        atEnqueue: summarizeHistogram(this.queueDepth)
+      },
+      ...this.counters,
+      tasks
+    };
+  }
+
+  /**
+   * Rechaza lo pendiente y termina los hilos (apagado del servidor)
+   */
+  async close() {
+    this.closed = true;
+    for (const job of this.queue.splice(0)) {
+      job.reject(new Error('El pool de workers se está cerrando'));
+    }
+    await Promise.all([...this.threads].map(thread => thread.terminate()));
+  }
+}
+
+const cpuPool = new WorkerPool({
+  filename: path.join(__dirname, '../workers/cpuTasks.js'),
+  size: process.env.CPU_POOL_SIZE !== undefined ? parseInt(process.env.CPU_POOL_SIZE) : defaultSize(),
+  maxQueue: parseInt(process.env.CPU_POOL_MAX_QUEUE || '200'),
+  taskTimeoutMs: parseInt(process.env.CPU_POOL_TASK_TIMEOUT_MS || '120000')
+});
+
+module.exports = {
+  WorkerPool,
+  cpuPool
+};
@@ -0,0 +1,54 @@
+/**
+ * Tareas de CPU que corren en los hilos del pool (utils/workerPool.js)
+ * - bcrypt: hash y verificación de contraseñas
+ * - report.render: generación de PDF/Excel de reportExportService
+ *
+ * Los argumentos y resultados cruzan el hilo por structured clone: solo
+ * datos planos (sin instancias de Prisma.Decimal ni funciones).
+ */
+
+const { parentPort, isMainThread } = require('worker_threads');
+const bcrypt = require('bcryptjs');
+
+// Métodos de render que se pueden invocar desde el hilo principal
+const REPORT_RENDERERS = new Set([
+  'renderSalesReportPDF',
+  'renderSalesReportExcel',
+  'renderDashboardPDF',
+  'renderCustomerAnalyticsExcel',
+  'renderInventoryReportExcel'
+]);
+
+const tasks = {
+  // Dentro del hilo las versiones síncronas son más rápidas: no ceden el loop
+  'bcrypt.hash': (password, rounds) => bcrypt.hashSync(password, rounds),
+  'bcrypt.compare': (password, hash) => bcrypt.compareSync(password, hash),
+
+  'report.render': (method, data, filename) => {
+    if (!REPORT_RENDERERS.has(method)) {
+      throw new Error(`Render de reporte desconocido: ${method}`);
+    }
+    // Carga diferida: pdfkit y exceljs solo se cargan en los hilos que los usan
+    const reportExportService = require('../services/reportExportService');
+    return reportExportService[method](data, filename);
+  }
+};
+
+async function runTask(task, args) {
+  const handler = tasks[task];
+  if (!handler) throw new Error(`Tarea desconocida: ${task}`);
+  return handler(...args);
+}
+
+if (!isMainThread && parentPort) {
+  parentPort.on('message', async ({ id, task, args }) => {
+    try {
+      const result = await runTask(task, args);
+      parentPort.postMessage({ id, result });
+    } catch (error) {
+      parentPort.postMessage({ id, error: { message: error.message, stack: error.stack } });
+    }
+  });
+}
+
+module.exports = { runTask };
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Benchmark del dashboard administrativo con varios admins
+Simula N admins con el dashboard abierto y auto-refresh cada
+--refresh-interval segundos (GET /admin/dashboard y, opcionalmente,
+/admin/analytics) y, si se pide, admins conectados al stream SSE de
+paneles. Mide la latencia del dashboard y las queries a la base por
+refresco: las de la ruta más las del recálculo en segundo plano (queries
+sin request, desde /admin/metrics/queries), divididas por los refrescos.
+
+Sobre el dataset sintético de 1M de pedidos (200k usuarios x 5). Para
+comparar contra la línea base que calcula todo en cada request:
+    DASHBOARD_CACHE=false npm start   # en backend/
+    python3 bench_admin_dashboard.py --skip-seed --label sin-cache
+    npm start
+    python3 bench_admin_dashboard.py --skip-seed --label paneles --baseline bench_admin_dashboard_1700000000.json
+
+Uso:
+    python3 bench_admin_dashboard.py                          # siembra 1M pedidos
+    python3 bench_admin_dashboard.py --skip-seed --admins 20 --refresh-interval 5 --duration 120
+    python3 bench_admin_dashboard.py --skip-seed --sse 5 --analytics
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import requests
+
+from bench_common import (
+    BASE_URL, Colors, auth_headers, fetch_query_metrics, login, print_section,
+    print_summary, reset_query_metrics, results_path, seed_synthetic, summarize,
+    time_request
+)
+
+DASHBOARD_ROUTES = ("GET /api/admin/dashboard", "GET /api/admin/analytics")
+
+
+class Admin(threading.Thread):
+    """Admin con el dashboard abierto: refresca cada --refresh-interval segundos"""
+
+    def __init__(self, index: int, headers: Dict[str, str], deadline: float, args):
+        super().__init__(daemon=True)
+        self.headers = headers
+        self.deadline = deadline
+        self.args = args
+        self.rng = random.Random(args.seed + index)
+        self.latencies: Dict[str, List[float]] = {"dashboard": [], "analytics": []}
+        self.statuses = Counter()
+
+    def fetch(self, name: str, path: str, params=None):
+        elapsed, response = time_request("GET", f"{BASE_URL}{path}", headers=self.headers,
+                                         params=params, timeout=self.args.timeout)
+        self.statuses[str(response.status_code) if response is not None else "error"] += 1
+        if response is not None and response.status_code == 200:
+            self.latencies[name].append(elapsed)
+
+    def run(self):
+        # Cada admin abre el dashboard en un momento distinto
+        time.sleep(self.rng.uniform(0, self.args.refresh_interval))
+        while time.time() < self.deadline:
+            started = time.time()
+            self.fetch("dashboard", "/admin/dashboard")
+            if self.args.analytics:
+                self.fetch("analytics", "/admin/analytics",
+                           params={"period": self.rng.choice(["week", "month", "year"])})
+            time.sleep(max(0.0, self.args.refresh_interval - (time.time() - started)))
+
+
+class StreamWatcher(threading.Thread):
+    """Admin conectado a /admin/dashboard/stream: cuenta los eventos recibidos"""
+
+    def __init__(self, headers: Dict[str, str], deadline: float, args):
+        super().__init__(daemon=True)
+        self.headers = headers
+        self.deadline = deadline
+        self.args = args
+        self.events = Counter()
+        self.error = None
+
+    def run(self):
+        try:
+            with requests.get(f"{BASE_URL}/admin/dashboard/stream", headers=self.headers,
+                              stream=True, timeout=self.args.timeout) as response:
+                if response.status_code != 200:
+                    self.error = f"HTTP {response.status_code}"
+                    return
+                for line in response.iter_lines(decode_unicode=True):
+                    if line and line.startswith("event: "):
+                        self.events[line[len("event: "):]] += 1
+                    if time.time() >= self.deadline:
+                        return
+        except requests.RequestException as error:
+            # El timeout de lectura corta el stream al final de la corrida
+            if time.time() < self.deadline:
+                self.error = str(error)
+
+
+def dashboard_metrics(headers, reset: bool = False) -> Optional[Dict]:
+    """Métricas de los paneles (None si el backend no las expone)"""
+    if reset:
+        time_request("POST", f"{BASE_URL}/admin/metrics/dashboard/reset", headers=headers, timeout=10)
+    _, response = time_request("GET", f"{BASE_URL}/admin/metrics/dashboard", headers=headers, timeout=10)
+    if response is None or response.status_code != 200:
+        return None
+    data = response.json().get("data")
+    return data if isinstance(data, dict) and "refreshes" in data else None
+
+
+def database_load(metrics: Optional[Dict], refreshes: int) -> Dict:
+    """Queries de las rutas del dashboard más las de fondo, por refresco"""
+    routes = (metrics or {}).get("routes") or {}
+    load = {"refreshes": refreshes, "routeQueries": 0, "routeQueryTimeMs": 0.0,
+            "backgroundQueries": (metrics or {}).get("unattributedQueries", 0)}
+    for route in DASHBOARD_ROUTES:
+        stats = routes.get(route)
+        if stats:
+            load["routeQueries"] += stats["queries"]
+            load["routeQueryTimeMs"] += stats["queryTimeMs"]
+    total = load["routeQueries"] + load["backgroundQueries"]
+    load["queriesPerRefresh"] = total / refreshes if refreshes else 0
+    return load
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dashboard administrativo con varios admins")
+    parser.add_argument("--label", default="", help="Etiqueta de la corrida (p. ej. sin-cache / paneles)")
+    parser.add_argument("--admins", type=int, default=20, help="Admins refrescando el dashboard")
+    parser.add_argument("--sse", type=int, default=0, help="Admins adicionales conectados al stream SSE")
+    parser.add_argument("--refresh-interval", type=float, default=5, help="Segundos entre refrescos de cada admin")
+    parser.add_argument("--analytics", action="store_true", help="Pedir también /admin/analytics en cada refresco")
+    parser.add_argument("--duration", type=float, default=60, help="Segundos de carga")
+    parser.add_argument("--users", type=int, default=200000)
+    parser.add_argument("--orders-per-user", type=float, default=5)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--items-per-order", type=float, default=2)
+    parser.add_argument("--skip-seed", action="store_true", help="Usar el dataset sintético existente")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", help="Resultado previo para comparar latencia y queries por refresco")
+    args = parser.parse_args()
+
+    print_section(f"DASHBOARD CON {args.admins} ADMINS{f' ({args.label})' if args.label else ''}")
+
+    if not args.skip_seed:
+        seed_synthetic("--reset", "--users", str(args.users), "--orders-per-user", str(args.orders_per_user),
+                       "--products", str(args.products), "--items-per-order", str(args.items_per_order))
+
+    headers = auth_headers(login())
+    reset_query_metrics(headers)
+    panels_before = dashboard_metrics(headers, reset=True)
+    print(f"  Paneles cacheados: {'sí' if panels_before and panels_before['enabled'] else 'no (cálculo por request)'}; "
+          f"refresco cada {args.refresh_interval:g}s durante {args.duration:.0f}s")
+
+    deadline = time.time() + args.duration
+    admins = [Admin(i, headers, deadline, args) for i in range(args.admins)]
+    watchers = [StreamWatcher(headers, deadline, args) for _ in range(args.sse)]
+    for thread in admins + watchers:
+        thread.start()
+    for thread in admins:
+        thread.join()
+    for watcher in watchers:
+        watcher.join(timeout=args.timeout)
+
+    latencies = {name: summarize([v for admin in admins for v in admin.latencies[name]])
+                 for name in ("dashboard", "analytics")}
+    statuses = sum((admin.statuses for admin in admins), Counter())
+    refreshes = latencies["dashboard"]["count"] + latencies["analytics"]["count"]
+    load = database_load(fetch_query_metrics(headers), refreshes)
+    panels = dashboard_metrics(headers)
+
+    print_summary("GET /admin/dashboard", latencies["dashboard"])
+    if args.analytics:
+        print_summary("GET /admin/analytics", latencies["analytics"])
+    print(f"  Respuestas: {dict(statuses)}")
+    print(f"  {Colors.BOLD}Base de datos{Colors.RESET}: {load['routeQueries']:,} queries en requests + "
+          f"{load['backgroundQueries']:,} en segundo plano → {load['queriesPerRefresh']:.2f} por refresco")
+    if panels:
+        print(f"  Paneles: {panels['refreshes']:,} recálculos ({panels['refreshMs']:,}ms), "
+              f"{panels['panelHits']:,} lecturas desde cache, {panels['panelWaits']:,} esperas")
+        for name, panel in panels["panels"].items():
+            print(f"    {name:<16} cálculo {panel['computeMs']:6,}ms  TTL efectivo {panel['ttlMs'] / 1000:6.0f}s")
+
+    sse = None
+    if watchers:
+        events = sum((watcher.events for watcher in watchers), Counter())
+        errors = [watcher.error for watcher in watchers if watcher.error]
+        sse = {"watchers": len(watchers), "events": dict(events), "errors": errors}
+        print(f"  SSE: {len(watchers)} conexiones, eventos {dict(events)}"
+              f"{f', {len(errors)} errores' if errors else ''}")
+
+    comparison = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        comparison = {
+            "baseline": args.baseline,
+            "baselineLabel": baseline["config"].get("label", ""),
+            "p50Ms": [baseline["latency"]["dashboard"]["p50"], latencies["dashboard"]["p50"]],
+            "p99Ms": [baseline["latency"]["dashboard"]["p99"], latencies["dashboard"]["p99"]],
+            "queriesPerRefresh": [baseline["database"]["queriesPerRefresh"], load["queriesPerRefresh"]],
+        }
+        print(f"\n{Colors.BOLD}vs {comparison['baselineLabel'] or args.baseline}{Colors.RESET}")
+        for key in ("p50Ms", "p99Ms", "queriesPerRefresh"):
+            old, new = comparison[key]
+            change = (new - old) / old if old else 0
+            color = Colors.GREEN if change <= 0 else Colors.RED
+            print(f"  {key:<18} {old:10.2f} → {new:10.2f} {color}({change:+.0%}){Colors.RESET}")
+
+    filename = results_path("bench_admin_dashboard")
+    with open(filename, "w") as f:
+        json.dump({
+            "timestamp": datetime.now().isoformat(),
+            "config": vars(args),
+            "latency": latencies,
+            "statuses": dict(statuses),
+            "database": load,
+            "panels": panels,
+            "sse": sse,
+            "comparison": comparison,
+        }, f, indent=2)
+    print(f"\n{Colors.CYAN}📄 Resultados guardados en: {filename}{Colors.RESET}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Escalado del throughput con el número de workers del cluster
+Para cada cantidad de workers levanta `node src/cluster.js` en el puerto de
+CARNES_BASE_URL, espera a que todos los workers respondan /health y mide
+el máximo RPS sostenible con la curva de saturación de load_open_loop.py.
+La eficiencia compara cada corrida con N veces el RPS de un solo worker.
+
+El puerto debe estar libre: el benchmark arranca y detiene su propio
+backend. El rate limit se eleva con RATE_LIMIT_MAX para que no corte la
+carga (todas las requests salen de la misma IP).
+
+Uso:
+    python3 bench_cluster_scaling.py
+    python3 bench_cluster_scaling.py --workers 1,2,4,8 --group catalog
+    python3 bench_cluster_scaling.py --workers 1,4 --start-rate 100 --step-factor 1.25 --max-p99-ms 300
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import time
+from datetime import datetime
+from typing import Dict, Optional, Set
+from urllib.parse import urlparse
+
+import requests
+
+from bench_common import (
+    BACKEND_DIR, BASE_URL, SERVER_URL, Colors, RequestLog, auth_headers, login,
+    print_section, results_path
+)
+from load_open_loop import DEFAULT_GROUPS, add_step_arguments, saturation_curve
+
+
+def start_cluster(workers: int, args) -> subprocess.Popen:
+    """Arranca el primario del cluster con `workers` workers"""
+    env = dict(os.environ,
+               WEB_CONCURRENCY=str(workers),
+               PORT=str(urlparse(BASE_URL).port or 80),
+               RATE_LIMIT_MAX=str(args.rate_limit_max))
+    print(f"{Colors.BLUE}$ WEB_CONCURRENCY={workers} node src/cluster.js{Colors.RESET}")
+    if not args.log_dir:
+        return subprocess.Popen(["node", "src/cluster.js"], cwd=BACKEND_DIR, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    with open(os.path.join(args.log_dir, f"cluster_{workers}w.log"), "w") as log:
+        return subprocess.Popen(["node", "src/cluster.js"], cwd=BACKEND_DIR, env=env,
+                                stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_for_workers(process: subprocess.Popen, workers: int, timeout: float) -> Set[int]:
+    """
+    Espera a que respondan `workers` pids distintos en /health. Cada sondeo
+    abre una conexión nueva para que el primario la reparta a otro worker.
+    """
+    pids: Set[int] = set()
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"el cluster terminó durante el arranque (código {process.returncode})")
+        try:
+            response = requests.get(f"{SERVER_URL}/health", timeout=2,
+                                    headers={"Connection": "close"})
+            if response.status_code == 200 and "pid" in response.json():
+                pids.add(response.json()["pid"])
+                if len(pids) >= workers:
+                    return pids
+                continue
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"solo respondieron {len(pids)}/{workers} workers en {timeout:.0f}s")
+
+
+def stop_cluster(process: subprocess.Popen, timeout: float):
+    """SIGTERM al primario (drena los workers) y SIGKILL si no termina"""
+    if process.poll() is not None:
+        return
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def measure(workers: int, groups: Dict[str, list], args) -> Optional[Dict]:
+    print_section(f"{workers} WORKER{'S' if workers > 1 else ''}")
+    process = start_cluster(workers, args)
+    try:
+        pids = wait_for_workers(process, workers, args.startup_timeout)
+        print(f"  {Colors.GREEN}✓ {len(pids)} workers listos{Colors.RESET} (pids {', '.join(map(str, sorted(pids)))})")
+        headers = auth_headers(login())
+        with RequestLog(None) as log:
+            result = {name: saturation_curve(name, endpoints, args, headers, log)
+                      for name, endpoints in groups.items()}
+        return {"workers": workers, "pids": sorted(pids), "groups": result}
+    except RuntimeError as error:
+        print(f"  {Colors.RED}✗ {error}{Colors.RESET}")
+        return None
+    finally:
+        stop_cluster(process, args.shutdown_timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Escalado del throughput por número de workers")
+    parser.add_argument("--workers", default=",".join(str(n) for n in (1, 2, 4, os.cpu_count() or 4)),
+                        help="Cantidades de workers separadas por coma")
+    parser.add_argument("--group", action="append", dest="groups",
+                        help="Grupo de load_open_loop.py a medir (repetible; por defecto catalog)")
+    parser.add_argument("--rate-limit-max", type=int, default=10_000_000,
+                        help="RATE_LIMIT_MAX del backend durante la medición")
+    parser.add_argument("--startup-timeout", type=float, default=60)
+    parser.add_argument("--shutdown-timeout", type=float, default=35)
+    parser.add_argument("--log-dir", help="Directorio para la salida de cada cluster")
+    add_step_arguments(parser)
+    args = parser.parse_args()
+
+    counts = sorted({int(n) for n in args.workers.split(",")})
+    selected = args.groups or ["catalog"]
+    unknown = [g for g in selected if g not in DEFAULT_GROUPS]
+    if unknown:
+        parser.error(f"grupos desconocidos: {', '.join(unknown)}")
+    groups = {name: DEFAULT_GROUPS[name] for name in selected}
+    if args.log_dir:
+        os.makedirs(args.log_dir, exist_ok=True)
+
+    print_section("ESCALADO POR WORKERS")
+    print(f"  Workers: {', '.join(map(str, counts))} · grupos: {', '.join(selected)} · "
+          f"umbral p99 {args.max_p99_ms:.0f}ms / errores {args.max_error_rate:.1%}")
+
+    runs = [run for run in (measure(n, groups, args) for n in counts) if run]
+
+    print(f"\n{Colors.BOLD}Máximo RPS sostenible{Colors.RESET}")
+    for name in selected:
+        base = next((run for run in runs if run["workers"] == 1), None)
+        base_rps = base["groups"][name]["maxSustainableRps"] if base else 0
+        print(f"  {Colors.BOLD}{name}{Colors.RESET}")
+        for run in runs:
+            group = run["groups"][name]
+            rps = group["maxSustainableRps"]
+            flag = f"  {Colors.YELLOW}(limitado por el rate limiter){Colors.RESET}" if group["rateLimited"] else ""
+            if base_rps:
+                group["speedup"] = round(rps / base_rps, 2)
+                group["efficiency"] = round(rps / (base_rps * run["workers"]), 2)
+                print(f"    {run['workers']:>3} workers {rps:9.1f} req/s  "
+                      f"×{group['speedup']:.2f}  eficiencia {group['efficiency']:.0%}{flag}")
+            else:
+                print(f"    {run['workers']:>3} workers {rps:9.1f} req/s{flag}")
+
+    filename = results_path("bench_cluster_scaling")
+    with open(filename, "w") as f:
+        json.dump({
+            "timestamp": datetime.now().isoformat(),
+            "config": vars(args),
+            "runs": runs,
+        }, f, indent=2)
+    print(f"\n{Colors.CYAN}📄 Resultados guardados en: {filename}{Colors.RESET}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Utilidades compartidas para los benchmarks de Carnes Premium
+Login, medición de latencias, percentiles y generación de datos sintéticos
+"""
+
+import gzip
+import json
+import math
+import os
+import re
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+# Configuración
+BASE_URL = os.environ.get("CARNES_BASE_URL", "http://localhost:3002/api")
+ADMIN_EMAIL = os.environ.get("CARNES_ADMIN_EMAIL", "admin@carnes.com")
+ADMIN_PASSWORD = os.environ.get("CARNES_ADMIN_PASSWORD", "admin123")
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+RESULTS_DIR = os.environ.get("CARNES_RESULTS_DIR", os.getcwd())
+
+
+def server_url(base_url: str) -> str:
+    """Raíz del servidor (sin /api), donde vive /health"""
+    return base_url[:-len("/api")] if base_url.endswith("/api") else base_url
+
+
+SERVER_URL = server_url(BASE_URL)
+
+
+class Colors:
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    MAGENTA = '\033[95m'
+    CYAN = '\033[96m'
+    RESET = '\033[0m'
+    BOLD = '\033[1m'
+
+
+def print_section(title: str):
+    """Imprime un título de sección"""
+    print(f"\n{Colors.CYAN}{Colors.BOLD}{'='*80}")
+    print(f"  {title}")
+    print(f"{'='*80}{Colors.RESET}\n")
+
+
+def login(email: str = ADMIN_EMAIL, password: str = ADMIN_PASSWORD, base_url: str = BASE_URL) -> str:
+    """Autentica y devuelve el token JWT"""
+    response = requests.post(f"{base_url}/auth/login", json={
+        "email": email,
+        "password": password
+    }, timeout=30)
+    response.raise_for_status()
+    return response.json()['data']['token']
+
+
+def auth_headers(token: str) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil con interpolación lineal (pct entre 0 y 100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def summarize(latencies_ms: List[float]) -> Dict[str, float]:
+    """Resumen estándar de una lista de latencias en milisegundos"""
+    if not latencies_ms:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    return {
+        "count": len(latencies_ms),
+        "mean": sum(latencies_ms) / len(latencies_ms),
+        "p50": percentile(latencies_ms, 50),
+        "p95": percentile(latencies_ms, 95),
+        "p99": percentile(latencies_ms, 99),
+        "max": max(latencies_ms),
+    }
+
+
+class LatencyHistogram:
+    """
+    Histograma log-lineal de latencias (buckets de ~1%) para corridas largas:
+    memoria constante y combinable. Dos histogramas fusionados dan los mismos
+    percentiles que uno solo con todas las muestras.
+    """
+
+    GROWTH = 1.01
+    # Buckets por debajo de 1µs se agrupan en el índice 0
+    MIN_MS = 0.001
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def _index(self, value_ms: float) -> int:
+        if value_ms <= self.MIN_MS:
+            return 0
+        return int(math.log(value_ms / self.MIN_MS, self.GROWTH)) + 1
+
+    def _upper_bound(self, index: int) -> float:
+        return self.MIN_MS * self.GROWTH ** index
+
+    def record(self, value_ms: float):
+        index = self._index(value_ms)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value_ms
+        self.max = max(self.max, value_ms)
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        return self
+
+    def percentile(self, pct: float) -> float:
+        """Límite superior del bucket del percentil, acotado por el máximo"""
+        if self.count == 0:
+            return 0.0
+        target = max(1, math.ceil(pct / 100 * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._upper_bound(index), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        """Mismo formato que summarize()"""
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+    def to_dict(self) -> Dict:
+        return {"counts": {str(k): v for k, v in self.counts.items()},
+                "count": self.count, "total": self.total, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "LatencyHistogram":
+        histogram = cls()
+        histogram.counts = {int(k): v for k, v in data["counts"].items()}
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.max = data["max"]
+        return histogram
+
+
+def print_summary(label: str, stats: Dict[str, float]):
+    """Imprime un resumen de latencias en una línea"""
+    print(f"  {Colors.BOLD}{label:<40}{Colors.RESET} "
+          f"n={stats['count']:<6} p50={stats['p50']:8.1f}ms "
+          f"p95={stats['p95']:8.1f}ms p99={stats['p99']:8.1f}ms "
+          f"max={stats['max']:8.1f}ms")
+
+
+def time_request(method: str, url: str, **kwargs) -> Tuple[float, Optional[requests.Response]]:
+    """Ejecuta una petición y devuelve (latencia_ms, respuesta)"""
+    kwargs.setdefault("timeout", 60)
+    start = time.perf_counter()
+    try:
+        response = requests.request(method, url, **kwargs)
+    except requests.RequestException:
+        return (time.perf_counter() - start) * 1000, None
+    return (time.perf_counter() - start) * 1000, response
+
+
+def sample_endpoint(path: str, iterations: int, headers: Optional[Dict[str, str]] = None,
+                    params: Optional[Dict[str, str]] = None) -> List[float]:
+    """Mide `iterations` GET secuenciales sobre un endpoint"""
+    latencies = []
+    for _ in range(iterations):
+        elapsed, response = time_request("GET", f"{BASE_URL}{path}", headers=headers, params=params)
+        if response is not None and response.status_code == 200:
+            latencies.append(elapsed)
+    return latencies
+
+
+def fetch_server_memory(base_url: str = BASE_URL) -> Optional[Dict[str, int]]:
+    """Memoria del proceso del backend en bytes ({rss, heapUsed}) desde /health"""
+    _, response = time_request("GET", f"{server_url(base_url)}/health", timeout=10)
+    if response is None or response.status_code != 200:
+        return None
+    return response.json().get("memory")
+
+
+def seed_synthetic(*args: str):
+    """Ejecuta backend/scripts/seed-synthetic.js con los argumentos dados"""
+    command = ["node", "scripts/seed-synthetic.js", *args]
+    print(f"{Colors.BLUE}$ {' '.join(command)}{Colors.RESET}")
+    subprocess.run(command, cwd=BACKEND_DIR, check=True)
+
+
+def results_path(prefix: str) -> str:
+    """Ruta del archivo de resultados para un benchmark"""
+    return os.path.join(RESULTS_DIR, f"{prefix}_{int(time.time())}.json")
+
+
+# ==================== REGISTRO POR REQUEST ====================
+
+class RequestLog:
+    """
+    Registro JSONL de cada request y de muestras de recursos del backend,
+    para generar el reporte HTML (perf_report.py). Se escribe a medida que
+    llega; sin ruta no hace nada, así los harness lo usan siempre.
+
+        {"type": "request", "t": epoch, "endpoint": "/products", "status": 200, "latencyMs": 12.3}
+        {"type": "resource", "t": epoch, "rss": bytes, "heapUsed": bytes}
+    """
+
+    def __init__(self, path: Optional[str], sample_interval: float = 2.0, base_url: str = BASE_URL):
+        self.path = path
+        self.sample_interval = sample_interval
+        self.base_url = base_url
+        self._lock = threading.Lock()
+        self._file = None
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def __enter__(self):
+        if self.path:
+            opener = gzip.open if self.path.endswith(".gz") else open
+            self._file = opener(self.path, "wt", encoding="utf-8")
+            if self.sample_interval > 0:
+                self._sampler = threading.Thread(target=self._sample_resources, daemon=True)
+                self._sampler.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join()
+        if self._file:
+            self._file.close()
+
+    def _write(self, record: Dict):
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def request(self, endpoint: str, status: Optional[int], latency_ms: float):
+        if self._file:
+            self._write({"type": "request", "t": time.time(), "endpoint": endpoint,
+                         "status": status, "latencyMs": round(latency_ms, 3)})
+
+    def _sample_resources(self):
+        while not self._stop.is_set():
+            memory = fetch_server_memory(self.base_url)
+            if memory:
+                self._write({"type": "resource", "t": time.time(), **memory})
+            self._stop.wait(self.sample_interval)
+
+
+def iter_records(path: str):
+    """Lee un registro JSONL (plano o .gz) línea a línea"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+# ==================== MÉTRICAS DE QUERIES DEL BACKEND ====================
+
+def reset_query_metrics(headers: Dict[str, str]) -> bool:
+    """Reinicia las métricas de queries antes de una corrida"""
+    _, response = time_request("POST", f"{BASE_URL}/admin/metrics/queries/reset", headers=headers)
+    return response is not None and response.status_code == 200
+
+
+def fetch_query_metrics(headers: Dict[str, str]) -> Optional[Dict]:
+    """Descarga la foto de métricas de queries (/api/admin/metrics/queries)"""
+    _, response = time_request("GET", f"{BASE_URL}/admin/metrics/queries", headers=headers)
+    if response is None or response.status_code != 200:
+        return None
+    return response.json()['data']
+
+
+def _route_pattern(route: str) -> Tuple[str, "re.Pattern"]:
+    """'GET /api/products/:id' -> ('GET', regex que acepta rutas concretas)"""
+    method, template = route.split(" ", 1)
+    regex = re.sub(r":[A-Za-z_]+", "[^/]+", template.rstrip("/"))
+    return method, re.compile(f"^{regex}/?$")
+
+
+def match_route(method: str, path: str, routes: Dict[str, Dict]) -> Optional[str]:
+    """Encuentra la plantilla de ruta del backend para un path concreto"""
+    path = path.split("?")[0]
+    candidates = []
+    for route in routes:
+        route_method, pattern = _route_pattern(route)
+        if route_method == method and pattern.match(path):
+            candidates.append(route)
+    # La plantilla con menos parámetros es la más específica
+    return min(candidates, key=lambda r: r.count(":")) if candidates else None
+
+
+def merge_query_metrics(report: Dict[str, Dict], metrics: Dict) -> Dict[str, Dict]:
+    """
+    Agrega a cada endpoint del reporte (clave 'METHOD /path') las queries
+    atribuidas por el backend: queries por request, tiempo en BD y sospechas de N+1
+    """
+    routes = metrics.get("routes", {})
+    api_prefix = urlparse(BASE_URL).path.rstrip("/")
+    for endpoint, entry in report.items():
+        method, path = endpoint.split(" ", 1)
+        route = match_route(method, f"{api_prefix}{path}", routes)
+        if route is None:
+            continue
+        stats = routes[route]
+        entry["db"] = {
+            "route": route,
+            "queriesPerRequest": stats["queriesPerRequest"],
+            "maxQueriesPerRequest": stats["maxQueriesPerRequest"],
+            "queryTimeMsPerRequest": round(stats["queryTimeMs"] / stats["requests"], 2) if stats["requests"] else 0,
+            "nPlusOneRequests": stats["nPlusOneRequests"],
+            "repeatedQueries": stats["repeatedQueries"],
+        }
+    return report
+
+
+# ==================== PROFILING DEL BACKEND ====================
+
+def add_profiling_arguments(parser):
+    """Flags comunes para envolver la fase de carga en una captura de profiling"""
+    group = parser.add_argument_group("profiling del backend")
+    group.add_argument("--profile-cpu", action="store_true",
+                       help="Perfil de CPU de la fase de carga (.cpuprofile, flamegraph en DevTools/speedscope)")
+    group.add_argument("--profile-event-loop", action="store_true",
+                       help="Histograma de retraso del event loop durante la carga")
+    group.add_argument("--heap-snapshot", action="store_true",
+                       help="Heap snapshot antes y después de la carga (pausa el backend)")
+    group.add_argument("--profile-sampling-us", type=int, default=1000,
+                       help="Intervalo de muestreo del perfil de CPU")
+    group.add_argument("--profile-dir", default=None,
+                       help="Carpeta donde descargar los artefactos (por defecto profiles_<timestamp>)")
+
+
+class ProfileCapture:
+    """
+    Context manager que inicia las capturas pedidas por flags en el backend
+    (/api/admin/profiling), ejecuta la fase de carga y al salir las detiene
+    y descarga los artefactos. Un fallo del profiling no corta la corrida.
+    """
+
+    def __init__(self, args, label: str, headers: Optional[Dict[str, str]] = None,
+                 base_url: str = BASE_URL):
+        self.args = args
+        self.label = label
+        self.headers = headers
+        self.base_url = base_url
+        self.enabled = args.profile_cpu or args.profile_event_loop or args.heap_snapshot
+        self.artifacts: List[Dict] = []
+        self.event_loop: Optional[Dict] = None
+        self.directory = args.profile_dir or os.path.join(RESULTS_DIR, f"profiles_{int(time.time())}")
+
+    def _post(self, path: str, payload: Optional[Dict] = None) -> Optional[Dict]:
+        _, response = time_request("POST", f"{self.base_url}/admin/profiling{path}",
+                                   headers=self.headers, json=payload or {}, timeout=600)
+        if response is None or response.status_code != 200:
+            status = response.status_code if response is not None else "sin respuesta"
+            print(f"  {Colors.YELLOW}⚠ profiling {path}: {status}{Colors.RESET}")
+            return None
+        return response.json()["data"]
+
+    def _artifact(self, data: Optional[Dict]):
+        if data:
+            self.artifacts.append(data)
+
+    def __enter__(self):
+        if not self.enabled:
+            return self
+        self.headers = self.headers or auth_headers(login(base_url=self.base_url))
+        if self.args.heap_snapshot:
+            self._artifact(self._post("/heap-snapshot", {"label": f"{self.label}-before"}))
+        if self.args.profile_event_loop:
+            self._post("/event-loop/start", {"label": self.label})
+        if self.args.profile_cpu:
+            self._post("/cpu/start", {"label": self.label,
+                                      "samplingIntervalUs": self.args.profile_sampling_us})
+        return self
+
+    def __exit__(self, *exc):
+        if not self.enabled:
+            return
+        if self.args.profile_cpu:
+            self._artifact(self._post("/cpu/stop"))
+        if self.args.profile_event_loop:
+            result = self._post("/event-loop/stop")
+            self._artifact(result)
+            self.event_loop = result and result["summary"]
+        if self.args.heap_snapshot:
+            self._artifact(self._post("/heap-snapshot", {"label": f"{self.label}-after"}))
+        self.download()
+
+    def download(self):
+        os.makedirs(self.directory, exist_ok=True)
+        for artifact in self.artifacts:
+            target = os.path.join(self.directory, artifact["name"])
+            try:
+                with requests.get(f"{self.base_url}/admin/profiling/artifacts/{artifact['name']}",
+                                  headers=self.headers, stream=True, timeout=600) as response:
+                    response.raise_for_status()
+                    with open(target, "wb") as f:
+                        for chunk in response.iter_content(chunk_size=1024 * 1024):
+                            f.write(chunk)
+                artifact["path"] = target
+                print(f"  {Colors.GREEN}✓{Colors.RESET} {artifact['name']} ({artifact['bytes'] / 1024:.0f} KB)")
+            except requests.RequestException as error:
+                print(f"  {Colors.YELLOW}⚠ No se pudo descargar {artifact['name']}: {error}{Colors.RESET}")
+        if self.event_loop:
+            print(f"  Event loop: p50={self.event_loop['p50Ms']:.1f}ms p99={self.event_loop['p99Ms']:.1f}ms "
+                  f"max={self.event_loop['maxMs']:.1f}ms")
+
+    def summary(self) -> Optional[Dict]:
+        if not self.enabled:
+            return None
+        return {"directory": self.directory, "artifacts": self.artifacts, "eventLoop": self.event_loop}
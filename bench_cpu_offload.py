@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Impacto del trabajo de CPU (bcrypt, PDF, Excel) en los endpoints baratos
+Mide el p99 de /categories con una sonda de tasa fija en dos fases:
+    1. reposo: solo la sonda
+    2. contención: la sonda mientras hilos de fondo piden exportaciones de
+       reportes y hacen logins en bucle
+Con el pool de worker threads el p99 en contención debería quedar cerca
+del de reposo; con CPU_POOL_SIZE=0 (todo en el hilo principal) cada
+exportación frena todas las requests.
+
+El backend debe correr con AUTH_RATE_LIMIT_MAX alto para que los logins
+no terminen en 429.
+
+Uso:
+    CPU_POOL_SIZE=0 npm start   # línea base, en backend/
+    python3 bench_cpu_offload.py --label sin-pool
+    npm start                   # con pool
+    python3 bench_cpu_offload.py --label con-pool --baseline bench_cpu_offload_1700000000.json
+    python3 bench_cpu_offload.py --export-workers 4 --login-workers 8 --probe-rate 50
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import requests
+
+from bench_common import (
+    ADMIN_EMAIL, ADMIN_PASSWORD, BASE_URL, Colors, LatencyHistogram, RequestLog,
+    auth_headers, login, print_section, print_summary, results_path, time_request
+)
+from load_open_loop import run_step
+
+DEFAULT_EXPORTS = [
+    "/reports/sales/export/pdf",
+    "/reports/sales/export/excel",
+    "/reports/inventory/export/excel",
+    "/reports/customers/export/excel",
+    "/reports/dashboard/export/pdf",
+]
+
+
+class BackgroundLoad:
+    """Hilos que repiten exportaciones y logins hasta que se detiene la carga"""
+
+    def __init__(self, args, headers: Dict[str, str]):
+        self.args = args
+        self.headers = headers
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+        self.latency = {"export": LatencyHistogram(), "login": LatencyHistogram()}
+        self.statuses = {"export": Counter(), "login": Counter()}
+        self.threads: List[threading.Thread] = []
+
+    def record(self, kind: str, elapsed_ms: float, status: Optional[int]):
+        with self.lock:
+            self.statuses[kind][str(status) if status else "error"] += 1
+            if status is not None and status < 400:
+                self.latency[kind].record(elapsed_ms)
+
+    def export_loop(self, index: int):
+        rng = random.Random(index)
+        session = requests.Session()
+        session.headers.update(self.headers)
+        while not self.stop.is_set():
+            endpoint = rng.choice(self.args.exports)
+            start = time.perf_counter()
+            status = None
+            try:
+                with session.get(f"{BASE_URL}{endpoint}", timeout=self.args.export_timeout,
+                                 stream=True) as response:
+                    for _ in response.iter_content(64 * 1024):
+                        pass
+                    status = response.status_code
+            except requests.RequestException:
+                pass
+            self.record("export", (time.perf_counter() - start) * 1000, status)
+
+    def login_loop(self, index: int):
+        session = requests.Session()
+        while not self.stop.is_set():
+            start = time.perf_counter()
+            status = None
+            try:
+                status = session.post(f"{BASE_URL}/auth/login",
+                                      json={"email": self.args.login_email,
+                                            "password": self.args.login_password},
+                                      timeout=self.args.timeout).status_code
+            except requests.RequestException:
+                pass
+            self.record("login", (time.perf_counter() - start) * 1000, status)
+
+    def start(self):
+        for i in range(self.args.export_workers):
+            self.threads.append(threading.Thread(target=self.export_loop, args=(i,), daemon=True))
+        for i in range(self.args.login_workers):
+            self.threads.append(threading.Thread(target=self.login_loop, args=(i,), daemon=True))
+        for thread in self.threads:
+            thread.start()
+
+    def finish(self) -> Dict:
+        self.stop.set()
+        for thread in self.threads:
+            thread.join(timeout=self.args.export_timeout)
+        return {
+            kind: {
+                "completed": self.latency[kind].count,
+                "statuses": dict(self.statuses[kind]),
+                "latency": self.latency[kind].summary(),
+            }
+            for kind in self.latency
+        }
+
+
+def pool_metrics(headers: Dict[str, str], reset: bool = False) -> Optional[Dict]:
+    """Métricas del pool de worker threads (None si el backend no lo expone)"""
+    if reset:
+        time_request("POST", f"{BASE_URL}/admin/metrics/worker-pool/reset", headers=headers, timeout=10)
+    _, response = time_request("GET", f"{BASE_URL}/admin/metrics/worker-pool", headers=headers, timeout=10)
+    if response is None or response.status_code != 200:
+        return None
+    data = response.json().get("data")
+    return data if isinstance(data, dict) and "queue" in data else None
+
+
+def probe(label: str, args, log: RequestLog) -> Dict:
+    print(f"\n{Colors.BOLD}Sonda {label}{Colors.RESET}: {', '.join(args.probe)} a {args.probe_rate:.0f} req/s "
+          f"durante {args.step_duration:.0f}s")
+    step = run_step(args.probe, args.probe_rate, args, {}, random.Random(args.seed), log)
+    print_summary(label, step["latency"])
+    if step["errors"]:
+        print(f"  {Colors.YELLOW}⚠ {step['errors']} errores: {step['statuses']}{Colors.RESET}")
+    return step
+
+
+def main():
+    parser = argparse.ArgumentParser(description="p99 de endpoints baratos con exportaciones y logins concurrentes")
+    parser.add_argument("--label", default="", help="Etiqueta de la corrida (p. ej. sin-pool / con-pool)")
+    parser.add_argument("--probe", action="append", help="Endpoint de la sonda (repetible; por defecto /categories)")
+    parser.add_argument("--probe-rate", type=float, default=20, help="Requests por segundo de la sonda")
+    parser.add_argument("--step-duration", type=float, default=30, help="Segundos por fase")
+    parser.add_argument("--warmup", type=float, default=3, help="Segundos de carga de fondo antes de medir")
+    parser.add_argument("--export", action="append", dest="exports", help="Exportación a pedir (repetible)")
+    parser.add_argument("--export-workers", type=int, default=2)
+    parser.add_argument("--login-workers", type=int, default=4)
+    parser.add_argument("--login-email", default=ADMIN_EMAIL)
+    parser.add_argument("--login-password", default=ADMIN_PASSWORD)
+    parser.add_argument("--arrivals", choices=["poisson", "fixed"], default="fixed")
+    parser.add_argument("--max-inflight", type=int, default=64)
+    parser.add_argument("--timeout", type=float, default=10)
+    parser.add_argument("--export-timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", help="Resultado previo para comparar el p99 en contención")
+    parser.add_argument("--record", help="Registro JSONL por request para perf_report.py (.gz comprime)")
+    args = parser.parse_args()
+    args.probe = args.probe or ["/categories"]
+    args.exports = args.exports or DEFAULT_EXPORTS
+
+    print_section(f"CPU EN EL EVENT LOOP{f' ({args.label})' if args.label else ''}")
+    headers = auth_headers(login())
+    pool_before = pool_metrics(headers, reset=True)
+    if pool_before is None:
+        print(f"  {Colors.YELLOW}El backend no expone métricas del pool de workers{Colors.RESET}")
+    else:
+        print(f"  Pool de workers: {pool_before.get('size', '?')} hilos "
+              f"(0 = en el hilo principal), cola máx. {pool_before['queue']['max']}")
+
+    with RequestLog(args.record) as log:
+        idle = probe("reposo", args, log)
+
+        print(f"\n{Colors.BOLD}Carga de fondo{Colors.RESET}: {args.export_workers} exportadores, "
+              f"{args.login_workers} logins en bucle")
+        background = BackgroundLoad(args, headers)
+        background.start()
+        time.sleep(args.warmup)
+        contended = probe("contención", args, log)
+        load = background.finish()
+
+    pool = pool_metrics(headers)
+    for kind, stats in load.items():
+        print(f"  {kind:<7} {stats['completed']:6d} completadas  p50={stats['latency']['p50']:8.1f}ms  "
+              f"p99={stats['latency']['p99']:8.1f}ms  {stats['statuses']}")
+    if pool:
+        print(f"  Cola del pool: pico {pool['queue']['peak']}, p99 al encolar {pool['queue']['atEnqueue']['p99']}, "
+              f"rechazadas {pool['rejected']}")
+
+    idle_p99 = idle["latency"]["p99"]
+    contended_p99 = contended["latency"]["p99"]
+    slowdown = contended_p99 / idle_p99 if idle_p99 else 0
+    color = Colors.GREEN if slowdown < 2 else Colors.YELLOW if slowdown < 5 else Colors.RED
+    print(f"\n{Colors.BOLD}p99 de la sonda{Colors.RESET}: reposo {idle_p99:.1f}ms → contención "
+          f"{color}{contended_p99:.1f}ms (×{slowdown:.1f}){Colors.RESET}")
+
+    comparison = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        base_p99 = baseline["contended"]["latency"]["p99"]
+        comparison = {
+            "baseline": args.baseline,
+            "baselineLabel": baseline["config"].get("label", ""),
+            "baselineContendedP99Ms": base_p99,
+            "contendedP99Ms": contended_p99,
+            "change": (contended_p99 - base_p99) / base_p99 if base_p99 else None,
+        }
+        if comparison["change"] is not None:
+            better = comparison["change"] < 0
+            print(f"  vs {comparison['baselineLabel'] or args.baseline}: {base_p99:.1f}ms → {contended_p99:.1f}ms "
+                  f"{Colors.GREEN if better else Colors.RED}({comparison['change']:+.0%}){Colors.RESET}")
+
+    filename = results_path("bench_cpu_offload")
+    with open(filename, "w") as f:
+        json.dump({
+            "timestamp": datetime.now().isoformat(),
+            "config": vars(args),
+            "idle": idle,
+            "contended": contended,
+            "slowdown": slowdown,
+            "background": load,
+            "pool": pool,
+            "comparison": comparison,
+        }, f, indent=2)
+    print(f"\n{Colors.CYAN}📄 Resultados guardados en: {filename}{Colors.RESET}\n")
+
+
+if __name__ == "__main__":
+    main()
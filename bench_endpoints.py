@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Reporte de latencia por endpoint con métricas de base de datos
+Ejecuta carga concurrente sobre un conjunto de endpoints, descarga las
+métricas de queries del backend (/api/admin/metrics/queries) y las combina
+en un reporte por endpoint: latencias, queries por request, tiempo en BD,
+sospechas de N+1 y las queries más lentas.
+
+Uso:
+    python3 bench_endpoints.py --requests 200 --concurrency 8
+    python3 bench_endpoints.py --endpoint /products --endpoint /categories
+"""
+
+import argparse
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from bench_common import (
+    BASE_URL, Colors, auth_headers, fetch_query_metrics, login,
+    merge_query_metrics, print_section, print_summary, reset_query_metrics,
+    results_path, summarize, time_request
+)
+
+# Endpoints de lectura más usados por la app
+DEFAULT_ENDPOINTS = [
+    "/categories",
+    "/products",
+    "/products?limit=50",
+    "/gamification/loyalty",
+    "/gamification/badges/next",
+    "/notifications",
+    "/wishlist",
+    "/admin/dashboard",
+    "/admin/orders",
+    "/admin/users",
+]
+
+
+def load_endpoint(path, headers, requests_count, concurrency):
+    """Ejecuta `requests_count` GET con `concurrency` hilos"""
+    def one(_):
+        return time_request("GET", f"{BASE_URL}{path}", headers=headers)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(one, range(requests_count)))
+
+    statuses = {}
+    latencies = []
+    for elapsed, response in samples:
+        status = str(response.status_code) if response is not None else "error"
+        statuses[status] = statuses.get(status, 0) + 1
+        if response is not None and response.status_code < 400:
+            latencies.append(elapsed)
+
+    return {"latency": summarize(latencies), "statuses": statuses}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reporte de latencia por endpoint")
+    parser.add_argument("--requests", type=int, default=100, help="Requests por endpoint")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--endpoint", action="append", dest="endpoints",
+                        help="Endpoint a medir (repetible, relativo a /api)")
+    args = parser.parse_args()
+
+    print_section("REPORTE POR ENDPOINT")
+
+    headers = auth_headers(login())
+    if not reset_query_metrics(headers):
+        print(f"{Colors.YELLOW}⚠ No se pudieron reiniciar las métricas de queries{Colors.RESET}")
+
+    report = {}
+    for path in args.endpoints or DEFAULT_ENDPOINTS:
+        entry = load_endpoint(path, headers, args.requests, args.concurrency)
+        report[f"GET {path}"] = entry
+        print_summary(path, entry["latency"])
+
+    metrics = fetch_query_metrics(headers)
+    if metrics is None:
+        print(f"\n{Colors.YELLOW}⚠ Métricas de queries no disponibles{Colors.RESET}")
+    else:
+        merge_query_metrics(report, metrics)
+
+        print(f"\n{Colors.BOLD}Base de datos por endpoint{Colors.RESET}")
+        for endpoint, entry in report.items():
+            db = entry.get("db")
+            if not db:
+                continue
+            flag = f" {Colors.RED}N+1{Colors.RESET}" if db["nPlusOneRequests"] else ""
+            print(f"  {endpoint:<40} queries/req={db['queriesPerRequest']:<6} "
+                  f"max={db['maxQueriesPerRequest']:<4} bd={db['queryTimeMsPerRequest']:7.1f}ms{flag}")
+            for query, count in db["repeatedQueries"].items():
+                print(f"      ↳ {query} x{count}")
+
+        if metrics["slowQueries"]:
+            print(f"\n{Colors.BOLD}Queries más lentas{Colors.RESET}")
+            for slow in metrics["slowQueries"][:10]:
+                print(f"  {slow['durationMs']:8.1f}ms {slow['query']:<35} {slow['route']}")
+
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "config": vars(args),
+        "endpoints": report,
+        "queryMetrics": metrics,
+    }
+    filename = results_path("bench_endpoints")
+    with open(filename, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n{Colors.CYAN}📄 Resultados guardados en: {filename}{Colors.RESET}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Bytes y tiempo de una página de listado de productos con sus imágenes
+Carga /products y descarga la imagen de cada producto como lo haría un
+navegador con N conexiones, en dos modos:
+    original   la imageUrl tal como se subió (comportamiento anterior)
+    rendition  la mejor candidata del imageSet para el ancho mostrado:
+               primer formato aceptado (AVIF, WebP) y el menor ancho que
+               cubra ancho × DPR
+Además verifica el cacheo de las renditions: Cache-Control immutable,
+revalidación con ETag (304) y requests Range (206).
+
+Uso:
+    python3 bench_image_delivery.py
+    python3 bench_image_delivery.py --limit 40 --display-width 300 --dpr 2 --iterations 5
+    python3 bench_image_delivery.py --accept webp --connections 6
+"""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import urljoin
+
+import requests
+
+from bench_common import (
+    BASE_URL, SERVER_URL, Colors, LatencyHistogram, print_section, print_summary,
+    results_path
+)
+
+FORMAT_TYPES = {"avif": "image/avif", "webp": "image/webp"}
+
+
+def parse_srcset(srcset: str) -> List[Dict]:
+    """'/a-320.webp 320w, /a-640.webp 640w' -> [{url, width}] ordenado por ancho"""
+    candidates = []
+    for entry in srcset.split(","):
+        url, _, descriptor = entry.strip().rpartition(" ")
+        if url and descriptor.endswith("w"):
+            candidates.append({"url": url, "width": int(descriptor[:-1])})
+    return sorted(candidates, key=lambda c: c["width"])
+
+
+def choose_rendition(image_set: Dict, accept: List[str], target_width: int) -> Optional[str]:
+    """Lo que elegiría <picture>: primer formato aceptado, menor ancho suficiente"""
+    for fmt in accept:
+        source = next((s for s in image_set.get("sources", []) if s["type"] == FORMAT_TYPES[fmt]), None)
+        if not source:
+            continue
+        candidates = parse_srcset(source["srcset"])
+        if candidates:
+            fitting = [c for c in candidates if c["width"] >= target_width]
+            return (fitting[0] if fitting else candidates[-1])["url"]
+    return image_set.get("src")
+
+
+def absolute(url: str) -> str:
+    return urljoin(SERVER_URL + "/", url)
+
+
+def image_urls(products: List[Dict], mode: str, args) -> List[str]:
+    urls = []
+    for product in products:
+        if mode == "rendition" and product.get("imageSet"):
+            url = choose_rendition(product["imageSet"], args.accept, args.display_width * args.dpr)
+        else:
+            url = product.get("imageUrl")
+        if not url or (url.startswith("http") and not args.include_external):
+            continue
+        urls.append(absolute(url))
+    return urls
+
+
+def load_page(mode: str, args) -> Dict:
+    """Una carga completa: listado + imágenes en paralelo"""
+    local = threading.local()
+
+    def fetch(url: str):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            response = session.get(url, timeout=args.timeout)
+            return (time.perf_counter() - start) * 1000, response.status_code, len(response.content), \
+                response.headers.get("Content-Type", "")
+        except requests.RequestException:
+            return (time.perf_counter() - start) * 1000, None, 0, ""
+
+    start = time.perf_counter()
+    response = requests.get(f"{BASE_URL}/products", params={"limit": args.limit}, timeout=args.timeout)
+    response.raise_for_status()
+    listing_bytes = len(response.content)
+    products = response.json()["data"]["products"]
+    urls = image_urls(products, mode, args)
+
+    with ThreadPoolExecutor(max_workers=args.connections) as pool:
+        results = list(pool.map(fetch, urls))
+    elapsed = (time.perf_counter() - start) * 1000
+
+    return {
+        "pageMs": elapsed,
+        "listingBytes": listing_bytes,
+        "images": len(urls),
+        "imageBytes": sum(r[2] for r in results),
+        "imageLatencies": [r[0] for r in results if r[1] == 200],
+        "errors": sum(1 for r in results if r[1] != 200),
+        "contentTypes": sorted({r[3] for r in results if r[3]}),
+        "urls": urls,
+    }
+
+
+def measure_mode(mode: str, args) -> Dict:
+    print(f"\n{Colors.BOLD}Modo {mode}{Colors.RESET}")
+    loads = [load_page(mode, args) for _ in range(args.iterations)]
+    latency = LatencyHistogram()
+    for load in loads:
+        for value in load["imageLatencies"]:
+            latency.record(value)
+
+    page_ms = statistics.median(load["pageMs"] for load in loads)
+    last = loads[-1]
+    total_bytes = last["listingBytes"] + last["imageBytes"]
+    print(f"  {last['images']} imágenes, {total_bytes / 1024:,.1f} KiB por página "
+          f"(listado {last['listingBytes'] / 1024:,.1f} KiB), mediana de página {page_ms:,.1f}ms")
+    if last["contentTypes"]:
+        print(f"  Tipos servidos: {', '.join(last['contentTypes'])}")
+    if last["errors"]:
+        print(f"  {Colors.YELLOW}⚠ {last['errors']} imágenes con error{Colors.RESET}")
+    print_summary(f"imagen ({mode})", latency.summary())
+
+    return {
+        "images": last["images"],
+        "listingBytes": last["listingBytes"],
+        "imageBytes": last["imageBytes"],
+        "totalBytes": total_bytes,
+        "pageMsMedian": page_ms,
+        "pageMs": [load["pageMs"] for load in loads],
+        "imageLatency": latency.summary(),
+        "errors": last["errors"],
+        "contentTypes": last["contentTypes"],
+        "sampleUrls": last["urls"][:3],
+    }
+
+
+def check_caching(url: str, timeout: float) -> Dict:
+    """Cabeceras de cacheo, revalidación con ETag y soporte de Range"""
+    response = requests.get(url, timeout=timeout)
+    etag = response.headers.get("ETag")
+    cache_control = response.headers.get("Cache-Control", "")
+    revalidation = requests.get(url, headers={"If-None-Match": etag}, timeout=timeout) if etag else None
+    ranged = requests.get(url, headers={"Range": "bytes=0-1023"}, timeout=timeout)
+    return {
+        "url": url,
+        "cacheControl": cache_control,
+        "immutable": "immutable" in cache_control,
+        "etag": etag,
+        "revalidationStatus": revalidation.status_code if revalidation is not None else None,
+        "revalidationBytes": len(revalidation.content) if revalidation is not None else None,
+        "rangeStatus": ranged.status_code,
+        "rangeBytes": len(ranged.content),
+    }
+
+
+def mark(condition: bool) -> str:
+    return f"{Colors.GREEN}✓{Colors.RESET}" if condition else f"{Colors.RED}✗{Colors.RESET}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes y tiempo de imágenes en el listado de productos")
+    parser.add_argument("--limit", type=int, default=24, help="Productos por página")
+    parser.add_argument("--display-width", type=int, default=300, help="Ancho CSS de la tarjeta (px)")
+    parser.add_argument("--dpr", type=int, default=2, help="Densidad de píxeles del dispositivo")
+    parser.add_argument("--accept", default="avif,webp", help="Formatos aceptados en orden de preferencia")
+    parser.add_argument("--connections", type=int, default=6, help="Conexiones en paralelo (como un navegador)")
+    parser.add_argument("--iterations", type=int, default=3, help="Cargas de página por modo")
+    parser.add_argument("--include-external", action="store_true",
+                        help="Descargar también imágenes en dominios externos")
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args()
+    args.accept = [fmt for fmt in args.accept.split(",") if fmt in FORMAT_TYPES]
+
+    print_section("ENTREGA DE IMÁGENES DEL LISTADO")
+    print(f"  {args.limit} productos, tarjeta de {args.display_width}px × DPR {args.dpr}, "
+          f"formatos {', '.join(args.accept) or 'ninguno'}, {args.connections} conexiones")
+
+    modes = {mode: measure_mode(mode, args) for mode in ("original", "rendition")}
+
+    original, rendition = modes["original"], modes["rendition"]
+    if original["totalBytes"]:
+        saved = 1 - rendition["totalBytes"] / original["totalBytes"]
+        faster = 1 - rendition["pageMsMedian"] / original["pageMsMedian"] if original["pageMsMedian"] else 0
+        color = Colors.GREEN if saved > 0 else Colors.RED
+        print(f"\n{Colors.BOLD}Por página{Colors.RESET}: {original['totalBytes'] / 1024:,.1f} KiB → "
+              f"{color}{rendition['totalBytes'] / 1024:,.1f} KiB ({saved:.0%} menos){Colors.RESET}, "
+              f"{original['pageMsMedian']:,.0f}ms → {rendition['pageMsMedian']:,.0f}ms ({faster:.0%} menos)")
+
+    caching = None
+    if rendition["sampleUrls"]:
+        caching = check_caching(rendition["sampleUrls"][0], args.timeout)
+        print(f"\n{Colors.BOLD}Cacheo de {caching['url']}{Colors.RESET}")
+        print(f"  {mark(caching['immutable'])} Cache-Control: {caching['cacheControl'] or '(ninguno)'}")
+        print(f"  {mark(caching['revalidationStatus'] == 304)} If-None-Match → {caching['revalidationStatus']}")
+        print(f"  {mark(caching['rangeStatus'] == 206)} Range bytes=0-1023 → {caching['rangeStatus']} "
+              f"({caching['rangeBytes']} bytes)")
+
+    filename = results_path("bench_image_delivery")
+    with open(filename, "w") as f:
+        json.dump({
+            "timestamp": datetime.now().isoformat(),
+            "config": vars(args),
+            "modes": modes,
+            "caching": caching,
+        }, f, indent=2)
+    print(f"\n{Colors.CYAN}📄 Resultados guardados en: {filename}{Colors.RESET}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark de paginación: offset vs cursor (keyset)
+Para cada endpoint de lista mide la página 1 y una página profunda
+(1000 por defecto) con page/limit y con cursor. Con keyset la página
+profunda debe costar lo mismo que la primera.
+
+Uso:
+    python3 bench_pagination.py --orders-per-user 4 --users 10000
+    python3 bench_pagination.py --skip-seed --page 1000 --limit 20
+"""
+
+import argparse
+import json
+from datetime import datetime
+
+from bench_common import (
+    BASE_URL, Colors, auth_headers, login, print_section, print_summary,
+    results_path, seed_synthetic, summarize, time_request
+)
+
+# (ruta, función que extrae la paginación de la respuesta)
+ENDPOINTS = [
+    ("/products", lambda body: body["data"]["pagination"]),
+    ("/admin/orders", lambda body: body["data"]["pagination"]),
+    ("/admin/users", lambda body: body["data"]["pagination"]),
+    ("/inventory/movements", lambda body: body["pagination"]),
+]
+
+
+def sample(path, headers, params, iterations):
+    latencies = []
+    for _ in range(iterations):
+        elapsed, response = time_request("GET", f"{BASE_URL}{path}", headers=headers, params=params)
+        if response is not None and response.status_code == 200:
+            latencies.append(elapsed)
+    return summarize(latencies)
+
+
+def walk_to_page(path, headers, limit, page, get_pagination):
+    """Sigue nextCursor hasta la página indicada; devuelve su cursor"""
+    cursor = None
+    for _ in range(page - 1):
+        params = {"limit": limit, "count": "false"}
+        if cursor:
+            params["cursor"] = cursor
+        _, response = time_request("GET", f"{BASE_URL}{path}", headers=headers, params=params)
+        if response is None or response.status_code != 200:
+            return None
+        cursor = get_pagination(response.json()).get("nextCursor")
+        if not cursor:
+            return None
+    return cursor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de paginación offset vs keyset")
+    parser.add_argument("--users", type=int, default=25000)
+    parser.add_argument("--orders-per-user", type=float, default=2)
+    parser.add_argument("--products", type=int, default=25000)
+    parser.add_argument("--movements", type=int, default=100000)
+    parser.add_argument("--page", type=int, default=1000, help="Página profunda a comparar")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--skip-seed", action="store_true",
+                        help="Usar el dataset sintético existente")
+    args = parser.parse_args()
+
+    print_section("BENCHMARK DE PAGINACIÓN")
+
+    if not args.skip_seed:
+        seed_synthetic("--reset", "--users", str(args.users),
+                       "--orders-per-user", str(args.orders_per_user),
+                       "--products", str(args.products),
+                       "--movements", str(args.movements))
+
+    headers = auth_headers(login())
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "config": vars(args),
+        "endpoints": {},
+    }
+
+    for path, get_pagination in ENDPOINTS:
+        print(f"\n{Colors.BOLD}{path}{Colors.RESET}")
+        entry = {
+            "offsetPage1": sample(path, headers, {"page": 1, "limit": args.limit}, args.iterations),
+            "offsetDeep": sample(path, headers, {"page": args.page, "limit": args.limit}, args.iterations),
+            "offsetDeepNoCount": sample(path, headers, {"page": args.page, "limit": args.limit, "count": "false"},
+                                        args.iterations),
+            "cursorPage1": sample(path, headers, {"limit": args.limit, "count": "false"}, args.iterations),
+        }
+
+        cursor = walk_to_page(path, headers, args.limit, args.page, get_pagination)
+        if cursor:
+            entry["cursorDeep"] = sample(path, headers, {"limit": args.limit, "count": "false", "cursor": cursor},
+                                         args.iterations)
+        else:
+            print(f"  {Colors.YELLOW}⚠ No hay {args.page} páginas; se omite la página profunda por cursor{Colors.RESET}")
+
+        print_summary("offset página 1", entry["offsetPage1"])
+        print_summary(f"offset página {args.page}", entry["offsetDeep"])
+        print_summary(f"offset página {args.page} (count=false)", entry["offsetDeepNoCount"])
+        print_summary("cursor página 1", entry["cursorPage1"])
+        if "cursorDeep" in entry:
+            print_summary(f"cursor página {args.page}", entry["cursorDeep"])
+            base = entry["cursorPage1"]["p50"] or 1
+            ratio = entry["cursorDeep"]["p50"] / base
+            entry["cursorDeepRatio"] = ratio
+            color = Colors.GREEN if ratio < 1.5 else Colors.RED
+            print(f"  {color}p50 página {args.page} / página 1 (cursor): {ratio:.2f}x{Colors.RESET}")
+
+        results["endpoints"][path] = entry
+
+    filename = results_path("bench_pagination")
+    with open(filename, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n{Colors.CYAN}📄 Resultados guardados en: {filename}{Colors.RESET}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Benchmark de agregados de calificación por producto
+Genera reseñas sintéticas, reconstruye los agregados, ejercita los caminos
+incrementales (aprobar, rechazar, eliminar) y verifica que el agregado
+guardado coincida con las reseñas. Mide la latencia del resumen
+(lectura de una fila) y del listado ordenado por rating.
+
+Uso:
+    python3 bench_ratings.py --users 5000 --products 500 --reviews 200000
+    python3 bench_ratings.py --skip-seed --moderate 200 --sample 20
+"""
+
+import argparse
+import json
+import random
+from datetime import datetime
+
+from bench_common import (
+    BASE_URL, Colors, auth_headers, login, print_section, print_summary,
+    results_path, sample_endpoint, seed_synthetic, summarize, time_request
+)
+
+
+def api(method, path, headers, **kwargs):
+    """Petición que devuelve el JSON o None si falla"""
+    _, response = time_request(method, f"{BASE_URL}{path}", headers=headers, **kwargs)
+    if response is None or response.status_code >= 400:
+        status = response.status_code if response is not None else "sin respuesta"
+        print(f"  {Colors.RED}✗ {method} {path}: {status}{Colors.RESET}")
+        return None
+    return response.json()
+
+
+def verify(headers, product_ids=None, limit=None):
+    """Verificación del backend: agregado guardado vs reseñas agrupadas"""
+    params = {}
+    if product_ids:
+        params["productIds"] = ",".join(product_ids)
+    if limit:
+        params["limit"] = limit
+    return api("GET", "/review/admin/ratings/verify", headers, params=params, timeout=600)
+
+
+def report_verification(label, result):
+    if result is None:
+        return
+    mismatches = result["mismatches"]
+    color = Colors.GREEN if not mismatches else Colors.RED
+    mark = "✓" if not mismatches else "✗"
+    print(f"  {color}{mark}{Colors.RESET} {label}: {result['checked']} productos, "
+          f"{len(mismatches)} diferencias")
+    for mismatch in mismatches[:5]:
+        print(f"      ↳ {mismatch['productId']} {mismatch['field']}: "
+              f"guardado={mismatch['stored']} real={mismatch['actual']}")
+
+
+def moderate(headers, count):
+    """
+    Ejercita los caminos incrementales: aprueba reseñas pendientes, rechaza
+    y elimina parte de las aprobadas. Devuelve los productos tocados.
+    """
+    touched = set()
+    pending = api("GET", "/review/admin/pending", headers, params={"limit": count}) or {"reviews": []}
+    approved = []
+
+    for review in pending["reviews"]:
+        if api("PUT", f"/review/admin/{review['id']}/approve", headers):
+            approved.append(review)
+            touched.add(review["productId"])
+
+    # Un tercio se rechaza después de aprobado, otro tercio se elimina
+    for index, review in enumerate(approved):
+        if index % 3 == 1:
+            api("PUT", f"/review/admin/{review['id']}/reject", headers, json={"reason": "Benchmark"})
+        elif index % 3 == 2:
+            api("DELETE", f"/review/{review['id']}", headers)
+
+    return {"approved": len(approved), "products": sorted(touched)}
+
+
+def recount_from_reviews(headers, product_id, page_size=100):
+    """Cuenta las reseñas aprobadas de un producto recorriendo el listado público"""
+    counts = {"totalReviews": 0, "ratingSum": 0, "verified": 0, "distribution": {r: 0 for r in range(1, 6)}}
+    page = 1
+    while True:
+        body = api("GET", f"/review/product/{product_id}", headers,
+                   params={"page": page, "limit": page_size})
+        if body is None:
+            return None
+        for review in body["reviews"]:
+            counts["totalReviews"] += 1
+            counts["ratingSum"] += review["rating"]
+            counts["distribution"][review["rating"]] += 1
+            if review["isVerifiedPurchase"]:
+                counts["verified"] += 1
+        if page >= body["pagination"]["pages"]:
+            return counts
+        page += 1
+
+
+def summary_matches(summary, counts):
+    total = counts["totalReviews"]
+    average = round(counts["ratingSum"] / total, 2) if total else 0
+    return (
+        summary["totalReviews"] == total
+        and summary["verifiedPurchases"] == counts["verified"]
+        and abs(summary["averageRating"] - average) < 0.01
+        and all(entry["count"] == counts["distribution"][entry["rating"]]
+                for entry in summary["distribution"])
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de agregados de calificación")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--reviews", type=int, default=200000)
+    parser.add_argument("--moderate", type=int, default=150,
+                        help="Reseñas pendientes a moderar por la API")
+    parser.add_argument("--sample", type=int, default=10,
+                        help="Productos a recontar desde el listado público")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--skip-seed", action="store_true",
+                        help="Usar el dataset sintético existente")
+    args = parser.parse_args()
+
+    print_section("BENCHMARK DE AGREGADOS DE CALIFICACIÓN")
+
+    if not args.skip_seed:
+        seed_synthetic("--reset", "--users", str(args.users),
+                       "--products", str(args.products),
+                       "--reviews", str(args.reviews))
+
+    headers = auth_headers(login())
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "config": vars(args),
+    }
+
+    # 1. Reconstrucción completa (las reseñas sembradas no pasan por la API)
+    print(f"{Colors.BOLD}Reconstrucción de agregados...{Colors.RESET}")
+    elapsed, response = time_request("POST", f"{BASE_URL}/review/admin/ratings/rebuild",
+                                     headers=headers, json={}, timeout=3600)
+    if response is None or response.status_code != 200:
+        print(f"{Colors.RED}✗ Reconstrucción fallida{Colors.RESET}")
+        return
+    rebuild = response.json()
+    results["rebuild"] = {**rebuild, "wallClockMs": elapsed}
+    print(f"  {Colors.GREEN}✓{Colors.RESET} {rebuild['processed']} productos en "
+          f"{rebuild['durationMs']}ms ({rebuild['productsPerSecond']} productos/s)")
+
+    verification = verify(headers, limit=rebuild["processed"])
+    report_verification("Tras reconstrucción", verification)
+    results["verifyAfterRebuild"] = verification
+
+    # 2. Caminos incrementales
+    print(f"\n{Colors.BOLD}Moderación incremental...{Colors.RESET}")
+    moderation = moderate(headers, args.moderate)
+    print(f"  {moderation['approved']} aprobadas en {len(moderation['products'])} productos")
+    if moderation["products"]:
+        verification = verify(headers, product_ids=moderation["products"])
+        report_verification("Tras moderación", verification)
+        results["verifyAfterModeration"] = verification
+    results["moderation"] = {"approved": moderation["approved"],
+                             "products": len(moderation["products"])}
+
+    # 3. Recuento independiente desde el listado público
+    print(f"\n{Colors.BOLD}Recuento desde reseñas públicas...{Colors.RESET}")
+    product_ids = [f"syn_p_{i:08d}" for i in range(args.products)]
+    rng = random.Random(42)
+    sampled = rng.sample(product_ids, min(args.sample, len(product_ids)))
+    mismatched = []
+    for product_id in sampled:
+        summary = api("GET", f"/review/product/{product_id}/summary", headers)
+        counts = recount_from_reviews(headers, product_id)
+        if summary is None or counts is None or not summary_matches(summary, counts):
+            mismatched.append(product_id)
+    color = Colors.GREEN if not mismatched else Colors.RED
+    print(f"  {color}{len(sampled) - len(mismatched)}/{len(sampled)} resúmenes coinciden{Colors.RESET}")
+    results["recount"] = {"sampled": len(sampled), "mismatched": mismatched}
+
+    # 4. Latencias
+    print(f"\n{Colors.BOLD}Latencias{Colors.RESET}")
+    summary_latencies = []
+    for _ in range(args.iterations):
+        product_id = rng.choice(product_ids)
+        summary_latencies.extend(sample_endpoint(f"/review/product/{product_id}/summary", 1, headers=headers))
+    results["summaryLatency"] = summarize(summary_latencies)
+    print_summary("resumen de producto", results["summaryLatency"])
+
+    results["ratingSortLatency"] = summarize(sample_endpoint(
+        "/products", args.iterations // 4 or 1, headers=headers,
+        params={"sortBy": "rating_desc", "limit": 20, "count": "false"}))
+    print_summary("productos por rating (página 1)", results["ratingSortLatency"])
+
+    filename = results_path("bench_ratings")
+    with open(filename, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n{Colors.CYAN}📄 Resultados guardados en: {filename}{Colors.RESET}\n")
+
+
+if __name__ == "__main__":
+    main()
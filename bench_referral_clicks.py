@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Ráfaga de clics en links de referido
+Envía --clicks clics (por defecto 50k) a POST /gamification/referrals/track-click
+en --duration segundos (lazo abierto, llegadas Poisson o fijas), repartidos
+entre los códigos de --codes usuarios referrers de prueba; el primero
+recibe --hot-share de los clics (un link viral). Mide la latencia desde el
+instante previsto de cada clic y, al terminar, espera a que los clics se
+vuelquen y verifica por referrer que:
+    - el contador de /referrals/stats (stats.clicks) subió exactamente lo aceptado
+    - los agregados por minuto de /referrals/clicks suman lo mismo
+También reporta las queries a la base por clic (las de la ruta más las del
+volcado en segundo plano, desde /admin/metrics/queries).
+
+El backend debe aceptar la ráfaga sin rate limit. Para comparar contra la
+línea base que escribe cada clic:
+    RATE_LIMIT_MAX=1000000 REFERRAL_CLICK_BUFFER=false npm start   # en backend/
+    python3 bench_referral_clicks.py --label por-clic
+    RATE_LIMIT_MAX=1000000 npm start
+    python3 bench_referral_clicks.py --label buffer --baseline bench_referral_clicks_1700000000.json
+
+Uso:
+    python3 bench_referral_clicks.py
+    python3 bench_referral_clicks.py --clicks 100000 --duration 60 --codes 20 --hot-share 0.8
+    python3 bench_referral_clicks.py --arrivals fixed --max-inflight 512
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import requests
+
+from bench_common import (
+    BASE_URL, Colors, auth_headers, fetch_query_metrics, login, print_section,
+    print_summary, reset_query_metrics, results_path, time_request
+)
+from load_open_loop import StepRecorder, arrival_offsets
+
+CLICK_ROUTE = "POST /api/gamification/referrals/track-click"
+REFERRER_PASSWORD = "BenchRef1!"
+
+
+def referrer_token(index: int) -> str:
+    """Token de un referrer de prueba; lo registra si no existe"""
+    email = f"bench.referrer{index}@carnes.test"
+    try:
+        return login(email, REFERRER_PASSWORD)
+    except requests.HTTPError:
+        response = requests.post(f"{BASE_URL}/auth/register", json={
+            "name": f"Bench Referrer {index}",
+            "email": email,
+            "password": REFERRER_PASSWORD
+        }, timeout=30)
+        response.raise_for_status()
+        return response.json()["data"]["token"]
+
+
+def referrer_counts(headers: Dict[str, str]) -> Dict[str, int]:
+    """Clics según el contador mantenido y según los agregados por minuto"""
+    _, stats = time_request("GET", f"{BASE_URL}/gamification/referrals/stats", headers=headers, timeout=30)
+    _, minutes = time_request("GET", f"{BASE_URL}/gamification/referrals/clicks", headers=headers,
+                              params={"minutes": 24 * 60}, timeout=30)
+    return {
+        "counter": stats.json()["data"]["stats"].get("clicks", 0) if stats is not None and stats.ok else None,
+        "minutes": minutes.json()["data"]["total"] if minutes is not None and minutes.ok else None,
+    }
+
+
+def click_metrics(headers: Dict[str, str], reset: bool = False) -> Optional[Dict]:
+    """Métricas del buffer de clics (None si el backend no las expone)"""
+    if reset:
+        time_request("POST", f"{BASE_URL}/admin/metrics/referral-clicks/reset", headers=headers, timeout=10)
+    _, response = time_request("GET", f"{BASE_URL}/admin/metrics/referral-clicks", headers=headers, timeout=10)
+    if response is None or response.status_code != 200:
+        return None
+    data = response.json().get("data")
+    return data if isinstance(data, dict) and "pendingClicks" in data else None
+
+
+def burst(codes: List[str], headers: Dict[str, str], args) -> Dict:
+    """Dispara la ráfaga en lazo abierto; devuelve latencias y clics aceptados por código"""
+    rng = random.Random(args.seed)
+    rate = args.clicks / args.duration
+    offsets = arrival_offsets(rate, args.duration, args.arrivals, rng)
+    weights = [args.hot_share] + [(1 - args.hot_share) / (len(codes) - 1)] * (len(codes) - 1) \
+        if len(codes) > 1 else [1.0]
+    recorder = StepRecorder()
+    accepted: Counter = Counter()
+    accepted_lock = threading.Lock()
+    local = threading.local()
+
+    def fire(code: str, intended: float):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+            session.headers.update(headers)
+        started = time.perf_counter()
+        status = None
+        try:
+            status = session.post(f"{BASE_URL}/gamification/referrals/track-click",
+                                  json={"code": code}, timeout=args.timeout).status_code
+        except requests.RequestException:
+            pass
+        finished = time.perf_counter()
+        recorder.record(intended, started, finished, status)
+        if status == 200:
+            with accepted_lock:
+                accepted[code] += 1
+
+    with ThreadPoolExecutor(max_workers=args.max_inflight) as pool:
+        begin = time.perf_counter() + 0.1
+        for offset in offsets:
+            intended = begin + offset
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            recorder.dispatch_lag.record(max(0.0, time.perf_counter() - intended) * 1000)
+            pool.submit(fire, rng.choices(codes, weights)[0], intended)
+
+    elapsed = max(recorder.last_completion - begin, args.duration)
+    return {
+        "sent": len(offsets),
+        "accepted": dict(accepted),
+        "achievedRps": round(sum(accepted.values()) / elapsed, 1),
+        "latency": recorder.latency.summary(),
+        "service": recorder.service.summary(),
+        "dispatchLagP99Ms": recorder.dispatch_lag.percentile(99),
+        "statuses": dict(recorder.statuses),
+    }
+
+
+def verify(referrers: List[Dict], accepted: Dict[str, int], args) -> List[Dict]:
+    """Espera el volcado hasta --settle segundos y compara los conteos por referrer"""
+    deadline = time.time() + args.settle
+    while True:
+        rows = []
+        for referrer in referrers:
+            after = referrer_counts(referrer["headers"])
+            expected = accepted.get(referrer["code"], 0)
+            row = {"code": referrer["code"], "accepted": expected}
+            for source in ("counter", "minutes"):
+                before, now = referrer["before"][source], after[source]
+                row[source] = now - before if before is not None and now is not None else None
+            row["ok"] = row["counter"] == expected and row["minutes"] == expected
+            rows.append(row)
+        if all(row["ok"] for row in rows) or time.time() >= deadline:
+            return rows
+        time.sleep(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ráfaga de clics en links de referido")
+    parser.add_argument("--label", default="", help="Etiqueta de la corrida (p. ej. por-clic / buffer)")
+    parser.add_argument("--clicks", type=int, default=50000, help="Clics a enviar")
+    parser.add_argument("--duration", type=float, default=60, help="Segundos de la ráfaga")
+    parser.add_argument("--codes", type=int, default=5, help="Referrers de prueba (un código cada uno)")
+    parser.add_argument("--hot-share", type=float, default=0.5, help="Fracción de clics del primer código")
+    parser.add_argument("--arrivals", choices=["poisson", "fixed"], default="poisson")
+    parser.add_argument("--max-inflight", type=int, default=256,
+                        help="Hilos de envío; los clics en espera cuentan como latencia")
+    parser.add_argument("--settle", type=float, default=30, help="Segundos máximos de espera del volcado")
+    parser.add_argument("--timeout", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", help="Resultado previo para comparar latencia y queries por clic")
+    args = parser.parse_args()
+
+    print_section(f"RÁFAGA DE {args.clicks:,} CLICS DE REFERIDO EN {args.duration:.0f}s"
+                  f"{f' ({args.label})' if args.label else ''}")
+
+    admin = auth_headers(login())
+    referrers = []
+    for index in range(args.codes):
+        headers = auth_headers(referrer_token(index))
+        _, response = time_request("GET", f"{BASE_URL}/gamification/referrals/code", headers=headers, timeout=30)
+        response.raise_for_status()
+        referrers.append({"code": response.json()["data"]["code"], "headers": headers,
+                          "before": referrer_counts(headers)})
+    print(f"  Códigos: {', '.join(r['code'] for r in referrers)} "
+          f"({args.hot_share:.0%} de los clics al primero)")
+
+    reset_query_metrics(admin)
+    metrics_before = click_metrics(admin, reset=True)
+    print(f"  Buffer de clics: {'habilitado' if metrics_before and metrics_before['enabled'] else 'deshabilitado (escritura por clic)'}")
+
+    result = burst([r["code"] for r in referrers], admin, args)
+    print_summary("track-click (desde el instante previsto)", result["latency"])
+    print_summary("track-click (servicio)", result["service"])
+    print(f"  Enviados {result['sent']:,}, aceptados {sum(result['accepted'].values()):,} "
+          f"({result['achievedRps']:,} clics/s); respuestas {result['statuses']}")
+    if result["dispatchLagP99Ms"] > 10:
+        print(f"  {Colors.YELLOW}⚠ retraso del despachador p99 {result['dispatchLagP99Ms']:.1f}ms: "
+              f"subir --max-inflight o bajar la tasa{Colors.RESET}")
+
+    rows = verify(referrers, result["accepted"], args)
+    print(f"\n  {'código':<10} {'aceptados':>10} {'contador':>10} {'por minuto':>11}")
+    for row in rows:
+        color = Colors.GREEN if row["ok"] else Colors.RED
+        print(f"  {row['code']:<10} {row['accepted']:>10,} {color}{row['counter'] if row['counter'] is not None else '-':>10}"
+              f" {row['minutes'] if row['minutes'] is not None else '-':>11}{Colors.RESET}")
+    verified = all(row["ok"] for row in rows)
+    print(f"  Conteos: {Colors.GREEN + 'coinciden' if verified else Colors.RED + 'NO coinciden'}{Colors.RESET}")
+
+    queries = fetch_query_metrics(admin) or {}
+    route = (queries.get("routes") or {}).get(CLICK_ROUTE) or {}
+    accepted_total = sum(result["accepted"].values())
+    database = {
+        "routeQueries": route.get("queries", 0),
+        "backgroundQueries": queries.get("unattributedQueries", 0),
+    }
+    database["queriesPerClick"] = (database["routeQueries"] + database["backgroundQueries"]) / accepted_total \
+        if accepted_total else 0
+    print(f"  {Colors.BOLD}Base de datos{Colors.RESET}: {database['routeQueries']:,} queries en requests + "
+          f"{database['backgroundQueries']:,} en segundo plano → {database['queriesPerClick']:.3f} por clic")
+
+    metrics = click_metrics(admin)
+    if metrics:
+        print(f"  Buffer: {metrics['flushes']:,} volcados ({metrics['flushedRows']:,} filas código/minuto, "
+              f"{metrics['flushMs']:,}ms), {metrics['codeLookups']:,} búsquedas de código, "
+              f"{metrics['pendingClicks']:,} clics pendientes")
+
+    comparison = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        comparison = {
+            "baseline": args.baseline,
+            "baselineLabel": baseline["config"].get("label", ""),
+            "p50Ms": [baseline["burst"]["latency"]["p50"], result["latency"]["p50"]],
+            "p99Ms": [baseline["burst"]["latency"]["p99"], result["latency"]["p99"]],
+            "queriesPerClick": [baseline["database"]["queriesPerClick"], database["queriesPerClick"]],
+        }
+        print(f"\n{Colors.BOLD}vs {comparison['baselineLabel'] or args.baseline}{Colors.RESET}")
+        for key in ("p50Ms", "p99Ms", "queriesPerClick"):
+            old, new = comparison[key]
+            change = (new - old) / old if old else 0
+            color = Colors.GREEN if change <= 0 else Colors.RED
+            print(f"  {key:<18} {old:10.3f} → {new:10.3f} {color}({change:+.0%}){Colors.RESET}")
+
+    filename = results_path("bench_referral_clicks")
+    with open(filename, "w") as f:
+        json.dump({
+            "timestamp": datetime.now().isoformat(),
+            "config": vars(args),
+            "burst": result,
+            "verification": {"ok": verified, "referrers": rows},
+            "database": database,
+            "clickMetrics": metrics,
+            "comparison": comparison,
+        }, f, indent=2)
+    print(f"\n{Colors.CYAN}📄 Resultados guardados en: {filename}{Colors.RESET}\n")
+
+
+if __name__ == "__main__":
+    main()
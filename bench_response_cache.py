@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Benchmark del cache de respuestas del catálogo público
+Pide los endpoints públicos que consulta SystemTester (categorías,
+destacados, listado y detalle de producto, planes) con distintos clientes:
+    - gzip: Accept-Encoding: gzip
+    - br: Accept-Encoding: br, gzip
+    - identity: sin compresión
+    - conditional: br, gzip con If-None-Match del ETag recibido (304)
+Por cada endpoint y cliente mide la latencia, los bytes en el cable (cuerpo
+sin descomprimir), el estado de cache (X-Cache) y la CPU del backend por
+request (diferencia de process.cpuUsage() de /health antes y después).
+Al final verifica que una escritura del catálogo invalida /categories.
+
+La CPU por request se mide bien con un solo proceso (sin cluster). Para
+comparar contra la línea base sin cache:
+    RESPONSE_CACHE=false npm start   # en backend/
+    python3 bench_response_cache.py --label sin-cache
+    npm start
+    python3 bench_response_cache.py --label con-cache --baseline bench_response_cache_1700000000.json
+
+Uso:
+    python3 bench_response_cache.py
+    python3 bench_response_cache.py --requests 500 --clients br,conditional
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import requests
+
+from bench_common import (
+    BASE_URL, SERVER_URL, Colors, auth_headers, login, print_section,
+    results_path, summarize, time_request
+)
+
+CLIENTS = {
+    "gzip": {"Accept-Encoding": "gzip"},
+    "br": {"Accept-Encoding": "br, gzip"},
+    "identity": {"Accept-Encoding": "identity"},
+    "conditional": {"Accept-Encoding": "br, gzip"},
+}
+
+
+def server_cpu_us() -> Optional[int]:
+    """CPU acumulada del backend (user + system, µs) desde /health"""
+    _, response = time_request("GET", f"{SERVER_URL}/health", timeout=10)
+    if response is None or response.status_code != 200:
+        return None
+    cpu = response.json().get("cpu")
+    return cpu["user"] + cpu["system"] if cpu else None
+
+
+def cache_metrics(headers, reset: bool = False) -> Optional[Dict]:
+    """Métricas del cache de respuestas (None si el backend no lo expone)"""
+    if reset:
+        time_request("POST", f"{BASE_URL}/admin/metrics/response-cache/reset", headers=headers,
+                     params={"flush": "true"}, timeout=10)
+    _, response = time_request("GET", f"{BASE_URL}/admin/metrics/response-cache", headers=headers, timeout=10)
+    if response is None or response.status_code != 200:
+        return None
+    data = response.json().get("data")
+    return data if isinstance(data, dict) and "hits" in data else None
+
+
+def discover_endpoints(args) -> List[str]:
+    endpoints = ["/categories", "/products/featured", f"/products?limit={args.page_size}",
+                 "/memberships/plans", "/subscriptions/plans"]
+    _, response = time_request("GET", f"{BASE_URL}/products", params={"limit": 1})
+    if response is not None and response.status_code == 200:
+        products = response.json()["data"]["products"]
+        if products:
+            endpoints.insert(3, f"/products/{products[0]['id']}")
+    return endpoints
+
+
+def measure(session: requests.Session, endpoint: str, client: str, args) -> Dict:
+    headers = dict(CLIENTS[client])
+    latencies, wire_bytes = [], 0
+    statuses: Dict[str, int] = {}
+    cache_states: Dict[str, int] = {}
+    etag = None
+
+    cpu_before = server_cpu_us()
+    for _ in range(args.requests):
+        if client == "conditional" and etag:
+            headers["If-None-Match"] = etag
+        start = time.perf_counter()
+        try:
+            response = session.get(f"{BASE_URL}{endpoint}", headers=headers, stream=True, timeout=args.timeout)
+            body = response.raw.read(decode_content=False)
+        except requests.RequestException:
+            statuses["error"] = statuses.get("error", 0) + 1
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+        wire_bytes += len(body)
+        statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+        state = response.headers.get("X-Cache", "none")
+        cache_states[state] = cache_states.get(state, 0) + 1
+        etag = response.headers.get("ETag") or etag
+    cpu_after = server_cpu_us()
+
+    count = len(latencies)
+    return {
+        "latency": summarize(latencies),
+        "bytesPerRequest": wire_bytes / count if count else 0,
+        "cpuUsPerRequest": (cpu_after - cpu_before) / count if count and cpu_before is not None and cpu_after is not None else None,
+        "statuses": statuses,
+        "cache": cache_states,
+    }
+
+
+def check_invalidation(headers) -> Optional[Dict]:
+    """Una escritura de categoría (sin cambios reales) debe invalidar /categories"""
+    _, response = time_request("GET", f"{BASE_URL}/categories")
+    if response is None or response.status_code != 200 or not response.json()["data"]:
+        return None
+    category = response.json()["data"][0]
+    time_request("GET", f"{BASE_URL}/categories")
+    _, write = time_request("PUT", f"{BASE_URL}/admin/categories/{category['id']}", headers=headers,
+                            json={"sortOrder": category["sortOrder"]})
+    _, after = time_request("GET", f"{BASE_URL}/categories")
+    if write is None or after is None:
+        return None
+    return {
+        "writeStatus": write.status_code,
+        "cacheAfterWrite": after.headers.get("X-Cache"),
+        "invalidated": after.headers.get("X-Cache") == "MISS",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del cache de respuestas del catálogo")
+    parser.add_argument("--label", default="", help="Etiqueta de la corrida (p. ej. sin-cache / con-cache)")
+    parser.add_argument("--requests", type=int, default=200, help="Requests por endpoint y cliente")
+    parser.add_argument("--clients", default=",".join(CLIENTS), help=f"Clientes a simular ({', '.join(CLIENTS)})")
+    parser.add_argument("--page-size", type=int, default=20, help="limit del listado de productos")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--baseline", help="Resultado previo para comparar bytes y CPU por request")
+    args = parser.parse_args()
+
+    clients = [client.strip() for client in args.clients.split(",") if client.strip()]
+    unknown = [client for client in clients if client not in CLIENTS]
+    if unknown:
+        raise SystemExit(f"Clientes desconocidos: {', '.join(unknown)} (válidos: {', '.join(CLIENTS)})")
+
+    print_section(f"CACHE DE RESPUESTAS DEL CATÁLOGO{f' ({args.label})' if args.label else ''}")
+    headers = auth_headers(login())
+    before = cache_metrics(headers, reset=True)
+    print(f"  Cache de respuestas: {'habilitado' if before and before['enabled'] else 'deshabilitado o no expuesto'}")
+
+    endpoints = discover_endpoints(args)
+    results: Dict[str, Dict[str, Dict]] = {}
+    print(f"\n  {'endpoint':<28} {'cliente':<12} {'p50':>8} {'p95':>8} {'bytes/req':>10} {'CPU µs/req':>11}  cache")
+    for endpoint in endpoints:
+        results[endpoint] = {}
+        for client in clients:
+            with requests.Session() as session:
+                result = measure(session, endpoint, client, args)
+            results[endpoint][client] = result
+            cpu = result["cpuUsPerRequest"]
+            states = " ".join(f"{state}={n}" for state, n in sorted(result["cache"].items()))
+            print(f"  {endpoint[:28]:<28} {client:<12} {result['latency']['p50']:7.2f}ms {result['latency']['p95']:7.2f}ms "
+                  f"{result['bytesPerRequest']:10,.0f} {cpu if cpu is not None else 0:11,.0f}  {states}")
+
+    invalidation = check_invalidation(headers)
+    if invalidation:
+        color = Colors.GREEN if invalidation["invalidated"] else Colors.YELLOW
+        print(f"\n  Escritura de categoría → /categories {color}{invalidation['cacheAfterWrite']}{Colors.RESET}")
+
+    metrics = cache_metrics(headers)
+    if metrics:
+        print(f"\n  {Colors.BOLD}Cache{Colors.RESET}: {metrics['hitRate']}% aciertos, {metrics['notModified']:,} respuestas 304, "
+              f"{metrics['entries']} entradas ({metrics['bytes'] / 1024:,.0f}KB), "
+              f"compresión {metrics['compressMs']:,.0f}ms en total")
+
+    comparison = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        comparison = {"baseline": args.baseline, "baselineLabel": baseline["config"].get("label", ""), "endpoints": {}}
+        print(f"\n{Colors.BOLD}vs {comparison['baselineLabel'] or args.baseline}{Colors.RESET}")
+        for endpoint, by_client in results.items():
+            old_endpoint = baseline["results"].get(endpoint) or {}
+            for client, result in by_client.items():
+                old = old_endpoint.get(client)
+                if not old:
+                    continue
+                row = {
+                    "bytesPerRequest": [old["bytesPerRequest"], result["bytesPerRequest"]],
+                    "cpuUsPerRequest": [old["cpuUsPerRequest"], result["cpuUsPerRequest"]],
+                    "p50Ms": [old["latency"]["p50"], result["latency"]["p50"]],
+                }
+                comparison["endpoints"].setdefault(endpoint, {})[client] = row
+                changes = []
+                for key, (old_value, new_value) in row.items():
+                    if not old_value or new_value is None:
+                        continue
+                    change = (new_value - old_value) / old_value
+                    color = Colors.GREEN if change <= 0 else Colors.RED
+                    changes.append(f"{key} {color}{change:+.0%}{Colors.RESET}")
+                print(f"  {endpoint[:28]:<28} {client:<12} {'  '.join(changes)}")
+
+    filename = results_path("bench_response_cache")
+    with open(filename, "w") as f:
+        json.dump({
+            "timestamp": datetime.now().isoformat(),
+            "config": vars(args),
+            "results": results,
+            "invalidation": invalidation,
+            "cacheMetrics": metrics,
+            "comparison": comparison,
+        }, f, indent=2)
+    print(f"\n{Colors.CYAN}📄 Resultados guardados en: {filename}{Colors.RESET}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark de segmentación de usuarios
+Mide la reconstrucción completa de segmentos sobre un dataset sintético
+(200k usuarios por defecto) y la latencia de las consultas de estadísticas.
+
+Uso:
+    python3 bench_segmentation.py --users 200000 --orders-per-user 5
+    python3 bench_segmentation.py --skip-seed
+"""
+
+import argparse
+import json
+from datetime import datetime
+
+from bench_common import (
+    BASE_URL, Colors, auth_headers, login, print_section, print_summary,
+    results_path, sample_endpoint, seed_synthetic, summarize, time_request
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de segmentación de usuarios")
+    parser.add_argument("--users", type=int, default=200000)
+    parser.add_argument("--orders-per-user", type=float, default=5)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=20,
+                        help="Repeticiones por endpoint de lectura")
+    parser.add_argument("--skip-seed", action="store_true",
+                        help="Usar el dataset sintético existente")
+    args = parser.parse_args()
+
+    print_section("BENCHMARK DE SEGMENTACIÓN")
+
+    if not args.skip_seed:
+        seed_synthetic("--reset", "--users", str(args.users),
+                       "--orders-per-user", str(args.orders_per_user))
+
+    headers = auth_headers(login())
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "config": vars(args),
+    }
+
+    # Reconstrucción completa
+    print(f"{Colors.BOLD}Reconstrucción completa de segmentos...{Colors.RESET}")
+    elapsed, response = time_request(
+        "POST", f"{BASE_URL}/recommendations/admin/rebuild-segments",
+        headers=headers,
+        json={"batchSize": args.batch_size, "concurrency": args.concurrency},
+        timeout=3600,
+    )
+    if response is None or response.status_code != 200:
+        status = response.status_code if response is not None else "sin respuesta"
+        print(f"{Colors.RED}✗ Reconstrucción fallida: {status}{Colors.RESET}")
+        return
+
+    rebuild = response.json()
+    results["rebuild"] = {**rebuild, "wallClockMs": elapsed}
+    print(f"  {Colors.GREEN}✓{Colors.RESET} {rebuild['processed']} usuarios "
+          f"en {elapsed / 1000:.1f}s ({rebuild['usersPerSecond']} usuarios/s, "
+          f"{rebuild['batches']} lotes)")
+
+    # Recalculo incremental de segmentos desactualizados
+    elapsed, response = time_request(
+        "POST", f"{BASE_URL}/recommendations/admin/recalculate-segments",
+        headers=headers, json={}, timeout=3600,
+    )
+    if response is not None and response.status_code == 200:
+        results["recalculateStale"] = {**response.json(), "wallClockMs": elapsed}
+        print(f"  {Colors.GREEN}✓{Colors.RESET} Recalculo de desactualizados en {elapsed:.0f}ms")
+
+    # Lecturas sobre columnas indexadas
+    print(f"\n{Colors.BOLD}Consultas de lectura{Colors.RESET}")
+    results["reads"] = {}
+    for label, path in [
+        ("Estadísticas de segmentos", "/recommendations/admin/stats/segments"),
+        ("Usuarios en riesgo", "/recommendations/admin/at-risk-users"),
+        ("Usuarios de alto valor", "/recommendations/admin/high-value-users"),
+    ]:
+        stats = summarize(sample_endpoint(path, args.iterations, headers=headers))
+        results["reads"][path] = stats
+        print_summary(label, stats)
+
+    filename = results_path("bench_segmentation")
+    with open(filename, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n{Colors.CYAN}📄 Resultados guardados en: {filename}{Colors.RESET}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Tiempo de arranque del backend
+Lanza `node src/server.js` repetidas veces en el puerto de CARNES_BASE_URL
+y mide desde el spawn del proceso hasta la primera respuesta 200 de
+/health. Junto a cada lanzamiento guarda el desglose por fase que reporta
+el propio servidor (campo `startup` de /health) y, opcionalmente, la
+primera y segunda request a una ruta de carga diferida (lo que cuesta
+cargarla con la primera request).
+
+Por defecto alterna los modos lazy (LAZY_ROUTES=true) y eager
+(LAZY_ROUTES=false) para compararlos en las mismas condiciones.
+
+El puerto debe estar libre: el benchmark arranca y detiene su propio
+backend.
+
+Uso:
+    python3 bench_startup.py
+    python3 bench_startup.py --runs 20 --modes lazy
+    python3 bench_startup.py --env REDIS_URL=redis://localhost:6379 --first-request /api/memberships/plans
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from bench_common import (
+    BACKEND_DIR, BASE_URL, SERVER_URL, Colors, print_section, print_summary,
+    results_path, summarize, time_request
+)
+
+MODES = {
+    "lazy": {"LAZY_ROUTES": "true"},
+    "eager": {"LAZY_ROUTES": "false"},
+}
+
+
+def parse_env(pairs: List[str]) -> Dict[str, str]:
+    env = {}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise SystemExit(f"--env espera KEY=VALUE: {pair}")
+        env[key] = value
+    return env
+
+
+def launch(mode: str, run: int, args) -> subprocess.Popen:
+    env = dict(os.environ, PORT=str(urlparse(BASE_URL).port or 80), **parse_env(args.env), **MODES[mode])
+    if not args.log_dir:
+        return subprocess.Popen(["node", "src/server.js"], cwd=BACKEND_DIR, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    with open(os.path.join(args.log_dir, f"startup_{mode}_{run}.log"), "w") as log:
+        return subprocess.Popen(["node", "src/server.js"], cwd=BACKEND_DIR, env=env,
+                                stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_for_health(process: subprocess.Popen, spawned: float, args) -> Dict:
+    """Sondea /health hasta el primer 200; devuelve el tiempo desde el spawn y su cuerpo"""
+    deadline = spawned + args.startup_timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"el servidor terminó durante el arranque (código {process.returncode})")
+        try:
+            response = requests.get(f"{SERVER_URL}/health", timeout=2, headers={"Connection": "close"})
+            if response.status_code == 200:
+                return {"readyMs": (time.perf_counter() - spawned) * 1000, "health": response.json()}
+        except requests.RequestException:
+            pass
+        time.sleep(args.poll_interval)
+    raise RuntimeError(f"/health no respondió en {args.startup_timeout:.0f}s")
+
+
+def stop(process: subprocess.Popen, timeout: float):
+    """SIGTERM (apagado ordenado) y SIGKILL si no termina"""
+    if process.poll() is not None:
+        return
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def measure_launch(mode: str, run: int, args) -> Optional[Dict]:
+    spawned = time.perf_counter()
+    process = launch(mode, run, args)
+    try:
+        ready = wait_for_health(process, spawned, args)
+        startup = ready["health"].get("startup") or {}
+        result = {
+            "mode": mode,
+            "readyMs": ready["readyMs"],
+            "serverMs": startup.get("totalMs"),
+            "phases": {phase["name"]: phase["ms"] for phase in startup.get("phases", [])},
+            "rss": (ready["health"].get("memory") or {}).get("rss"),
+        }
+        if args.first_request:
+            first, response = time_request("GET", f"{SERVER_URL}{args.first_request}", timeout=30)
+            second, _ = time_request("GET", f"{SERVER_URL}{args.first_request}", timeout=30)
+            result["firstRequest"] = {
+                "status": response.status_code if response is not None else None,
+                "firstMs": first,
+                "secondMs": second,
+            }
+        return result
+    except RuntimeError as error:
+        print(f"  {Colors.RED}✗ {mode} #{run}: {error}{Colors.RESET}")
+        return None
+    finally:
+        stop(process, args.shutdown_timeout)
+
+
+def summarize_mode(launches: List[Dict]) -> Dict:
+    phases: Dict[str, List[float]] = {}
+    for launch_result in launches:
+        for name, ms in launch_result["phases"].items():
+            phases.setdefault(name, []).append(ms)
+    summary = {
+        "launches": len(launches),
+        "readyMs": summarize([l["readyMs"] for l in launches]),
+        "serverMs": summarize([l["serverMs"] for l in launches if l["serverMs"] is not None]),
+        "phases": {name: summarize(values) for name, values in phases.items()},
+        "rss": summarize([l["rss"] / 1024 / 1024 for l in launches if l["rss"]]),
+    }
+    first_requests = [l["firstRequest"] for l in launches if "firstRequest" in l]
+    if first_requests:
+        summary["firstRequestMs"] = summarize([f["firstMs"] for f in first_requests])
+        summary["secondRequestMs"] = summarize([f["secondMs"] for f in first_requests])
+    return summary
+
+
+def print_mode(mode: str, summary: Dict):
+    print(f"\n{Colors.BOLD}{mode}{Colors.RESET} ({summary['launches']} lanzamientos)")
+    print_summary("spawn → /health 200", summary["readyMs"])
+    print_summary("arranque según el servidor", summary["serverMs"])
+    for name, stats in summary["phases"].items():
+        print(f"    {name:<12} p50={stats['p50']:8.1f}ms max={stats['max']:8.1f}ms")
+    if summary["rss"]["count"]:
+        print(f"    RSS al estar listo: {summary['rss']['p50']:.0f}MB (p50)")
+    if "firstRequestMs" in summary:
+        print_summary("primera request (carga diferida)", summary["firstRequestMs"])
+        print_summary("segunda request", summary["secondRequestMs"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de arranque del backend (spawn → /health)")
+    parser.add_argument("--label", default="", help="Etiqueta de la corrida")
+    parser.add_argument("--runs", type=int, default=10, help="Lanzamientos por modo")
+    parser.add_argument("--modes", default="lazy,eager", help="Modos a comparar (lazy, eager)")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Variable de entorno extra para el servidor (repetible)")
+    parser.add_argument("--first-request", default="/api/memberships/plans",
+                        help="Ruta diferida a pedir apenas está listo ('' = ninguna)")
+    parser.add_argument("--poll-interval", type=float, default=0.01, help="Segundos entre sondeos a /health")
+    parser.add_argument("--startup-timeout", type=float, default=60)
+    parser.add_argument("--shutdown-timeout", type=float, default=15)
+    parser.add_argument("--log-dir", help="Directorio para guardar el log de cada lanzamiento")
+    parser.add_argument("--baseline", help="Resultado previo para comparar el tiempo hasta /health")
+    args = parser.parse_args()
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        raise SystemExit(f"Modos desconocidos: {', '.join(unknown)} (válidos: {', '.join(MODES)})")
+    if args.log_dir:
+        os.makedirs(args.log_dir, exist_ok=True)
+
+    print_section(f"ARRANQUE DEL BACKEND{f' ({args.label})' if args.label else ''}")
+
+    launches: Dict[str, List[Dict]] = {mode: [] for mode in modes}
+    # Modos intercalados: el cache de disco y la carga de la máquina afectan a todos por igual
+    for run in range(args.runs):
+        for mode in modes:
+            result = measure_launch(mode, run, args)
+            if result:
+                launches[mode].append(result)
+                print(f"  {mode:<6} #{run + 1:<3} {result['readyMs']:8.1f}ms hasta /health"
+                      f" (servidor: {result['serverMs'] or 0:.1f}ms)")
+
+    summaries = {mode: summarize_mode(results) for mode, results in launches.items() if results}
+    for mode, summary in summaries.items():
+        print_mode(mode, summary)
+
+    if "lazy" in summaries and "eager" in summaries:
+        eager, lazy = summaries["eager"]["readyMs"]["p50"], summaries["lazy"]["readyMs"]["p50"]
+        change = (lazy - eager) / eager if eager else 0
+        color = Colors.GREEN if change <= 0 else Colors.RED
+        print(f"\n  {Colors.BOLD}lazy vs eager{Colors.RESET} (p50 hasta /health): "
+              f"{eager:.0f}ms → {lazy:.0f}ms {color}({change:+.0%}){Colors.RESET}")
+
+    comparison = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        comparison = {"baseline": args.baseline, "baselineLabel": baseline["config"].get("label", "")}
+        print(f"\n{Colors.BOLD}vs {comparison['baselineLabel'] or args.baseline}{Colors.RESET}")
+        for mode, summary in summaries.items():
+            if mode not in baseline["summary"]:
+                continue
+            old, new = baseline["summary"][mode]["readyMs"]["p50"], summary["readyMs"]["p50"]
+            comparison[mode] = [old, new]
+            change = (new - old) / old if old else 0
+            color = Colors.GREEN if change <= 0 else Colors.RED
+            print(f"  {mode:<6} p50 {old:10.1f} → {new:10.1f}ms {color}({change:+.0%}){Colors.RESET}")
+
+    filename = results_path("bench_startup")
+    with open(filename, "w") as f:
+        json.dump({
+            "timestamp": datetime.now().isoformat(),
+            "config": vars(args),
+            "launches": launches,
+            "summary": summaries,
+            "comparison": comparison,
+        }, f, indent=2)
+    print(f"\n{Colors.CYAN}📄 Resultados guardados en: {filename}{Colors.RESET}\n")
+
+
+if __name__ == "__main__":
+    main()
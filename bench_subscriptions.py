@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark del ciclo masivo de entregas de suscripciones
+Genera 50k suscripciones vencidas, ejecuta un ciclo completo y reporta
+throughput (suscripciones/s y órdenes/s). Una segunda corrida verifica que
+no se generen entregas duplicadas.
+
+Uso:
+    python3 bench_subscriptions.py --subscriptions 50000
+    python3 bench_subscriptions.py --skip-seed --page-size 1000 --concurrency 8
+"""
+
+import argparse
+import json
+from datetime import datetime
+
+from bench_common import (
+    BASE_URL, Colors, auth_headers, login, print_section, results_path,
+    seed_synthetic, time_request
+)
+
+
+def run_cycle(headers, page_size, concurrency):
+    """Ejecuta una corrida del ciclo y devuelve (latencia_ms, corrida)"""
+    elapsed, response = time_request(
+        "POST", f"{BASE_URL}/subscriptions/admin/delivery-cycle/run",
+        headers=headers,
+        json={"pageSize": page_size, "concurrency": concurrency},
+        timeout=3600,
+    )
+    if response is None or response.status_code != 200:
+        status = response.status_code if response is not None else "sin respuesta"
+        detail = response.text[:300] if response is not None else ""
+        print(f"{Colors.RED}✗ Ciclo fallido: {status} {detail}{Colors.RESET}")
+        return elapsed, None
+    return elapsed, response.json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del ciclo de entregas de suscripciones")
+    parser.add_argument("--subscriptions", type=int, default=50000)
+    parser.add_argument("--products", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--skip-seed", action="store_true",
+                        help="Usar el dataset sintético existente")
+    args = parser.parse_args()
+
+    print_section("BENCHMARK DE CICLO DE SUSCRIPCIONES")
+
+    if not args.skip_seed:
+        seed_synthetic("--reset", "--users", str(args.subscriptions),
+                       "--products", str(args.products),
+                       "--subscriptions", str(args.subscriptions))
+
+    headers = auth_headers(login())
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "config": vars(args),
+    }
+
+    print(f"{Colors.BOLD}Ciclo completo...{Colors.RESET}")
+    elapsed, run = run_cycle(headers, args.page_size, args.concurrency)
+    if run is None:
+        return
+
+    results["cycle"] = {**run, "wallClockMs": elapsed}
+    print(f"  {Colors.GREEN}✓{Colors.RESET} {run['processed']} suscripciones en "
+          f"{elapsed / 1000:.1f}s ({run['subscriptionsPerSecond']} susc/s, "
+          f"{run['ordersPerSecond']} órdenes/s)")
+    print(f"    Órdenes: {run['ordersCreated']} | Sin stock: {run['failed']} | "
+          f"Páginas: {run['pages']} | Reanudaciones: {run['resumedCount']}")
+
+    expected = args.subscriptions if not args.skip_seed else None
+    if expected is not None and run["processed"] < expected:
+        print(f"  {Colors.YELLOW}⚠ Se esperaban {expected} suscripciones{Colors.RESET}")
+
+    # Segunda corrida: todo fue avanzado, no debe generar nada
+    print(f"\n{Colors.BOLD}Segunda corrida (idempotencia)...{Colors.RESET}")
+    elapsed, rerun = run_cycle(headers, args.page_size, args.concurrency)
+    if rerun is not None:
+        results["rerun"] = {**rerun, "wallClockMs": elapsed}
+        if rerun["processed"] == 0:
+            print(f"  {Colors.GREEN}✓{Colors.RESET} Sin suscripciones pendientes ({elapsed:.0f}ms)")
+        else:
+            print(f"  {Colors.RED}✗ La segunda corrida procesó {rerun['processed']} suscripciones{Colors.RESET}")
+
+    filename = results_path("bench_subscriptions")
+    with open(filename, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n{Colors.CYAN}📄 Resultados guardados en: {filename}{Colors.RESET}\n")
+
+
+if __name__ == "__main__":
+    main()
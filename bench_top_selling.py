@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Benchmark de productos más vendidos
+Genera ~1M items de pedidos pagados, reconstruye los contadores de ventas
+y mide /products/top-selling (histórico y por ventana de días) bajo carga,
+muestreando el RSS del backend mientras corre. Con contadores el RSS no
+debe crecer con el tamaño del historial de pedidos.
+
+Uso:
+    python3 bench_top_selling.py --users 100000 --orders-per-user 4 --items-per-order 2.5
+    python3 bench_top_selling.py --skip-seed --requests 500 --concurrency 16
+"""
+
+import argparse
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from bench_common import (
+    BASE_URL, Colors, auth_headers, fetch_server_memory, login, print_section,
+    print_summary, results_path, seed_synthetic, summarize, time_request
+)
+
+MB = 1024 * 1024
+
+
+class MemorySampler:
+    """Consulta /health periódicamente y guarda el RSS observado"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            memory = fetch_server_memory()
+            if memory:
+                self.samples.append(memory["rss"])
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def summary(self):
+        if not self.samples:
+            return None
+        return {
+            "samples": len(self.samples),
+            "minMb": round(min(self.samples) / MB, 1),
+            "maxMb": round(max(self.samples) / MB, 1),
+        }
+
+
+def load(path, params, requests_count, concurrency):
+    def one(_):
+        return time_request("GET", f"{BASE_URL}{path}", params=params)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(one, range(requests_count)))
+
+    latencies = [elapsed for elapsed, response in samples
+                 if response is not None and response.status_code == 200]
+    errors = len(samples) - len(latencies)
+    return summarize(latencies), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de productos más vendidos")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--orders-per-user", type=float, default=4)
+    parser.add_argument("--items-per-order", type=float, default=2.5)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--days", type=int, default=30, help="Ventana para el ranking por días")
+    parser.add_argument("--sample-interval", type=float, default=0.5,
+                        help="Segundos entre muestras de RSS")
+    parser.add_argument("--skip-seed", action="store_true",
+                        help="Usar el dataset sintético existente")
+    args = parser.parse_args()
+
+    print_section("BENCHMARK DE MÁS VENDIDOS")
+
+    if not args.skip_seed:
+        seed_synthetic("--reset", "--users", str(args.users),
+                       "--orders-per-user", str(args.orders_per_user),
+                       "--products", str(args.products),
+                       "--items-per-order", str(args.items_per_order))
+
+    headers = auth_headers(login())
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "config": vars(args),
+        "items": round(args.users * args.orders_per_user * args.items_per_order),
+    }
+
+    # Los items sembrados no pasan por el flujo de pago
+    print(f"{Colors.BOLD}Reconstrucción de contadores...{Colors.RESET}")
+    elapsed, response = time_request("POST", f"{BASE_URL}/admin/sales-counters/rebuild",
+                                     headers=headers, json={}, timeout=3600)
+    if response is None or response.status_code != 200:
+        print(f"{Colors.RED}✗ Reconstrucción fallida{Colors.RESET}")
+        return
+    rebuild = response.json()["data"]
+    results["rebuild"] = {**rebuild, "wallClockMs": elapsed}
+    print(f"  {Colors.GREEN}✓{Colors.RESET} {rebuild['orders']} pedidos, {rebuild['products']} productos, "
+          f"{rebuild['days']} filas diarias en {rebuild['durationMs']}ms")
+
+    results["rssBeforeMb"] = round((fetch_server_memory() or {"rss": 0})["rss"] / MB, 1)
+    results["endpoints"] = {}
+
+    for label, params in (("histórico", {}), (f"últimos {args.days} días", {"days": args.days})):
+        with MemorySampler(args.sample_interval) as sampler:
+            latency, errors = load("/products/top-selling", params, args.requests, args.concurrency)
+        entry = {"params": params, "latency": latency, "errors": errors, "rss": sampler.summary()}
+        results["endpoints"][label] = entry
+
+        print_summary(f"top-selling {label}", latency)
+        if entry["rss"]:
+            print(f"    RSS: {entry['rss']['minMb']}–{entry['rss']['maxMb']} MB "
+                  f"({entry['rss']['samples']} muestras)")
+        if errors:
+            print(f"    {Colors.YELLOW}⚠ {errors} respuestas con error{Colors.RESET}")
+
+    results["rssAfterMb"] = round((fetch_server_memory() or {"rss": 0})["rss"] / MB, 1)
+    growth = results["rssAfterMb"] - results["rssBeforeMb"]
+    color = Colors.GREEN if growth < 50 else Colors.YELLOW
+    print(f"\n  {color}RSS: {results['rssBeforeMb']} MB → {results['rssAfterMb']} MB "
+          f"({growth:+.1f} MB){Colors.RESET}")
+
+    filename = results_path("bench_top_selling")
+    with open(filename, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n{Colors.CYAN}📄 Resultados guardados en: {filename}{Colors.RESET}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Carga de clientes mirando el tracking de sus pedidos
+Simula N watchers que refrescan el tracking cada --poll-interval segundos
+(tasa total = watchers / intervalo, en lazo abierto) sobre un conjunto de
+pedidos, mientras un hilo agrega eventos de tracking como lo haría el
+panel. Mide la latencia y la carga en la base por request (queries y
+tiempo de query de las rutas /api/tracking, desde /admin/metrics/queries).
+
+Para comparar contra la línea base sin modelo de lectura:
+    TRACKING_READ_MODEL=false npm start   # en backend/
+    python3 bench_tracking_watchers.py --label sin-cache
+    npm start
+    python3 bench_tracking_watchers.py --label con-cache --baseline bench_tracking_watchers_1700000000.json
+
+Uso:
+    python3 bench_tracking_watchers.py --users 2000 --orders-per-user 1 --products 200
+    python3 bench_tracking_watchers.py --skip-seed --watchers 5000 --poll-interval 5 --orders 1000
+"""
+
+import argparse
+import json
+import random
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional
+
+from bench_common import (
+    BASE_URL, Colors, RequestLog, auth_headers, fetch_query_metrics, login,
+    print_section, print_summary, reset_query_metrics, results_path, seed_synthetic,
+    time_request
+)
+from load_open_loop import run_step
+
+TRACKING_ROUTE_PREFIX = "/api/tracking/"
+
+
+class EventWriter:
+    """Hilo que agrega eventos de tracking a pedidos mirados"""
+
+    def __init__(self, order_ids, headers: Dict[str, str], args):
+        self.order_ids = order_ids
+        self.headers = headers
+        self.args = args
+        self.stop = threading.Event()
+        self.statuses = Counter()
+        self.thread = threading.Thread(target=self.loop, daemon=True)
+
+    def loop(self):
+        rng = random.Random(self.args.seed + 1)
+        while not self.stop.wait(self.args.event_interval):
+            _, response = time_request("POST", f"{BASE_URL}/tracking/add-event", headers=self.headers, json={
+                "orderId": rng.choice(self.order_ids),
+                "status": "IN_TRANSIT",
+                "message": "Evento de benchmark",
+            }, timeout=self.args.timeout)
+            self.statuses[str(response.status_code) if response is not None else "error"] += 1
+
+    def start(self):
+        if self.args.event_interval > 0:
+            self.thread.start()
+
+    def finish(self) -> Dict:
+        self.stop.set()
+        if self.thread.is_alive():
+            self.thread.join(timeout=self.args.timeout)
+        return dict(self.statuses)
+
+
+def tracking_metrics(headers, reset: bool = False) -> Optional[Dict]:
+    """Métricas del modelo de lectura (None si el backend no lo expone)"""
+    if reset:
+        time_request("POST", f"{BASE_URL}/admin/metrics/tracking/reset", headers=headers, timeout=10)
+    _, response = time_request("GET", f"{BASE_URL}/admin/metrics/tracking", headers=headers, timeout=10)
+    if response is None or response.status_code != 200:
+        return None
+    data = response.json().get("data")
+    return data if isinstance(data, dict) and "hits" in data else None
+
+
+def database_load(metrics: Optional[Dict]) -> Dict:
+    """Requests, queries y tiempo de query de las rutas de tracking"""
+    load = {"requests": 0, "queries": 0, "queryTimeMs": 0.0, "routes": {}}
+    for route, stats in ((metrics or {}).get("routes") or {}).items():
+        if TRACKING_ROUTE_PREFIX not in route:
+            continue
+        load["requests"] += stats["requests"]
+        load["queries"] += stats["queries"]
+        load["queryTimeMs"] += stats["queryTimeMs"]
+        load["routes"][route] = {key: stats[key] for key in ("requests", "queries", "queriesPerRequest", "queryTimeMs")}
+    load["queriesPerRequest"] = load["queries"] / load["requests"] if load["requests"] else 0
+    load["queryMsPerRequest"] = load["queryTimeMs"] / load["requests"] if load["requests"] else 0
+    return load
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clientes refrescando el tracking de sus pedidos")
+    parser.add_argument("--label", default="", help="Etiqueta de la corrida (p. ej. sin-cache / con-cache)")
+    parser.add_argument("--watchers", type=int, default=5000, help="Clientes mirando un pedido")
+    parser.add_argument("--poll-interval", type=float, default=5, help="Segundos entre refrescos de cada cliente")
+    parser.add_argument("--orders", type=int, default=1000, help="Pedidos distintos que se miran")
+    parser.add_argument("--by-number", type=float, default=0.2,
+                        help="Fracción de refrescos por número de pedido (el resto por ID)")
+    parser.add_argument("--duration", type=float, default=60, help="Segundos de carga")
+    parser.add_argument("--event-interval", type=float, default=0.5,
+                        help="Segundos entre eventos de tracking agregados (0 = ninguno)")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--orders-per-user", type=float, default=1)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--items-per-order", type=float, default=3)
+    parser.add_argument("--skip-seed", action="store_true", help="Usar el dataset sintético existente")
+    parser.add_argument("--arrivals", choices=["poisson", "fixed"], default="poisson")
+    parser.add_argument("--max-inflight", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", help="Resultado previo para comparar la carga en la base")
+    parser.add_argument("--record", help="Registro JSONL por request para perf_report.py (.gz comprime)")
+    args = parser.parse_args()
+    args.step_duration = args.duration
+
+    print_section(f"TRACKING CON {args.watchers} CLIENTES{f' ({args.label})' if args.label else ''}")
+
+    if not args.skip_seed:
+        seed_synthetic("--reset", "--users", str(args.users), "--orders-per-user", str(args.orders_per_user),
+                       "--products", str(args.products), "--items-per-order", str(args.items_per_order))
+
+    total_orders = round(args.users * args.orders_per_user)
+    rng = random.Random(args.seed)
+    indexes = rng.sample(range(total_orders), min(args.orders, total_orders))
+    order_ids = [f"syn_o_{i:08d}" for i in indexes]
+    # run_step elige endpoints al azar: la fracción se logra con la cantidad de URLs por número
+    by_number = max(1, round(len(indexes) * args.by_number / (1 - args.by_number))) if 0 < args.by_number < 1 else 0
+    endpoints = [f"/tracking/order/{order_id}" for order_id in order_ids]
+    endpoints += [f"/tracking/order-by-number/SYN-{i:09d}" for i in indexes[:by_number]]
+    rate = args.watchers / args.poll_interval
+
+    headers = auth_headers(login())
+    reset_query_metrics(headers)
+    before = tracking_metrics(headers, reset=True)
+    print(f"  {len(order_ids)} pedidos, {rate:,.0f} req/s durante {args.duration:.0f}s, "
+          f"modelo de lectura: {before['backend'] if before else 'no expuesto'}")
+
+    writer = EventWriter(order_ids, headers, args)
+    with RequestLog(args.record) as log:
+        writer.start()
+        step = run_step(endpoints, rate, args, {}, rng, log)
+        events = writer.finish()
+
+    load = database_load(fetch_query_metrics(headers))
+    read_model = tracking_metrics(headers)
+
+    print_summary("tracking", step["latency"])
+    print(f"  Logrado {step['achievedRps']:,.1f} req/s, {step['errors']} errores {step['statuses']}")
+    print(f"  Eventos agregados: {events}")
+    print(f"  {Colors.BOLD}Base de datos{Colors.RESET}: {load['queries']:,} queries en {load['requests']:,} requests "
+          f"({load['queriesPerRequest']:.2f} por request, {load['queryMsPerRequest']:.2f}ms de query por request)")
+    if read_model:
+        print(f"  Modelo de lectura ({read_model['backend']}): {read_model['hitRate']}% aciertos, "
+              f"{read_model['loads']:,} cargas desde la base, {read_model['deltas']:,} deltas emitidos")
+
+    comparison = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        base_load = baseline["database"]
+        comparison = {
+            "baseline": args.baseline,
+            "baselineLabel": baseline["config"].get("label", ""),
+            "queriesPerRequest": [base_load["queriesPerRequest"], load["queriesPerRequest"]],
+            "queryMsPerRequest": [base_load["queryMsPerRequest"], load["queryMsPerRequest"]],
+            "p99Ms": [baseline["step"]["latency"]["p99"], step["latency"]["p99"]],
+        }
+        print(f"\n{Colors.BOLD}vs {comparison['baselineLabel'] or args.baseline}{Colors.RESET}")
+        for key, (old, new) in ((k, comparison[k]) for k in ("queriesPerRequest", "queryMsPerRequest", "p99Ms")):
+            change = (new - old) / old if old else 0
+            color = Colors.GREEN if change <= 0 else Colors.RED
+            print(f"  {key:<18} {old:10.2f} → {new:10.2f} {color}({change:+.0%}){Colors.RESET}")
+
+    filename = results_path("bench_tracking_watchers")
+    with open(filename, "w") as f:
+        json.dump({
+            "timestamp": datetime.now().isoformat(),
+            "config": vars(args),
+            "step": step,
+            "events": events,
+            "database": load,
+            "readModel": read_model,
+            "comparison": comparison,
+        }, f, indent=2)
+    print(f"\n{Colors.CYAN}📄 Resultados guardados en: {filename}{Colors.RESET}\n")
+
+
+if __name__ == "__main__":
+    main()
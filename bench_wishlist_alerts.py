@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Benchmark de alertas de precio de wishlist
+Siembra productos con su variante y items de wishlist con alerta de
+precio, actualiza en bloque el precio de miles de variantes por
+PUT /admin/variants/prices y mide:
+    - la latencia del update (las alertas se generan en segundo plano)
+    - cuánto tarda la evaluación por índice producto → usuarios en crear
+      alertas y notificaciones, y la latencia del catálogo mientras corre
+    - una segunda corrida con los mismos precios (no debe crear alertas)
+    - opcionalmente el recorrido completo del job programado
+      (POST /wishlist/admin/notify-price-changes)
+
+Uso:
+    python3 bench_wishlist_alerts.py                    # 10k productos, 500k items
+    python3 bench_wishlist_alerts.py --products 2000 --wishlist 100000 --changed 500
+    python3 bench_wishlist_alerts.py --skip-seed --full-scan
+"""
+
+import argparse
+import json
+import math
+import random
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from bench_common import (
+    BASE_URL, Colors, auth_headers, login, print_section, print_summary,
+    results_path, sample_endpoint, seed_synthetic, summarize, time_request
+)
+
+SYNTHETIC_PASSWORD = "synthetic123"
+
+
+def seeded_price(index: int) -> float:
+    """Precio con el que seed-synthetic.js crea la variante (y el item de wishlist)"""
+    return 100 + (index % 10) * 25
+
+
+def price_updates(args, rng: random.Random):
+    """Nuevo precio para `changed` variantes: bajas de 5% a --max-drop sobre el precio sembrado"""
+    indexes = rng.sample(range(args.products), min(args.changed, args.products))
+    return [
+        {"variantId": f"syn_v_{i:08d}",
+         "price": round(seeded_price(i) * (1 - rng.uniform(0.05, args.max_drop)), 2)}
+        for i in indexes
+    ]
+
+
+def alert_metrics(headers) -> Optional[Dict]:
+    """Métricas de la evaluación de alertas (None si el backend no las expone)"""
+    _, response = time_request("GET", f"{BASE_URL}/admin/metrics/wishlist-alerts", headers=headers, timeout=10)
+    if response is None or response.status_code != 200:
+        return None
+    data = response.json().get("data")
+    return data if isinstance(data, dict) and "runs" in data else None
+
+
+def wait_for_evaluation(headers, runs_before: int, args):
+    """
+    Espera a que termine la evaluación en segundo plano midiendo el
+    catálogo mientras tanto. Devuelve (métricas, latencias del catálogo).
+    """
+    latencies = []
+    deadline = time.time() + args.timeout
+    while time.time() < deadline:
+        metrics = alert_metrics(headers)
+        if metrics and metrics["runs"] > runs_before and metrics["pending"] == 0 and not metrics["running"]:
+            return metrics, latencies
+        latencies.extend(sample_endpoint(args.probe, 5))
+        time.sleep(args.poll_interval)
+    return None, latencies
+
+
+def run_update(label: str, updates, headers, args) -> Optional[Dict]:
+    print(f"\n{Colors.BOLD}{label}{Colors.RESET}: {len(updates)} variantes")
+    before = alert_metrics(headers)
+    if before is None:
+        print(f"  {Colors.RED}✗ El backend no expone /admin/metrics/wishlist-alerts{Colors.RESET}")
+        return None
+
+    started = time.perf_counter()
+    elapsed, response = time_request("PUT", f"{BASE_URL}/admin/variants/prices", headers=headers,
+                                     json={"updates": updates}, timeout=args.timeout)
+    if response is None or response.status_code != 200:
+        status = response.status_code if response is not None else "sin respuesta"
+        print(f"  {Colors.RED}✗ PUT /admin/variants/prices: {status}{Colors.RESET}")
+        return None
+    update = response.json()["data"]
+
+    metrics, probe_latencies = wait_for_evaluation(headers, before["runs"], args)
+    total_ms = (time.perf_counter() - started) * 1000
+    if metrics is None:
+        print(f"  {Colors.RED}✗ La evaluación no terminó en {args.timeout:.0f}s{Colors.RESET}")
+        return None
+
+    # Puede haber juntado más de una corrida: se usan las diferencias de totales
+    result = {
+        "variantsUpdated": update["updated"],
+        "products": update["products"],
+        "updateMs": elapsed,
+        "untilAlertsMs": total_ms,
+        "evaluationMs": metrics["lastRun"]["durationMs"],
+        "itemsScanned": metrics["items"] - before["items"],
+        "alerts": metrics["alerts"] - before["alerts"],
+        "notifications": metrics["notifications"] - before["notifications"],
+        "failedRuns": metrics["failed"] - before["failed"],
+        "probe": summarize(probe_latencies),
+    }
+    items_per_second = result["itemsScanned"] / (result["evaluationMs"] / 1000) if result["evaluationMs"] else 0
+    print(f"  Update: {elapsed:,.0f}ms ({update['updated']} variantes, {update['products']} productos)")
+    print(f"  Evaluación: {result['evaluationMs']:,}ms, {result['itemsScanned']:,} items "
+          f"({items_per_second:,.0f} items/s) → {result['alerts']:,} alertas, "
+          f"{result['notifications']:,} notificaciones")
+    print(f"  Del update a las alertas: {total_ms:,.0f}ms")
+    if result["failedRuns"]:
+        print(f"  {Colors.RED}✗ {result['failedRuns']} corridas fallidas (ver log del backend){Colors.RESET}")
+    if result["probe"]["count"]:
+        print_summary(f"{args.probe} durante la evaluación", result["probe"])
+    return result
+
+
+def check_user_alerts() -> Optional[Dict]:
+    """Las alertas llegan al usuario: /wishlist/price-alerts de un usuario sintético"""
+    _, response = time_request("POST", f"{BASE_URL}/auth/login",
+                               json={"email": "user0@synthetic.local", "password": SYNTHETIC_PASSWORD})
+    if response is None or response.status_code != 200:
+        return None
+    headers = auth_headers(response.json()["data"]["token"])
+    elapsed, response = time_request("GET", f"{BASE_URL}/wishlist/price-alerts", headers=headers,
+                                     params={"notified": "false"})
+    if response is None or response.status_code != 200:
+        return None
+    return {"alerts": len(response.json()["data"]), "latencyMs": elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de alertas de precio de wishlist")
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--wishlist", type=int, default=500000, help="Items de wishlist a sembrar")
+    parser.add_argument("--changed", type=int, default=10000, help="Variantes con precio nuevo por corrida")
+    parser.add_argument("--max-drop", type=float, default=0.3, help="Baja máxima de precio (0-1)")
+    parser.add_argument("--probe", default="/categories", help="Endpoint medido durante la evaluación")
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--full-scan", action="store_true",
+                        help="Medir también el job completo /wishlist/admin/notify-price-changes")
+    parser.add_argument("--timeout", type=float, default=1800)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-seed", action="store_true", help="Usar el dataset sintético existente")
+    args = parser.parse_args()
+
+    print_section("BENCHMARK DE ALERTAS DE PRECIO DE WISHLIST")
+
+    users = math.ceil(args.wishlist / args.products)
+    if not args.skip_seed:
+        seed_synthetic("--reset", "--users", str(users), "--products", str(args.products),
+                       "--wishlist", str(args.wishlist))
+
+    headers = auth_headers(login())
+    rng = random.Random(args.seed)
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "config": vars(args),
+    }
+
+    updates = price_updates(args, rng)
+    results["priceDrop"] = run_update("Actualización de precios", updates, headers, args)
+
+    # Mismos precios: los guardados ya quedaron al día, no hay alertas nuevas
+    results["unchanged"] = run_update("Mismos precios otra vez", updates, headers, args)
+    if results["unchanged"] and results["unchanged"]["alerts"]:
+        print(f"  {Colors.RED}✗ Se repitieron alertas sin cambio de precio{Colors.RESET}")
+
+    if args.full_scan:
+        # Recorre todos los productos seguidos; con los precios al día no crea alertas
+        print(f"\n{Colors.BOLD}Job completo{Colors.RESET}")
+        elapsed, response = time_request("POST", f"{BASE_URL}/wishlist/admin/notify-price-changes",
+                                         headers=headers, json={}, timeout=args.timeout)
+        if response is not None and response.status_code == 200:
+            data = response.json()["data"]
+            results["fullScan"] = {**data, "wallClockMs": elapsed}
+            print(f"  {data['processed']:,} items en {elapsed:,.0f}ms → {data['alertsCreated']:,} alertas")
+        else:
+            print(f"  {Colors.RED}✗ notify-price-changes falló{Colors.RESET}")
+
+    user_alerts = check_user_alerts()
+    results["userAlerts"] = user_alerts
+    if user_alerts:
+        print(f"\n  /wishlist/price-alerts de user0: {user_alerts['alerts']} alertas "
+              f"en {user_alerts['latencyMs']:.1f}ms")
+
+    filename = results_path("bench_wishlist_alerts")
+    with open(filename, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n{Colors.CYAN}📄 Resultados guardados en: {filename}{Colors.RESET}\n")
+
+
+if __name__ == "__main__":
+    main()
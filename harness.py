@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Harness de pruebas y benchmarks con backends aislados
+Levanta una o varias instancias del backend, cada una con:
+    - su propia base: copia de una plantilla ya migrada y sembrada
+      (CREATE DATABASE ... TEMPLATE, ver backend/scripts/harness-db.js)
+    - un puerto efímero
+    - un Redis propio (redis-server local en otro puerto efímero) o, si no
+      hay redis-server, los respaldos en memoria del backend
+    - opcionalmente, un grupo de CPUs propio (--cpus-per-instance)
+espera a que /health responda, corre la suite o el perfil de carga elegido
+contra esa instancia (CARNES_BASE_URL y CARNES_RESULTS_DIR apuntan a ella)
+y desmonta todo al terminar. Las instancias corren en paralelo, así se
+comparan configuraciones en la misma máquina y al mismo tiempo.
+
+La plantilla se crea la primera vez (migraciones, seed-simple, datos de
+gamificación y, si se pide, seed-synthetic con semilla fija) y se reutiliza
+en las corridas siguientes; --rebuild-template la regenera.
+
+Uso:
+    python3 harness.py --suite complete
+    python3 harness.py --suite gamification --instances 4 --cpus-per-instance 2
+    python3 harness.py --variant buffer:REFERRAL_CLICK_BUFFER=true \\
+        --variant por-clic:REFERRAL_CLICK_BUFFER=false -- bench_referral_clicks.py --clicks 10000
+    python3 harness.py --seed-args "--users 20000 --orders-per-user 5" --rebuild-template \\
+        --variant cache:DASHBOARD_CACHE=true --variant sin-cache:DASHBOARD_CACHE=false \\
+        -- bench_admin_dashboard.py --skip-seed --duration 30
+"""
+
+import argparse
+import json
+import os
+import shlex
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import urlparse, urlunparse
+
+import requests
+
+from bench_common import BACKEND_DIR, RESULTS_DIR, Colors, print_section, results_path
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SUITES = {
+    "complete": ["test_complete_system.py"],
+    "gamification": ["test_gamification.py"],
+    "load": ["load_open_loop.py", "--group", "catalog"],
+}
+
+# Entorno común de las instancias: sin límites de tasa que corten la carga
+# y con la hora fija en UTC para que los agregados por día coincidan
+BASE_ENV = {
+    "NODE_ENV": "test",
+    "TZ": "UTC",
+    "RATE_LIMIT_MAX": "1000000",
+    "AUTH_RATE_LIMIT_MAX": "1000000",
+}
+
+# Las copias de la plantilla se hacen de a una (la plantilla no admite
+# conexiones concurrentes mientras se copia)
+clone_lock = threading.Lock()
+
+
+def read_dotenv(path: str) -> Dict[str, str]:
+    values = {}
+    if not os.path.exists(path):
+        return values
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#") or "=" not in line:
+                continue
+            key, _, value = line.partition("=")
+            values[key.strip()] = value.strip().strip('"').strip("'")
+    return values
+
+
+def database_url(base_url: str, name: str) -> str:
+    """DATABASE_URL de la base `name` en el mismo servidor que base_url"""
+    parsed = urlparse(base_url)
+    return urlunparse(parsed._replace(path=f"/{name}"))
+
+
+def masked_url(url: str) -> str:
+    """URL sin la contraseña, para logs y resultados"""
+    parsed = urlparse(url)
+    if not parsed.password:
+        return url
+    return urlunparse(parsed._replace(netloc=parsed.netloc.replace(f":{parsed.password}@", ":***@")))
+
+
+def free_port() -> int:
+    """Puerto efímero libre según el sistema operativo"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+def run_node(args: List[str], env: Dict[str, str], check: bool = True) -> int:
+    print(f"{Colors.BLUE}$ {' '.join(args)}{Colors.RESET}")
+    return subprocess.run(args, cwd=BACKEND_DIR, env=env, check=check).returncode
+
+
+def harness_db(command: str, *names: str, base_url: str, check: bool = True) -> int:
+    env = dict(os.environ, DATABASE_URL=base_url)
+    return subprocess.run(["node", "scripts/harness-db.js", command, *names], cwd=BACKEND_DIR,
+                          env=env, check=check).returncode
+
+
+def prepare_template(args):
+    """Crea la base plantilla si no existe (o si se pide regenerarla)"""
+    exists = harness_db("exists", args.template, base_url=args.database_url, check=False) == 0
+    if exists and not args.rebuild_template:
+        print(f"  Plantilla {args.template}: reutilizada")
+        return
+
+    print(f"  Plantilla {args.template}: {'regenerando' if exists else 'creando'}")
+    harness_db("drop", args.template, base_url=args.database_url)
+    harness_db("create", args.template, base_url=args.database_url)
+    env = dict(os.environ, **BASE_ENV, DATABASE_URL=database_url(args.database_url, args.template))
+    run_node(["npx", "prisma", "migrate", "deploy"], env)
+    run_node(["node", "src/database/seed-simple.js"], env)
+    run_node(["node", "scripts/init-gamification-data.js"], env)
+    if args.seed_args:
+        run_node(["node", "scripts/seed-synthetic.js", "--seed", str(args.seed), *shlex.split(args.seed_args)], env)
+
+
+def parse_variants(specs: List[str]) -> List[Dict]:
+    """--variant nombre:KEY=VALUE,KEY=VALUE"""
+    variants = []
+    for spec in specs or ["default:"]:
+        name, _, pairs = spec.partition(":")
+        env = {}
+        for pair in filter(None, pairs.split(",")):
+            key, sep, value = pair.partition("=")
+            if not sep:
+                raise SystemExit(f"--variant espera nombre:KEY=VALUE,...: {spec}")
+            env[key.strip()] = value.strip()
+        variants.append({"name": name or "default", "env": env})
+    return variants
+
+
+def cpu_slices(count: int, per_instance: int) -> List[Optional[List[int]]]:
+    """Un grupo disjunto de CPUs por instancia (None = sin fijar)"""
+    if not per_instance:
+        return [None] * count
+    cpus = sorted(os.sched_getaffinity(0))
+    if count * per_instance > len(cpus):
+        raise SystemExit(f"{count} instancias x {per_instance} CPUs no entran en {len(cpus)} CPUs disponibles")
+    return [cpus[i * per_instance:(i + 1) * per_instance] for i in range(count)]
+
+
+class Instance:
+    """Un backend aislado: base, Redis, puerto y directorio de resultados propios"""
+
+    def __init__(self, index: int, variant: Dict, cpus: Optional[List[int]], run_id: str, args):
+        self.index = index
+        self.variant = variant
+        self.cpus = cpus
+        self.args = args
+        self.name = f"{variant['name']}-{index}"
+        self.database = f"carnes_harness_{run_id}_{index}"
+        self.dir = os.path.join(args.work_dir, self.name)
+        self.port = None
+        self.redis_port = None
+        self.server = None
+        self.redis = None
+        self.cloned = False
+        self.result = {"name": self.name, "variant": variant["name"], "env": variant["env"],
+                       "cpus": cpus, "database": self.database}
+
+    def popen(self, command: List[str], log_name: str, **kwargs) -> subprocess.Popen:
+        cpus = self.cpus
+        log = open(os.path.join(self.dir, log_name), "w")
+        try:
+            return subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT,
+                                    preexec_fn=(lambda: os.sched_setaffinity(0, cpus)) if cpus else None,
+                                    **kwargs)
+        finally:
+            log.close()
+
+    def start_redis(self, redis_server: Optional[str]) -> Optional[str]:
+        if not redis_server:
+            return None
+        self.redis_port = free_port()
+        self.redis = self.popen([redis_server, "--port", str(self.redis_port), "--bind", "127.0.0.1",
+                                 "--save", "", "--appendonly", "no"], "redis.log")
+        if not wait_for_port(self.redis_port, 10):
+            raise RuntimeError("redis-server no respondió")
+        return f"redis://127.0.0.1:{self.redis_port}"
+
+    def start_server(self, redis_url: Optional[str]):
+        """Arranca el backend y espera /health; reintenta si otro proceso tomó el puerto"""
+        for attempt in range(3):
+            self.port = free_port()
+            env = dict(os.environ, **BASE_ENV, **self.variant["env"],
+                       PORT=str(self.port),
+                       DATABASE_URL=database_url(self.args.database_url, self.database))
+            env.pop("REDIS_URL", None)
+            if redis_url:
+                env["REDIS_URL"] = redis_url
+            spawned = time.perf_counter()
+            self.server = self.popen(["node", "src/server.js"], f"server_{attempt}.log", cwd=BACKEND_DIR, env=env)
+            deadline = spawned + self.args.startup_timeout
+            while time.perf_counter() < deadline and self.server.poll() is None:
+                try:
+                    response = requests.get(f"http://127.0.0.1:{self.port}/health", timeout=2)
+                    if response.status_code == 200:
+                        self.result["readyMs"] = round((time.perf_counter() - spawned) * 1000, 1)
+                        return
+                except requests.RequestException:
+                    pass
+                time.sleep(0.05)
+            if self.server.poll() is None:
+                raise RuntimeError(f"/health no respondió en {self.args.startup_timeout:.0f}s")
+        raise RuntimeError(f"el servidor terminó durante el arranque (código {self.server.returncode})")
+
+    def run(self, command: List[str], redis_server: Optional[str]) -> Dict:
+        os.makedirs(self.dir, exist_ok=True)
+        started = time.perf_counter()
+        try:
+            with clone_lock:
+                harness_db("clone", self.args.template, self.database, base_url=self.args.database_url)
+            self.cloned = True
+            self.start_server(self.start_redis(redis_server))
+            self.result["port"] = self.port
+            self.result["redis"] = f"127.0.0.1:{self.redis_port}" if self.redis_port else "memoria"
+
+            env = dict(os.environ,
+                       CARNES_BASE_URL=f"http://127.0.0.1:{self.port}/api",
+                       CARNES_RESULTS_DIR=self.dir)
+            suite_started = time.perf_counter()
+            suite = self.popen(command, "suite.log", cwd=ROOT_DIR, env=env)
+            try:
+                self.result["exitCode"] = suite.wait(timeout=self.args.suite_timeout)
+            except subprocess.TimeoutExpired:
+                suite.kill()
+                suite.wait()
+                self.result["exitCode"] = None
+                self.result["error"] = f"la suite superó {self.args.suite_timeout:.0f}s"
+            self.result["suiteSeconds"] = round(time.perf_counter() - suite_started, 2)
+        except (RuntimeError, subprocess.CalledProcessError) as error:
+            self.result["error"] = str(error)
+        finally:
+            self.stop()
+            self.result["totalSeconds"] = round(time.perf_counter() - started, 2)
+            self.result["logs"] = self.dir
+            self.result["results"] = sorted(f for f in os.listdir(self.dir) if f.endswith(".json"))
+        return self.result
+
+    def stop(self):
+        for process in (self.server, self.redis):
+            if process is None or process.poll() is not None:
+                continue
+            process.send_signal(signal.SIGTERM)
+            try:
+                process.wait(timeout=self.args.shutdown_timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        # Solo la base que clonó esta instancia: si el clone falló el nombre puede ser de otra corrida
+        if self.cloned and not self.args.keep_databases:
+            harness_db("drop", self.database, base_url=self.args.database_url, check=False)
+
+
+def resolve_command(args) -> List[str]:
+    command = args.command[1:] if args.command[:1] == ["--"] else args.command
+    if not command:
+        command = SUITES[args.suite]
+    if command[0].endswith(".py"):
+        command = [sys.executable, command[0], *command[1:]]
+    return command
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backends aislados en paralelo para pruebas y benchmarks")
+    parser.add_argument("--label", default="", help="Etiqueta de la corrida")
+    parser.add_argument("--suite", choices=sorted(SUITES), default="complete",
+                        help="Suite a correr si no se pasa un comando después de --")
+    parser.add_argument("--variant", action="append", metavar="NOMBRE:KEY=VALUE,...",
+                        help="Configuración del backend a comparar (repetible)")
+    parser.add_argument("--instances", type=int, default=1, help="Instancias por variante")
+    parser.add_argument("--cpus-per-instance", type=int, default=0,
+                        help="CPUs fijas por instancia (backend y suite); 0 = sin fijar")
+    parser.add_argument("--redis", choices=["auto", "local", "none"], default="auto",
+                        help="Redis por instancia: redis-server local, respaldos en memoria o auto")
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL") or
+                        read_dotenv(os.path.join(BACKEND_DIR, ".env")).get("DATABASE_URL"),
+                        help="Servidor PostgreSQL (por defecto DATABASE_URL o backend/.env)")
+    parser.add_argument("--template", default="carnes_harness_template", help="Base plantilla")
+    parser.add_argument("--rebuild-template", action="store_true", help="Regenerar la plantilla")
+    parser.add_argument("--seed-args", default="", help="Argumentos de seed-synthetic.js para la plantilla")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla de seed-synthetic.js")
+    parser.add_argument("--work-dir", help="Directorio de logs y resultados (por defecto harness_<ts>/)")
+    parser.add_argument("--keep-databases", action="store_true", help="No borrar las bases de las instancias")
+    parser.add_argument("--startup-timeout", type=float, default=60)
+    parser.add_argument("--suite-timeout", type=float, default=3600)
+    parser.add_argument("--shutdown-timeout", type=float, default=15)
+    parser.add_argument("command", nargs=argparse.REMAINDER,
+                        help="Comando a correr contra cada instancia (después de --)")
+    args = parser.parse_args()
+
+    if not args.database_url:
+        raise SystemExit("Falta DATABASE_URL (variable de entorno, backend/.env o --database-url)")
+    command = resolve_command(args)
+    variants = parse_variants(args.variant)
+    # Único aunque dos corridas arranquen en el mismo segundo: las bases clonadas
+    # (y su drop en stop()) son por corrida. Minúsculas, dígitos y _ como exige
+    # harness-db.js; carnes_harness_<run_id>_<n> queda bajo 63 caracteres
+    run_id = f"{int(time.time())}_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+    args.work_dir = os.path.abspath(args.work_dir or os.path.join(RESULTS_DIR, f"harness_{run_id}"))
+
+    redis_server = shutil.which("redis-server") if args.redis != "none" else None
+    if args.redis == "local" and not redis_server:
+        raise SystemExit("--redis local requiere redis-server en el PATH")
+
+    specs = [variant for variant in variants for _ in range(args.instances)]
+    slices = cpu_slices(len(specs), args.cpus_per_instance)
+    instances = [Instance(i, variant, slices[i], run_id, args) for i, variant in enumerate(specs)]
+
+    print_section(f"HARNESS: {len(instances)} INSTANCIAS{f' ({args.label})' if args.label else ''}")
+    print(f"  Comando: {' '.join(command)}")
+    print(f"  PostgreSQL: {masked_url(args.database_url)} (plantilla {args.template})")
+    print(f"  Redis: {'redis-server por instancia' if redis_server else 'respaldos en memoria'}")
+    prepare_template(args)
+
+    with ThreadPoolExecutor(max_workers=len(instances)) as pool:
+        results = list(pool.map(lambda instance: instance.run(command, redis_server), instances))
+
+    print(f"\n  {'instancia':<20} {'puerto':>6} {'listo':>9} {'suite':>9} {'código':>7}  resultados")
+    for result in results:
+        ok = result.get("exitCode") == 0 and "error" not in result
+        color = Colors.GREEN if ok else Colors.RED
+        ready = f"{result['readyMs']:.0f}ms" if "readyMs" in result else "-"
+        suite = f"{result['suiteSeconds']:.1f}s" if "suiteSeconds" in result else "-"
+        print(f"  {result['name']:<20} {result.get('port') or '-':>6} {ready:>9} {suite:>9} "
+              f"{color}{result.get('exitCode') if result.get('exitCode') is not None else '-':>7}{Colors.RESET}"
+              f"  {', '.join(result['results']) or '-'}")
+        if "error" in result:
+            print(f"    {Colors.RED}✗ {result['error']}{Colors.RESET}")
+    print(f"  Logs: {args.work_dir}")
+
+    filename = results_path("harness")
+    with open(filename, "w") as f:
+        json.dump({
+            "timestamp": datetime.now().isoformat(),
+            "config": {**vars(args), "database_url": masked_url(args.database_url), "command": command},
+            "instances": results,
+        }, f, indent=2)
+    print(f"\n{Colors.CYAN}📄 Resultados guardados en: {filename}{Colors.RESET}\n")
+
+    sys.exit(0 if all(r.get("exitCode") == 0 and "error" not in r for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+Carga distribuida: coordinador y workers sobre TCP
+El coordinador reparte la población de usuarios virtuales entre workers
+(procesos en la misma máquina o en otros hosts). Cada worker ejecuta sus
+usuarios en lazo cerrado y envía por intervalo un histograma de latencias
+por endpoint; el coordinador los fusiona y reporta percentiles agregados
+exactos (mismos buckets que un único histograma con todas las muestras).
+
+Protocolo: una línea JSON por mensaje.
+    worker → coordinador: hello, snapshot (por intervalo), done
+    coordinador → worker: start (rango de usuarios y configuración)
+
+Uso:
+    # Una máquina, 8 procesos
+    python3 load_distributed.py coordinator --spawn-local 8 --users 800 --duration 120
+    # Varios hosts: el coordinador espera 4 workers externos
+    python3 load_distributed.py coordinator --listen 0.0.0.0:7070 --workers 4 --users 2000
+    python3 load_distributed.py worker --coordinator 10.0.0.5:7070
+"""
+
+import argparse
+import json
+import os
+import queue
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import requests
+
+from bench_common import (
+    BASE_URL, Colors, LatencyHistogram, ProfileCapture, RequestLog,
+    add_profiling_arguments, print_section, print_summary, results_path
+)
+
+DEFAULT_ENDPOINTS = [
+    "/categories",
+    "/products",
+    "/products?limit=50",
+    "/gamification/loyalty",
+    "/notifications",
+    "/wishlist",
+]
+
+
+# ==================== PROTOCOLO ====================
+
+def send_message(sock: socket.socket, message: Dict):
+    sock.sendall((json.dumps(message) + "\n").encode())
+
+
+def read_messages(stream):
+    """Generador de mensajes JSON delimitados por salto de línea"""
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def parse_address(value: str):
+    host, _, port = value.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+# ==================== WORKER ====================
+
+class IntervalRecorder:
+    """Histogramas por endpoint del intervalo en curso; se vacían en cada snapshot"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.histograms: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self.statuses: Counter = Counter()
+
+    def record(self, endpoint: str, latency_ms: float, status: Optional[int]):
+        with self.lock:
+            self.statuses[str(status) if status else "error"] += 1
+            if status is not None and status < 400:
+                self.histograms[endpoint].record(latency_ms)
+
+    def drain(self) -> Dict:
+        with self.lock:
+            snapshot = {
+                "histograms": {k: h.to_dict() for k, h in self.histograms.items()},
+                "statuses": dict(self.statuses),
+            }
+            self._reset()
+        return snapshot
+
+
+def login_user(base_url: str, email: str, password: str) -> Optional[str]:
+    try:
+        response = requests.post(f"{base_url}/auth/login",
+                                 json={"email": email, "password": password}, timeout=30)
+        response.raise_for_status()
+        return response.json()["data"]["token"]
+    except (requests.RequestException, KeyError, ValueError):
+        return None
+
+
+def virtual_user(index: int, config: Dict, recorder: IntervalRecorder, log: RequestLog, stop_at: float):
+    """Lazo cerrado: elegir endpoint, pedir, esperar think time, repetir"""
+    rng = random.Random(index)
+    token = login_user(config["baseUrl"], config["userEmail"].format(i=index), config["userPassword"])
+    session = requests.Session()
+    if token:
+        session.headers["Authorization"] = f"Bearer {token}"
+
+    endpoints = config["endpoints"]
+    think = config["thinkTimeMs"] / 1000
+    while time.time() < stop_at:
+        endpoint = rng.choice(endpoints)
+        start = time.perf_counter()
+        status = None
+        try:
+            status = session.get(f"{config['baseUrl']}{endpoint}", timeout=60).status_code
+        except requests.RequestException:
+            pass
+        latency_ms = (time.perf_counter() - start) * 1000
+        recorder.record(endpoint, latency_ms, status)
+        log.request(endpoint, status, latency_ms)
+        if think > 0:
+            time.sleep(rng.uniform(0, 2 * think))
+
+
+def run_worker(args):
+    host, port = parse_address(args.coordinator)
+    sock = socket.create_connection((host, port), timeout=args.connect_timeout)
+    sock.settimeout(None)
+    send_message(sock, {"type": "hello", "host": socket.gethostname(), "pid": os.getpid()})
+
+    start = next(read_messages(sock.makefile("r", encoding="utf-8")))
+    if start.get("type") != "start":
+        raise RuntimeError(f"Mensaje inesperado del coordinador: {start}")
+
+    config = start["config"]
+    first, last = start["userRange"]
+    recorder = IntervalRecorder()
+    began = time.time()
+    stop_at = began + config["durationSeconds"]
+
+    # Las muestras de recursos las toma el coordinador
+    with RequestLog(args.record, sample_interval=0) as log:
+        # Arranque escalonado para no iniciar sesión con todos a la vez; corre
+        # en su propio hilo para que los snapshots cubran también la rampa
+        users = []
+
+        def ramp_up():
+            ramp = config["rampUpSeconds"] / max(1, last - first)
+            for index in range(first, last):
+                thread = threading.Thread(target=virtual_user, daemon=True,
+                                          args=(index, config, recorder, log, stop_at))
+                thread.start()
+                users.append(thread)
+                if ramp > 0:
+                    time.sleep(ramp)
+
+        ramper = threading.Thread(target=ramp_up, daemon=True)
+        ramper.start()
+
+        interval = config["intervalSeconds"]
+        number = 0
+        while ramper.is_alive() or any(t.is_alive() for t in list(users)):
+            number += 1
+            time.sleep(max(0.0, began + number * interval - time.time()))
+            send_message(sock, {"type": "snapshot", "interval": number, **recorder.drain()})
+
+    send_message(sock, {"type": "snapshot", "interval": number + 1, **recorder.drain()})
+    send_message(sock, {"type": "done"})
+    sock.close()
+
+
+# ==================== COORDINADOR ====================
+
+class Aggregate:
+    """Fusión de snapshots: por intervalo y total, por endpoint"""
+
+    def __init__(self):
+        self.intervals: Dict[int, Dict[str, LatencyHistogram]] = defaultdict(lambda: defaultdict(LatencyHistogram))
+        self.interval_statuses: Dict[int, Counter] = defaultdict(Counter)
+        self.total: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self.statuses: Counter = Counter()
+
+    def add(self, snapshot: Dict):
+        number = snapshot["interval"]
+        for endpoint, data in snapshot["histograms"].items():
+            histogram = LatencyHistogram.from_dict(data)
+            self.intervals[number][endpoint].merge(histogram)
+            self.total[endpoint].merge(histogram)
+        self.interval_statuses[number].update(snapshot["statuses"])
+        self.statuses.update(snapshot["statuses"])
+
+    def interval_all(self, number: int) -> LatencyHistogram:
+        merged = LatencyHistogram()
+        for histogram in self.intervals[number].values():
+            merged.merge(histogram)
+        return merged
+
+    def total_all(self) -> LatencyHistogram:
+        merged = LatencyHistogram()
+        for histogram in self.total.values():
+            merged.merge(histogram)
+        return merged
+
+
+def split_users(total: int, workers: int) -> List[List[int]]:
+    """Rangos [inicio, fin) contiguos y balanceados"""
+    base, extra = divmod(total, workers)
+    ranges, start = [], 0
+    for i in range(workers):
+        size = base + (1 if i < extra else 0)
+        ranges.append([start, start + size])
+        start += size
+    return ranges
+
+
+def connection_reader(stream, worker_id: int, inbox: queue.Queue):
+    try:
+        for message in read_messages(stream):
+            inbox.put((worker_id, message))
+    except (OSError, ValueError) as error:
+        inbox.put((worker_id, {"type": "error", "error": str(error)}))
+    finally:
+        inbox.put((worker_id, {"type": "closed"}))
+
+
+def worker_record_path(path: str, number: int) -> str:
+    """run.jsonl.gz -> run.w0.jsonl.gz"""
+    base, marker, ext = path.partition(".jsonl")
+    return f"{base}.w{number}{marker}{ext}" if marker else f"{path}.w{number}"
+
+
+def accept_workers(server: socket.socket, expected: int, timeout: float) -> List:
+    """Conexiones (socket, stream) de los workers; None si no llegan todos a tiempo"""
+    server.settimeout(timeout)
+    connections = []
+    while len(connections) < expected:
+        try:
+            conn, address = server.accept()
+        except socket.timeout:
+            print(f"  {Colors.RED}✗ Solo se conectaron {len(connections)} de {expected} workers "
+                  f"en {timeout:.0f}s{Colors.RESET}")
+            for conn, _ in connections:
+                conn.close()
+            return None
+        conn.settimeout(timeout)
+        stream = conn.makefile("r", encoding="utf-8")
+        try:
+            hello = next(read_messages(stream))
+        except (OSError, ValueError, StopIteration):
+            print(f"  {Colors.YELLOW}⚠ Conexión de {address[0]} sin saludo válido, descartada{Colors.RESET}")
+            conn.close()
+            continue
+        conn.settimeout(None)
+        connections.append((conn, stream))
+        print(f"  {Colors.GREEN}✓{Colors.RESET} worker {len(connections)}: {hello['host']} pid={hello['pid']} ({address[0]})")
+    return connections
+
+
+def run_coordinator(args):
+    host, port = parse_address(args.listen)
+    expected = args.spawn_local or args.workers
+    server = socket.create_server((host, port))
+    port = server.getsockname()[1]
+
+    print_section("CARGA DISTRIBUIDA")
+    print(f"  Coordinador en {host}:{port}, esperando {expected} workers...")
+
+    children = []
+    if args.spawn_local:
+        for number in range(args.spawn_local):
+            command = [sys.executable, os.path.abspath(__file__), "worker",
+                       "--coordinator", f"127.0.0.1:{port}"]
+            if args.record:
+                command += ["--record", worker_record_path(args.record, number)]
+            children.append(subprocess.Popen(command))
+
+    connections = accept_workers(server, expected, args.connect_timeout)
+    server.close()
+    if connections is None:
+        for child in children:
+            child.terminate()
+        sys.exit(1)
+
+    config = {
+        "baseUrl": args.base_url,
+        "endpoints": args.endpoints or DEFAULT_ENDPOINTS,
+        "durationSeconds": args.duration,
+        "intervalSeconds": args.interval,
+        "rampUpSeconds": args.ramp_up,
+        "thinkTimeMs": args.think_time,
+        "userEmail": args.user_email,
+        "userPassword": args.user_password,
+    }
+
+    inbox: queue.Queue = queue.Queue()
+    print(f"\n  {args.users} usuarios virtuales, {args.duration}s, snapshots cada {args.interval}s\n")
+    aggregate = Aggregate()
+    # Workers que enviaron cada intervalo
+    reported: Dict[int, set] = defaultdict(set)
+    finished = set()
+    timeline = []
+
+    def report_complete_intervals():
+        """Muestra los intervalos que ya enviaron todos los workers activos"""
+        active = set(range(expected)) - finished
+        for number in sorted(reported):
+            if not active <= reported[number]:
+                continue
+            del reported[number]
+            summary = aggregate.interval_all(number).summary()
+            errors = sum(n for s, n in aggregate.interval_statuses[number].items()
+                         if s == "error" or int(s) >= 400)
+            if summary["count"] == 0 and errors == 0:
+                continue
+            timeline.append({"interval": number, "rps": summary["count"] / args.interval,
+                             "errors": errors, **summary})
+            print(f"  [{number * args.interval:5.0f}s] {summary['count'] / args.interval:8.1f} req/s  "
+                  f"p50={summary['p50']:7.1f}ms p99={summary['p99']:7.1f}ms errores={errors}")
+
+    # El coordinador muestrea la memoria del backend y perfila mientras dura la carga
+    with RequestLog(args.record, base_url=args.base_url), \
+            ProfileCapture(args, "load_distributed", base_url=args.base_url) as profile:
+        ranges = split_users(args.users, expected)
+        for worker_id, ((conn, stream), user_range) in enumerate(zip(connections, ranges)):
+            send_message(conn, {"type": "start", "userRange": user_range, "config": config})
+            threading.Thread(target=connection_reader, args=(stream, worker_id, inbox), daemon=True).start()
+
+        while len(finished) < expected:
+            worker_id, message = inbox.get()
+            kind = message["type"]
+            if kind == "snapshot":
+                aggregate.add(message)
+                reported[message["interval"]].add(worker_id)
+            elif kind in ("done", "closed", "error"):
+                if kind == "error":
+                    print(f"  {Colors.RED}✗ worker {worker_id}: {message['error']}{Colors.RESET}")
+                finished.add(worker_id)
+            # Un worker que termina puede completar intervalos que solo él debía
+            report_complete_intervals()
+
+    for child in children:
+        child.wait()
+
+    print(f"\n{Colors.BOLD}Agregado ({expected} workers){Colors.RESET}")
+    for endpoint, histogram in sorted(aggregate.total.items()):
+        print_summary(endpoint, histogram.summary())
+    overall = aggregate.total_all().summary()
+    print_summary("TOTAL", overall)
+    print(f"  Throughput medio: {overall['count'] / args.duration:.1f} req/s | "
+          f"Status: {dict(aggregate.statuses)}")
+
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "config": {**config, "workers": expected, "users": args.users},
+        "total": overall,
+        "endpoints": {k: {"latency": h.summary(), "histogram": h.to_dict()} for k, h in aggregate.total.items()},
+        "statuses": dict(aggregate.statuses),
+        "timeline": timeline,
+        "profiling": profile.summary(),
+    }
+    filename = results_path("load_distributed")
+    with open(filename, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n{Colors.CYAN}📄 Resultados guardados en: {filename}{Colors.RESET}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga distribuida con coordinador y workers")
+    sub = parser.add_subparsers(dest="role", required=True)
+
+    coordinator = sub.add_parser("coordinator", help="Reparte usuarios y agrega resultados")
+    coordinator.add_argument("--listen", default="127.0.0.1:0",
+                             help="host:puerto de escucha (0 = puerto libre, solo con --spawn-local)")
+    coordinator.add_argument("--workers", type=int, default=1, help="Workers externos a esperar")
+    coordinator.add_argument("--spawn-local", type=int, default=0,
+                             help="Lanzar N workers locales (uno por núcleo)")
+    coordinator.add_argument("--users", type=int, default=100)
+    coordinator.add_argument("--duration", type=int, default=60, help="Segundos de carga")
+    coordinator.add_argument("--interval", type=float, default=5, help="Segundos por snapshot")
+    coordinator.add_argument("--ramp-up", type=float, default=10, help="Segundos de arranque escalonado")
+    coordinator.add_argument("--think-time", type=float, default=0, help="Espera media entre requests (ms)")
+    coordinator.add_argument("--endpoint", action="append", dest="endpoints",
+                             help="Endpoint GET relativo a /api (repetible)")
+    coordinator.add_argument("--base-url", default=BASE_URL)
+    coordinator.add_argument("--user-email", default="user{i}@synthetic.local")
+    coordinator.add_argument("--user-password", default="synthetic123")
+    coordinator.add_argument("--connect-timeout", type=float, default=120)
+    coordinator.add_argument("--record",
+                             help="Registro JSONL para perf_report.py: memoria del backend aquí y "
+                                  "requests de cada worker local en <nombre>.wN.jsonl")
+    add_profiling_arguments(coordinator)
+
+    worker = sub.add_parser("worker", help="Ejecuta usuarios virtuales para un coordinador")
+    worker.add_argument("--coordinator", required=True, help="host:puerto del coordinador")
+    worker.add_argument("--connect-timeout", type=float, default=30)
+    worker.add_argument("--record", help="Registro JSONL de los requests de este worker")
+
+    args = parser.parse_args()
+    if args.role == "worker":
+        run_worker(args)
+    else:
+        run_coordinator(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Carga en lazo abierto (tasa de llegadas fija o Poisson)
+Los requests se disparan según un calendario de llegadas independiente de
+las respuestas, y la latencia se mide desde el instante en que el request
+debía salir. Así un atasco del backend aparece como latencia en vez de
+reducir la carga enviada (omisión coordinada del modo de lazo cerrado).
+
+Para cada grupo de endpoints se sube la tasa por escalones hasta que la
+tasa de error o el p99 superan el umbral; la última tasa que pasa es el
+máximo RPS sostenible del grupo.
+
+El rate limiter global del backend (RATE_LIMIT_MAX, 5000 requests cada
+15 min por IP fuera de producción) corta mucho antes que el servidor: hay
+que levantar el backend con un límite alto, por ejemplo
+    RATE_LIMIT_MAX=1000000 npm start   # en backend/
+Los 429 se cuentan aparte de los errores; un escalón con 429 corta la
+curva y el resultado queda marcado como limitado por el rate limiter.
+
+Uso:
+    python3 load_open_loop.py
+    python3 load_open_loop.py --group catalog --arrivals fixed --rates 50,100,200,400
+    python3 load_open_loop.py --start-rate 20 --step-factor 1.5 --max-p99-ms 300 --step-duration 20
+    python3 load_open_loop.py --define "busqueda=/products?search=res,/products?search=cerdo"
+    python3 load_open_loop.py --group catalog --profile-cpu --profile-event-loop --record run.jsonl.gz
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import requests
+
+from bench_common import (
+    BASE_URL, Colors, LatencyHistogram, ProfileCapture, RequestLog,
+    add_profiling_arguments, auth_headers, login, print_section, print_summary,
+    results_path
+)
+
+DEFAULT_GROUPS = {
+    "catalog": ["/categories", "/products", "/products?limit=50", "/products/top-selling"],
+    "account": ["/notifications", "/wishlist", "/gamification/loyalty"],
+}
+
+# Retraso del despachador a partir del cual la corrida no es confiable
+DISPATCH_LAG_WARN_MS = 10
+
+
+def arrival_offsets(rate: float, duration: float, mode: str, rng: random.Random) -> List[float]:
+    """Segundos desde el inicio en que debe salir cada request"""
+    if mode == "fixed":
+        return [i / rate for i in range(int(rate * duration))]
+
+    offsets = []
+    t = rng.expovariate(rate)
+    while t < duration:
+        offsets.append(t)
+        t += rng.expovariate(rate)
+    return offsets
+
+
+class StepRecorder:
+    """Métricas de un escalón: latencia desde el instante previsto y de servicio"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = LatencyHistogram()
+        self.service = LatencyHistogram()
+        self.dispatch_lag = LatencyHistogram()
+        self.statuses: Counter = Counter()
+        self.last_completion = 0.0
+
+    def record(self, intended: float, started: float, finished: float, status: Optional[int]):
+        with self.lock:
+            self.statuses[str(status) if status else "error"] += 1
+            self.last_completion = max(self.last_completion, finished)
+            if status is not None and status < 400:
+                self.latency.record((finished - intended) * 1000)
+                self.service.record((finished - started) * 1000)
+
+    def errors(self) -> int:
+        """Fallos del servidor o de red (sin contar los 429 del rate limiter)"""
+        return sum(n for s, n in self.statuses.items()
+                   if s == "error" or (int(s) >= 400 and s != "429"))
+
+    def rate_limited(self) -> int:
+        return self.statuses.get("429", 0)
+
+
+def run_step(endpoints: List[str], rate: float, args, headers: Dict[str, str],
+             rng: random.Random, log: RequestLog) -> Dict:
+    """Ejecuta un escalón de tasa constante y devuelve sus métricas"""
+    offsets = arrival_offsets(rate, args.step_duration, args.arrivals, rng)
+    recorder = StepRecorder()
+    local = threading.local()
+
+    def fire(endpoint: str, intended: float):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+            session.headers.update(headers)
+        started = time.perf_counter()
+        status = None
+        try:
+            status = session.get(f"{BASE_URL}{endpoint}", timeout=args.timeout).status_code
+        except requests.RequestException:
+            pass
+        finished = time.perf_counter()
+        recorder.record(intended, started, finished, status)
+        log.request(endpoint, status, (finished - intended) * 1000)
+
+    # Los requests que esperan un hilo libre siguen midiendo desde su instante previsto
+    with ThreadPoolExecutor(max_workers=args.max_inflight) as pool:
+        begin = time.perf_counter() + 0.1
+        for offset in offsets:
+            intended = begin + offset
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            recorder.dispatch_lag.record(max(0.0, time.perf_counter() - intended) * 1000)
+            pool.submit(fire, rng.choice(endpoints), intended)
+
+    sent = len(offsets)
+    errors = recorder.errors()
+    rate_limited = recorder.rate_limited()
+    elapsed = max(recorder.last_completion - begin, args.step_duration)
+    return {
+        "targetRps": rate,
+        "sent": sent,
+        "achievedRps": round((sent - errors - rate_limited) / elapsed, 1),
+        "errors": errors,
+        "errorRate": errors / sent if sent else 0.0,
+        "rateLimited": rate_limited,
+        "latency": recorder.latency.summary(),
+        "service": recorder.service.summary(),
+        "dispatchLagP99Ms": recorder.dispatch_lag.percentile(99),
+        "statuses": dict(recorder.statuses),
+    }
+
+
+def step_rates(args):
+    """Tasas a probar: lista explícita o progresión geométrica"""
+    if args.rates:
+        yield from (float(r) for r in args.rates.split(","))
+        return
+    rate = args.start_rate
+    while rate <= args.max_rate:
+        yield rate
+        rate *= args.step_factor
+
+
+def saturation_curve(name: str, endpoints: List[str], args, headers: Dict[str, str],
+                     log: RequestLog) -> Dict:
+    print(f"\n{Colors.BOLD}Grupo {name}{Colors.RESET} ({', '.join(endpoints)})")
+    rng = random.Random(args.seed)
+    curve = []
+    sustainable = None
+    breach = None
+    rate_limited = False
+
+    for rate in step_rates(args):
+        step = run_step(endpoints, rate, args, headers, rng, log)
+        curve.append(step)
+
+        reasons = []
+        if step["rateLimited"]:
+            rate_limited = True
+            reasons.append(f"{step['rateLimited']} respuestas 429")
+        if step["errorRate"] > args.max_error_rate:
+            reasons.append(f"errores {step['errorRate']:.1%}")
+        if step["latency"]["p99"] > args.max_p99_ms:
+            reasons.append(f"p99 {step['latency']['p99']:.0f}ms")
+
+        color = Colors.RED if reasons else Colors.GREEN
+        print(f"  {color}{rate:8.1f} req/s{Colors.RESET} → {step['achievedRps']:8.1f} ok/s  "
+              f"p50={step['latency']['p50']:7.1f}ms p99={step['latency']['p99']:8.1f}ms "
+              f"(servicio p99={step['service']['p99']:7.1f}ms) errores={step['errorRate']:.1%}")
+        if step["dispatchLagP99Ms"] > DISPATCH_LAG_WARN_MS:
+            print(f"    {Colors.YELLOW}⚠ El despachador va retrasado (p99 {step['dispatchLagP99Ms']:.1f}ms): "
+                  f"el cliente no sostiene esta tasa{Colors.RESET}")
+        if step["rateLimited"]:
+            print(f"    {Colors.YELLOW}⚠ El rate limiter respondió 429: se mide el límite y no el "
+                  f"servidor. Levantar el backend con RATE_LIMIT_MAX alto{Colors.RESET}")
+
+        if reasons:
+            breach = {"targetRps": rate, "reasons": reasons}
+            break
+        sustainable = step
+
+        if args.cooldown:
+            time.sleep(args.cooldown)
+
+    if sustainable:
+        note = " (cortado por el rate limiter, no es el máximo del servidor)" if rate_limited else ""
+        print(f"  {Colors.CYAN}Máximo sostenible: {sustainable['targetRps']:.1f} req/s{note}{Colors.RESET}")
+        print_summary(f"{name} @ {sustainable['targetRps']:.0f} req/s", sustainable["latency"])
+    else:
+        print(f"  {Colors.RED}Ningún escalón cumplió los umbrales{Colors.RESET}")
+
+    return {
+        "endpoints": endpoints,
+        "curve": curve,
+        "maxSustainableRps": sustainable["targetRps"] if sustainable else 0,
+        "breach": breach,
+        "rateLimited": rate_limited,
+    }
+
+
+def add_step_arguments(parser):
+    """Opciones de la curva de saturación (compartidas con otros benchmarks)"""
+    parser.add_argument("--arrivals", choices=["poisson", "fixed"], default="poisson")
+    parser.add_argument("--rates", help="Tasas explícitas separadas por coma (req/s)")
+    parser.add_argument("--start-rate", type=float, default=10)
+    parser.add_argument("--step-factor", type=float, default=1.5)
+    parser.add_argument("--max-rate", type=float, default=5000)
+    parser.add_argument("--step-duration", type=float, default=15, help="Segundos por escalón")
+    parser.add_argument("--cooldown", type=float, default=2, help="Pausa entre escalones (s)")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--max-p99-ms", type=float, default=500)
+    parser.add_argument("--max-inflight", type=int, default=256,
+                        help="Hilos de envío; los requests en espera cuentan como latencia")
+    parser.add_argument("--timeout", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga en lazo abierto y curva de saturación")
+    parser.add_argument("--group", action="append", dest="groups",
+                        help="Grupo a medir (repetible; por defecto todos)")
+    parser.add_argument("--define", action="append", default=[],
+                        help="Grupo propio: nombre=/ruta1,/ruta2")
+    add_step_arguments(parser)
+    parser.add_argument("--record", help="Registro JSONL por request para perf_report.py (.gz comprime)")
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+
+    groups = dict(DEFAULT_GROUPS)
+    for definition in args.define:
+        name, _, paths = definition.partition("=")
+        groups[name] = [p for p in paths.split(",") if p]
+    selected = args.groups or list(groups)
+    unknown = [g for g in selected if g not in groups]
+    if unknown:
+        parser.error(f"grupos desconocidos: {', '.join(unknown)}")
+
+    print_section("CARGA EN LAZO ABIERTO")
+    print(f"  Llegadas {args.arrivals}, {args.step_duration:.0f}s por escalón, "
+          f"umbral p99 {args.max_p99_ms:.0f}ms / errores {args.max_error_rate:.1%}")
+
+    headers = auth_headers(login())
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "config": vars(args),
+    }
+    with RequestLog(args.record) as log, ProfileCapture(args, "load_open_loop", headers) as profile:
+        results["groups"] = {name: saturation_curve(name, groups[name], args, headers, log)
+                             for name in selected}
+    results["profiling"] = profile.summary()
+
+    print(f"\n{Colors.BOLD}Máximo RPS sostenible por grupo{Colors.RESET}")
+    for name, group in results["groups"].items():
+        flag = f"  {Colors.YELLOW}(limitado por el rate limiter){Colors.RESET}" if group["rateLimited"] else ""
+        print(f"  {name:<20} {group['maxSustainableRps']:8.1f} req/s{flag}")
+
+    filename = results_path("load_open_loop")
+    with open(filename, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n{Colors.CYAN}📄 Resultados guardados en: {filename}{Colors.RESET}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Reporte HTML de rendimiento
+Genera un único archivo HTML autocontenido (sin dependencias externas, se
+abre offline) a partir de los registros por request de una corrida
+(--record de los harness): throughput y percentiles de latencia en el
+tiempo por endpoint, errores por status, muestras de memoria del backend
+y, opcionalmente, la superposición de una corrida base.
+
+Los registros se leen en streaming y se agregan en histogramas por
+intervalo, así el tamaño de la corrida no limita la memoria.
+
+Uso:
+    python3 load_open_loop.py --record run.jsonl.gz
+    python3 perf_report.py run.jsonl.gz
+    python3 perf_report.py run.jsonl.gz --baseline release_anterior.jsonl.gz -o reporte.html
+    python3 perf_report.py worker_*.jsonl --bucket 10 --top 8
+"""
+
+import argparse
+import html
+import os
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from bench_common import Colors, LatencyHistogram, RESULTS_DIR, iter_records, print_section
+
+PALETTE = ["#2563eb", "#dc2626", "#16a34a", "#d97706", "#7c3aed",
+           "#0891b2", "#db2777", "#65a30d", "#475569", "#ea580c"]
+MB = 1024 * 1024
+
+
+# ==================== AGREGACIÓN ====================
+
+class RunAggregate:
+    """Histogramas por (endpoint, intervalo) construidos registro a registro"""
+
+    def __init__(self, bucket_seconds: float):
+        self.bucket = bucket_seconds
+        self.latency: Dict[str, Dict[int, LatencyHistogram]] = defaultdict(lambda: defaultdict(LatencyHistogram))
+        self.requests: Dict[str, Counter] = defaultdict(Counter)
+        self.errors: Dict[str, Counter] = defaultdict(Counter)
+        self.total: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.resources: Dict[int, List[float]] = {}
+        self.first: Optional[float] = None
+        self.last: Optional[float] = None
+
+    def add(self, record: Dict):
+        t = record["t"]
+        self.first = t if self.first is None else min(self.first, t)
+        self.last = t if self.last is None else max(self.last, t)
+        index = int(t // self.bucket)
+
+        if record["type"] == "resource":
+            # [suma rss, suma heap, muestras]
+            entry = self.resources.setdefault(index, [0.0, 0.0, 0])
+            entry[0] += record.get("rss", 0)
+            entry[1] += record.get("heapUsed", 0)
+            entry[2] += 1
+            return
+
+        endpoint = record["endpoint"]
+        status = record.get("status")
+        self.requests[endpoint][index] += 1
+        self.statuses[endpoint][str(status) if status else "error"] += 1
+        if status is None or status >= 400:
+            self.errors[endpoint][index] += 1
+        else:
+            self.latency[endpoint][index].record(record["latencyMs"])
+            self.total[endpoint].record(record["latencyMs"])
+
+    def load(self, paths: List[str]) -> "RunAggregate":
+        for path in paths:
+            for record in iter_records(path):
+                self.add(record)
+        return self
+
+    @property
+    def duration(self) -> float:
+        if self.first is None:
+            return 0.0
+        return max(self.last - self.first, self.bucket)
+
+    def offset(self, index: int) -> float:
+        """Segundos desde el inicio de la corrida hasta el intervalo"""
+        return index * self.bucket - self.first + self.bucket / 2
+
+    def endpoints(self, top: int) -> List[str]:
+        ranked = sorted(self.requests, key=lambda e: -sum(self.requests[e].values()))
+        return ranked[:top]
+
+    def throughput_series(self, endpoint: Optional[str] = None) -> List[Tuple[float, float]]:
+        """Requests por segundo por intervalo (todos los endpoints si None)"""
+        counts: Counter = Counter()
+        for name, per_bucket in self.requests.items():
+            if endpoint is None or name == endpoint:
+                counts.update(per_bucket)
+        return [(self.offset(i), counts[i] / self.bucket) for i in sorted(counts)]
+
+    def percentile_series(self, endpoint: str, pct: float) -> List[Tuple[float, float]]:
+        per_bucket = self.latency.get(endpoint, {})
+        return [(self.offset(i), per_bucket[i].percentile(pct)) for i in sorted(per_bucket)]
+
+    def resource_series(self, field: int) -> List[Tuple[float, float]]:
+        return [(self.offset(i), entry[field] / entry[2] / MB)
+                for i, entry in sorted(self.resources.items())]
+
+    def summary(self, endpoint: str) -> Dict:
+        requests = sum(self.requests[endpoint].values())
+        errors = sum(self.errors[endpoint].values())
+        return {
+            "requests": requests,
+            "rps": requests / self.duration if self.duration else 0.0,
+            "errorRate": errors / requests if requests else 0.0,
+            **self.total[endpoint].summary(),
+        }
+
+
+# ==================== SVG ====================
+
+def line_chart(title: str, series: List[Dict], unit: str, width: int = 900, height: int = 260) -> str:
+    """
+    Gráfico de líneas SVG. Cada serie: {label, points: [(x, y)], color, dashed}
+    """
+    left, right, top, bottom = 60, 170, 30, 35
+    plot_w, plot_h = width - left - right, height - top - bottom
+    points = [p for s in series for p in s["points"]]
+    if not points:
+        return f"<h3>{html.escape(title)}</h3><p class='muted'>Sin datos</p>"
+
+    max_x = max(x for x, _ in points) or 1
+    max_y = max(y for _, y in points) or 1
+
+    def sx(x):
+        return left + x / max_x * plot_w
+
+    def sy(y):
+        return top + plot_h - y / max_y * plot_h
+
+    parts = [f"<svg viewBox='0 0 {width} {height}' class='chart'>",
+             f"<text x='{left}' y='18' class='title'>{html.escape(title)}</text>"]
+
+    for step in range(5):
+        value = max_y * step / 4
+        y = sy(value)
+        parts.append(f"<line x1='{left}' x2='{left + plot_w}' y1='{y:.1f}' y2='{y:.1f}' class='grid'/>")
+        parts.append(f"<text x='{left - 6}' y='{y + 4:.1f}' class='axis' text-anchor='end'>{value:.4g}</text>")
+    for step in range(5):
+        value = max_x * step / 4
+        parts.append(f"<text x='{sx(value):.1f}' y='{height - 12}' class='axis' "
+                     f"text-anchor='middle'>{value:.0f}s</text>")
+    parts.append(f"<text x='{left - 50}' y='{top - 8}' class='axis'>{html.escape(unit)}</text>")
+
+    for position, s in enumerate(series):
+        if not s["points"]:
+            continue
+        path = " ".join(f"{sx(x):.1f},{sy(y):.1f}" for x, y in s["points"])
+        dash = " stroke-dasharray='6 4'" if s.get("dashed") else ""
+        parts.append(f"<polyline points='{path}' fill='none' stroke='{s['color']}' stroke-width='1.6'{dash}/>")
+        ly = top + 14 * position
+        parts.append(f"<line x1='{left + plot_w + 12}' x2='{left + plot_w + 30}' y1='{ly}' y2='{ly}' "
+                     f"stroke='{s['color']}' stroke-width='2'{dash}/>")
+        parts.append(f"<text x='{left + plot_w + 34}' y='{ly + 4}' class='legend'>"
+                     f"{html.escape(s['label'][:22])}</text>")
+
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+# ==================== HTML ====================
+
+STYLE = """
+body { font-family: -apple-system, Segoe UI, Roboto, sans-serif; margin: 24px; color: #0f172a; }
+h1 { margin-bottom: 4px; } h2 { margin-top: 36px; border-bottom: 1px solid #e2e8f0; padding-bottom: 4px; }
+table { border-collapse: collapse; font-size: 13px; margin: 12px 0; }
+th, td { border: 1px solid #e2e8f0; padding: 4px 8px; text-align: right; }
+th:first-child, td:first-child { text-align: left; font-family: monospace; }
+th { background: #f1f5f9; }
+.muted { color: #64748b; } .worse { color: #dc2626; } .better { color: #16a34a; }
+.chart { width: 100%; max-width: 900px; display: block; margin: 8px 0 20px; }
+.chart .grid { stroke: #e2e8f0; } .chart .axis, .chart .legend { font-size: 11px; fill: #475569; }
+.chart .title { font-size: 13px; font-weight: bold; fill: #0f172a; }
+"""
+
+
+def delta_cell(current: float, baseline: Optional[float]) -> str:
+    """Diferencia porcentual contra la base (más latencia = peor)"""
+    if not baseline:
+        return "<td class='muted'>–</td>"
+    change = (current - baseline) / baseline * 100
+    css = "worse" if change > 5 else "better" if change < -5 else "muted"
+    return f"<td class='{css}'>{change:+.1f}%</td>"
+
+
+def endpoint_table(run: RunAggregate, baseline: Optional[RunAggregate], endpoints: List[str]) -> str:
+    header = ("<tr><th>Endpoint</th><th>Requests</th><th>req/s</th><th>Errores</th>"
+              "<th>p50 ms</th><th>p95 ms</th><th>p99 ms</th><th>max ms</th>")
+    if baseline:
+        header += "<th>p99 base</th><th>Δ p99</th>"
+    rows = [header + "</tr>"]
+    for endpoint in endpoints:
+        s = run.summary(endpoint)
+        row = (f"<tr><td>{html.escape(endpoint)}</td><td>{s['requests']}</td><td>{s['rps']:.1f}</td>"
+               f"<td>{s['errorRate']:.2%}</td><td>{s['p50']:.1f}</td><td>{s['p95']:.1f}</td>"
+               f"<td>{s['p99']:.1f}</td><td>{s['max']:.1f}</td>")
+        if baseline:
+            base_p99 = baseline.summary(endpoint)["p99"] if endpoint in baseline.requests else None
+            row += f"<td>{base_p99:.1f}</td>" if base_p99 else "<td class='muted'>–</td>"
+            row += delta_cell(s["p99"], base_p99)
+        rows.append(row + "</tr>")
+    return "<table>" + "".join(rows) + "</table>"
+
+
+def error_table(run: RunAggregate) -> str:
+    statuses = sorted({s for counts in run.statuses.values() for s in counts})
+    failing = [e for e in sorted(run.statuses)
+               if any(s == "error" or int(s) >= 400 for s in run.statuses[e])]
+    if not failing:
+        return "<p class='muted'>Sin errores</p>"
+    rows = ["<tr><th>Endpoint</th>" + "".join(f"<th>{html.escape(s)}</th>" for s in statuses) + "</tr>"]
+    for endpoint in failing:
+        counts = run.statuses[endpoint]
+        rows.append(f"<tr><td>{html.escape(endpoint)}</td>"
+                    + "".join(f"<td>{counts.get(s, '') or ''}</td>" for s in statuses) + "</tr>")
+    return "<table>" + "".join(rows) + "</table>"
+
+
+def render(run: RunAggregate, baseline: Optional[RunAggregate], args) -> str:
+    endpoints = run.endpoints(args.top)
+    total_requests = sum(sum(c.values()) for c in run.requests.values())
+    total_errors = sum(sum(c.values()) for c in run.errors.values())
+    started = datetime.fromtimestamp(run.first).isoformat(timespec="seconds") if run.first else "–"
+
+    sections = [
+        f"<h1>{html.escape(args.title)}</h1>",
+        f"<p class='muted'>Corrida: {html.escape(', '.join(args.runs))} · inicio {started} · "
+        f"{run.duration:.0f}s · {total_requests} requests · "
+        f"{total_requests / run.duration if run.duration else 0:.1f} req/s · "
+        f"errores {total_errors / total_requests if total_requests else 0:.2%}"
+        + (f"<br>Base: {html.escape(', '.join(args.baseline))}" if baseline else "") + "</p>",
+        "<h2>Resumen por endpoint</h2>",
+        endpoint_table(run, baseline, endpoints),
+        "<h2>Throughput</h2>",
+    ]
+
+    throughput = [{"label": "total", "points": run.throughput_series(), "color": "#0f172a"}]
+    if baseline:
+        throughput.append({"label": "total (base)", "points": baseline.throughput_series(),
+                           "color": "#94a3b8", "dashed": True})
+    for position, endpoint in enumerate(endpoints):
+        throughput.append({"label": endpoint, "points": run.throughput_series(endpoint),
+                           "color": PALETTE[position % len(PALETTE)]})
+    sections.append(line_chart("Requests por segundo", throughput, "req/s"))
+
+    sections.append("<h2>Latencia por endpoint</h2>")
+    for endpoint in endpoints:
+        series = [
+            {"label": "p50", "points": run.percentile_series(endpoint, 50), "color": PALETTE[2]},
+            {"label": "p95", "points": run.percentile_series(endpoint, 95), "color": PALETTE[3]},
+            {"label": "p99", "points": run.percentile_series(endpoint, 99), "color": PALETTE[1]},
+        ]
+        if baseline and endpoint in baseline.latency:
+            series.append({"label": "p99 base", "points": baseline.percentile_series(endpoint, 99),
+                           "color": "#94a3b8", "dashed": True})
+        sections.append(line_chart(endpoint, series, "ms"))
+
+    sections.append("<h2>Errores por status</h2>")
+    sections.append(error_table(run))
+
+    sections.append("<h2>Recursos del servidor</h2>")
+    if run.resources or (baseline and baseline.resources):
+        memory = [
+            {"label": "RSS", "points": run.resource_series(0), "color": PALETTE[0]},
+            {"label": "heap usado", "points": run.resource_series(1), "color": PALETTE[4]},
+        ]
+        if baseline:
+            memory.append({"label": "RSS (base)", "points": baseline.resource_series(0),
+                           "color": "#94a3b8", "dashed": True})
+        sections.append(line_chart("Memoria del backend (/health)", memory, "MB"))
+    else:
+        sections.append("<p class='muted'>La corrida no incluye muestras de recursos</p>")
+
+    return ("<!DOCTYPE html><html lang='es'><head><meta charset='utf-8'>"
+            f"<title>{html.escape(args.title)}</title><style>{STYLE}</style></head><body>"
+            + "\n".join(sections) + "</body></html>")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reporte HTML de rendimiento desde registros por request")
+    parser.add_argument("runs", nargs="+", help="Registros JSONL de la corrida (.jsonl o .jsonl.gz)")
+    parser.add_argument("--baseline", nargs="+", help="Registros de la corrida base a superponer")
+    parser.add_argument("--bucket", type=float, default=5, help="Segundos por punto de las series")
+    parser.add_argument("--top", type=int, default=12, help="Endpoints con más requests a graficar")
+    parser.add_argument("--title", default="Reporte de rendimiento - Carnes Premium")
+    parser.add_argument("-o", "--output", help="Archivo HTML de salida")
+    args = parser.parse_args()
+
+    print_section("REPORTE DE RENDIMIENTO")
+    started = time.perf_counter()
+    run = RunAggregate(args.bucket).load(args.runs)
+    if run.first is None:
+        print(f"{Colors.RED}✗ Los registros están vacíos{Colors.RESET}")
+        return
+    baseline = RunAggregate(args.bucket).load(args.baseline) if args.baseline else None
+
+    output = args.output or os.path.join(RESULTS_DIR, f"perf_report_{int(time.time())}.html")
+    with open(output, "w", encoding="utf-8") as f:
+        f.write(render(run, baseline, args))
+
+    print(f"  {len(run.requests)} endpoints, {run.duration:.0f}s de corrida, "
+          f"generado en {time.perf_counter() - started:.1f}s")
+    print(f"\n{Colors.CYAN}📄 Reporte guardado en: {output}{Colors.RESET}\n")
+
+
+if __name__ == "__main__":
+    main()
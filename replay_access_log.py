@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Replay de logs de acceso (formato combined de morgan) contra el backend
+Lee el log en streaming (también .gz), asigna cada cliente del log a un
+usuario virtual autenticado y reproduce las peticiones respetando los
+tiempos entre llegadas originales (1x, Nx o sin esperas) y el orden de
+cada usuario. Reporta la distribución de latencias por endpoint y compara
+el status obtenido con el registrado en el log.
+
+Uso:
+    python3 replay_access_log.py backend/server.log
+    python3 replay_access_log.py access.log.gz --speed 10 --lanes 64
+    python3 replay_access_log.py access.log --speed max --include-writes
+"""
+
+import argparse
+import gzip
+import json
+import queue
+import re
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+import requests
+
+from bench_common import (
+    ADMIN_EMAIL, ADMIN_PASSWORD, BASE_URL, SERVER_URL, Colors, LatencyHistogram,
+    ProfileCapture, RequestLog, add_profiling_arguments, print_section, print_summary,
+    results_path
+)
+
+# host ident user [fecha] "METHOD path HTTP/x" status bytes "referer" "user-agent"
+COMBINED_LOG = re.compile(
+    r'^(?P<addr>\S+) \S+ (?P<user>\S+) \[(?P<time>[^\]]+)\] '
+    r'"(?P<method>[A-Z]+) (?P<path>\S+) [^"]*" (?P<status>\d{3}) \S+'
+    r'(?: "(?P<referer>[^"]*)" "(?P<agent>[^"]*)")?'
+)
+LOG_TIME_FORMAT = "%d/%b/%Y:%H:%M:%S %z"
+
+# Segmentos de ruta que son identificadores (cuid, uuid, numéricos, sintéticos)
+ID_SEGMENT = re.compile(
+    r"^(\d+|c[a-z0-9]{20,}|[0-9a-f]{8}-[0-9a-f-]{27}|syn_[a-z]+_\d+|[A-Z]{2,4}-[\w-]+)$"
+)
+READ_METHODS = {"GET", "HEAD"}
+
+
+@dataclass
+class LogEntry:
+    timestamp: float  # segundos epoch (con la fracción asignada dentro del segundo)
+    client: str
+    method: str
+    path: str
+    status: int
+
+
+def open_log(path: str):
+    return gzip.open(path, "rt", errors="replace") if path.endswith(".gz") else open(path, errors="replace")
+
+
+def client_key(match, mode: str) -> str:
+    if mode == "user" and match.group("user") != "-":
+        return match.group("user")
+    if mode == "addr":
+        return match.group("addr")
+    return f"{match.group('addr')}|{match.group('agent') or ''}"
+
+
+def parse_log(path: str, key_mode: str) -> Iterator[LogEntry]:
+    """
+    Lee el log línea a línea. El formato combined tiene resolución de un
+    segundo: las peticiones de un mismo segundo se reparten uniformemente
+    dentro de él (solo se retiene en memoria el grupo del segundo actual).
+    """
+    group = []
+    group_second = None
+
+    def flush():
+        for index, entry in enumerate(group):
+            entry.timestamp = group_second + index / len(group)
+            yield entry
+
+    with open_log(path) as handle:
+        for line in handle:
+            match = COMBINED_LOG.match(line)
+            if not match:
+                continue  # líneas de la app mezcladas en el log
+            try:
+                second = datetime.strptime(match.group("time"), LOG_TIME_FORMAT).timestamp()
+            except ValueError:
+                continue
+
+            if second != group_second and group:
+                yield from flush()
+                group = []
+            group_second = second
+            group.append(LogEntry(second, client_key(match, key_mode), match.group("method"),
+                                  match.group("path"), int(match.group("status"))))
+
+    if group:
+        yield from flush()
+
+
+def endpoint_group(method: str, path: str) -> str:
+    """'GET /api/products/ckx...?page=2' -> 'GET /api/products/:id'"""
+    segments = path.split("?")[0].rstrip("/").split("/")
+    return f"{method} " + ("/".join(":id" if ID_SEGMENT.match(s) else s for s in segments) or "/")
+
+
+def is_admin_path(path: str) -> bool:
+    return path.startswith("/api/admin") or "/admin/" in path
+
+
+class VirtualUsers:
+    """
+    Asigna cada cliente del log a uno de N usuarios sintéticos
+    (user{i}@synthetic.local) y mantiene sus tokens. El login es perezoso
+    y se hace una sola vez por usuario.
+    """
+
+    def __init__(self, pool_size: int, email_pattern: str, password: str):
+        self.pool_size = pool_size
+        self.email_pattern = email_pattern
+        self.password = password
+        self.tokens: Dict[str, Optional[str]] = {}
+        self.lock = threading.Lock()
+        self.login_failures = 0
+
+    def _login(self, email: str, password: str) -> Optional[str]:
+        try:
+            response = requests.post(f"{BASE_URL}/auth/login",
+                                     json={"email": email, "password": password}, timeout=30)
+            response.raise_for_status()
+            return response.json()["data"]["token"]
+        except (requests.RequestException, KeyError, ValueError):
+            with self.lock:
+                self.login_failures += 1
+            return None
+
+    def _token(self, email: str, password: str) -> Optional[str]:
+        with self.lock:
+            if email in self.tokens:
+                return self.tokens[email]
+        token = self._login(email, password)
+        with self.lock:
+            self.tokens.setdefault(email, token)
+            return self.tokens[email]
+
+    def headers_for(self, client: str, path: str) -> Dict[str, str]:
+        if is_admin_path(path):
+            token = self._token(ADMIN_EMAIL, ADMIN_PASSWORD)
+        else:
+            # Hash estable (no depende de PYTHONHASHSEED)
+            index = zlib.crc32(client.encode()) % self.pool_size
+            token = self._token(self.email_pattern.format(i=index), self.password)
+        return {"Authorization": f"Bearer {token}"} if token else {}
+
+
+class ReplayStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self.lag = LatencyHistogram()
+        self.status_pairs: Dict[str, Counter] = defaultdict(Counter)
+        self.sent = 0
+        self.status_matches = 0
+        self.errors = 0
+
+    def record(self, group: str, recorded: int, replayed: Optional[int], latency_ms: float, lag_ms: float):
+        with self.lock:
+            self.sent += 1
+            self.lag.record(lag_ms)
+            self.status_pairs[group][f"{recorded}->{replayed or 'error'}"] += 1
+            if replayed is None:
+                self.errors += 1
+                return
+            self.latency[group].record(latency_ms)
+            if replayed == recorded:
+                self.status_matches += 1
+
+
+def lane_worker(lane: queue.Queue, users: VirtualUsers, stats: ReplayStats, log: RequestLog,
+                write_body: bool):
+    """Procesa en orden las peticiones de los clientes asignados a este carril"""
+    session = requests.Session()
+    while True:
+        item = lane.get()
+        if item is None:
+            return
+        entry, due = item
+        # El login perezoso del usuario virtual no cuenta como latencia
+        headers = users.headers_for(entry.client, entry.path)
+        start = time.perf_counter()
+        status = None
+        try:
+            response = session.request(
+                entry.method, f"{SERVER_URL}{entry.path}",
+                headers=headers,
+                json={} if write_body and entry.method not in READ_METHODS else None,
+                timeout=60,
+            )
+            status = response.status_code
+        except requests.RequestException:
+            pass
+        end = time.perf_counter()
+        group = endpoint_group(entry.method, entry.path)
+        stats.record(group, entry.status, status, (end - start) * 1000, max(0.0, start - due) * 1000)
+        log.request(group, status, (end - start) * 1000)
+
+
+def parse_speed(value: str) -> Optional[float]:
+    if value == "max":
+        return None
+    speed = float(value.rstrip("x"))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("la velocidad debe ser positiva o 'max'")
+    return speed
+
+
+def replay(args, log: RequestLog) -> Dict:
+    users = VirtualUsers(args.user_pool, args.user_email, args.user_password)
+    stats = ReplayStats()
+    # Colas acotadas: a velocidad máxima el lector espera en vez de cargar el log entero
+    lanes = [queue.Queue(maxsize=args.queue_size) for _ in range(args.lanes)]
+    threads = [threading.Thread(target=lane_worker, daemon=True,
+                                args=(lane, users, stats, log, args.include_writes))
+               for lane in lanes]
+    for thread in threads:
+        thread.start()
+
+    skipped = Counter()
+    log_start = None
+    log_end = None
+    wall_start = time.perf_counter()
+    read = 0
+
+    for entry in parse_log(args.log, args.user_key):
+        if args.limit and read >= args.limit:
+            break
+        read += 1
+
+        if entry.method not in READ_METHODS and not args.include_writes:
+            skipped["write"] += 1
+            continue
+        if not entry.path.startswith("/api/"):
+            skipped["non_api"] += 1
+            continue
+
+        if log_start is None:
+            log_start = entry.timestamp
+        log_end = entry.timestamp
+        if args.speed is None:
+            due = time.perf_counter()
+        else:
+            due = wall_start + (entry.timestamp - log_start) / args.speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        # Mismo cliente -> mismo carril: se conserva su orden
+        lanes[zlib.crc32(entry.client.encode()) % len(lanes)].put((entry, due))
+
+        if read % 1000 == 0:
+            print(f"\r  {read} líneas leídas, {stats.sent} enviadas", end="", flush=True)
+
+    for lane in lanes:
+        lane.put(None)
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.perf_counter() - wall_start
+    print(f"\r  {read} líneas leídas, {stats.sent} enviadas en {elapsed:.1f}s")
+
+    return {
+        "linesRead": read,
+        "sent": stats.sent,
+        "skipped": dict(skipped),
+        "elapsedSeconds": elapsed,
+        "achievedRps": stats.sent / elapsed if elapsed > 0 else 0,
+        "logSpanSeconds": (log_end - log_start) if log_start is not None else 0,
+        "statusMatchRate": stats.status_matches / stats.sent if stats.sent else 0,
+        "transportErrors": stats.errors,
+        "loginFailures": users.login_failures,
+        "lag": stats.lag.summary(),
+        "endpoints": {
+            group: {
+                "latency": stats.latency[group].summary(),
+                "histogram": stats.latency[group].to_dict(),
+                "statusPairs": dict(stats.status_pairs[group]),
+            }
+            for group in sorted(stats.status_pairs)
+        },
+    }
+
+
+def print_report(result: Dict):
+    print(f"\n{Colors.BOLD}Latencia por endpoint{Colors.RESET}")
+    ordered = sorted(result["endpoints"].items(), key=lambda item: -item[1]["latency"]["count"])
+    for group, entry in ordered:
+        print_summary(group[:40], entry["latency"])
+        mismatched = {pair: n for pair, n in entry["statusPairs"].items()
+                      if pair.split("->")[0] != pair.split("->")[1]}
+        if mismatched:
+            detail = ", ".join(f"{pair} x{n}" for pair, n in sorted(mismatched.items(), key=lambda p: -p[1]))
+            print(f"      {Colors.YELLOW}↳ status distinto al log: {detail}{Colors.RESET}")
+
+    match_rate = result["statusMatchRate"] * 100
+    color = Colors.GREEN if match_rate >= 95 else Colors.YELLOW
+    print(f"\n  {color}Status igual al registrado: {match_rate:.1f}%{Colors.RESET}")
+    print(f"  Throughput: {result['achievedRps']:.1f} req/s "
+          f"(log original: {result['logSpanSeconds']:.0f}s, replay: {result['elapsedSeconds']:.0f}s)")
+    print_summary("retraso de envío (lag)", result["lag"])
+    if result["loginFailures"]:
+        print(f"  {Colors.YELLOW}⚠ {result['loginFailures']} logins de usuarios virtuales fallidos "
+              f"(¿falta seed-synthetic --users?){Colors.RESET}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay de logs de acceso contra el backend")
+    parser.add_argument("log", help="Log en formato combined (.log o .gz)")
+    parser.add_argument("--speed", type=parse_speed, default=1.0,
+                        help="Factor de velocidad (1, 10, 2.5x) o 'max' para no esperar")
+    parser.add_argument("--lanes", type=int, default=32,
+                        help="Carriles paralelos; cada cliente del log usa siempre el mismo")
+    parser.add_argument("--queue-size", type=int, default=1000,
+                        help="Peticiones pendientes por carril antes de frenar la lectura")
+    parser.add_argument("--user-key", choices=["client", "addr", "user"], default="client",
+                        help="Cómo identificar clientes: ip+user-agent, ip o usuario del log")
+    parser.add_argument("--user-pool", type=int, default=100,
+                        help="Usuarios virtuales a los que se asignan los clientes")
+    parser.add_argument("--user-email", default="user{i}@synthetic.local")
+    parser.add_argument("--user-password", default="synthetic123")
+    parser.add_argument("--include-writes", action="store_true",
+                        help="Reproducir también POST/PUT/DELETE (con cuerpo vacío)")
+    parser.add_argument("--limit", type=int, default=0, help="Máximo de líneas a leer")
+    parser.add_argument("--record", help="Registro JSONL por request para perf_report.py (.gz comprime)")
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+
+    print_section("REPLAY DE LOG DE ACCESO")
+    speed = "máxima" if args.speed is None else f"{args.speed}x"
+    print(f"  {args.log} → {SERVER_URL} (velocidad {speed}, {args.lanes} carriles)\n")
+
+    with RequestLog(args.record) as log, ProfileCapture(args, "replay") as profile:
+        result = replay(args, log)
+    print_report(result)
+
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "config": {**vars(args), "speed": args.speed or "max"},
+        "replay": result,
+        "profiling": profile.summary(),
+    }
+    filename = results_path("replay_access_log")
+    with open(filename, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n{Colors.CYAN}📄 Resultados guardados en: {filename}{Colors.RESET}\n")
+
+
+if __name__ == "__main__":
+    main()
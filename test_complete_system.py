@@ -11,10 +11,8 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import time
 
-# Configuración
-BASE_URL = "http://localhost:3002/api"
-ADMIN_EMAIL = "admin@carnes.com"
-ADMIN_PASSWORD = "admin123"
+# Configuración (CARNES_BASE_URL, CARNES_ADMIN_EMAIL, CARNES_ADMIN_PASSWORD)
+from bench_common import ADMIN_EMAIL, ADMIN_PASSWORD, BASE_URL, results_path
 
 # Colores para output
 class Colors:
@@ -882,7 +880,7 @@ class SystemTester:
             'test_data': self.test_data
         }
         
-        filename = f"/workspace/test_results_{int(time.time())}.json"
+        filename = results_path("test_results")
         with open(filename, 'w') as f:
             json.dump(results, f, indent=2)
         
@@ -891,6 +889,7 @@ class SystemTester:
 def main():
     tester = SystemTester()
     tester.run_all_tests()
+    sys.exit(1 if tester.test_results['failed'] else 0)
 
 if __name__ == "__main__":
     main()
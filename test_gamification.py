@@ -2,13 +2,23 @@
 """
 Script de prueba para el Sistema de Gamificación
 Prueba todos los endpoints principales de gamificación
+
+Uso:
+    python3 test_gamification.py
+    python3 test_gamification.py --write-path --iterations 500
 """
 
-import requests
+import argparse
 import json
+import os
+import random
+import requests
 from datetime import datetime
 
-BASE_URL = "http://localhost:3002"
+from bench_common import RESULTS_DIR, SERVER_URL, print_summary, summarize, time_request
+
+# Configurable con CARNES_BASE_URL
+BASE_URL = SERVER_URL
 API_URL = f"{BASE_URL}/api"
 
 def print_separator():
@@ -18,7 +28,70 @@ def print_test_header(number, name):
     print(f"\n{number}. {name}")
     print("-" * 70)
 
+def run_write_path(headers, user_id, iterations):
+    """Dispara acciones PURCHASE/REVIEW contra el motor de reglas y mide latencias"""
+    print_test_header("⚡", f"RUTA DE ESCRITURA ({iterations} acciones)")
+    latencies = {"PURCHASE": [], "REVIEW": []}
+    badges_awarded = 0
+    challenges_touched = 0
+    errors = 0
+
+    for i in range(iterations):
+        if i % 3 == 2:
+            action = {"actionType": "REVIEW", "data": {}}
+        else:
+            action = {
+                "actionType": "PURCHASE",
+                "data": {
+                    "orderTotal": round(random.uniform(50, 500), 2),
+                    "productCount": random.randint(1, 5)
+                }
+            }
+
+        elapsed, response = time_request(
+            "POST", f"{API_URL}/gamification/admin/actions",
+            headers=headers, json={"userId": user_id, **action}
+        )
+        if response is None or response.status_code != 200:
+            errors += 1
+            continue
+
+        data = response.json()['data']
+        latencies[action["actionType"]].append(elapsed)
+        badges_awarded += len(data.get('badgesAwarded', []))
+        challenges_touched += len(data.get('challenges', []))
+
+    report = {
+        "iterations": iterations,
+        "errors": errors,
+        "badgesAwarded": badges_awarded,
+        "challengesTouched": challenges_touched,
+        "latency": {}
+    }
+    for action_type, values in latencies.items():
+        stats = summarize(values)
+        report["latency"][action_type] = stats
+        print_summary(action_type, stats)
+
+    all_stats = summarize(latencies["PURCHASE"] + latencies["REVIEW"])
+    report["latency"]["ALL"] = all_stats
+    print_summary("TOTAL", all_stats)
+    print(f"   Badges otorgados: {badges_awarded} | Challenges con progreso: {challenges_touched} | Errores: {errors}")
+
+    return report
+
 def main():
+    parser = argparse.ArgumentParser(description="Pruebas del sistema de gamificación")
+    parser.add_argument("--write-path", action="store_true",
+                        help="Medir la ruta de escritura (acciones → badges/challenges)")
+    parser.add_argument("--iterations", type=int, default=200,
+                        help="Acciones a disparar en modo --write-path")
+    parser.add_argument("--user-id", default=None,
+                        help="Usuario objetivo (por defecto el usuario autenticado)")
+    parser.add_argument("--output", default=os.environ.get(
+        "GAMIFICATION_RESULTS", os.path.join(RESULTS_DIR, "gamification_test_results.json")))
+    args = parser.parse_args()
+
     print_separator()
     print("PRUEBAS DEL SISTEMA DE GAMIFICACIÓN")
     print(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -47,6 +120,13 @@ def main():
     
     headers = {"Authorization": f"Bearer {token}"}
     results = {"timestamp": datetime.now().isoformat(), "tests": {}}
+
+    if args.write_path:
+        results['write_path'] = run_write_path(headers, args.user_id or user['id'], args.iterations)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\n📄 Resultados guardados en: {args.output}")
+        return
     
     # 2. Estadísticas de Lealtad
     print_test_header("📊", "ESTADÍSTICAS DE LEALTAD")
@@ -259,7 +339,7 @@ def main():
     # Guardar resultados
     print("\n")
     print_separator()
-    output_file = "/workspace/gamification_test_results.json"
+    output_file = args.output
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(results, f, indent=2, ensure_ascii=False)
     